@@ -0,0 +1,143 @@
+"""
+Пакетная запись завершений маршрутных карт.
+
+Номера ставятся в очередь, а отдельный поток записывает их пакетами через
+DatabaseManager.complete_route_cards: одна транзакция на все номера,
+накопившиеся за время предыдущей записи, вместо транзакции на каждую карту.
+Если база данных недоступна, номера пакета возвращаются с успехом None:
+карты не записаны, и вызывающий код сохраняет их в локальный журнал сканов.
+"""
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from route_card_db import DatabaseManager, DatabaseUnavailableError
+
+
+# Максимальное количество номеров в одной транзакции
+MAX_BATCH_SIZE = 500
+
+# Время ожидания дополнительных номеров перед записью пакета (секунды)
+MAX_BATCH_DELAY = 0.0
+
+# Функция (номер, успех, сообщение); успех None - база данных недоступна
+ResultCallback = Callable[[str, Optional[bool], Optional[str]], None]
+
+
+class BatchWriter:
+    """Фоновый поток пакетной записи завершений маршрутных карт."""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_delay: float = MAX_BATCH_DELAY
+    ) -> None:
+        """Инициализация пакетной записи.
+
+        Args:
+            db_manager: Менеджер базы данных
+            max_batch_size: Максимальное количество номеров в одной транзакции
+            max_delay: Время ожидания дополнительных номеров перед записью пакета
+        """
+        self.db_manager = db_manager
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.batches = 0
+        self.written = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, Optional[ResultCallback]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BatchWriter":
+        """Запуск потока записи.
+
+        Returns:
+            Этот же объект для цепочки вызовов
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="BatchWriter", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, route_card_number: str, callback: Optional[ResultCallback] = None) -> None:
+        """Постановка номера в очередь на завершение.
+
+        Args:
+            route_card_number: Нормализованный номер маршрутной карты
+            callback: Функция (номер, успех, сообщение), вызываемая из потока записи;
+                успех None означает, что база данных недоступна и карта не записана
+        """
+        self._queue.put((route_card_number, callback))
+
+    def pending(self) -> int:
+        """Количество номеров в очереди, еще не взятых на запись."""
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Ожидание записи всех номеров, поставленных в очередь."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Запись оставшихся номеров и остановка потока."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _collect(self, first: Tuple[str, Optional[ResultCallback]]) -> Tuple[list, bool]:
+        """Сбор пакета из очереди.
+
+        Returns:
+            Кортеж (пакет, получен сигнал остановки)
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        """Цикл потока записи."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch, stop = self._collect(item)
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _write(self, batch: List[Tuple[str, Optional[ResultCallback]]]) -> None:
+        """Запись пакета и уведомление о результатах."""
+        numbers = [number for number, _ in batch]
+        try:
+            results = self.db_manager.complete_route_cards(numbers)
+        except DatabaseUnavailableError as e:
+            results = [(number, None, str(e)) for number in numbers]
+        except Exception as e:
+            message = f"Ошибка при завершении маршрутной карты: {e}"
+            results = [(number, False, message) for number in numbers]
+
+        self.batches += 1
+        for (number, callback), (_, success, message) in zip(batch, results):
+            if success:
+                self.written += 1
+            if callback is not None:
+                try:
+                    callback(number, success, message)
+                except Exception as e:
+                    print(f"Ошибка обработки результата для карты №{number}: {e}")
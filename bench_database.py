@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+"""
+Бенчмарк методов DatabaseManager на сгенерированных базах разного размера.
+
+Для каждого размера базы (generate_test_db.generate_database) измеряется
+задержка каждого публичного метода DatabaseManager. Результаты выводятся
+таблицей и, по желанию, сохраняются в JSON. Регрессии определяются по
+файлу порогов (наибольшая медиана в мс для размера и метода) и по
+сравнению с сохраненным ранее JSON-результатом.
+
+Пример:
+    python bench_database.py --rows 10000 100000 --json результат.json --thresholds bench_thresholds.json
+    python bench_database.py --rows 100000 --baseline результат.json --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from generate_test_db import generate_database
+from route_card_db import DatabaseManager
+
+
+# Изменения медианы меньше этой величины (мс) не считаются регрессией
+NOISE_FLOOR_MS = 0.05
+
+ArgsFactory = Callable[[random.Random, int, int], List[tuple]]
+
+
+def _blanks(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [(f"{rng.randint(1, min(rows, 999999)):06d}",) for _ in range(calls)]
+
+
+def _accounts(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [
+        (f"{rng.randint(1, 12):02d}-{rng.randint(1, 999):03d}/{rng.randint(18, 25)}",)
+        for _ in range(calls)
+    ]
+
+
+def _clusters(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [
+        (f"К{rng.randint(18, 25)}/{rng.randint(1, 12):02d}-{rng.randint(1, 999):03d}",)
+        for _ in range(calls)
+    ]
+
+
+def _pages(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [(100, rng.randrange(0, max(rows - 100, 1), 100)) for _ in range(calls)]
+
+
+def _search_terms(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    terms = [f"{rng.randint(1, min(rows, 999999)):06d}", "К25/07-5", "03-31", "маршрутная"]
+    return [(terms[position % len(terms)],) for position in range(calls)]
+
+
+def _periods(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [
+        (f"20{year}-{month:02d}-01", f"20{year}-{month:02d}-28")
+        for year, month in ((rng.randint(18, 25), rng.randint(1, 12)) for _ in range(calls))
+    ]
+
+
+def _years(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [(2025,), (None,)] * (calls // 2) + [(2024,)] * (calls % 2)
+
+
+def _batch_numbers(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [([number for number, in _blanks(rng, rows, 100)],) for _ in range(calls)]
+
+
+def _replay_entries(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [
+        ([(number, "2025-12-31 12:00:00") for number, in _blanks(rng, rows, 100)],)
+        for _ in range(calls)
+    ]
+
+
+def _card_updates(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    # Год 99 генератор не использует, поэтому номера не конфликтуют с базой
+    return [
+        (number, f"{position % 12 + 1:02d}-{position // 12 % 999 + 1:03d}/99",
+         f"К99/{position % 12 + 1:02d}-{position // 12 % 999 + 1:03d}")
+        for position, (number,) in enumerate(_blanks(rng, rows, calls))
+    ]
+
+
+def _no_args(rng: random.Random, rows: int, calls: int) -> List[tuple]:
+    return [()] * calls
+
+
+# Методы DatabaseManager: (имя, тяжелый метод, генератор аргументов).
+# Тяжелые методы вызываются --slow-calls раз. Сначала идут чтения, затем записи.
+BENCHMARKS: List[Tuple[str, bool, ArgsFactory]] = [
+    ("check_blank_number", False, _blanks),
+    ("check_account_number", False, _accounts),
+    ("check_cluster_number", False, _clusters),
+    ("check_route_card_completed", False, _blanks),
+    ("get_all_records", False, _pages),
+    ("get_file_problems", False, _no_args),
+    ("search_records", True, _search_terms),
+    ("get_total_cards_count", True, _no_args),
+    ("get_completed_cards_count", True, _no_args),
+    ("get_incomplete_cards_count", True, _no_args),
+    ("get_cards_by_period", True, _periods),
+    ("get_cards_count_by_period", True, _periods),
+    ("get_completed_cards_by_period", True, _periods),
+    ("iter_cards", True, _periods),
+    ("get_monthly_stats", True, _years),
+    ("find_blank_sequence_issues", True, _no_args),
+    ("find_duplicate_numbers", True, _no_args),
+    ("complete_route_card", False, _blanks),
+    ("complete_route_cards", True, _batch_numbers),
+    ("replay_completions", True, _replay_entries),
+    ("update_card_info", False, _card_updates),
+    ("ensure_indexes", True, _no_args),
+    ("enable_blank_index", True, _no_args),
+    ("enable_mirror", True, _no_args),
+]
+
+# Методы, не требующие замера (подключение и настройка журнала без обращения к базе)
+UNBENCHMARKED_METHODS = {"connect", "enable_slow_query_log"}
+
+
+def missing_benchmarks() -> List[str]:
+    """Публичные методы DatabaseManager без замера.
+
+    Returns:
+        Имена методов, отсутствующих в BENCHMARKS
+    """
+    covered = {name for name, _, _ in BENCHMARKS} | UNBENCHMARKED_METHODS
+    return sorted(
+        name for name in dir(DatabaseManager)
+        if not name.startswith("_") and callable(getattr(DatabaseManager, name)) and name not in covered
+    )
+
+
+def call_method(db_manager: DatabaseManager, name: str, args: tuple) -> None:
+    """Вызов метода с полным получением результата.
+
+    Методы enable_* вызываются на отдельном менеджере, чтобы битовая карта и
+    зеркало не влияли на замеры других методов.
+    """
+    if name == "enable_blank_index":
+        DatabaseManager(db_manager.db_name).enable_blank_index(use_sidecar=False).close()
+        return
+    if name == "enable_mirror":
+        mirror = DatabaseManager(db_manager.db_name).enable_mirror()
+        mirror.ensure_current()
+        mirror.close()
+        return
+
+    result = getattr(db_manager, name)(*args)
+    if hasattr(result, "__next__"):
+        list(result)
+
+
+def measure(db_manager: DatabaseManager, name: str, args_list: List[tuple]) -> Dict[str, float]:
+    """Измерение задержки вызовов метода.
+
+    Args:
+        db_manager: Менеджер базы данных
+        name: Имя метода
+        args_list: Аргументы последовательных вызовов
+
+    Returns:
+        Словарь с количеством вызовов, медианой, p95 и максимумом в мс
+    """
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        call_method(db_manager, name, args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[max(int(len(timings) * 0.95 + 0.5) - 1, 0)],
+        "max_ms": timings[-1],
+    }
+
+
+def run_size(db_path: str, rows: int, calls: int, slow_calls: int, seed: int) -> Dict[str, dict]:
+    """Замер всех методов на одной базе.
+
+    Args:
+        db_path: Путь к копии базы (изменяется методами записи)
+        rows: Количество строк в базе
+        calls: Количество вызовов быстрых методов
+        slow_calls: Количество вызовов тяжелых методов
+        seed: Начальное значение генератора аргументов
+
+    Returns:
+        Словарь имя метода -> результаты measure
+    """
+    db_manager = DatabaseManager(db_path)
+    results = {}
+    for name, heavy, args_factory in BENCHMARKS:
+        rng = random.Random(f"{seed}-{name}")
+        args_list = args_factory(rng, rows, slow_calls if heavy else calls)
+        results[name] = measure(db_manager, name, args_list)
+    db_manager.recent_completions.close()
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, dict]],
+    thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+    baseline: Optional[Dict[str, Dict[str, dict]]] = None,
+    tolerance: float = 0.5
+) -> List[str]:
+    """Поиск регрессий по порогам и по предыдущему результату.
+
+    Args:
+        results: Результаты {размер: {метод: замер}}
+        thresholds: Наибольшие медианы {размер: {метод: мс}}
+        baseline: Предыдущие результаты в формате results
+        tolerance: Допустимый относительный рост медианы по сравнению с baseline
+
+    Returns:
+        Описания регрессий
+    """
+    regressions = []
+    for size, methods in results.items():
+        for name, result in methods.items():
+            limit = (thresholds or {}).get(size, {}).get(name)
+            if limit is not None and result["p50_ms"] > limit:
+                regressions.append(
+                    f"{size} строк, {name}: медиана {result['p50_ms']:.3f} мс больше порога {limit:.3f} мс"
+                )
+            previous = (baseline or {}).get(size, {}).get(name)
+            if previous is not None:
+                allowed = max(previous["p50_ms"] * (1 + tolerance), previous["p50_ms"] + NOISE_FLOOR_MS)
+                if result["p50_ms"] > allowed:
+                    regressions.append(
+                        f"{size} строк, {name}: медиана {result['p50_ms']:.3f} мс, "
+                        f"было {previous['p50_ms']:.3f} мс"
+                    )
+    return regressions
+
+
+def prepare_database(rows: int, directory: str, cache_dir: Optional[str], seed: int) -> str:
+    """Рабочая копия сгенерированной базы заданного размера.
+
+    Args:
+        rows: Количество строк
+        directory: Каталог для рабочей копии
+        cache_dir: Каталог для сохранения сгенерированных баз между запусками
+        seed: Начальное значение генератора базы
+
+    Returns:
+        Путь к рабочей копии
+    """
+    template_dir = cache_dir or directory
+    template_path = os.path.join(template_dir, f"маршрутные_карты_{rows}_{seed}.db")
+    if not os.path.exists(template_path):
+        os.makedirs(template_dir, exist_ok=True)
+        generate_database(template_path, rows, seed=seed)
+    work_path = os.path.join(directory, f"bench_{rows}.db")
+    shutil.copyfile(template_path, work_path)
+    return work_path
+
+
+def main() -> int:
+    """Запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк методов DatabaseManager")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="Размеры баз данных")
+    parser.add_argument("--calls", type=int, default=200, help="Вызовов быстрых методов")
+    parser.add_argument("--slow-calls", type=int, default=5, help="Вызовов тяжелых методов")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение генераторов")
+    parser.add_argument("--cache-dir", help="Каталог для сгенерированных баз (сохраняются между запусками)")
+    parser.add_argument("--json", help="Файл для сохранения результатов")
+    parser.add_argument("--thresholds", help="JSON-файл порогов {размер: {метод: мс}}")
+    parser.add_argument("--baseline", help="JSON-файл предыдущего результата для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Допустимый рост медианы от baseline")
+    args = parser.parse_args()
+
+    for name in missing_benchmarks():
+        print(f"Предупреждение: нет замера для DatabaseManager.{name}", file=sys.stderr)
+
+    results: Dict[str, Dict[str, dict]] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for rows in args.rows:
+            db_path = prepare_database(rows, temp_dir, args.cache_dir, args.seed)
+            results[str(rows)] = run_size(db_path, rows, args.calls, args.slow_calls, args.seed)
+
+    print(f"{'Метод':32}" + "".join(f"{size + ' строк':>16}" for size in results) + "  (медиана, мс)")
+    for name, _, _ in BENCHMARKS:
+        print(f"{name:32}" + "".join(f"{results[size][name]['p50_ms']:16.3f}" for size in results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "results": results,
+            }, output, ensure_ascii=False, indent=2)
+
+    thresholds = baseline = None
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as thresholds_file:
+            thresholds = json.load(thresholds_file)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    regressions = find_regressions(results, thresholds, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Регрессия: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
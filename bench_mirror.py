@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Бенчмарк зеркала таблицы маршрутных карт в памяти.
+
+Создает временную базу данных заданного размера (generate_test_db) и сравнивает:
+- память зеркала в байтах на строку;
+- время полной загрузки зеркала;
+- задержку чтений DatabaseManager из SQLite и из зеркала.
+
+Пример:
+    python bench_mirror.py --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+
+from card_mirror import CardMirror, mirror_memory_per_row
+from generate_test_db import generate_database
+from route_card_db import DatabaseManager
+
+
+def measure(func, args_list) -> dict:
+    """Измерение задержки вызовов в микросекундах.
+
+    Args:
+        func: Вызываемая функция
+        args_list: Список аргументов для последовательных вызовов
+
+    Returns:
+        Словарь с медианой, p95 и максимумом
+    """
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+        "max": timings[-1],
+    }
+
+
+def main() -> int:
+    """Запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк зеркала маршрутных карт")
+    parser.add_argument("--rows", type=int, default=100000, help="Количество строк в базе")
+    parser.add_argument("--lookups", type=int, default=2000, help="Количество чтений на метод")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "bench.db")
+        generate_database(db_path, args.rows)
+
+        tracemalloc.start()
+        mirror = CardMirror(db_path)
+        start = time.perf_counter()
+        mirror.ensure_current()
+        load_seconds = time.perf_counter() - start
+        traced_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"Строк: {args.rows}")
+        print(f"Загрузка зеркала: {load_seconds:.2f} с")
+        print(f"Память (tracemalloc): {traced_bytes / args.rows:.0f} байт/строку")
+        print(f"Память (getsizeof): {mirror_memory_per_row(mirror):.0f} байт/строку")
+        mirror.close()
+
+        sql_manager = DatabaseManager(db_path)
+        mirror_manager = DatabaseManager(db_path)
+        mirror_manager.enable_mirror().ensure_current()
+
+        rng = random.Random(1)
+        blanks = [(f"{rng.randint(1, args.rows):06d}",) for _ in range(args.lookups)]
+        accounts = [
+            (f"{rng.randint(1, 12):02d}-{rng.randint(1, 999):03d}/{rng.randint(18, 25)}",)
+            for _ in range(args.lookups)
+        ]
+        few = max(args.lookups // 20, 10)
+        benchmarks = [
+            ("check_blank_number", blanks),
+            ("check_route_card_completed", blanks),
+            ("check_account_number", accounts),
+            ("get_all_records", [(100, 0)] * few),
+            ("get_completed_cards_count", [()] * few),
+            ("get_cards_count_by_period", [("2025-03-01", "2025-03-31")] * few),
+            ("search_records", [("К25/07-5",)] * few),
+        ]
+
+        print()
+        print(f"{'Метод':32} {'SQLite p50':>12} {'Зеркало p50':>12} {'SQLite p95':>12} {'Зеркало p95':>12}  (мкс)")
+        for name, call_args in benchmarks:
+            sql = measure(getattr(sql_manager, name), call_args)
+            memory = measure(getattr(mirror_manager, name), call_args)
+            print(f"{name:32} {sql['p50']:12.1f} {memory['p50']:12.1f} {sql['p95']:12.1f} {memory['p95']:12.1f}")
+
+        mirror_manager.mirror.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""
+Бенчмарк задержки скана от нажатий клавиш до готовности к следующему скану.
+
+Приложение строится без окна (Kivy с бэкендом KIVY_GL_BACKEND=mock, как в
+тестах), а сканы подаются в поле route_card_input пачками нажатий клавиш,
+как их отправляет USB-сканер: цифры номера и Enter. Для каждого скана
+измеряются этапы обработки и общая задержка:
+- keys - ввод цифр в TextInput;
+- enter - обработка Enter (on_text_validate, весь обработчик скана);
+- validate, check, complete, optimistic - проверка номера и запросы к базе;
+- report, popup, banner, reset - сообщение о результате и сброс формы;
+- frame - следующий кадр Clock (отложенные обратные вызовы, без ожидания FPS);
+- total - от первой цифры до конца кадра.
+Этапы вложены: enter включает validate, check, complete и report.
+
+Пример:
+    python bench_scan_latency.py --rows 100000 --scans 500 --mode continuous --max-p95 total=20
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+# Кадр без ожидания ограничения FPS: замеряется только обработка
+os.environ.setdefault('KCFG_GRAPHICS_MAXFPS', '0')
+
+from kivy.clock import Clock
+
+from generate_test_db import generate_database
+from route_card_app import RouteCardApp
+from route_card_db import DatabaseManager
+
+
+# Порядок этапов в отчете
+STAGES = (
+    "keys", "enter", "validate", "check", "complete", "optimistic",
+    "report", "popup", "banner", "reset", "frame", "total",
+)
+
+# Режимы сообщений о результате скана
+MODES = ("popup", "continuous", "optimistic")
+
+
+class StageTimer:
+    """Сбор длительностей этапов обработки сканов."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, owner: object, attribute: str, stage: str) -> None:
+        """Замена метода объекта оберткой, замеряющей его длительность.
+
+        Args:
+            owner: Объект (приложение, менеджер базы данных, виджет)
+            attribute: Имя метода
+            stage: Имя этапа в отчете
+        """
+        method = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Добавление длительности этапа в миллисекундах."""
+        self.samples[stage].append(seconds * 1000)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Перцентили этапов.
+
+        Returns:
+            Словарь этап -> количество замеров, p50, p95, p99 и максимум (мс)
+        """
+        result = {}
+        for stage in STAGES:
+            values = sorted(self.samples.get(stage, []))
+            if not values:
+                continue
+            result[stage] = {
+                "count": len(values),
+                "p50": statistics.median(values),
+                "p95": values[max(int(len(values) * 0.95 + 0.5) - 1, 0)],
+                "p99": values[max(int(len(values) * 0.99 + 0.5) - 1, 0)],
+                "max": values[-1],
+            }
+        return result
+
+
+def build_app(db_path: str, mode: str, timer: StageTimer) -> RouteCardApp:
+    """Построение вкладки ввода без окна с замером этапов.
+
+    Args:
+        db_path: Путь к базе данных
+        mode: Режим из MODES
+        timer: Сбор длительностей этапов
+
+    Returns:
+        Приложение с построенной вкладкой редактирования
+    """
+    app = RouteCardApp()
+    app.db_manager = DatabaseManager(db_path)
+    app.build_edit_tab()
+    if mode in ("continuous", "optimistic"):
+        app.set_continuous_mode(True)
+    if mode == "optimistic":
+        app.optimistic_mode = True
+        app.db_manager.enable_blank_index(use_sidecar=False)
+        app.start_background_writer()
+        timer.wrap(app, "complete_optimistically", "optimistic")
+    # Первый кадр создает строки TextInput, без него ввод символов игнорируется
+    Clock.tick()
+
+    timer.wrap(app, "validate_route_card_number", "validate")
+    timer.wrap(app.db_manager, "check_route_card_completed", "check")
+    timer.wrap(app.db_manager, "complete_route_card", "complete")
+    timer.wrap(app, "report_scan", "report")
+    timer.wrap(app, "show_popup", "popup")
+    timer.wrap(app.scan_panel, "show", "banner")
+    timer.wrap(app, "reset_form", "reset")
+    return app
+
+
+def scan_numbers(db_path: str, scans: int, repeat_ratio: float, invalid_ratio: float, seed: int) -> List[str]:
+    """Последовательность сканов: новые карты, повторы и ошибочные номера.
+
+    Args:
+        db_path: Путь к базе данных
+        scans: Количество сканов
+        repeat_ratio: Доля повторных сканов уже отсканированных карт
+        invalid_ratio: Доля номеров вне допустимого диапазона
+        seed: Начальное значение генератора
+
+    Returns:
+        Номера в том виде, в каком их вводит сканер
+    """
+    conn = sqlite3.connect(db_path)
+    incomplete = [row[0] for row in conn.execute(
+        "SELECT Номер_бланка FROM маршрутные_карты WHERE Статус IS NOT 'Завершена'"
+    )]
+    conn.close()
+
+    rng = random.Random(seed)
+    rng.shuffle(incomplete)
+    numbers = []
+    for _ in range(scans):
+        roll = rng.random()
+        if roll < invalid_ratio:
+            numbers.append("9999999")
+        elif numbers and roll < invalid_ratio + repeat_ratio:
+            numbers.append(rng.choice(numbers))
+        elif incomplete:
+            numbers.append(incomplete.pop())
+        else:
+            numbers.append(f"{rng.randint(1, 999999):06d}")
+    return numbers
+
+
+def replay(app: RouteCardApp, numbers: List[str], timer: StageTimer, key_interval: float) -> None:
+    """Подача сканов пачками нажатий клавиш в поле ввода.
+
+    Args:
+        app: Приложение
+        numbers: Номера сканов
+        timer: Сбор длительностей этапов
+        key_interval: Пауза между нажатиями (с), 0 - без пауз
+    """
+    text_input = app.route_card_input
+    sleep: Callable[[float], None] = time.sleep
+    for number in numbers:
+        # После ошибки во всплывающем окне оператор очищает поле перед следующим сканом
+        if text_input.text:
+            text_input.text = ""
+            Clock.tick()
+
+        started = time.perf_counter()
+        for char in number:
+            text_input._key_down((char, char, None, 1))
+            if key_interval:
+                sleep(key_interval)
+        typed = time.perf_counter()
+        text_input._key_down((None, None, "enter", 1))
+        validated = time.perf_counter()
+        Clock.tick()
+        finished = time.perf_counter()
+
+        timer.add("keys", typed - started)
+        timer.add("enter", validated - typed)
+        timer.add("frame", finished - validated)
+        timer.add("total", finished - started)
+
+
+def run_benchmark(
+    db_path: str,
+    mode: str,
+    scans: int,
+    repeat_ratio: float = 0.1,
+    invalid_ratio: float = 0.02,
+    key_interval: float = 0.0,
+    seed: int = 1
+) -> Dict[str, Dict[str, float]]:
+    """Прогон сканов через интерфейс на указанной базе.
+
+    Args:
+        db_path: Путь к базе данных (изменяется сканами)
+        mode: Режим из MODES
+        scans: Количество сканов
+        repeat_ratio: Доля повторных сканов
+        invalid_ratio: Доля ошибочных номеров
+        key_interval: Пауза между нажатиями (с)
+        seed: Начальное значение генератора
+
+    Returns:
+        Перцентили этапов (StageTimer.summary)
+    """
+    timer = StageTimer()
+    app = build_app(db_path, mode, timer)
+    numbers = scan_numbers(db_path, scans, repeat_ratio, invalid_ratio, seed)
+    try:
+        replay(app, numbers, timer, key_interval)
+    finally:
+        if app.batch_writer is not None:
+            app.batch_writer.close()
+            Clock.tick()
+        app.db_manager.recent_completions.close()
+        if app.db_manager.blank_index is not None:
+            app.db_manager.blank_index.close()
+    return timer.summary()
+
+
+def parse_limit(text: str) -> Tuple[str, float]:
+    """Разбор порога "этап=мс"."""
+    stage, _, limit = text.partition("=")
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(f"Неизвестный этап: {stage}")
+    return stage, float(limit)
+
+
+def main() -> int:
+    """Запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description="Задержка скана через интерфейс без окна")
+    parser.add_argument("--db", help="Существующая база данных (копируется), по умолчанию генерируется")
+    parser.add_argument("--rows", type=int, default=100000, help="Количество строк сгенерированной базы")
+    parser.add_argument("--scans", type=int, default=500, help="Количество сканов")
+    parser.add_argument("--mode", choices=MODES, default="continuous", help="Режим сообщений о результате")
+    parser.add_argument("--repeat-ratio", type=float, default=0.1, help="Доля повторных сканов")
+    parser.add_argument("--invalid-ratio", type=float, default=0.02, help="Доля ошибочных номеров")
+    parser.add_argument("--key-interval", type=float, default=0.0, help="Пауза между нажатиями (с)")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение генератора")
+    parser.add_argument("--json", help="Файл для сохранения результатов")
+    parser.add_argument(
+        "--max-p95", type=parse_limit, action="append", default=[], metavar="ЭТАП=МС",
+        help="Порог p95 этапа, например total=20 (можно указать несколько)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "scan.db")
+        if args.db:
+            source = sqlite3.connect(args.db)
+            target = sqlite3.connect(db_path)
+            source.backup(target)
+            source.close()
+            target.close()
+        else:
+            generate_database(db_path, args.rows, {"Завершена": 0.5, None: 0.5}, seed=args.seed)
+
+        summary = run_benchmark(
+            db_path, args.mode, args.scans, args.repeat_ratio, args.invalid_ratio,
+            args.key_interval, args.seed
+        )
+
+    print(f"Сканов: {args.scans}, режим: {args.mode}")
+    print(f"{'Этап':12} {'Замеров':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'Макс':>9}  (мс)")
+    for stage, result in summary.items():
+        print(
+            f"{stage:12} {result['count']:8d} {result['p50']:9.3f} {result['p95']:9.3f} "
+            f"{result['p99']:9.3f} {result['max']:9.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({"mode": args.mode, "scans": args.scans, "stages": summary}, output, indent=2)
+
+    exceeded = [
+        (stage, limit) for stage, limit in args.max_p95
+        if stage in summary and summary[stage]["p95"] > limit
+    ]
+    for stage, limit in exceeded:
+        print(f"Регрессия: p95 этапа {stage} {summary[stage]['p95']:.3f} мс больше порога {limit:.3f} мс")
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
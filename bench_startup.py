@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Бенчмарк времени готовности приложения к вводу (time-to-interactive).
+
+Каждый замер запускает приложение в отдельном процессе и измеряет время от
+запуска процесса до первого кадра с фокусом на поле ввода номера
+маршрутной карты. Дополнительно выводится время импорта модулей и
+построения интерфейса.
+
+Пример:
+    python bench_startup.py --db маршрутные_карты.db --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def child(db_name: str, started: float) -> None:
+    """Запуск приложения и вывод времени до фокуса на поле ввода.
+
+    Args:
+        db_name: Путь к базе данных
+        started: Время запуска процесса (time.time() родительского процесса)
+    """
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_FILELOG', '1')
+
+    from kivy.clock import Clock
+    from route_card_app import RouteCardApp
+
+    imported = time.time()
+    app = RouteCardApp()
+    app.db_manager.db_name = db_name
+    timings = {}
+
+    def on_frame(dt: float) -> bool:
+        if "built" not in timings and app.root is not None:
+            timings["built"] = time.time()
+        if getattr(app, "route_card_input", None) is not None and app.route_card_input.focus:
+            ready = time.time()
+            print(
+                f"RESULT {ready - started:.4f} {imported - started:.4f} "
+                f"{timings.get('built', ready) - imported:.4f}",
+                flush=True
+            )
+            app.stop()
+            return False
+        return True
+
+    Clock.schedule_interval(on_frame, 0)
+    app.run()
+
+
+def measure(db_name: str) -> tuple:
+    """Один замер в отдельном процессе.
+
+    Args:
+        db_name: Путь к базе данных
+
+    Returns:
+        Кортеж (готовность, импорт, построение интерфейса) в секундах
+    """
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--db", db_name, "--started", repr(started)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return tuple(float(value) for value in line.split()[1:])
+    raise RuntimeError(f"Замер не выполнен: {result.stderr.strip()[-500:]}")
+
+
+def main() -> int:
+    """Запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description="Время готовности приложения к вводу")
+    parser.add_argument("--db", default="маршрутные_карты.db", help="Путь к файлу базы данных")
+    parser.add_argument("--runs", type=int, default=5, help="Количество запусков")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--started", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.db, args.started)
+        return 0
+
+    samples = [measure(args.db) for _ in range(args.runs)]
+    for name, position in (("Готовность к вводу", 0), ("Импорт модулей", 1), ("Построение интерфейса", 2)):
+        values = sorted(sample[position] for sample in samples)
+        print(
+            f"{name:24} медиана {statistics.median(values) * 1000:8.1f} мс, "
+            f"мин {values[0] * 1000:8.1f} мс, макс {values[-1] * 1000:8.1f} мс"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
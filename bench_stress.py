@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+"""
+Нагрузочный тест одной базы маршрутных карт несколькими станциями.
+
+Для каждой конфигурации подключения (режим журнала, synchronous, ожидание
+блокировки, повторы записи) на копии сгенерированной базы запускаются:
+- N процессов-сканеров, каждый завершает карты с заданной частотой тем же
+  путем, что и приложение (проверка завершенности, затем завершение);
+- процесс статистики, непрерывно выполняющий запросы вкладки статистики.
+
+Выводятся пропускная способность, задержки p50/p95/p99 и количество ошибок
+блокировки. Внешние сервисы не нужны.
+
+Пример:
+    python bench_stress.py --rows 100000 --scanners 8 --rate 5 --duration 10
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+from generate_test_db import generate_database
+from query_control import QueryControl
+from route_card_db import DatabaseManager
+from write_retry import WRITE_BUSY_TIMEOUT, WRITE_RETRY_ATTEMPTS, WriteRetryPolicy
+
+
+# Конфигурации: режим журнала, synchronous, ожидание блокировки (с), попыток записи
+CONFIGS: Dict[str, Tuple[str, str, float, int]] = {
+    "delete-no-retry": ("DELETE", "FULL", 5.0, 1),
+    "delete": ("DELETE", "FULL", WRITE_BUSY_TIMEOUT, WRITE_RETRY_ATTEMPTS),
+    "wal": ("WAL", "NORMAL", WRITE_BUSY_TIMEOUT, WRITE_RETRY_ATTEMPTS),
+    "wal-full": ("WAL", "FULL", WRITE_BUSY_TIMEOUT, WRITE_RETRY_ATTEMPTS),
+}
+
+# Запас времени на получение результатов сверх длительности нагрузки (секунды)
+RESULTS_TIMEOUT = 60.0
+
+
+class ConfiguredDatabaseManager(DatabaseManager):
+    """Менеджер базы данных с PRAGMA конфигурации на каждом подключении."""
+
+    def __init__(self, db_name: str, config: Tuple[str, str, float, int]) -> None:
+        super().__init__(db_name)
+        _, self.synchronous, busy_timeout, attempts = config
+        self.write_retry = WriteRetryPolicy(max_attempts=attempts, busy_timeout=busy_timeout)
+
+    def connect(
+        self,
+        timeout: float = 5.0,
+        control: Optional[QueryControl] = None
+    ) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
+        conn, cursor = super().connect(timeout, control)
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn, cursor
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Перцентиль по ближайшему рангу.
+
+    Args:
+        sorted_values: Отсортированные значения
+        fraction: Доля (0.95 для p95)
+
+    Returns:
+        Значение перцентиля или 0 для пустого списка
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(len(sorted_values) * fraction + 0.5) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def scanner(
+    db_path: str,
+    config: Tuple[str, str, float, int],
+    index: int,
+    scanners: int,
+    rows: int,
+    rate: float,
+    duration: float,
+    start_at: float,
+    results: multiprocessing.Queue
+) -> None:
+    """Процесс-сканер: завершение карт с заданной частотой.
+
+    Каждый сканер выбирает номера из своей доли бланков; часть сканов
+    повторяет уже отсканированные карты, как при двойном скане.
+    """
+    db_manager = ConfiguredDatabaseManager(db_path, config)
+    rng = random.Random(index)
+    numbers = list(range(index + 1, rows + 1, scanners))
+    scanned: List[str] = []
+    latencies = []
+    lock_errors = 0
+    other_errors = 0
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    interval = 1.0 / rate
+    next_scan = time.perf_counter()
+    deadline = next_scan + duration
+    while next_scan < deadline:
+        delay = next_scan - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        if scanned and rng.random() < 0.05:
+            number = rng.choice(scanned)
+        else:
+            number = f"{rng.choice(numbers):06d}"
+            scanned.append(number)
+
+        started = time.perf_counter()
+        try:
+            message = None
+            if not db_manager.check_route_card_completed(number):
+                _, message = db_manager.complete_route_card(number)
+        except Exception as e:
+            message = str(e)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        if message and "locked" in message:
+            lock_errors += 1
+        elif message and "не найдена" not in message:
+            other_errors += 1
+        next_scan += interval
+
+    db_manager.recent_completions.close()
+    results.put(("scanner", latencies, lock_errors, other_errors, db_manager.write_retry.stats()))
+
+
+def stats_reader(
+    db_path: str,
+    config: Tuple[str, str, float, int],
+    duration: float,
+    start_at: float,
+    results: multiprocessing.Queue
+) -> None:
+    """Процесс статистики: непрерывные запросы вкладки статистики."""
+    db_manager = ConfiguredDatabaseManager(db_path, config)
+    queries = [
+        (db_manager.get_completed_cards_count, ()),
+        (db_manager.get_cards_count_by_period, ("2025-03-01", "2025-03-31")),
+        (db_manager.get_completed_cards_by_period, ("2025-01-01", "2025-12-31")),
+        (db_manager.get_monthly_stats, (2025,)),
+    ]
+    latencies = []
+    lock_errors = 0
+    other_errors = 0
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    deadline = time.perf_counter() + duration
+    position = 0
+    while time.perf_counter() < deadline:
+        method, args = queries[position % len(queries)]
+        position += 1
+        output = io.StringIO()
+        started = time.perf_counter()
+        # Методы чтения сообщают об ошибках через print и возвращают значение по умолчанию
+        with contextlib.redirect_stdout(output):
+            method(*args)
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors = output.getvalue()
+        if "locked" in errors:
+            lock_errors += 1
+        elif errors:
+            other_errors += 1
+
+    results.put(("stats", latencies, lock_errors, other_errors, {}))
+
+
+def run_worker(role: str, target: Callable[..., None], *args) -> None:
+    """Запуск процесса нагрузки с передачей исключения в очередь результатов.
+
+    Последний аргумент target - очередь результатов. Без передачи ошибки
+    основной процесс ждал бы результат упавшего процесса.
+    """
+    results = args[-1]
+    try:
+        target(*args)
+    except BaseException:
+        results.put(("error", role, traceback.format_exc()))
+
+
+def collect_results(processes: List[multiprocessing.Process], results: multiprocessing.Queue, timeout: float) -> list:
+    """Получение результатов всех процессов нагрузки.
+
+    Args:
+        processes: Запущенные процессы
+        results: Очередь результатов
+        timeout: Общее время ожидания (секунды)
+
+    Returns:
+        Результаты процессов
+
+    Raises:
+        RuntimeError: Процесс завершился с ошибкой или не вернул результат вовремя
+            (оставшиеся процессы останавливаются)
+    """
+    deadline = time.monotonic() + timeout
+    collected = []
+    try:
+        for _ in processes:
+            try:
+                part = results.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                raise RuntimeError(f"Процессы нагрузки не вернули результаты за {timeout:g} с")
+            if part[0] == "error":
+                raise RuntimeError(f"Процесс '{part[1]}' завершился с ошибкой:\n{part[2]}")
+            collected.append(part)
+    except RuntimeError:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+    return collected
+
+
+def run_config(
+    template_path: str,
+    temp_dir: str,
+    name: str,
+    args: argparse.Namespace
+) -> dict:
+    """Запуск одной конфигурации на свежей копии базы.
+
+    Returns:
+        Словарь с результатами сканеров и процесса статистики
+
+    Raises:
+        RuntimeError: Процесс нагрузки завершился с ошибкой или завис
+    """
+    config = CONFIGS[name]
+    db_path = os.path.join(temp_dir, f"{name}.db")
+    shutil.copyfile(template_path, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {config[0]}")
+    conn.close()
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1.0
+    processes = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=("scanner", scanner, db_path, config, index, args.scanners, args.rows,
+                  args.rate, args.duration, start_at, results)
+        )
+        for index in range(args.scanners)
+    ]
+    if not args.no_stats:
+        processes.append(multiprocessing.Process(
+            target=run_worker, args=("stats", stats_reader, db_path, config, args.duration, start_at, results)
+        ))
+    for process in processes:
+        process.start()
+    collected = collect_results(processes, results, args.duration + RESULTS_TIMEOUT)
+
+    summary = {}
+    for role in ("scanner", "stats"):
+        parts = [part for part in collected if part[0] == role]
+        latencies = sorted(value for part in parts for value in part[1])
+        retries = sum(part[4].get("retries", 0) for part in parts)
+        summary[role] = {
+            "operations": len(latencies),
+            "throughput": len(latencies) / args.duration,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0.0,
+            "lock_errors": sum(part[2] for part in parts),
+            "other_errors": sum(part[3] for part in parts),
+            "retries": retries,
+        }
+    return summary
+
+
+def main() -> int:
+    """Запуск нагрузочного теста."""
+    parser = argparse.ArgumentParser(description="Нагрузочный тест базы маршрутных карт несколькими станциями")
+    parser.add_argument("--rows", type=int, default=100000, help="Количество строк в базе")
+    parser.add_argument("--scanners", type=int, default=4, help="Количество процессов-сканеров")
+    parser.add_argument("--rate", type=float, default=5.0, help="Сканов в секунду на один сканер")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность каждой конфигурации (с)")
+    parser.add_argument(
+        "--configs", nargs="+", choices=sorted(CONFIGS), default=list(CONFIGS),
+        help="Проверяемые конфигурации подключения"
+    )
+    parser.add_argument("--no-stats", action="store_true", help="Без процесса статистики")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        template_path = os.path.join(temp_dir, "template.db")
+        generate_database(template_path, args.rows)
+
+        print(
+            f"Строк: {args.rows}, сканеров: {args.scanners}, "
+            f"частота: {args.rate:g}/с на сканер, длительность: {args.duration:g} с"
+        )
+        print(
+            f"{'Конфигурация':22} {'Роль':8} {'Опер/с':>8} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'Макс':>8} {'Блок.':>6} {'Ошиб.':>6} {'Повт.':>6}  (мс)"
+        )
+        for name in args.configs:
+            try:
+                summary = run_config(template_path, temp_dir, name, args)
+            except RuntimeError as e:
+                print(f"{name}: {e}", file=sys.stderr)
+                return 1
+            for role, label in (("scanner", "сканеры"), ("stats", "отчеты")):
+                result = summary[role]
+                if not result["operations"]:
+                    continue
+                print(
+                    f"{name:22} {label:8} {result['throughput']:8.1f} {result['p50']:8.1f} "
+                    f"{result['p95']:8.1f} {result['p99']:8.1f} {result['max']:8.1f} "
+                    f"{result['lock_errors']:6d} {result['other_errors']:6d} {result['retries']:6d}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
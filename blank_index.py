@@ -0,0 +1,343 @@
+"""
+Битовая карта номеров бланков маршрутных карт.
+
+Номера бланков ограничены диапазоном 000001-999999, поэтому признаки
+"бланк существует" и "карта завершена" помещаются в две битовые карты по
+125 000 байт. Карта строится одним потоковым проходом по таблице и
+обновляется при каждой записи через DatabaseManager, что позволяет отвечать
+на вопросы "существует?", "завершена?" и "сколько в диапазоне?" без
+обращения к SQLite.
+
+Карта сохраняется в файл рядом с базой данных (<база>.bitmap) вместе с
+отпечатком файла базы, что ускоряет повторный запуск.
+
+Номера карт, перенесенных в архивы прошлых лет, тоже отмечаются в карте
+(как существующие и завершенные), чтобы их нельзя было создать повторно.
+Перенос в архив всегда изменяет файл базы, поэтому сохраненная карта после
+него строится заново.
+"""
+import os
+import sqlite3
+import struct
+import threading
+from typing import Optional, Sequence
+
+from data_version import DataVersionWatcher, connect_existing, file_stamp
+
+
+BLANK_MIN = 1
+BLANK_MAX = 999999
+
+# Один бит на каждый возможный номер бланка (0..999999)
+BITMAP_SIZE = (BLANK_MAX >> 3) + 1
+
+# Размер порции строк при потоковом чтении таблицы
+FETCH_BATCH_SIZE = 10000
+
+_SIDECAR_MAGIC = b"RCBM"
+_SIDECAR_FORMAT = 1
+_SIDECAR_HEADER = struct.Struct("<4sI5qq")
+
+
+def blank_to_int(blank_number: str) -> Optional[int]:
+    """Преобразование номера бланка в позицию битовой карты.
+
+    Args:
+        blank_number: Номер бланка в формате 'NNNNNN'
+
+    Returns:
+        Номер как целое число или None, если формат не шестизначный
+    """
+    if len(blank_number) != 6 or not blank_number.isdigit():
+        return None
+    number = int(blank_number)
+    if number < BLANK_MIN:
+        return None
+    return number
+
+
+def _popcount(bits: bytearray, start: int, end: int) -> int:
+    """Подсчет установленных битов в диапазоне [start, end]."""
+    if end < start:
+        return 0
+    chunk = int.from_bytes(bits[start >> 3:(end >> 3) + 1], "little")
+    chunk >>= start & 7
+    chunk &= (1 << (end - start + 1)) - 1
+    return chunk.bit_count()
+
+
+class BlankBitmap:
+    """Битовый индекс существования и завершения бланков."""
+
+    def __init__(self, db_name: str, archive_paths: Sequence[str] = ()) -> None:
+        """Инициализация пустой битовой карты.
+
+        Args:
+            db_name: Путь к файлу базы данных
+            archive_paths: Пути к архивам карт прошлых лет
+        """
+        self.db_name = db_name
+        self.archive_paths = tuple(archive_paths)
+        self.sidecar_path = db_name + ".bitmap"
+        self.exists_bits = bytearray(BITMAP_SIZE)
+        self.completed_bits = bytearray(BITMAP_SIZE)
+        self.max_id = 0
+        self._watcher = DataVersionWatcher(db_name)
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(
+        cls,
+        db_name: str,
+        use_sidecar: bool = True,
+        archive_paths: Sequence[str] = ()
+    ) -> "BlankBitmap":
+        """Загрузка битовой карты из файла или построение по базе данных.
+
+        Args:
+            db_name: Путь к файлу базы данных
+            use_sidecar: Использовать сохраненный файл битовой карты
+            archive_paths: Пути к архивам карт прошлых лет
+
+        Returns:
+            Готовая к работе битовая карта
+        """
+        bitmap = cls(db_name, archive_paths)
+        if not (use_sidecar and bitmap.load()):
+            bitmap.build()
+            if use_sidecar:
+                bitmap.save()
+        return bitmap
+
+    def exists(self, blank_number: str) -> bool:
+        """Проверка наличия бланка.
+
+        Args:
+            blank_number: Номер бланка
+
+        Returns:
+            True если бланк есть в битовой карте
+        """
+        number = blank_to_int(blank_number)
+        if number is None:
+            return False
+        return bool(self.exists_bits[number >> 3] & (1 << (number & 7)))
+
+    def completed(self, blank_number: str) -> bool:
+        """Проверка признака завершения карты.
+
+        Args:
+            blank_number: Номер бланка
+
+        Returns:
+            True если карта отмечена как завершенная
+        """
+        number = blank_to_int(blank_number)
+        if number is None:
+            return False
+        return bool(self.completed_bits[number >> 3] & (1 << (number & 7)))
+
+    def count_range(self, start: str, end: str, completed: bool = False) -> int:
+        """Подсчет бланков в диапазоне номеров.
+
+        Args:
+            start: Первый номер диапазона
+            end: Последний номер диапазона (включительно)
+            completed: Считать только завершенные карты
+
+        Returns:
+            Количество бланков в диапазоне
+        """
+        first = max(int(start), BLANK_MIN)
+        last = min(int(end), BLANK_MAX)
+        bits = self.completed_bits if completed else self.exists_bits
+        return _popcount(bits, first, last)
+
+    def mark_exists(self, blank_number: str) -> None:
+        """Отметка бланка как существующего."""
+        number = blank_to_int(blank_number)
+        if number is not None:
+            self.exists_bits[number >> 3] |= 1 << (number & 7)
+
+    def mark_completed(self, blank_number: str) -> None:
+        """Отметка карты как завершенной (бланк при этом существует)."""
+        number = blank_to_int(blank_number)
+        if number is not None:
+            mask = 1 << (number & 7)
+            self.exists_bits[number >> 3] |= mask
+            self.completed_bits[number >> 3] |= mask
+
+    def is_fresh(self) -> bool:
+        """Проверка, что после синхронизации база не изменялась.
+
+        Returns:
+            True если битовая карта отражает текущее состояние базы
+        """
+        version = self._watcher.current()
+        return version is not None and version == self._version
+
+    def precheck_completed(self, blank_number: str) -> Optional[bool]:
+        """Быстрая проверка завершения карты до обращения к SQLite.
+
+        Завершение карты необратимо, поэтому установленный бит считается
+        достоверным всегда. Отсутствие бланка достоверно только для
+        актуальной карты: новые бланки дочитываются по id перед ответом.
+
+        Args:
+            blank_number: Номер бланка
+
+        Returns:
+            True - карта завершена, False - бланка нет в базе,
+            None - нужен запрос к базе данных
+        """
+        if self.completed(blank_number):
+            return True
+        if not self.refresh():
+            return None
+        if not self.exists(blank_number):
+            return False
+        return None
+
+    def refresh(self) -> bool:
+        """Дочитывание новых строк, добавленных другими соединениями.
+
+        Returns:
+            True если после обновления битовая карта актуальна
+        """
+        with self._lock:
+            version = self._watcher.current()
+            if version is None:
+                return False
+            if version == self._version:
+                return True
+            try:
+                self._scan("WHERE id > ?", (self.max_id,))
+            except sqlite3.Error:
+                return False
+            self._version = version
+            return True
+
+    def note_write(self, blank_number: str, was_fresh: bool) -> None:
+        """Учет собственной записи о завершении карты.
+
+        Между проверкой актуальности и фиксацией записи (включая паузы
+        повторов) другие станции могли добавить бланки, поэтому актуальная
+        карта не просто принимает новую версию базы, а дочитывает новые строки.
+
+        Args:
+            blank_number: Номер завершенной карты
+            was_fresh: Была ли карта актуальной перед записью
+        """
+        with self._lock:
+            self.mark_completed(blank_number)
+        if was_fresh:
+            self.refresh()
+
+    def build(self) -> None:
+        """Построение битовой карты одним потоковым проходом по таблице и архивам."""
+        with self._lock:
+            self.exists_bits = bytearray(BITMAP_SIZE)
+            self.completed_bits = bytearray(BITMAP_SIZE)
+            self.max_id = 0
+            version = self._watcher.current()
+            self._scan("", ())
+            # id строк архивов не влияют на дочитывание новых строк основной таблицы
+            max_id = self.max_id
+            for path in self.archive_paths:
+                self._scan("", (), path)
+            self.max_id = max_id
+            self._version = version
+
+    def _scan(self, where: str, params: tuple, db_name: Optional[str] = None) -> None:
+        """Потоковое чтение строк таблицы (по умолчанию основной базы) с обновлением битов."""
+        conn = connect_existing(db_name or self.db_name)
+        try:
+            cursor = conn.execute(
+                f"SELECT id, Номер_бланка, Статус FROM маршрутные_карты {where}",
+                params
+            )
+            exists_bits = self.exists_bits
+            completed_bits = self.completed_bits
+            max_id = self.max_id
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row_id, blank_number, status in rows:
+                    if row_id > max_id:
+                        max_id = row_id
+                    if not blank_number:
+                        continue
+                    number = blank_to_int(blank_number)
+                    if number is None:
+                        continue
+                    mask = 1 << (number & 7)
+                    exists_bits[number >> 3] |= mask
+                    if status == "Завершена":
+                        completed_bits[number >> 3] |= mask
+            self.max_id = max_id
+        finally:
+            conn.close()
+
+    def load(self) -> bool:
+        """Загрузка битовой карты из файла рядом с базой данных.
+
+        Returns:
+            True если файл найден и соответствует текущему состоянию базы
+        """
+        try:
+            with open(self.sidecar_path, "rb") as sidecar:
+                header = sidecar.read(_SIDECAR_HEADER.size)
+                payload = sidecar.read()
+        except OSError:
+            return False
+
+        if len(header) != _SIDECAR_HEADER.size or len(payload) != 2 * BITMAP_SIZE:
+            return False
+
+        magic, file_format, *stamp, max_id = _SIDECAR_HEADER.unpack(header)
+        if magic != _SIDECAR_MAGIC or file_format != _SIDECAR_FORMAT:
+            return False
+
+        with self._lock:
+            version = self._watcher.current()
+            if tuple(stamp) != file_stamp(self.db_name):
+                return False
+            self.exists_bits = bytearray(payload[:BITMAP_SIZE])
+            self.completed_bits = bytearray(payload[BITMAP_SIZE:])
+            self.max_id = max_id
+            self._version = version
+        return True
+
+    def save(self) -> bool:
+        """Сохранение битовой карты в файл рядом с базой данных.
+
+        Карта сохраняется только если она актуальна, иначе отпечаток файла
+        базы не соответствовал бы ее содержимому.
+
+        Returns:
+            True если файл записан
+        """
+        with self._lock:
+            stamp = file_stamp(self.db_name)
+            version = self._watcher.current()
+            if version is None or version != self._version:
+                return False
+            header = _SIDECAR_HEADER.pack(
+                _SIDECAR_MAGIC, _SIDECAR_FORMAT, *stamp, self.max_id
+            )
+            temp_path = self.sidecar_path + ".tmp"
+            try:
+                with open(temp_path, "wb") as sidecar:
+                    sidecar.write(header)
+                    sidecar.write(self.exists_bits)
+                    sidecar.write(self.completed_bits)
+                os.replace(temp_path, self.sidecar_path)
+            except OSError:
+                return False
+        return True
+
+    def close(self) -> None:
+        """Освобождение соединения наблюдателя."""
+        self._watcher.close()
@@ -0,0 +1,128 @@
+"""
+Перенос завершенных карт прошлых лет в архивы по годам.
+
+Завершенные карты прошлых лет больше не изменяются, но участвуют в каждом
+просмотре таблицы маршрутные_карты. archive_completed_cards переносит их в
+файлы <имя базы>_архив_ГГГГ.db рядом с базой (год - по Дата_создания), и
+основная таблица содержит только рабочий набор карт. Запросы истории
+DatabaseManager (поиск, карты и статистика за период) подключают нужные
+архивы через ATTACH и видят всю историю; проверки и завершение карт
+обращаются только к основной таблице.
+
+Перенос каждого года выполняется одной транзакцией по основной базе и
+архиву: строки копируются с прежними id и удаляются из основной таблицы.
+Повторный запуск безопасен: строки, уже попавшие в архив, не дублируются.
+"""
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+from route_card_db import ARCHIVE_SCHEMA_PREFIX, DatabaseManager, archive_path
+
+
+# Таблица архива: те же столбцы, что в основной таблице, id сохраняется
+ARCHIVE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS {schema}.маршрутные_карты (
+           id INTEGER PRIMARY KEY,
+           Номер_бланка TEXT,
+           Учетный_номер TEXT,
+           Номер_кластера TEXT,
+           Статус TEXT,
+           Дата_создания TEXT,
+           Путь_к_файлу TEXT
+       )""",
+    """CREATE INDEX IF NOT EXISTS {schema}.idx_маршрутные_карты_номер_бланка
+       ON маршрутные_карты (Номер_бланка)""",
+)
+
+ARCHIVE_COLUMNS = "id, Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания, Путь_к_файлу"
+
+# Условие переноса: завершенная карта, созданная в году [начало года, начало следующего)
+ARCHIVE_WHERE = "Статус = 'Завершена' AND Дата_создания >= ? AND Дата_создания < ?"
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def archive_years(db_manager: DatabaseManager, before_year: int) -> List[Tuple[int, int]]:
+    """Года завершенных карт, подлежащих переносу в архив.
+
+    Args:
+        db_manager: Менеджер базы данных
+        before_year: Переносятся карты, завершенные раньше этого года
+
+    Returns:
+        Список (год, количество карт) по возрастанию года
+    """
+    conn, cursor = db_manager.connect()
+    try:
+        cursor.execute(
+            """SELECT strftime('%Y', Дата_создания) AS Год, COUNT(*)
+               FROM маршрутные_карты
+               WHERE Статус = 'Завершена' AND Дата_создания < ?
+               GROUP BY Год
+               HAVING Год IS NOT NULL
+               ORDER BY Год""",
+            (f"{before_year:04d}",)
+        )
+        return [(int(year), count) for year, count in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def archive_completed_cards(
+    db_manager: DatabaseManager,
+    before_year: int,
+    on_progress: Optional[ProgressCallback] = None
+) -> List[Tuple[int, int, str]]:
+    """Перенос завершенных карт прошлых лет в архивы по годам.
+
+    Args:
+        db_manager: Менеджер базы данных
+        before_year: Переносятся карты, завершенные раньше этого года
+        on_progress: Функция (перенесено карт, всего карт), вызывается после каждого года
+
+    Returns:
+        Список (год, перенесено карт, путь к архиву)
+
+    Raises:
+        sqlite3.Error: При ошибке записи (перенос года, на котором произошла
+            ошибка, отменяется целиком, уже перенесенные года остаются в архивах)
+    """
+    years = archive_years(db_manager, before_year)
+    total = sum(count for _, count in years)
+    moved = 0
+    results = []
+
+    for year, _ in years:
+        path = archive_path(db_manager.db_name, year)
+        schema = f'"{ARCHIVE_SCHEMA_PREFIX}{year}"'
+        year_range = (f"{year:04d}", f"{year + 1:04d}")
+        conn, cursor = db_manager.connect(timeout=db_manager.write_retry.busy_timeout)
+        try:
+            cursor.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            for statement in ARCHIVE_SCHEMA:
+                cursor.execute(statement.format(schema=schema))
+            conn.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                f"""INSERT OR IGNORE INTO {schema}.маршрутные_карты ({ARCHIVE_COLUMNS})
+                    SELECT {ARCHIVE_COLUMNS} FROM main.маршрутные_карты
+                    WHERE {ARCHIVE_WHERE}""",
+                year_range
+            )
+            cursor.execute(f"DELETE FROM main.маршрутные_карты WHERE {ARCHIVE_WHERE}", year_range)
+            count = cursor.rowcount
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        moved += count
+        results.append((year, count, path))
+        if on_progress is not None:
+            on_progress(moved, total)
+
+    if results and db_manager.mirror is not None:
+        # Зеркало дочитывает только новые строки, удаление требует полной загрузки
+        db_manager.mirror.reload()
+    return results
@@ -0,0 +1,207 @@
+"""
+Потоковая выгрузка маршрутных карт и сводки за период в CSV и XLSX.
+
+Карты читаются DatabaseManager.iter_cards участками (fetchmany) и сразу
+записываются в файл, поэтому память не зависит от размера периода. Сводка
+(количество карт, заполненных карт и заполненных по месяцам) считается по
+ходу выгрузки без дополнительных запросов.
+
+XLSX записывается через openpyxl в режиме write_only, если пакет
+установлен; CSV не требует дополнительных пакетов. Файл сначала пишется во
+временный и переименовывается только после успешной выгрузки, поэтому
+отмененная выгрузка не оставляет неполный отчет.
+"""
+import csv
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from query_control import QueryControl
+from route_card_db import EXPORT_CHUNK_SIZE, DatabaseManager
+
+try:
+    import openpyxl
+except ImportError:  # XLSX недоступен, выгрузка только в CSV
+    openpyxl = None
+
+
+# Заголовки столбцов в порядке полей CardRecord
+EXPORT_HEADERS = ("id", "Номер бланка", "Учетный номер", "Номер кластера", "Статус", "Дата создания")
+
+# Разделитель CSV: Excel с русскими региональными настройками ожидает точку с запятой
+CSV_DELIMITER = ";"
+
+# Статус заполненной карты
+COMPLETED_STATUS = "Завершена"
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class ExportError(Exception):
+    """Выгрузка в указанный формат невозможна."""
+
+
+def xlsx_available() -> bool:
+    """Установлен ли openpyxl для выгрузки в XLSX."""
+    return openpyxl is not None
+
+
+def export_format(path: str) -> str:
+    """Формат выгрузки по расширению файла.
+
+    Args:
+        path: Путь к файлу отчета
+
+    Returns:
+        "csv" или "xlsx"
+
+    Raises:
+        ExportError: Если расширение не поддерживается или openpyxl не установлен
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension == ".xlsx":
+        if not xlsx_available():
+            raise ExportError("Для выгрузки в XLSX установите пакет openpyxl (pip install openpyxl)")
+        return "xlsx"
+    raise ExportError(f"Неподдерживаемый формат файла: {extension or path} (ожидается .csv или .xlsx)")
+
+
+def default_export_name(period_start: Optional[str] = None, period_end: Optional[str] = None) -> str:
+    """Имя файла отчета по умолчанию (XLSX, если доступен, иначе CSV).
+
+    Args:
+        period_start: Начало периода или None для всех карт
+        period_end: Конец периода
+
+    Returns:
+        Имя файла в текущем каталоге
+    """
+    extension = "xlsx" if xlsx_available() else "csv"
+    if period_start is None:
+        return f"маршрутные_карты_все.{extension}"
+    return f"маршрутные_карты_{period_start}_{period_end}.{extension}"
+
+
+class _ReportSummary:
+    """Сводка, накапливаемая по ходу выгрузки."""
+
+    def __init__(self, period_start: Optional[str], period_end: Optional[str]) -> None:
+        self.period_start = period_start
+        self.period_end = period_end
+        self.total = 0
+        self.completed = 0
+        self.monthly: Dict[Tuple[str, str], int] = {}
+
+    def add(self, record: tuple) -> None:
+        self.total += 1
+        if record[4] == COMPLETED_STATUS:
+            self.completed += 1
+            created_at = record[5] or ""
+            key = (created_at[:4], created_at[5:7])
+            self.monthly[key] = self.monthly.get(key, 0) + 1
+
+    def rows(self) -> List[tuple]:
+        """Строки сводки для записи в отчет."""
+        if self.period_start is None:
+            period = "Все время"
+        else:
+            period = f"{self.period_start} - {self.period_end}"
+        rows = [
+            ("Период", period),
+            ("Всего карт", self.total),
+            ("Заполненные карты", self.completed),
+            (),
+            ("Год", "Месяц", "Заполнено карт"),
+        ]
+        rows.extend((year, month, count) for (year, month), count in sorted(self.monthly.items()))
+        return rows
+
+
+def _summary_path(path: str) -> str:
+    """Путь к файлу сводки рядом с CSV-файлом карт."""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}_сводка{extension}"
+
+
+def export_cards(
+    db_manager: DatabaseManager,
+    path: str,
+    period_start: Optional[str] = None,
+    period_end: Optional[str] = None,
+    control: Optional[QueryControl] = None,
+    on_progress: Optional[ProgressCallback] = None
+) -> int:
+    """Выгрузка карт (всех или за период) и сводки в файл.
+
+    В XLSX карты и сводка записываются на листы "Карты" и "Сводка", для CSV
+    сводка записывается в соседний файл с суффиксом "_сводка".
+
+    Args:
+        db_manager: Менеджер базы данных
+        path: Путь к файлу отчета (.csv или .xlsx)
+        period_start: Начало периода в формате 'YYYY-MM-DD', None - все карты
+        period_end: Конец периода в формате 'YYYY-MM-DD'
+        control: Отмена выгрузки (например, при закрытии приложения)
+        on_progress: Функция (выгружено карт, всего карт), вызывается после каждого участка
+
+    Returns:
+        Количество выгруженных карт
+
+    Raises:
+        ExportError: Если формат не поддерживается
+        QueryCancelled: Если выгрузка отменена (файл отчета не создается)
+        sqlite3.Error: При ошибке чтения базы данных
+        OSError: При ошибке записи файла
+    """
+    file_format = export_format(path)
+    if period_start is None:
+        total = db_manager.get_total_cards_count(control=control)
+    else:
+        total = db_manager.get_cards_count_by_period(period_start, period_end, control=control)
+    if on_progress is not None:
+        on_progress(0, total)
+
+    summary = _ReportSummary(period_start, period_end)
+    records = db_manager.iter_cards(period_start, period_end, control=control)
+    temp_path = f"{path}.tmp"
+    summary_temp_path = f"{_summary_path(path)}.tmp"
+
+    def write_records(append_row: Callable[[tuple], None]) -> None:
+        append_row(EXPORT_HEADERS)
+        for record in records:
+            append_row(record)
+            summary.add(record)
+            if summary.total % EXPORT_CHUNK_SIZE == 0:
+                if control is not None:
+                    control.check()
+                if on_progress is not None:
+                    on_progress(summary.total, total)
+
+    try:
+        if file_format == "xlsx":
+            workbook = openpyxl.Workbook(write_only=True)
+            cards_sheet = workbook.create_sheet("Карты")
+            write_records(cards_sheet.append)
+            summary_sheet = workbook.create_sheet("Сводка")
+            for row in summary.rows():
+                summary_sheet.append(row)
+            workbook.save(temp_path)
+        else:
+            with open(temp_path, "w", newline="", encoding="utf-8-sig") as output:
+                write_records(csv.writer(output, delimiter=CSV_DELIMITER).writerow)
+            with open(summary_temp_path, "w", newline="", encoding="utf-8-sig") as output:
+                csv.writer(output, delimiter=CSV_DELIMITER).writerows(summary.rows())
+        os.replace(temp_path, path)
+        if file_format == "csv":
+            os.replace(summary_temp_path, _summary_path(path))
+    except BaseException:
+        records.close()
+        for leftover_path in (temp_path, summary_temp_path):
+            if os.path.exists(leftover_path):
+                os.unlink(leftover_path)
+        raise
+
+    if on_progress is not None:
+        on_progress(summary.total, max(total, summary.total))
+    return summary.total
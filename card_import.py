@@ -0,0 +1,392 @@
+"""
+Потоковая загрузка новых серий бланков маршрутных карт.
+
+Источником служит CSV-файл (например, выгрузка card_export или таблица из
+Excel) или каталог с документами карт (маршрутная_карта_NNNNNN.pptx), номер
+бланка берется из имени файла, а путь записывается в Путь_к_файлу.
+
+Строки читаются и проверяются по одной (форматы номеров - регулярными
+выражениями приложения), поэтому память не зависит от размера источника.
+Повторы номеров бланков (в базе, ее архивах и внутри источника) определяются по битовой
+карте BlankBitmap и пропускаются. Завершенные карты, учетный номер или номер
+кластера которых уже занят завершенной картой (в базе или раньше в источнике),
+тоже пропускаются, чтобы уникальный индекс не отменил весь пакет. Вставка идет
+большими транзакциями.
+
+Индексы таблицы можно на время загрузки удалить и создать заново одним
+проходом в конце (defer_indexes). На базах, индекс номеров бланков которых
+помещается в кэш SQLite, это не ускоряет загрузку, а на время загрузки
+замедляет запросы других станций и снимает проверку уникальности, поэтому
+по умолчанию выключено.
+"""
+import csv
+import os
+import re
+import sqlite3
+from datetime import datetime
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from blank_index import BlankBitmap
+from route_card_db import (
+    ACCOUNT_NUMBER_PATTERN,
+    CLUSTER_NUMBER_PATTERN,
+    ROUTE_CARD_PATTERN,
+    UNIQUE_CARD_COLUMNS,
+    DatabaseManager,
+    find_archives,
+    validate_route_card_number,
+)
+
+
+# Столбцы таблицы, заполняемые при загрузке
+IMPORT_COLUMNS = ("Номер_бланка", "Учетный_номер", "Номер_кластера", "Статус", "Дата_создания", "Путь_к_файлу")
+
+# Количество строк в одной транзакции вставки
+IMPORT_BATCH_SIZE = 50000
+
+# Расширения документов карт при загрузке каталога
+DOCUMENT_EXTENSIONS = (".pptx",)
+
+# Номер бланка в имени документа: последняя группа из 6 цифр
+DOCUMENT_BLANK_PATTERN = re.compile(r"(\d{6})(?!.*\d{6})")
+
+# Дата создания: 'YYYY-MM-DD' или 'YYYY-MM-DD HH:MM:SS'
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2})?$")
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Строка источника: (номер строки CSV или путь к документу, значения IMPORT_COLUMNS)
+SourceRow = Tuple[Union[int, str], tuple]
+
+RejectedCallback = Callable[[Union[int, str], str, str], None]
+ProgressCallback = Callable[["ImportResult"], None]
+
+
+class CardImportError(Exception):
+    """Источник нельзя загрузить (нет файла, нет столбца номера бланка)."""
+
+
+class ImportResult(NamedTuple):
+    """Итог загрузки."""
+    inserted: int
+    duplicates: int
+    invalid: int
+    conflicts: List[Tuple[str, str, int, List[str]]]
+
+
+def _column_key(header: str) -> str:
+    """Приведение заголовка CSV к имени столбца: 'Номер бланка' -> 'номер_бланка'."""
+    return header.strip().replace(" ", "_").lower()
+
+
+def read_csv_rows(path: str) -> Iterator[SourceRow]:
+    """Потоковое чтение строк CSV-файла.
+
+    Столбцы определяются по заголовку (имена столбцов таблицы или заголовки
+    выгрузки, порядок любой, лишние столбцы вроде id игнорируются).
+    Разделитель - точка с запятой или запятая, по первой строке.
+
+    Args:
+        path: Путь к CSV-файлу в UTF-8
+
+    Yields:
+        (номер строки, значения IMPORT_COLUMNS), отсутствующие столбцы - пустые строки
+
+    Raises:
+        CardImportError: Если нет заголовка или столбца номера бланка
+    """
+    with open(path, newline="", encoding="utf-8-sig") as source:
+        header_line = source.readline()
+        delimiter = ";" if ";" in header_line else ","
+        header = next(csv.reader([header_line], delimiter=delimiter), [])
+        positions = {_column_key(name): position for position, name in enumerate(header)}
+        if IMPORT_COLUMNS[0].lower() not in positions:
+            raise CardImportError(f"{path}: в заголовке нет столбца 'Номер бланка'")
+
+        # Отсутствующие в файле столбцы читаются из дополнительного пустого значения
+        # после столбцов заголовка; лишние значения в конце строки отбрасываются
+        width = len(header)
+        row_getter = itemgetter(*(positions.get(column.lower(), width) for column in IMPORT_COLUMNS))
+        for line_number, values in enumerate(csv.reader(source, delimiter=delimiter), start=2):
+            if not values:
+                continue
+            if len(values) > width:
+                del values[width:]
+            values += [""] * (width + 1 - len(values))
+            yield line_number, row_getter(values)
+
+
+def scan_documents(directory: str) -> Iterator[SourceRow]:
+    """Потоковый обход каталога с документами карт (включая подкаталоги).
+
+    Args:
+        directory: Каталог с документами
+
+    Yields:
+        (путь к файлу, значения IMPORT_COLUMNS) с номером бланка из имени файла
+    """
+    pending = [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(DOCUMENT_EXTENSIONS):
+                    continue
+                match = DOCUMENT_BLANK_PATTERN.search(entry.name)
+                blank_number = match.group(1) if match else entry.name
+                yield entry.path, (blank_number, "", "", "", "", entry.path)
+
+
+def read_source(source: str) -> Iterator[SourceRow]:
+    """Строки источника: каталога с документами или CSV-файла.
+
+    Args:
+        source: Путь к каталогу или CSV-файлу
+
+    Returns:
+        Итератор строк источника
+
+    Raises:
+        CardImportError: Если источник не существует
+    """
+    if os.path.isdir(source):
+        return scan_documents(source)
+    if not os.path.isfile(source):
+        raise CardImportError(f"Источник не найден: {source}")
+    return read_csv_rows(source)
+
+
+def validate_row(row: tuple, created_at: str) -> Tuple[Optional[tuple], str]:
+    """Проверка и нормализация строки перед вставкой.
+
+    Args:
+        row: Значения IMPORT_COLUMNS (пустая строка или None - значение не задано)
+        created_at: Дата создания для строк без даты
+
+    Returns:
+        (нормализованная строка, "") или (None, причина отказа)
+    """
+    blank_number, account_number, cluster_number, status, created, path = row
+    if not (blank_number and ROUTE_CARD_PATTERN.match(blank_number) and blank_number != "000000"):
+        # Номер без ведущих нулей (например, после Excel) или с пробелами
+        valid, blank_number = validate_route_card_number(blank_number or "")
+        if not valid:
+            return None, f"неверный номер бланка '{blank_number}'"
+    account_number = account_number.strip() if account_number else None
+    if account_number and not ACCOUNT_NUMBER_PATTERN.match(account_number):
+        return None, f"неверный учетный номер '{account_number}'"
+    cluster_number = cluster_number.strip() if cluster_number else None
+    if cluster_number and not CLUSTER_NUMBER_PATTERN.match(cluster_number):
+        return None, f"неверный номер кластера '{cluster_number}'"
+    created = created.strip() if created else None
+    if not created:
+        created = created_at
+    elif not DATE_PATTERN.match(created):
+        return None, f"неверная дата создания '{created}'"
+    return (
+        blank_number,
+        account_number or None,
+        cluster_number or None,
+        status.strip() or None if status else None,
+        created,
+        path.strip() or None if path else None,
+    ), ""
+
+
+def _table_indexes(cursor: sqlite3.Cursor) -> List[Tuple[str, str]]:
+    """Имена и определения созданных пользователем индексов таблицы."""
+    cursor.execute(
+        """SELECT name, sql FROM sqlite_master
+           WHERE type = 'index' AND tbl_name = 'маршрутные_карты' AND sql IS NOT NULL"""
+    )
+    return cursor.fetchall()
+
+
+def _unique_checks(indexes: List[Tuple[str, str]]) -> List[Tuple[int, str, Set[str]]]:
+    """Столбцы с уникальным индексом среди завершенных карт.
+
+    Returns:
+        Список (позиция в IMPORT_COLUMNS, столбец, значения, загруженные из источника)
+    """
+    names = {name for name, _ in indexes}
+    return [
+        (IMPORT_COLUMNS.index(column), column, set())
+        for column, index_suffix in UNIQUE_CARD_COLUMNS
+        if f"uq_маршрутные_карты_{index_suffix}" in names
+    ]
+
+
+def _unique_conflict(
+    cursor: sqlite3.Cursor,
+    record: tuple,
+    unique_checks: List[Tuple[int, str, Set[str]]]
+) -> str:
+    """Проверка учетного номера и номера кластера завершенной карты перед вставкой.
+
+    Значения ищутся по уникальному индексу в базе и среди уже загруженных
+    строк источника; свободные значения запоминаются.
+
+    Returns:
+        Причина отказа или пустая строка
+    """
+    if record[3] != "Завершена":
+        return ""
+    for position, column, imported in unique_checks:
+        value = record[position]
+        if not value:
+            continue
+        cursor.execute(
+            f"""SELECT 1 FROM маршрутные_карты
+                WHERE Статус = 'Завершена' AND {column} = ? AND {column} > ''
+                LIMIT 1""",
+            (value,)
+        )
+        if value in imported or cursor.fetchone() is not None:
+            return f"{column.replace('_', ' ').lower()} '{value}' уже есть у завершенной карты"
+    for position, _, imported in unique_checks:
+        if record[position]:
+            imported.add(record[position])
+    return ""
+
+
+def import_cards(
+    db_manager: DatabaseManager,
+    rows: Iterable[SourceRow],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    defer_indexes: bool = False,
+    on_rejected: Optional[RejectedCallback] = None,
+    on_progress: Optional[ProgressCallback] = None
+) -> ImportResult:
+    """Загрузка строк в таблицу маршрутных карт.
+
+    При defer_indexes индексы таблицы удаляются перед загрузкой и создаются
+    по сохраненным определениям после нее. Если уникальный индекс учетного
+    номера или номера кластера нельзя создать из-за повторов в загруженных
+    данных, индексы создаются через ensure_indexes, а повторы возвращаются в
+    итоге; без defer_indexes такие строки отклоняются по одной (on_rejected)
+    и учитываются как повторы. Загрузка, прерванная ошибкой, сохраняет уже
+    зафиксированные пакеты и тоже восстанавливает индексы; если процесс
+    завершен аварийно, индексы создаст ensure_indexes при следующем запуске
+    приложения.
+
+    Args:
+        db_manager: Менеджер базы данных
+        rows: Строки источника (read_source)
+        batch_size: Количество строк в одной транзакции
+        defer_indexes: Перестроить индексы после загрузки вместо обновления при каждой вставке
+        on_rejected: Функция (место в источнике, номер бланка, причина) для пропущенных строк
+        on_progress: Функция (промежуточный итог), вызывается после каждой транзакции
+
+    Returns:
+        Итог загрузки
+
+    Raises:
+        CardImportError: Если источник нельзя прочитать
+        sqlite3.Error: При ошибке записи (незафиксированный пакет отменяется)
+    """
+    # Битовая карта существующих бланков (включая архивы), дополняемая загружаемыми номерами
+    known_blanks = BlankBitmap.open(
+        db_manager.db_name,
+        use_sidecar=False,
+        archive_paths=list(find_archives(db_manager.db_name).values())
+    )
+    known_blanks.close()
+    known_bits = known_blanks.exists_bits
+    created_at = datetime.now().strftime(DATE_FORMAT)
+    inserted = duplicates = invalid = 0
+    conflicts: List[Tuple[str, str, int, List[str]]] = []
+
+    conn, cursor = db_manager.connect()
+    try:
+        indexes = _table_indexes(cursor)
+        dropped_indexes = indexes if defer_indexes else []
+        unique_checks = [] if defer_indexes else _unique_checks(indexes)
+        if dropped_indexes:
+            conn.execute("BEGIN IMMEDIATE")
+            for name, _ in dropped_indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.commit()
+
+        try:
+            batch = []
+            for location, row in rows:
+                record, reason = validate_row(row, created_at)
+                if record is None:
+                    invalid += 1
+                else:
+                    number = int(record[0])
+                    mask = 1 << (number & 7)
+                    if known_bits[number >> 3] & mask:
+                        reason = "номер бланка уже есть в базе"
+                    elif unique_checks:
+                        reason = _unique_conflict(cursor, record, unique_checks)
+                    if reason:
+                        duplicates += 1
+                    else:
+                        known_bits[number >> 3] |= mask
+                        batch.append(record)
+                if reason and on_rejected is not None:
+                    on_rejected(location, row[0] or "", reason)
+
+                if len(batch) >= batch_size:
+                    inserted += _insert_batch(conn, cursor, batch)
+                    batch = []
+                    if on_progress is not None:
+                        on_progress(ImportResult(inserted, duplicates, invalid, conflicts))
+            if batch:
+                inserted += _insert_batch(conn, cursor, batch)
+        finally:
+            if dropped_indexes:
+                conflicts = _restore_indexes(db_manager, conn, cursor, dropped_indexes)
+    except OSError as e:
+        raise CardImportError(f"Ошибка чтения источника: {e}")
+    finally:
+        conn.close()
+
+    if db_manager.blank_index is not None:
+        db_manager.blank_index.refresh()
+    result = ImportResult(inserted, duplicates, invalid, conflicts)
+    if on_progress is not None:
+        on_progress(result)
+    return result
+
+
+def _restore_indexes(
+    db_manager: DatabaseManager,
+    conn: sqlite3.Connection,
+    cursor: sqlite3.Cursor,
+    indexes: List[Tuple[str, str]]
+) -> List[Tuple[str, str, int, List[str]]]:
+    """Создание удаленных индексов заново одним проходом по таблице.
+
+    Returns:
+        Повторы учетных номеров и номеров кластеров, если уникальный индекс создать нельзя
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for _, sql in indexes:
+            cursor.execute(sql)
+        conn.commit()
+        return []
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return db_manager.ensure_indexes()
+
+
+def _insert_batch(conn: sqlite3.Connection, cursor: sqlite3.Cursor, batch: List[tuple]) -> int:
+    """Вставка пакета строк одной транзакцией."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor.executemany(
+            f"""INSERT INTO маршрутные_карты ({", ".join(IMPORT_COLUMNS)})
+                VALUES (?, ?, ?, ?, ?, ?)""",
+            batch
+        )
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return len(batch)
@@ -0,0 +1,474 @@
+"""
+Зеркало таблицы маршрутных карт в памяти процесса.
+
+Рабочий набор данных невелик (тысячи строк сейчас, до миллиона в
+перспективе), поэтому таблица целиком загружается в компактные записи
+CardRecord с хеш-индексами по номеру бланка, учетному номеру и номеру
+кластера и отсортированным индексом по дате. Зеркало загружается при первом
+обращении, собственные записи DatabaseManager применяются к нему сразу
+(write-through), а изменения других станций обнаруживаются через
+PRAGMA data_version и дочитываются инкрементально.
+"""
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from card_records import CARD_SELECT, CardRecord
+from data_version import DataVersionWatcher, connect_existing
+
+
+COMPLETED_STATUS = "Завершена"
+
+# Порция строк при потоковой загрузке
+LOAD_BATCH_SIZE = 10000
+
+# Изменения других станций дочитываются по дате с запасом на расхождение часов
+REFRESH_DATE_MARGIN_SECONDS = 24 * 60 * 60
+
+# Условие дочитывания измененных строк (использует индекс по Дата_создания,
+# который создает DatabaseManager.ensure_indexes)
+REFRESH_CHANGED_WHERE = "WHERE Дата_создания >= ?"
+
+# Интервал полной перезагрузки, страхующей от правок без обновления даты
+FULL_RELOAD_INTERVAL_SECONDS = 15 * 60
+
+# Таблица для сравнения без учета регистра ASCII, как в LIKE SQLite
+_ASCII_LOWER = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"
+)
+
+
+# Значение хеш-индекса: id единственной записи или кортеж id при повторах
+_IndexValue = Union[int, Tuple[int, ...]]
+
+
+def _index_add(index: Dict[str, _IndexValue], key: Optional[str], record_id: int) -> None:
+    if not key:
+        return
+    current = index.get(key)
+    if current is None:
+        index[key] = record_id
+    elif isinstance(current, int):
+        if current != record_id:
+            index[key] = (current, record_id)
+    elif record_id not in current:
+        index[key] = current + (record_id,)
+
+
+def _index_remove(index: Dict[str, _IndexValue], key: Optional[str], record_id: int) -> None:
+    if not key:
+        return
+    current = index.get(key)
+    if current is None:
+        return
+    if isinstance(current, int):
+        if current == record_id:
+            del index[key]
+        return
+    remaining = tuple(value for value in current if value != record_id)
+    index[key] = remaining[0] if len(remaining) == 1 else remaining
+
+
+def _index_ids(index: Dict[str, _IndexValue], key: str) -> Tuple[int, ...]:
+    current = index.get(key)
+    if current is None:
+        return ()
+    if isinstance(current, int):
+        return (current,)
+    return current
+
+
+def _is_incomplete(record: CardRecord) -> bool:
+    return not record.account_number or not record.cluster_number
+
+
+class CardMirror:
+    """Зеркало таблицы маршрутные_карты в памяти."""
+
+    def __init__(self, db_name: str, reload_key: Optional[Callable[[], object]] = None) -> None:
+        """Инициализация пустого зеркала.
+
+        Args:
+            db_name: Путь к файлу базы данных
+            reload_key: Функция, значение которой меняется при удалении строк
+                (например, при переносе карт в архив); после изменения базы
+                зеркало загружается заново, если значение изменилось
+        """
+        self.db_name = db_name
+        self._reload_key = reload_key
+        self.loaded_key: object = None
+        self.records: Dict[int, CardRecord] = {}
+        self.by_blank: Dict[str, _IndexValue] = {}
+        self.by_account: Dict[str, _IndexValue] = {}
+        self.by_cluster: Dict[str, _IndexValue] = {}
+        self._dates: List[str] = []
+        self._date_ids = array("q")
+        self.completed_count = 0
+        self.incomplete_count = 0
+        self.max_id = 0
+        self.loaded = False
+        self._strings: Dict[str, str] = {}
+        self._haystack: Optional[Tuple[str, array, array]] = None
+        self._watcher = DataVersionWatcher(db_name)
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
+
+    # Загрузка и согласованность
+
+    def ensure_current(self) -> bool:
+        """Загрузка зеркала при первом обращении и дочитывание изменений.
+
+        Returns:
+            True если зеркало соответствует базе данных и может отвечать
+        """
+        with self._lock:
+            version = self._watcher.current()
+            if version is None:
+                return False
+            if self.loaded and version == self._version:
+                return True
+            try:
+                # Ключ берется до чтения: удаление во время загрузки изменит его снова
+                key = self._reload_key() if self._reload_key is not None else None
+                if (not self.loaded or key != self.loaded_key
+                        or time.monotonic() - self._loaded_at > FULL_RELOAD_INTERVAL_SECONDS):
+                    self._load(version)
+                else:
+                    self._refresh(version)
+                self.loaded_key = key
+            except sqlite3.Error as e:
+                print(f"Ошибка при загрузке зеркала маршрутных карт: {e}")
+                self.loaded = False
+                return False
+            return True
+
+    def reload(self) -> None:
+        """Принудительная полная перезагрузка зеркала."""
+        with self._lock:
+            self.loaded = False
+        self.ensure_current()
+
+    def _load(self, version: int) -> None:
+        """Полная потоковая загрузка таблицы."""
+        self.records = {}
+        self.by_blank = {}
+        self.by_account = {}
+        self.by_cluster = {}
+        self._dates = []
+        self._date_ids = array("q")
+        self.completed_count = 0
+        self.incomplete_count = 0
+        self.max_id = 0
+        self._strings = {}
+        self._haystack = None
+
+        dated = []
+        for record in self._stream("ORDER BY id", ()):
+            self._index(record)
+            if record.created_at:
+                dated.append((record.created_at, record.id))
+        dated.sort()
+        self._dates = [created_at for created_at, _ in dated]
+        self._date_ids = array("q", (record_id for _, record_id in dated))
+
+        self._version = version
+        self._loaded_at = time.monotonic()
+        self.loaded = True
+
+    def _refresh(self, version: int) -> None:
+        """Инкрементальное дочитывание новых и недавно измененных строк.
+
+        Все записи приложения обновляют Дата_создания, поэтому изменения
+        других станций находятся по дате с запасом на расхождение часов.
+        """
+        for record in self._stream("WHERE id > ? ORDER BY id", (self.max_id,)):
+            self.put(record)
+
+        if self._dates:
+            watermark = time.strftime(
+                "%Y-%m-%d %H:%M:%S",
+                time.localtime(time.time() - REFRESH_DATE_MARGIN_SECONDS)
+            )
+            watermark = min(watermark, self._dates[-1])
+            for record in self._stream(REFRESH_CHANGED_WHERE, (watermark,)):
+                if self.records.get(record.id) != record:
+                    self.put(record)
+
+        self._version = version
+
+    def _stream(self, where: str, params: tuple) -> Iterator[CardRecord]:
+        """Потоковое чтение строк таблицы в виде CardRecord."""
+        conn = connect_existing(self.db_name)
+        try:
+            cursor = conn.execute(f"{CARD_SELECT} {where}", params)
+            strings = self._strings
+            make_record = tuple.__new__
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+                if not rows:
+                    break
+                for row_id, blank, account, cluster, status, created_at in rows:
+                    if status is not None:
+                        status = strings.setdefault(status, status)
+                    if created_at is not None:
+                        created_at = strings.setdefault(created_at, created_at)
+                    yield make_record(
+                        CardRecord, (row_id, blank, account, cluster, status, created_at)
+                    )
+        finally:
+            conn.close()
+
+    def _intern(self, value: Optional[str]) -> Optional[str]:
+        """Общий объект строки для повторяющихся значений (статус, дата)."""
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    # Изменение зеркала
+
+    def put(self, record: CardRecord) -> None:
+        """Добавление или замена записи с обновлением всех индексов.
+
+        Args:
+            record: Новая версия записи
+        """
+        with self._lock:
+            self._haystack = None
+            old = self.records.get(record.id)
+            if old is not None:
+                self._unindex(old)
+                if old.created_at:
+                    self._date_remove(old.created_at, old.id)
+            self._index(record)
+            if record.created_at:
+                self._date_insert(record.created_at, record.id)
+
+    def apply_completion(
+        self,
+        blank_number: str,
+        created_at: str,
+        account_number: Optional[str] = None,
+        cluster_number: Optional[str] = None,
+        was_current: bool = False
+    ) -> None:
+        """Применение собственной записи о завершении карты (write-through).
+
+        Args:
+            blank_number: Номер бланка
+            created_at: Записанная дата
+            account_number: Новый учетный номер (None - без изменений)
+            cluster_number: Новый номер кластера (None - без изменений)
+            was_current: Было ли зеркало актуальным перед записью
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            created_at = self._intern(created_at)
+            for record_id in _index_ids(self.by_blank, blank_number):
+                record = self.records[record_id]
+                changes = {"status": self._intern(COMPLETED_STATUS), "created_at": created_at}
+                if account_number is not None:
+                    changes["account_number"] = account_number
+                if cluster_number is not None:
+                    changes["cluster_number"] = cluster_number
+                self.put(record._replace(**changes))
+            if was_current:
+                self._version = self._watcher.current()
+
+    def is_current(self) -> bool:
+        """Проверка, что зеркало загружено и база не изменялась."""
+        with self._lock:
+            return self.loaded and self._watcher.current() == self._version
+
+    def _index(self, record: CardRecord) -> None:
+        self.records[record.id] = record
+        _index_add(self.by_blank, record.blank_number, record.id)
+        if record.status == COMPLETED_STATUS:
+            self.completed_count += 1
+            _index_add(self.by_account, record.account_number, record.id)
+            _index_add(self.by_cluster, record.cluster_number, record.id)
+        if _is_incomplete(record):
+            self.incomplete_count += 1
+        if record.id > self.max_id:
+            self.max_id = record.id
+
+    def _unindex(self, record: CardRecord) -> None:
+        _index_remove(self.by_blank, record.blank_number, record.id)
+        if record.status == COMPLETED_STATUS:
+            self.completed_count -= 1
+            _index_remove(self.by_account, record.account_number, record.id)
+            _index_remove(self.by_cluster, record.cluster_number, record.id)
+        if _is_incomplete(record):
+            self.incomplete_count -= 1
+
+    def _date_insert(self, created_at: str, record_id: int) -> None:
+        position = bisect_right(self._dates, created_at)
+        self._dates.insert(position, created_at)
+        self._date_ids.insert(position, record_id)
+
+    def _date_remove(self, created_at: str, record_id: int) -> None:
+        position = bisect_left(self._dates, created_at)
+        while position < len(self._dates) and self._dates[position] == created_at:
+            if self._date_ids[position] == record_id:
+                del self._dates[position]
+                del self._date_ids[position]
+                return
+            position += 1
+
+    # Чтение
+
+    def find_by_blank(self, blank_number: str) -> List[CardRecord]:
+        """Записи с указанным номером бланка в порядке id."""
+        with self._lock:
+            return [self.records[i] for i in sorted(_index_ids(self.by_blank, blank_number))]
+
+    def is_completed(self, blank_number: str) -> bool:
+        """Проверка, что хотя бы одна запись с номером бланка завершена."""
+        return any(
+            record.status == COMPLETED_STATUS for record in self.find_by_blank(blank_number)
+        )
+
+    def has_completed_account(self, account_number: str) -> bool:
+        """Проверка использования учетного номера завершенной картой."""
+        return bool(account_number) and account_number in self.by_account
+
+    def has_completed_cluster(self, cluster_number: str) -> bool:
+        """Проверка использования номера кластера завершенной картой."""
+        return bool(cluster_number) and cluster_number in self.by_cluster
+
+    def latest(self, limit: int, offset: int) -> List[CardRecord]:
+        """Записи в порядке убывания id (как ORDER BY id DESC LIMIT/OFFSET)."""
+        with self._lock:
+            return list(islice(reversed(self.records.values()), offset, offset + limit))
+
+    def search(self, search_term: str, limit: int = 100) -> List[CardRecord]:
+        """Поиск подстроки в номерах бланка, учетном номере и номере кластера.
+
+        Сравнение без учета регистра только для латиницы, как у LIKE в SQLite.
+        Поиск идет с конца общей строки всех записей (str.rfind), поэтому
+        результаты получаются сразу в порядке убывания id.
+        """
+        term = search_term.translate(_ASCII_LOWER)
+        if not term:
+            return self.latest(limit, 0)
+
+        result = []
+        with self._lock:
+            haystack, starts, ids = self._search_text()
+            end = len(haystack)
+            while len(result) < limit:
+                position = haystack.rfind(term, 0, end)
+                if position < 0:
+                    break
+                index = bisect_right(starts, position) - 1
+                result.append(self.records[ids[index]])
+                end = starts[index]
+        return result
+
+    def _search_text(self) -> Tuple[str, array, array]:
+        """Общая строка полей поиска всех записей с началами записей и их id."""
+        if self._haystack is None:
+            parts = []
+            starts = array("q")
+            ids = array("q")
+            position = 0
+            for record in self.records.values():
+                text = (
+                    f"{record.blank_number or ''}\x1f{record.account_number or ''}"
+                    f"\x1f{record.cluster_number or ''}\x1e"
+                ).translate(_ASCII_LOWER)
+                starts.append(position)
+                ids.append(record.id)
+                parts.append(text)
+                position += len(text)
+            self._haystack = ("".join(parts), starts, ids)
+        return self._haystack
+
+    def _period_ids(self, period_start: str, period_end: str) -> array:
+        """id записей, дата которых попадает в период (по дню, включительно)."""
+        low = bisect_left(self._dates, period_start[:10])
+        high = bisect_right(self._dates, period_end[:10] + "\uffff")
+        return self._date_ids[low:high]
+
+    def by_period(self, period_start: str, period_end: str) -> List[CardRecord]:
+        """Записи за период в порядке убывания даты."""
+        with self._lock:
+            ids = self._period_ids(period_start, period_end)
+            return [self.records[record_id] for record_id in reversed(ids)]
+
+    def by_id(self, period_start: Optional[str] = None, period_end: Optional[str] = None) -> List[CardRecord]:
+        """Записи (все или за период) в порядке возрастания id."""
+        with self._lock:
+            if period_start is None:
+                return [self.records[record_id] for record_id in sorted(self.records)]
+            ids = sorted(self._period_ids(period_start, period_end))
+            return [self.records[record_id] for record_id in ids]
+
+    def count_by_period(self, period_start: str, period_end: str, completed_only: bool = False) -> int:
+        """Количество записей за период."""
+        with self._lock:
+            ids = self._period_ids(period_start, period_end)
+            if not completed_only:
+                return len(ids)
+            records = self.records
+            return sum(1 for record_id in ids if records[record_id].status == COMPLETED_STATUS)
+
+    def monthly_stats(self, year: Optional[int] = None) -> List[Tuple[str, str, int]]:
+        """Количество завершенных карт по месяцам: (месяц, год, количество)."""
+        counts: Dict[Tuple[str, str], int] = {}
+        with self._lock:
+            if year:
+                ids = self._period_ids(f"{year}-01-01", f"{year}-12-31")
+            else:
+                ids = self._date_ids
+            records = self.records
+            for record_id in ids:
+                record = records[record_id]
+                if record.status != COMPLETED_STATUS:
+                    continue
+                key = (record.created_at[:4], record.created_at[5:7])
+                counts[key] = counts.get(key, 0) + 1
+        return [(month, year_str, count) for (year_str, month), count in sorted(counts.items())]
+
+    def close(self) -> None:
+        """Освобождение соединения наблюдателя."""
+        self._watcher.close()
+
+
+def mirror_memory_per_row(mirror: CardMirror) -> float:
+    """Оценка памяти зеркала в байтах на строку (записи, строки и индексы).
+
+    Args:
+        mirror: Загруженное зеркало
+
+    Returns:
+        Среднее количество байт на одну запись
+    """
+    if not mirror.records:
+        return 0.0
+    seen = set()
+    total = 0
+
+    def add(obj) -> None:
+        nonlocal total
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+
+    for container in (mirror.records, mirror.by_blank, mirror.by_account,
+                      mirror.by_cluster, mirror._dates, mirror._date_ids):
+        add(container)
+    for record in mirror.records.values():
+        add(record)
+        for value in record:
+            add(value)
+    for index in (mirror.by_blank, mirror.by_account, mirror.by_cluster):
+        for value in index.values():
+            add(value)
+    return total / len(mirror.records)
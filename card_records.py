@@ -0,0 +1,75 @@
+"""
+Типизированные записи маршрутных карт.
+
+Все запросы DatabaseManager, возвращающие карты, используют явный список
+столбцов CARD_SELECT и фабрику строк card_record_factory, поэтому строки
+сразу создаются как CardRecord - кортеж с именованными полями без __dict__.
+Добавление столбцов в таблицу не меняет результат запросов, а вызывающий код
+обращается к полям по именам.
+"""
+import sqlite3
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+
+# Столбцы таблицы в порядке полей CardRecord
+CARD_COLUMNS = (
+    "id",
+    "Номер_бланка",
+    "Учетный_номер",
+    "Номер_кластера",
+    "Статус",
+    "Дата_создания",
+)
+
+CARD_SELECT = f"SELECT {', '.join(CARD_COLUMNS)} FROM маршрутные_карты"
+
+# Размер кэша отформатированных для отображения строк
+DISPLAY_CACHE_SIZE = 4096
+
+
+class CardRecord(NamedTuple):
+    """Компактная запись маршрутной карты (кортеж без __dict__)."""
+
+    id: int
+    blank_number: str
+    account_number: Optional[str]
+    cluster_number: Optional[str]
+    status: Optional[str]
+    created_at: Optional[str]
+
+
+def card_record_factory(cursor: sqlite3.Cursor, row: tuple) -> CardRecord:
+    """Фабрика строк sqlite3, создающая CardRecord без промежуточных объектов.
+
+    Args:
+        cursor: Курсор, выполнивший запрос
+        row: Кортеж значений строки
+
+    Returns:
+        Запись маршрутной карты
+    """
+    return tuple.__new__(CardRecord, row)
+
+
+@lru_cache(maxsize=DISPLAY_CACHE_SIZE)
+def _format_row(row: tuple) -> Tuple[str, ...]:
+    return tuple("" if cell is None else str(cell) for cell in row)
+
+
+def display_cells(row: tuple) -> Tuple[str, ...]:
+    """Текст ячеек строки для отображения в таблице.
+
+    Строки форматируются один раз и кэшируются, поэтому повторный показ тех
+    же записей (обновление таблицы, зеркало в памяти) не создает новых строк.
+
+    Args:
+        row: Запись или произвольная последовательность значений
+
+    Returns:
+        Кортеж строк, пустая строка вместо None
+    """
+    try:
+        return _format_row(row)
+    except TypeError:
+        return tuple("" if cell is None else str(cell) for cell in row)
@@ -0,0 +1,105 @@
+"""
+Отслеживание изменений базы данных маршрутных карт.
+
+Кэши в памяти (битовая карта бланков и другие) должны узнавать о записях,
+сделанных другими станциями. Для этого используется PRAGMA data_version на
+отдельном долгоживущем соединении: значение меняется после каждой фиксации
+транзакции любым другим соединением с тем же файлом базы данных.
+
+PRAGMA data_version имеет смысл только в пределах одного соединения, поэтому
+для сохранения кэшей на диск используется file_stamp() - отпечаток файла
+базы данных (счетчик изменений из заголовка SQLite, размер и время изменения).
+"""
+import os
+import sqlite3
+import struct
+import threading
+from typing import Optional, Tuple
+from urllib.request import pathname2url
+
+
+# Смещение счетчика изменений файла в заголовке базы данных SQLite
+_FILE_CHANGE_COUNTER_OFFSET = 24
+
+
+def connect_existing(db_name: str, **kwargs) -> sqlite3.Connection:
+    """Подключение к существующему файлу базы данных без его создания.
+
+    Args:
+        db_name: Путь к файлу базы данных
+        **kwargs: Дополнительные параметры sqlite3.connect
+
+    Returns:
+        Соединение с базой данных
+    """
+    uri = "file:" + pathname2url(os.path.abspath(db_name)) + "?mode=rw"
+    return sqlite3.connect(uri, uri=True, **kwargs)
+
+
+def file_stamp(db_name: str) -> Tuple[int, ...]:
+    """Получение отпечатка файла базы данных без обращения к SQLite.
+
+    Args:
+        db_name: Путь к файлу базы данных
+
+    Returns:
+        Кортеж (счетчик изменений, размер, mtime, размер WAL, mtime WAL)
+    """
+    try:
+        with open(db_name, "rb") as db_file:
+            db_file.seek(_FILE_CHANGE_COUNTER_OFFSET)
+            header = db_file.read(4)
+        counter = struct.unpack(">I", header)[0] if len(header) == 4 else 0
+        stat = os.stat(db_name)
+    except OSError:
+        return (0, 0, 0, 0, 0)
+
+    try:
+        wal_stat = os.stat(db_name + "-wal")
+        wal_size, wal_mtime = wal_stat.st_size, wal_stat.st_mtime_ns
+    except OSError:
+        wal_size, wal_mtime = 0, 0
+
+    return (counter, stat.st_size, stat.st_mtime_ns, wal_size, wal_mtime)
+
+
+class DataVersionWatcher:
+    """Наблюдатель за изменениями базы данных через PRAGMA data_version."""
+
+    def __init__(self, db_name: str) -> None:
+        """Инициализация наблюдателя.
+
+        Args:
+            db_name: Путь к файлу базы данных
+        """
+        self.db_name = db_name
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[int]:
+        """Получение текущего значения data_version.
+
+        Returns:
+            Значение data_version или None, если база недоступна
+        """
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = connect_existing(self.db_name, check_same_thread=False)
+                return self._conn.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error:
+                self._close_locked()
+                return None
+
+    def close(self) -> None:
+        """Закрытие соединения наблюдателя."""
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
@@ -0,0 +1,280 @@
+"""
+Резервное копирование базы данных маршрутных карт без остановки станций.
+
+Копия снимается через sqlite3.Connection.backup порциями по BACKUP_PAGES
+страниц: между порциями блокировка чтения снимается и станции могут
+записывать, поэтому ни одна запись не ждет дольше копирования одной порции.
+Если база изменилась другим соединением во время копирования, SQLite
+начинает копирование заново, так что снимок всегда согласован (в отличие
+от копирования файла, которое может захватить половину транзакции). При
+частой записи копирование по шагам может не закончиться никогда, поэтому
+после BACKUP_MAX_RESTARTS перезапусков база копируется за один шаг (запись
+ждет окончания копирования).
+
+Каждая копия проверяется PRAGMA integrity_check и только после этого
+получает постоянное имя; старые копии сверх заданного количества удаляются.
+BackupScheduler снимает копии по расписанию в фоновом потоке.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from data_version import connect_existing
+
+
+# Количество страниц базы, копируемых за один шаг
+BACKUP_PAGES = 256
+
+# Пауза между шагами копирования, чтобы станции могли записывать (секунды)
+BACKUP_STEP_PAUSE = 0.005
+
+# Количество перезапусков копирования по шагам до копирования за один шаг
+BACKUP_MAX_RESTARTS = 3
+
+# Количество хранимых копий
+BACKUP_KEEP = 7
+
+# Интервал копирования по расписанию (секунды)
+BACKUP_INTERVAL = 60 * 60
+
+# Каталог копий рядом с файлом базы данных
+BACKUP_DIR_NAME = "резервные_копии"
+
+# Формат времени в имени копии: сортировка имен совпадает с сортировкой по времени
+BACKUP_TIME_FORMAT = "%Y%m%d_%H%M%S"
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class BackupError(Exception):
+    """Копия не создана или не прошла проверку целостности."""
+
+
+class _TooManyRestarts(Exception):
+    """Копирование по шагам перезапускалось слишком часто."""
+
+
+def default_backup_dir(db_name: str) -> str:
+    """Каталог копий по умолчанию (рядом с файлом базы данных)."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_name)), BACKUP_DIR_NAME)
+
+
+def _backup_prefix(db_name: str) -> str:
+    """Начало имени копий базы данных: имя файла без расширения."""
+    return os.path.splitext(os.path.basename(db_name))[0] + "_"
+
+
+def list_backups(db_name: str, backup_dir: Optional[str] = None) -> List[str]:
+    """Проверенные копии базы данных от старых к новым.
+
+    Args:
+        db_name: Путь к файлу базы данных
+        backup_dir: Каталог копий (по умолчанию default_backup_dir)
+
+    Returns:
+        Пути к файлам копий
+    """
+    backup_dir = backup_dir or default_backup_dir(db_name)
+    prefix = _backup_prefix(db_name)
+    try:
+        names = os.listdir(backup_dir)
+    except OSError:
+        return []
+    return [
+        os.path.join(backup_dir, name)
+        for name in sorted(names)
+        if name.startswith(prefix) and name.endswith(".db")
+    ]
+
+
+def integrity_check(path: str) -> List[str]:
+    """Проверка целостности файла базы данных.
+
+    Args:
+        path: Путь к файлу базы данных
+
+    Returns:
+        Пустой список, если нарушений нет, иначе сообщения integrity_check
+    """
+    conn = connect_existing(path)
+    try:
+        messages = [message for message, in conn.execute("PRAGMA integrity_check").fetchall()]
+    finally:
+        conn.close()
+    return [] if messages == ["ok"] else messages
+
+
+def rotate_backups(db_name: str, backup_dir: Optional[str] = None, keep: int = BACKUP_KEEP) -> List[str]:
+    """Удаление старых копий сверх keep.
+
+    Args:
+        db_name: Путь к файлу базы данных
+        backup_dir: Каталог копий
+        keep: Количество хранимых копий
+
+    Returns:
+        Пути удаленных копий
+    """
+    backups = list_backups(db_name, backup_dir)
+    removed = backups[:max(len(backups) - keep, 0)]
+    for path in removed:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            print(f"Не удалось удалить старую копию {path}: {e}")
+    return removed
+
+
+def create_backup(
+    db_name: str,
+    backup_dir: Optional[str] = None,
+    keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES,
+    pause: float = BACKUP_STEP_PAUSE,
+    on_progress: Optional[ProgressCallback] = None,
+    max_restarts: int = BACKUP_MAX_RESTARTS
+) -> str:
+    """Создание проверенной копии базы данных и удаление старых копий.
+
+    Args:
+        db_name: Путь к файлу базы данных
+        backup_dir: Каталог копий (создается при необходимости)
+        keep: Количество хранимых копий
+        pages: Количество страниц, копируемых за один шаг
+        pause: Пауза между шагами (секунды)
+        on_progress: Функция (скопировано страниц, всего страниц), вызывается после каждого шага
+        max_restarts: Количество перезапусков из-за записи других станций, после
+            которого база копируется за один шаг
+
+    Returns:
+        Путь к созданной копии
+
+    Raises:
+        BackupError: Если базу не удалось скопировать или копия повреждена
+    """
+    backup_dir = backup_dir or default_backup_dir(db_name)
+    stamp = datetime.now().strftime(BACKUP_TIME_FORMAT)
+    path = os.path.join(backup_dir, f"{_backup_prefix(db_name)}{stamp}.db")
+    temp_path = path + ".tmp"
+
+    restarts = 0
+    last_copied = 0
+
+    def report(status: int, remaining: int, total: int) -> None:
+        if on_progress is not None:
+            on_progress(total - remaining, total)
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal restarts, last_copied
+        report(status, remaining, total)
+        copied = total - remaining
+        # Шаг не продвинул копирование: база изменилась и копирование начато заново
+        if copied <= last_copied:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_copied = copied
+        if remaining:
+            time.sleep(pause)
+
+    try:
+        os.makedirs(backup_dir, exist_ok=True)
+        source = connect_existing(db_name)
+        try:
+            target = sqlite3.connect(temp_path)
+            try:
+                try:
+                    source.backup(target, pages=pages, progress=progress)
+                except _TooManyRestarts:
+                    source.backup(target, pages=-1, progress=report)
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+        problems = integrity_check(temp_path)
+        if problems:
+            raise BackupError(f"Копия не прошла проверку целостности: {'; '.join(problems[:5])}")
+        os.replace(temp_path, path)
+    except (sqlite3.Error, OSError) as e:
+        raise BackupError(f"Не удалось создать копию базы данных: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    rotate_backups(db_name, backup_dir, keep)
+    return path
+
+
+class BackupScheduler:
+    """Фоновый поток резервного копирования по расписанию."""
+
+    def __init__(
+        self,
+        db_name: str,
+        interval: float = BACKUP_INTERVAL,
+        backup_dir: Optional[str] = None,
+        keep: int = BACKUP_KEEP
+    ) -> None:
+        """Инициализация расписания.
+
+        Args:
+            db_name: Путь к файлу базы данных
+            interval: Интервал между копиями (секунды)
+            backup_dir: Каталог копий
+            keep: Количество хранимых копий
+        """
+        self.db_name = db_name
+        self.interval = interval
+        self.backup_dir = backup_dir or default_backup_dir(db_name)
+        self.keep = keep
+        self.last_backup: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BackupScheduler":
+        """Запуск потока копирования.
+
+        Returns:
+            Этот же объект для цепочки вызовов
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="BackupScheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Остановка потока (начатая копия дописывается)."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def next_delay(self) -> float:
+        """Время до следующей копии с учетом копий, снятых до запуска (секунды)."""
+        backups = list_backups(self.db_name, self.backup_dir)
+        if not backups:
+            return 0.0
+        try:
+            age = time.time() - os.path.getmtime(backups[-1])
+        except OSError:
+            return 0.0
+        return min(max(self.interval - age, 0.0), self.interval)
+
+    def _run(self) -> None:
+        """Цикл потока копирования."""
+        while not self._stop.wait(self.next_delay()):
+            try:
+                self.last_backup = create_backup(self.db_name, self.backup_dir, self.keep)
+                self.last_error = None
+            except BackupError as e:
+                self.last_error = str(e)
+                print(e)
+                # Повтор не раньше чем через интервал, чтобы не копировать в цикле
+                if self._stop.wait(self.interval):
+                    break
@@ -0,0 +1,234 @@
+"""
+Проверка документов маршрутных карт по путям Путь_к_файлу.
+
+Пути хранятся в стиле Windows (обратная косая черта, иногда с буквой диска)
+и приводятся к путям текущей системы относительно корня с документами.
+Строки таблицы читаются участками по id, наличие, размер и время изменения
+файлов проверяются пулом потоков (на сетевом диске задержка каждого обращения
+велика, а потоки ожидают ответы одновременно). Результаты записываются в
+служебную таблицу проверка_файлов с индексом по состоянию, откуда их читает
+вкладка просмотра (DatabaseManager.get_file_problems).
+
+Повторная проверка инкрементальна: карта проверяется заново, только если
+изменился ее путь или изменился каталог с файлом (время изменения каталога
+меняется при создании, удалении и переименовании файлов в нем). Изменение
+содержимого файла на месте обнаруживает полная проверка (full=True).
+"""
+import ntpath
+import os
+import sqlite3
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from route_card_db import (
+    FILE_CHECK_SCHEMA,
+    FILE_EMPTY,
+    FILE_FOUND,
+    FILE_MISNAMED,
+    FILE_MISSING,
+    FILE_NO_PATH,
+    DatabaseManager,
+)
+
+
+# Количество потоков проверки файлов
+FILE_CHECK_WORKERS = 16
+
+# Количество карт, проверяемых и записываемых одной транзакцией
+FILE_CHECK_CHUNK_SIZE = 2000
+
+# Расширение документов карт
+DOCUMENT_EXTENSION = ".pptx"
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Результат проверки: (состояние, размер, время изменения)
+FileCheck = Tuple[str, Optional[int], Optional[float]]
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def normalize_card_path(path: Optional[str], root: str) -> Optional[str]:
+    """Приведение пути из базы к пути текущей системы.
+
+    Относительные пути отсчитываются от root. В системах без букв дисков
+    буква диска или сервер UNC-пути отбрасываются, и путь также отсчитывается
+    от root (корень - каталог, куда подключена сетевая папка с документами).
+
+    Args:
+        path: Значение Путь_к_файлу
+        root: Каталог с документами
+
+    Returns:
+        Путь к файлу или None, если путь не задан
+    """
+    if not path or not path.strip():
+        return None
+    path = path.strip()
+    if os.sep == "\\":
+        return os.path.normpath(os.path.join(root, path))
+    _, tail = ntpath.splitdrive(path)
+    relative = tail.replace("\\", "/").lstrip("/")
+    return os.path.normpath(os.path.join(root, relative))
+
+
+def check_card_file(blank_number: Optional[str], path: Optional[str]) -> FileCheck:
+    """Проверка документа одной карты.
+
+    Args:
+        blank_number: Номер бланка карты
+        path: Путь к файлу (normalize_card_path)
+
+    Returns:
+        Состояние, размер и время изменения файла
+    """
+    if path is None:
+        return FILE_NO_PATH, None, None
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return FILE_MISSING, None, None
+    if not stat.S_ISREG(file_stat.st_mode):
+        return FILE_MISSING, None, None
+    name = os.path.basename(path)
+    if not name.lower().endswith(DOCUMENT_EXTENSION) or (blank_number and blank_number not in name):
+        return FILE_MISNAMED, file_stat.st_size, file_stat.st_mtime
+    if file_stat.st_size == 0:
+        return FILE_EMPTY, 0, file_stat.st_mtime
+    return FILE_FOUND, file_stat.st_size, file_stat.st_mtime
+
+
+def _directory_mtime(directory: str) -> Optional[float]:
+    """Время изменения каталога или None, если каталога нет."""
+    try:
+        return os.stat(directory).st_mtime
+    except OSError:
+        return None
+
+
+def verify_card_files(
+    db_manager: DatabaseManager,
+    root: Optional[str] = None,
+    workers: int = FILE_CHECK_WORKERS,
+    full: bool = False,
+    chunk_size: int = FILE_CHECK_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None
+) -> Dict[str, int]:
+    """Проверка документов всех карт с записью результатов в проверка_файлов.
+
+    Args:
+        db_manager: Менеджер базы данных
+        root: Каталог с документами (по умолчанию каталог файла базы данных)
+        workers: Количество потоков проверки
+        full: Проверить все карты, а не только измененные
+        chunk_size: Количество карт в одной транзакции
+        on_progress: Функция (просмотрено карт, проверено файлов)
+
+    Returns:
+        Количество карт по состояниям после проверки и ключ "проверено" -
+        количество файлов, проверенных в этот раз
+
+    Raises:
+        sqlite3.Error: При ошибке чтения или записи базы данных
+    """
+    if root is None:
+        root = os.path.dirname(os.path.abspath(db_manager.db_name))
+    checked_at = datetime.now().strftime(DATE_FORMAT)
+    # Каталог -> (время изменения сейчас, изменился ли с прошлой проверки)
+    directories: Dict[str, Tuple[Optional[float], bool]] = {}
+    seen = checked = 0
+    last_id = 0
+
+    conn, cursor = db_manager.connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for statement in FILE_CHECK_SCHEMA:
+            cursor.execute(statement)
+        conn.commit()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="FileCheck") as pool:
+            while True:
+                cursor.execute(
+                    """SELECT m.id, m.Номер_бланка, m.Путь_к_файлу, p.Путь_к_файлу
+                       FROM маршрутные_карты m
+                       LEFT JOIN проверка_файлов p ON p.id_карты = m.id
+                       WHERE m.id > ?
+                       ORDER BY m.id
+                       LIMIT ?""",
+                    (last_id, chunk_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                seen += len(rows)
+
+                pending: List[Tuple[int, Optional[str], Optional[str], Optional[str]]] = []
+                for card_id, blank_number, stored_path, checked_path in rows:
+                    path = normalize_card_path(stored_path, root)
+                    if not full and checked_path is not None and checked_path == (stored_path or ""):
+                        if path is None or not _directory_changed(cursor, directories, os.path.dirname(path)):
+                            continue
+                    elif path is not None:
+                        _directory_changed(cursor, directories, os.path.dirname(path))
+                    pending.append((card_id, blank_number, stored_path, path))
+
+                if pending:
+                    # Файлы проверяются до начала транзакции, чтобы не держать блокировку записи
+                    results = list(pool.map(lambda row: check_card_file(row[1], row[3]), pending))
+                    conn.execute("BEGIN IMMEDIATE")
+                    cursor.executemany(
+                        """INSERT OR REPLACE INTO проверка_файлов
+                           (id_карты, Путь_к_файлу, Состояние, Размер, Изменен, Проверено)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        [
+                            (card_id, stored_path or "", state, size, mtime, checked_at)
+                            for (card_id, _, stored_path, _), (state, size, mtime) in zip(pending, results)
+                        ]
+                    )
+                    conn.commit()
+                    checked += len(pending)
+                if on_progress is not None:
+                    on_progress(seen, checked)
+
+        # Время изменения каталогов сохраняется после проверки всех их файлов,
+        # поэтому прерванная проверка будет повторена полностью
+        conn.execute("BEGIN IMMEDIATE")
+        cursor.executemany(
+            "INSERT OR REPLACE INTO проверка_каталогов (Каталог, Изменен) VALUES (?, ?)",
+            [(directory, mtime) for directory, (mtime, _) in directories.items()]
+        )
+        cursor.execute(
+            """DELETE FROM проверка_файлов
+               WHERE id_карты NOT IN (SELECT id FROM маршрутные_карты)"""
+        )
+        conn.commit()
+
+        cursor.execute("SELECT Состояние, COUNT(*) FROM проверка_файлов GROUP BY Состояние")
+        summary = dict(cursor.fetchall())
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    summary["проверено"] = checked
+    return summary
+
+
+def _directory_changed(
+    cursor: sqlite3.Cursor,
+    directories: Dict[str, Tuple[Optional[float], bool]],
+    directory: str
+) -> bool:
+    """Изменился ли каталог с прошлой проверки (результат запоминается на время проверки)."""
+    known = directories.get(directory)
+    if known is None:
+        mtime = _directory_mtime(directory)
+        cursor.execute("SELECT Изменен FROM проверка_каталогов WHERE Каталог = ?", (directory,))
+        stored = cursor.fetchone()
+        known = (mtime, mtime is None or stored is None or stored[0] != mtime)
+        directories[directory] = known
+    return known[1]
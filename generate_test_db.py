@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+"""
+Генератор баз данных маршрутных карт для нагрузочных тестов и бенчмарков.
+
+Создает таблицу маршрутные_карты той же структуры, что и рабочая база, с
+заданным количеством строк (от десятков тысяч до десятков миллионов):
+- номера бланков идут подряд с 000001; после 999999 номера повторяются,
+  так как номер бланка шестизначный;
+- учетные номера (ММ-ННН/ГГ) и номера кластеров (КГГ/ММ-ННН) завершенных
+  карт соответствуют месяцу завершения и уникальны, пока в месяце не больше
+  999 завершений;
+- статусы распределяются по заданным долям, даты равномерно растут от
+  начала к концу периода.
+
+Пример:
+    python generate_test_db.py тест_1м.db --rows 1000000 --status-mix Завершена=0.8,NULL=0.2
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+from route_card_db import DatabaseManager
+
+
+# Доли статусов по умолчанию (None - карта не завершена)
+DEFAULT_STATUS_MIX: Dict[Optional[str], float] = {"Завершена": 0.8, None: 0.2}
+
+# Период дат по умолчанию
+DEFAULT_START_DATE = "2018-01-01"
+DEFAULT_END_DATE = "2025-12-31"
+
+# Наибольший номер бланка и наибольший порядковый номер в учетном номере
+MAX_BLANK_NUMBER = 999999
+MAX_MONTHLY_NUMBER = 999
+
+# Количество строк в одной транзакции вставки
+INSERT_BATCH_SIZE = 50000
+
+# Наибольшая задержка завершения карты после создания (дни)
+MAX_COMPLETION_DELAY_DAYS = 7
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_status_mix(text: str) -> Dict[Optional[str], float]:
+    """Разбор долей статусов из строки "Завершена=0.8,NULL=0.2".
+
+    Args:
+        text: Пары статус=доля через запятую, NULL - пустой статус
+
+    Returns:
+        Словарь статус -> доля (доли нормируются к сумме 1)
+
+    Raises:
+        ValueError: Неверный формат или нулевая сумма долей
+    """
+    mix: Dict[Optional[str], float] = {}
+    for part in text.split(","):
+        status, separator, share = part.partition("=")
+        if not separator:
+            raise ValueError(f"Ожидается статус=доля: {part}")
+        status = status.strip()
+        mix[None if status.upper() == "NULL" else status] = float(share)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Сумма долей статусов должна быть положительной")
+    return {status: share / total for status, share in mix.items()}
+
+
+def generate_rows(
+    rows: int,
+    status_mix: Dict[Optional[str], float],
+    start_date: str,
+    end_date: str,
+    seed: int,
+    counters: Dict[Tuple[int, int], int]
+) -> Iterator[tuple]:
+    """Генерация строк таблицы маршрутных карт.
+
+    Args:
+        rows: Количество строк
+        status_mix: Доли статусов
+        start_date: Начало периода ("ГГГГ-ММ-ДД")
+        end_date: Конец периода ("ГГГГ-ММ-ДД")
+        seed: Начальное значение генератора случайных чисел
+        counters: Счетчики завершений по (год, месяц), заполняются при генерации
+
+    Yields:
+        Кортежи (Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания, Путь_к_файлу)
+    """
+    rng = random.Random(seed)
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    span = (end - start).total_seconds()
+    step = span / rows
+    statuses = list(status_mix)
+    weights = [status_mix[status] for status in statuses]
+    cluster_offsets: Dict[Tuple[int, int], int] = {}
+
+    for position in range(rows):
+        blank = f"{position % MAX_BLANK_NUMBER + 1:06d}"
+        created = start + timedelta(seconds=position * step + rng.random() * step)
+        status = rng.choices(statuses, weights)[0]
+        account_number = cluster_number = None
+
+        if status == "Завершена":
+            delay = rng.random() * MAX_COMPLETION_DELAY_DAYS * 86400
+            created = min(created + timedelta(seconds=delay), end - timedelta(seconds=1))
+            month_key = (created.year, created.month)
+            sequence = counters.get(month_key, 0)
+            counters[month_key] = sequence + 1
+            offset = cluster_offsets.setdefault(month_key, rng.randrange(MAX_MONTHLY_NUMBER))
+            year = created.year % 100
+            account_number = f"{created.month:02d}-{sequence % MAX_MONTHLY_NUMBER + 1:03d}/{year:02d}"
+            cluster_number = (
+                f"К{year:02d}/{created.month:02d}-{(sequence + offset) % MAX_MONTHLY_NUMBER + 1:03d}"
+            )
+
+        yield (
+            blank,
+            account_number,
+            cluster_number,
+            status,
+            created.strftime(DATE_FORMAT),
+            f"Маршрутные_карты\\маршрутная_карта_{blank}.pptx",
+        )
+
+
+def generate_database(
+    path: str,
+    rows: int,
+    status_mix: Optional[Dict[Optional[str], float]] = None,
+    start_date: str = DEFAULT_START_DATE,
+    end_date: str = DEFAULT_END_DATE,
+    seed: int = 1,
+    indexes: bool = True
+) -> dict:
+    """Создание базы данных маршрутных карт.
+
+    Args:
+        path: Путь к новому файлу базы данных (не должен существовать)
+        rows: Количество строк
+        status_mix: Доли статусов (по умолчанию DEFAULT_STATUS_MIX)
+        start_date: Начало периода дат
+        end_date: Конец периода дат
+        seed: Начальное значение генератора случайных чисел
+        indexes: Создать индексы приложения (DatabaseManager.ensure_indexes)
+
+    Returns:
+        Сводка: строки, завершенные карты, повторы номеров бланков и учетных номеров
+
+    Raises:
+        FileExistsError: Файл уже существует
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"Файл уже существует: {path}")
+
+    counters: Dict[Tuple[int, int], int] = {}
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("""
+            CREATE TABLE маршрутные_карты (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Номер_бланка TEXT NOT NULL,
+                Учетный_номер TEXT,
+                Номер_кластера TEXT,
+                Статус TEXT,
+                Дата_создания TEXT,
+                Путь_к_файлу TEXT
+            )
+        """)
+        generated = generate_rows(
+            rows, status_mix or DEFAULT_STATUS_MIX, start_date, end_date, seed, counters
+        )
+        while True:
+            batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), generated)]
+            if not batch:
+                break
+            conn.executemany(
+                """INSERT INTO маршрутные_карты
+                   (Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания, Путь_к_файлу)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                batch
+            )
+            conn.commit()
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+
+    if indexes:
+        DatabaseManager(path).ensure_indexes()
+
+    return {
+        "rows": rows,
+        "completed": sum(counters.values()),
+        "repeated_blanks": max(rows - MAX_BLANK_NUMBER, 0),
+        "repeated_account_numbers": sum(
+            max(count - MAX_MONTHLY_NUMBER, 0) for count in counters.values()
+        ),
+    }
+
+
+def main() -> int:
+    """Запуск генератора из командной строки."""
+    parser = argparse.ArgumentParser(description="Генератор базы данных маршрутных карт")
+    parser.add_argument("path", help="Путь к новому файлу базы данных")
+    parser.add_argument("--rows", type=int, default=100000, help="Количество строк")
+    parser.add_argument(
+        "--status-mix", type=parse_status_mix, default=DEFAULT_STATUS_MIX,
+        help="Доли статусов, например Завершена=0.8,NULL=0.2"
+    )
+    parser.add_argument("--start", default=DEFAULT_START_DATE, help="Начало периода дат (ГГГГ-ММ-ДД)")
+    parser.add_argument("--end", default=DEFAULT_END_DATE, help="Конец периода дат (ГГГГ-ММ-ДД)")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение генератора")
+    parser.add_argument("--no-indexes", action="store_true", help="Не создавать индексы приложения")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        summary = generate_database(
+            args.path, args.rows, args.status_mix, args.start, args.end, args.seed,
+            indexes=not args.no_indexes
+        )
+    except (FileExistsError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Создана база {args.path}: {summary['rows']} строк, завершено {summary['completed']}, "
+        f"{time.perf_counter() - started:.1f} с"
+    )
+    if summary["repeated_blanks"]:
+        print(f"Повторяющихся номеров бланков: {summary['repeated_blanks']} (номер бланка шестизначный)")
+    if summary["repeated_account_numbers"]:
+        print(
+            f"Повторяющихся учетных номеров: {summary['repeated_account_numbers']} "
+            f"(больше {MAX_MONTHLY_NUMBER} завершений в месяц)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Прием сканов маршрутных карт без графического интерфейса.
+
+Сканер (или другая программа) передает номера карт по одному в строке.
+Источники:
+- "-" - стандартный ввод;
+- путь к файлу или именованному каналу (FIFO), канал переоткрывается после
+  отключения пишущей стороны;
+- "tcp:ПОРТ" - локальный TCP-сокет на 127.0.0.1;
+- "unix:ПУТЬ" - локальный Unix-сокет (где поддерживается).
+
+На каждую строку выводится ответ "номер<TAB>OK" или
+"номер<TAB>ОШИБКА<TAB>сообщение". Пока база данных недоступна, сканы
+сохраняются в локальный журнал (ответ "номер<TAB>OK<TAB>сообщение"), и журнал
+применяется в фоне, когда база снова доступна. Модуль не импортирует Kivy.
+Если указан порт метрик, счетчики сканов и глубина очереди записи доступны
+по HTTP в формате Prometheus (см. metrics_server).
+"""
+import os
+import socketserver
+import stat
+import sys
+import threading
+from typing import Callable, Iterable, Optional, TextIO
+
+from batch_writer import BatchWriter
+from instrumentation import metrics
+from metrics_server import METRICS_HOST, MetricsServer, render_metrics
+from route_card_db import DatabaseManager, validate_route_card_number
+from scan_journal import JOURNAL_RETRY_INTERVAL, ScanJournal
+
+
+Reply = Callable[[str], None]
+
+
+def format_result(route_card_number: str, success: bool, message: Optional[str]) -> str:
+    """Форматирование ответа на один скан.
+
+    Args:
+        route_card_number: Номер карты
+        success: Успешно ли завершена карта
+        message: Сообщение об ошибке (для успешного скана - пояснение)
+
+    Returns:
+        Строка ответа без перевода строки
+    """
+    if success:
+        return f"{route_card_number}\tOK\t{message}" if message else f"{route_card_number}\tOK"
+    return f"{route_card_number}\tОШИБКА\t{message}"
+
+
+def journal_scan(journal: ScanJournal, route_card_number: str) -> str:
+    """Сохранение скана в локальный журнал, пока база данных недоступна.
+
+    Args:
+        journal: Журнал сканов
+        route_card_number: Нормализованный номер карты
+
+    Returns:
+        Строка ответа без перевода строки
+    """
+    if route_card_number in journal:
+        metrics.increment("scans.error")
+        return format_result(route_card_number, False, f"Маршрутная карта №{route_card_number} уже завершена")
+    try:
+        journal.append(route_card_number)
+    except OSError as e:
+        metrics.increment("scans.error")
+        return format_result(route_card_number, False, f"Не удалось сохранить скан в локальный журнал: {e}")
+    metrics.increment("scans.success")
+    return format_result(route_card_number, True, "сохранена в локальный журнал (база недоступна)")
+
+
+def ingest_lines(
+    lines: Iterable[str],
+    writer: BatchWriter,
+    reply: Reply,
+    journal: Optional[ScanJournal] = None
+) -> int:
+    """Проверка строк с номерами карт и постановка их в очередь записи.
+
+    Пока в журнале есть непримененные сканы, новые сканы дописываются в
+    журнал, чтобы они применялись после более ранних.
+
+    Args:
+        lines: Строки с номерами карт
+        writer: Пакетная запись завершений
+        reply: Функция вывода ответа
+        journal: Журнал сканов на время недоступности базы (None - без журнала)
+
+    Returns:
+        Количество номеров, поставленных в очередь или в журнал
+    """
+    def on_result(number: str, success: Optional[bool], message: Optional[str]) -> None:
+        if success is None and journal is not None:
+            reply(journal_scan(journal, number))
+            return
+        metrics.increment("scans.success" if success else "scans.error")
+        reply(format_result(number, bool(success), message))
+
+    submitted = 0
+    for line in lines:
+        number = line.strip()
+        if not number:
+            continue
+        is_valid, normalized_number = validate_route_card_number(number)
+        if not is_valid:
+            metrics.increment("scans.error")
+            reply(format_result(
+                number, False, "Номер должен быть шестизначным числом (от 000001 до 999999)"
+            ))
+            continue
+        if journal is not None and len(journal):
+            reply(journal_scan(journal, normalized_number))
+        else:
+            writer.submit(normalized_number, on_result)
+        submitted += 1
+    return submitted
+
+
+def start_journal_replay(
+    journal: ScanJournal,
+    db_manager: DatabaseManager,
+    stop: threading.Event,
+    interval: float = JOURNAL_RETRY_INTERVAL
+) -> threading.Thread:
+    """Запуск фонового применения журнала сканов до события остановки.
+
+    Args:
+        journal: Журнал сканов
+        db_manager: Менеджер базы данных
+        stop: Событие остановки
+        interval: Интервал попыток применения (секунды)
+
+    Returns:
+        Запущенный поток применения журнала
+    """
+    def run() -> None:
+        while True:
+            if len(journal):
+                applied, conflicts, _ = journal.replay(db_manager)
+                if applied or conflicts:
+                    print(
+                        f"Журнал сканов применен: записей {applied}, конфликтов {len(conflicts)}",
+                        file=sys.stderr
+                    )
+            if stop.wait(interval):
+                return
+
+    thread = threading.Thread(target=run, name="ScanJournalReplay", daemon=True)
+    thread.start()
+    return thread
+
+
+def stream_reply(stream: TextIO) -> Reply:
+    """Создание потокобезопасной функции вывода ответов в текстовый поток.
+
+    Args:
+        stream: Поток вывода
+
+    Returns:
+        Функция вывода одной строки ответа
+    """
+    lock = threading.Lock()
+
+    def reply(line: str) -> None:
+        with lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+    return reply
+
+
+def serve_path(
+    path: str,
+    writer: BatchWriter,
+    reply: Reply,
+    journal: Optional[ScanJournal] = None
+) -> None:
+    """Чтение номеров из файла или именованного канала.
+
+    Args:
+        path: Путь к файлу или FIFO
+        writer: Пакетная запись завершений
+        reply: Функция вывода ответа
+        journal: Журнал сканов на время недоступности базы
+    """
+    is_fifo = stat.S_ISFIFO(os.stat(path).st_mode)
+    while True:
+        with open(path, encoding="utf-8") as stream:
+            ingest_lines(stream, writer, reply, journal)
+        writer.flush()
+        if not is_fifo:
+            return
+
+
+class _ScanHandler(socketserver.StreamRequestHandler):
+    """Обработчик подключения к сокету приема сканов."""
+
+    def handle(self) -> None:
+        lock = threading.Lock()
+
+        def reply(line: str) -> None:
+            with lock:
+                try:
+                    self.wfile.write((line + "\n").encode("utf-8"))
+                except OSError:
+                    pass
+
+        lines = (raw.decode("utf-8", errors="replace") for raw in self.rfile)
+        ingest_lines(lines, self.server.writer, reply, self.server.journal)
+        self.server.writer.flush()
+
+
+def create_server(
+    address: str,
+    writer: BatchWriter,
+    journal: Optional[ScanJournal] = None
+) -> socketserver.BaseServer:
+    """Создание локального сервера приема сканов.
+
+    Args:
+        address: "tcp:ПОРТ" или "unix:ПУТЬ"
+        writer: Пакетная запись завершений
+        journal: Журнал сканов на время недоступности базы
+
+    Returns:
+        Сервер, обслуживающий подключения в отдельных потоках
+    """
+    if address.startswith("tcp:"):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", int(address[4:])), _ScanHandler)
+    elif address.startswith("unix:") and hasattr(socketserver, "ThreadingUnixStreamServer"):
+        server = socketserver.ThreadingUnixStreamServer(address[5:], _ScanHandler)
+    else:
+        raise ValueError(f"Неподдерживаемый адрес сокета: {address}")
+    server.daemon_threads = True
+    server.writer = writer
+    server.journal = journal
+    return server
+
+
+def run_headless(
+    db_manager: DatabaseManager,
+    source: str = "-",
+    metrics_port: Optional[int] = None,
+    metrics_host: str = METRICS_HOST
+) -> int:
+    """Запуск приема сканов до окончания ввода или прерывания.
+
+    Args:
+        db_manager: Менеджер базы данных
+        source: Источник номеров ("-", путь, "tcp:ПОРТ" или "unix:ПУТЬ")
+        metrics_port: Порт точки сбора метрик (None - без нее)
+        metrics_host: Адрес точки сбора метрик
+
+    Returns:
+        Код завершения
+    """
+    try:
+        db_manager.enable_blank_index()
+    except Exception as e:
+        print(f"Не удалось построить битовую карту бланков: {e}", file=sys.stderr)
+
+    writer = BatchWriter(db_manager).start()
+    # Сканы, оставшиеся в журнале с прошлого запуска, применяются первыми
+    journal = ScanJournal()
+    stop_replay = threading.Event()
+    replay_thread = start_journal_replay(journal, db_manager, stop_replay)
+    server = None
+    metrics_server = None
+    try:
+        if metrics_port is not None:
+            metrics_server = MetricsServer(
+                lambda: render_metrics(db_manager, writer, {"journal": len(journal)}, len(journal) > 0),
+                metrics_host,
+                metrics_port
+            ).start()
+            print(f"Метрики: http://{metrics_host}:{metrics_server.address[1]}/metrics", file=sys.stderr)
+        if source == "-":
+            ingest_lines(sys.stdin, writer, stream_reply(sys.stdout), journal)
+        elif source.startswith(("tcp:", "unix:")):
+            server = create_server(source, writer, journal)
+            print(f"Прием сканов: {source}", file=sys.stderr)
+            server.serve_forever()
+        else:
+            serve_path(source, writer, stream_reply(sys.stdout), journal)
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Ошибка источника сканов '{source}': {e}", file=sys.stderr)
+        return 1
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        if server is not None:
+            server.server_close()
+            if source.startswith("unix:"):
+                try:
+                    os.unlink(source[5:])
+                except OSError:
+                    pass
+        writer.close()
+        stop_replay.set()
+        replay_thread.join()
+        if db_manager.blank_index is not None:
+            db_manager.blank_index.save()
+            db_manager.blank_index.close()
+        db_manager.recent_completions.close()
+
+    print(f"Завершено карт: {writer.written}, пакетов: {writer.batches}", file=sys.stderr)
+    return 0
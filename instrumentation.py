@@ -0,0 +1,384 @@
+"""
+Замеры времени выполнения методов DatabaseManager и обработчиков интерфейса.
+
+Замеры выключены по умолчанию и почти ничего не стоят: обертка проверяет
+один флаг и вызывает функцию. Включение:
+- переменная окружения ROUTE_CARD_METRICS=1 (отчет в METRICS_FILE) или
+  ROUTE_CARD_METRICS=путь.json;
+- флаг run.py --metrics [ПУТЬ];
+- вызов enable() из кода.
+
+Для каждого имени замера собираются количество вызовов и ошибок, суммарное
+и наибольшее время, гистограмма задержек и количество возвращенных строк.
+Кроме замеров ведутся счетчики событий (сканы по результату, завершенные карты).
+Отчет записывается при выходе из программы, по сигналу SIGUSR1 (где он
+есть) или по вызову dump().
+"""
+import atexit
+import functools
+import inspect
+import json
+import math
+import os
+import signal
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Переменная окружения для включения замеров
+METRICS_ENV_VAR = "ROUTE_CARD_METRICS"
+
+# Файл отчета по умолчанию
+METRICS_FILE = "метрики_производительности.json"
+
+# Верхние границы интервалов гистограммы задержек (мс)
+HISTOGRAM_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, math.inf)
+
+
+class Metric:
+    """Счетчики и гистограмма задержек одного имени замера."""
+
+    __slots__ = ("count", "errors", "total_seconds", "max_seconds", "rows", "max_rows", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.max_rows = 0
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS_MS)
+
+    def add(self, seconds: float, rows: Optional[int], error: bool) -> None:
+        """Учет одного вызова."""
+        self.count += 1
+        self.errors += error
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if rows is not None:
+            self.rows += rows
+            self.max_rows = max(self.max_rows, rows)
+        milliseconds = seconds * 1000
+        for position, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if milliseconds <= bound:
+                self.buckets[position] += 1
+                break
+
+    def percentile_ms(self, fraction: float) -> float:
+        """Оценка перцентиля по гистограмме (верхняя граница интервала).
+
+        Args:
+            fraction: Доля (0.95 для p95)
+
+        Returns:
+            Верхняя граница интервала, содержащего перцентиль (мс)
+        """
+        target = self.count * fraction
+        seen = 0
+        for bound, bucket in zip(HISTOGRAM_BUCKETS_MS, self.buckets):
+            seen += bucket
+            if seen >= target and seen:
+                return min(bound, self.max_seconds * 1000)
+        return self.max_seconds * 1000
+
+    def to_dict(self) -> dict:
+        """Счетчики в виде словаря для JSON."""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": self.total_seconds * 1000,
+            "mean_ms": self.total_seconds * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max_seconds * 1000,
+            "p50_ms": self.percentile_ms(0.50),
+            "p95_ms": self.percentile_ms(0.95),
+            "p99_ms": self.percentile_ms(0.99),
+            "rows": self.rows,
+            "max_rows": self.max_rows,
+            "buckets_ms": [
+                [None if math.isinf(bound) else bound, count]
+                for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.buckets)
+            ],
+        }
+
+
+class MetricsRegistry:
+    """Набор замеров процесса."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.dump_path: Optional[str] = None
+        self._metrics: Dict[str, Metric] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._exit_hook_installed = False
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None, error: bool = False) -> None:
+        """Учет одного вызова.
+
+        Args:
+            name: Имя замера ("db.check_blank_number", "ui.refresh_table")
+            seconds: Длительность вызова
+            rows: Количество возвращенных строк, если известно
+            error: Вызов завершился исключением
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Metric()
+            metric.add(seconds, rows, error)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Увеличение счетчика событий (учитывается только при включенных замерах).
+
+        Args:
+            name: Имя счетчика ("scans.success", "db.completions")
+            amount: Величина увеличения
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counters(self) -> Dict[str, int]:
+        """Текущие значения счетчиков событий."""
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Текущие значения всех замеров.
+
+        Returns:
+            Словарь имя замера -> Metric.to_dict()
+        """
+        with self._lock:
+            return {name: metric.to_dict() for name, metric in sorted(self._metrics.items())}
+
+    def histograms(self) -> Dict[str, Metric]:
+        """Копии замеров с гистограммами (для экспорта в другие форматы)."""
+        with self._lock:
+            copies = {}
+            for name, metric in self._metrics.items():
+                copy = Metric()
+                for slot in Metric.__slots__:
+                    setattr(copy, slot, getattr(metric, slot))
+                copy.buckets = list(metric.buckets)
+                copies[name] = copy
+            return copies
+
+    def reset(self) -> None:
+        """Сброс всех замеров."""
+        with self._lock:
+            self._metrics.clear()
+            self._counters.clear()
+
+    def format_report(self) -> str:
+        """Текстовый отчет по замерам.
+
+        Returns:
+            Таблица с количеством вызовов, задержками и строками
+        """
+        lines = [
+            f"{'Замер':40} {'Вызовов':>8} {'Ошибок':>7} {'Среднее':>9} {'p95':>9} "
+            f"{'Макс':>9} {'Строк':>9}  (мс)"
+        ]
+        for name, values in self.snapshot().items():
+            lines.append(
+                f"{name:40} {values['count']:8d} {values['errors']:7d} {values['mean_ms']:9.3f} "
+                f"{values['p95_ms']:9.3f} {values['max_ms']:9.3f} {values['rows']:9d}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """Запись отчета в JSON-файл.
+
+        Args:
+            path: Путь к файлу (по умолчанию dump_path или METRICS_FILE)
+
+        Returns:
+            Путь к записанному файлу или None при ошибке
+        """
+        path = path or self.dump_path or METRICS_FILE
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "metrics": self.snapshot(),
+            "counters": self.counters(),
+        }
+        try:
+            with open(path, "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"Не удалось записать отчет о замерах: {e}")
+            return None
+        return path
+
+    def _dump_at_exit(self) -> None:
+        if self.enabled and (self._metrics or self._counters):
+            self.dump()
+
+    def enable(self, dump_path: Optional[str] = None, dump_at_exit: bool = True) -> None:
+        """Включение замеров с записью отчета при выходе.
+
+        Args:
+            dump_path: Путь к файлу отчета (по умолчанию METRICS_FILE)
+            dump_at_exit: Записывать отчет при выходе и по сигналу SIGUSR1
+        """
+        self.enabled = True
+        if dump_path:
+            self.dump_path = dump_path
+        if dump_at_exit and not self._exit_hook_installed:
+            self._exit_hook_installed = True
+            atexit.register(self._dump_at_exit)
+            if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump())
+
+    def disable(self) -> None:
+        """Выключение замеров (накопленные значения сохраняются)."""
+        self.enabled = False
+
+
+# Замеры процесса
+metrics = MetricsRegistry()
+
+
+def enable(dump_path: Optional[str] = None, dump_at_exit: bool = True) -> None:
+    """Включение замеров процесса (см. MetricsRegistry.enable)."""
+    metrics.enable(dump_path, dump_at_exit)
+
+
+def enable_from_environment() -> bool:
+    """Включение замеров, если задана переменная окружения ROUTE_CARD_METRICS.
+
+    Returns:
+        True если замеры включены
+    """
+    value = os.environ.get(METRICS_ENV_VAR, "").strip()
+    if not value or value.lower() in ("0", "false", "no"):
+        return metrics.enabled
+    metrics.enable(None if value.lower() in ("1", "true", "yes") else value)
+    return True
+
+
+def dump(path: Optional[str] = None) -> Optional[str]:
+    """Запись отчета о замерах процесса (см. MetricsRegistry.dump)."""
+    return metrics.dump(path)
+
+
+def _count_rows(result) -> Optional[int]:
+    """Количество строк в результате метода (для списков записей)."""
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+def _timed_iteration(name: str, iterator: Iterator) -> Iterator:
+    """Замер времени, проведенного внутри генератора, за все его шаги."""
+    elapsed = 0.0
+    rows = 0
+    error = False
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            except BaseException:
+                elapsed += time.perf_counter() - start
+                error = True
+                raise
+            elapsed += time.perf_counter() - start
+            rows += 1
+            yield item
+    finally:
+        metrics.record(name, elapsed, rows, error)
+
+
+def timed(name: str) -> Callable:
+    """Декоратор замера времени вызова функции или метода.
+
+    Для генераторов замеряется время всех шагов, количество строк равно
+    количеству выданных элементов. Для функций, возвращающих список,
+    количество строк равно длине списка.
+
+    Args:
+        name: Имя замера
+
+    Returns:
+        Декоратор
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not metrics.enabled:
+                    return func(*args, **kwargs)
+                return _timed_iteration(name, func(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                metrics.record(name, time.perf_counter() - start, error=True)
+                raise
+            metrics.record(name, time.perf_counter() - start, _count_rows(result))
+            return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Контекстный менеджер замера участка кода.
+
+    Args:
+        name: Имя замера ("db.commit", "ui.build_table")
+    """
+    if not metrics.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        metrics.record(name, time.perf_counter() - start, error=error)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Курсор SQLite с замером выполнения запросов и получения строк.
+
+    Используется DatabaseManager.connect() только при включенных замерах.
+    """
+
+    def execute(self, sql, parameters=()):
+        with stage("db.query"):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with stage("db.query"):
+            return super().executemany(sql, seq_of_parameters)
+
+    def fetchone(self):
+        with stage("db.fetch"):
+            return super().fetchone()
+
+    def fetchall(self) -> List:
+        if not metrics.enabled:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        metrics.record("db.fetch", time.perf_counter() - start, len(rows))
+        return rows
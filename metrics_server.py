@@ -0,0 +1,245 @@
+"""
+Локальная точка сбора метрик в текстовом формате Prometheus.
+
+Сервер работает в фоновом потоке и по умолчанию слушает только 127.0.0.1.
+Ответ на GET /metrics собирается из уже накопленных в памяти значений:
+счетчиков и гистограмм модуля instrumentation, счетчиков кэша недавно
+завершенных карт и повторов записи DatabaseManager, глубины очередей
+приложения. К базе данных сервер не обращается, поэтому частый опрос
+сборщиком не мешает сканированию.
+
+Пример опроса:
+    curl http://127.0.0.1:9108/metrics
+"""
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from instrumentation import HISTOGRAM_BUCKETS_MS, metrics
+
+
+# Адрес и порт по умолчанию
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# Тип содержимого текстового формата Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Префикс имен метрик
+PREFIX = "route_card"
+
+
+def _escape(value: str) -> str:
+    """Экранирование значения метки."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Число в формате Prometheus."""
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class _Family:
+    """Одно семейство метрик: описание, тип и строки значений."""
+
+    def __init__(self, name: str, kind: str, help_text: str) -> None:
+        self.name = f"{PREFIX}_{name}"
+        self.kind = kind
+        self.help_text = help_text
+        self.samples: List[Tuple[str, Dict[str, str], float]] = []
+
+    def add(self, value: float, suffix: str = "", **labels: str) -> "_Family":
+        """Добавление значения с метками."""
+        self.samples.append((suffix, labels, value))
+        return self
+
+    def render(self) -> List[str]:
+        """Строки семейства в текстовом формате."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples:
+            label_text = ",".join(f'{key}="{_escape(str(item))}"' for key, item in labels.items())
+            name = self.name + suffix
+            if label_text:
+                name += "{" + label_text + "}"
+            lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+
+def render_metrics(
+    db_manager=None,
+    batch_writer=None,
+    queue_depths: Optional[Dict[str, int]] = None,
+    offline: Optional[bool] = None
+) -> str:
+    """Текст ответа /metrics.
+
+    Args:
+        db_manager: Менеджер базы данных (кэш завершенных карт и повторы записи)
+        batch_writer: Фоновая пакетная запись, если запущена
+        queue_depths: Глубина остальных очередей (имя -> количество элементов)
+        offline: Работает ли приложение с локальным журналом вместо базы
+
+    Returns:
+        Метрики в текстовом формате Prometheus
+    """
+    families = []
+    counters = metrics.counters()
+
+    scans = _Family("scans_total", "counter", "Обработанные сканы по результату")
+    for name, value in counters.items():
+        if name.startswith("scans."):
+            scans.add(value, outcome=name[len("scans."):])
+    families.append(scans)
+
+    families.append(_Family(
+        "completions_total", "counter", "Маршрутные карты, завершенные записью в базу"
+    ).add(counters.get("db.completions", 0)))
+
+    durations = _Family(
+        "operation_duration_seconds", "histogram",
+        "Длительность методов базы данных и обработчиков интерфейса"
+    )
+    errors = _Family("operation_errors_total", "counter", "Вызовы, завершившиеся исключением")
+    rows = _Family("operation_rows_total", "counter", "Строки, возвращенные вызовами")
+    for name, metric in sorted(metrics.histograms().items()):
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS, metric.buckets):
+            cumulative += count
+            le = "+Inf" if math.isinf(bound) else _format_value(bound / 1000)
+            durations.add(cumulative, "_bucket", operation=name, le=le)
+        durations.add(metric.total_seconds, "_sum", operation=name)
+        durations.add(metric.count, "_count", operation=name)
+        errors.add(metric.errors, operation=name)
+        rows.add(metric.rows, operation=name)
+    families.extend([durations, errors, rows])
+
+    if db_manager is not None:
+        cache = db_manager.recent_completions.stats()
+        cache_events = _Family(
+            "recent_completions_cache_total", "counter", "Обращения к кэшу недавно завершенных карт"
+        )
+        for event in ("hits", "misses", "revalidations", "evictions"):
+            cache_events.add(cache[event], event=event)
+        lookups = cache["hits"] + cache["misses"]
+        families.extend([
+            cache_events,
+            _Family("recent_completions_cache_size", "gauge", "Номера в кэше недавно завершенных карт")
+            .add(cache["size"]),
+            _Family("recent_completions_cache_hit_ratio", "gauge", "Доля попаданий в кэш")
+            .add(cache["hits"] / lookups if lookups else 0.0),
+        ])
+
+        retry = db_manager.write_retry.stats()
+        families.extend([
+            _Family("writes_total", "counter", "Транзакции записи").add(retry["writes"]),
+            _Family("write_retries_total", "counter", "Повторы записи из-за блокировки базы")
+            .add(retry["retries"]),
+            _Family("write_failures_total", "counter", "Записи, не выполненные после всех попыток")
+            .add(retry["failures"]),
+            _Family("write_retry_wait_seconds_total", "counter", "Время ожидания перед повторами записи")
+            .add(retry["wait_seconds"]),
+        ])
+
+    depths = dict(queue_depths or {})
+    if batch_writer is not None:
+        depths["batch_writer"] = batch_writer.pending()
+        families.extend([
+            _Family("batch_writes_total", "counter", "Пакеты, записанные фоновой записью")
+            .add(batch_writer.batches),
+            _Family("batch_cards_total", "counter", "Карты, завершенные фоновой записью")
+            .add(batch_writer.written),
+        ])
+    queues = _Family("queue_depth", "gauge", "Элементы, ожидающие обработки")
+    for name, depth in sorted(depths.items()):
+        queues.add(depth, queue=name)
+    families.append(queues)
+
+    if offline is not None:
+        families.append(_Family(
+            "offline", "gauge", "Сканы записываются в локальный журнал (база недоступна)"
+        ).add(int(offline)))
+
+    lines = []
+    for family in families:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к точке сбора метрик."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        try:
+            body = self.server.collect().encode("utf-8")
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """Запросы сборщика не выводятся в консоль."""
+
+
+class MetricsServer:
+    """HTTP-сервер метрик в фоновом потоке."""
+
+    def __init__(self, collect: Callable[[], str], host: str = METRICS_HOST, port: int = METRICS_PORT) -> None:
+        """Инициализация сервера.
+
+        Args:
+            collect: Функция, возвращающая текст метрик (например, render_metrics)
+            host: Адрес для прослушивания
+            port: Порт (0 - любой свободный)
+        """
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """Фактический адрес сервера (host, port) или None, если он не запущен."""
+        if self._server is None:
+            return None
+        return self._server.server_address[:2]
+
+    def start(self) -> "MetricsServer":
+        """Запуск сервера.
+
+        Returns:
+            Этот же объект для цепочки вызовов
+
+        Raises:
+            OSError: Если порт занят
+        """
+        if self._server is None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+            self._server.daemon_threads = True
+            self._server.collect = self.collect
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, name="MetricsServer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Остановка сервера."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
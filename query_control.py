@@ -0,0 +1,116 @@
+"""
+Отмена, ограничение времени и ход выполнения долгих запросов статистики.
+
+QueryControl подключается к соединениям SQLite через set_progress_handler:
+обработчик вызывается каждые PROGRESS_INSTRUCTIONS инструкций виртуальной
+машины SQLite, сообщает о ходе выполнения и прерывает запрос, если он
+отменен или превышено время. cancel() из другого потока дополнительно
+вызывает Connection.interrupt(), поэтому устаревший запрос перестает читать
+диск и занимать процессор сразу, а не после очередного шага.
+"""
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+# Количество инструкций SQLite между вызовами обработчика хода выполнения
+PROGRESS_INSTRUCTIONS = 10000
+
+# Наименьший интервал между сообщениями о ходе выполнения (секунды)
+PROGRESS_REPORT_INTERVAL = 0.1
+
+# Ограничение времени запросов вкладки статистики (секунды)
+STATS_QUERY_TIMEOUT = 60.0
+
+ProgressCallback = Callable[[float, int], None]
+
+
+class QueryCancelled(Exception):
+    """Запрос отменен или превысил отведенное время."""
+
+
+class QueryControl:
+    """Управление долгими запросами одной задачи (например, обновления статистики)."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        report_interval: float = PROGRESS_REPORT_INTERVAL
+    ) -> None:
+        """Инициализация управления запросами.
+
+        Args:
+            timeout: Ограничение времени всей задачи (секунды), None - без ограничения
+            on_progress: Функция (прошло секунд, шагов SQLite), вызывается из потока запроса
+            report_interval: Наименьший интервал между вызовами on_progress (секунды)
+        """
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout is not None else None
+        self.on_progress = on_progress
+        self.report_interval = report_interval
+        self.steps = 0
+        self.cancelled = False
+        self._last_report = 0.0
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @property
+    def timed_out(self) -> bool:
+        """Превышено ли отведенное время."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def stopped(self) -> bool:
+        """Нужно ли прекратить выполнение запросов."""
+        return self.cancelled or self.timed_out
+
+    @property
+    def reason(self) -> str:
+        """Причина остановки для сообщения пользователю."""
+        return "Запрос отменен" if self.cancelled else "Превышено время выполнения запроса"
+
+    def check(self) -> None:
+        """Проверка перед очередным запросом.
+
+        Raises:
+            QueryCancelled: Если задача отменена или время истекло
+        """
+        if self.stopped:
+            raise QueryCancelled(self.reason)
+
+    def attach(self, conn: sqlite3.Connection) -> None:
+        """Подключение обработчика хода выполнения к соединению.
+
+        Args:
+            conn: Соединение, на котором будут выполняться запросы задачи
+        """
+        conn.set_progress_handler(self._progress, PROGRESS_INSTRUCTIONS)
+        with self._lock:
+            self._connections = [known for known in self._connections if known is not conn]
+            self._connections.append(conn)
+
+    def cancel(self) -> None:
+        """Отмена задачи (можно вызывать из любого потока)."""
+        with self._lock:
+            self.cancelled = True
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.interrupt()
+            except sqlite3.ProgrammingError:
+                # Соединение уже закрыто: запрос завершился до отмены
+                pass
+
+    def _progress(self) -> int:
+        """Обработчик SQLite: ненулевой результат прерывает запрос."""
+        self.steps += 1
+        if self.stopped:
+            return 1
+        if self.on_progress is not None:
+            now = time.monotonic()
+            if now - self._last_report >= self.report_interval:
+                self._last_report = now
+                self.on_progress(now - self.started, self.steps)
+        return 0
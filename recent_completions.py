@@ -0,0 +1,171 @@
+"""
+Кэш недавно завершенных маршрутных карт.
+
+Операторы часто сканируют одну и ту же карту дважды. Номера, завершенные на
+этой станции или найденные завершенными при проверке, хранятся в
+ограниченном LRU-кэше, и повторный скан получает ответ "уже завершена" без
+запросов к базе данных.
+
+Кэш согласован с записями других станций через PRAGMA data_version: если
+база изменилась, все номера кэша перепроверяются одним запросом.
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from data_version import DataVersionWatcher
+
+
+# Максимальное количество номеров в кэше
+RECENT_COMPLETIONS_SIZE = 512
+
+
+class RecentCompletions:
+    """Ограниченный LRU-кэш номеров завершенных маршрутных карт."""
+
+    def __init__(self, db_manager, max_size: int = RECENT_COMPLETIONS_SIZE) -> None:
+        """Инициализация кэша.
+
+        Args:
+            db_manager: Менеджер базы данных (для имени файла и подключения)
+            max_size: Максимальное количество номеров
+        """
+        self.db_manager = db_manager
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._numbers: "OrderedDict[str, None]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._watcher: Optional[DataVersionWatcher] = None
+        self._lock = threading.RLock()
+
+    def _current_version(self) -> Optional[int]:
+        """Текущее значение data_version базы менеджера."""
+        if self._watcher is None or self._watcher.db_name != self.db_manager.db_name:
+            if self._watcher is not None:
+                # Менеджер переключен на другую базу данных
+                self._watcher.close()
+                self._numbers.clear()
+                self._version = None
+            self._watcher = DataVersionWatcher(self.db_manager.db_name)
+        return self._watcher.current()
+
+    def contains(self, route_card_number: str) -> bool:
+        """Проверка, что номер недавно был завершен.
+
+        Args:
+            route_card_number: Нормализованный номер маршрутной карты
+
+        Returns:
+            True если карта завершена (по данным кэша, согласованного с базой)
+        """
+        with self._lock:
+            if route_card_number not in self._numbers:
+                self.misses += 1
+                return False
+
+            version = self._current_version()
+            if version is None:
+                self.misses += 1
+                return False
+            if version != self._version:
+                self._revalidate(version)
+
+            if route_card_number in self._numbers:
+                self._numbers.move_to_end(route_card_number)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def is_current(self) -> bool:
+        """Проверка, что база не изменялась с последней проверки кэша."""
+        with self._lock:
+            version = self._current_version()
+            if not self._numbers:
+                # Пустой кэш согласован с любым состоянием базы
+                self._version = version
+            return version is not None and version == self._version
+
+    def add(self, route_card_number: str) -> None:
+        """Добавление номера завершенной карты.
+
+        Args:
+            route_card_number: Нормализованный номер маршрутной карты
+        """
+        with self._lock:
+            self._numbers[route_card_number] = None
+            self._numbers.move_to_end(route_card_number)
+            while len(self._numbers) > self.max_size:
+                self._numbers.popitem(last=False)
+                self.evictions += 1
+
+    def note_completed(self, route_card_number: str, was_current: bool) -> None:
+        """Учет карты, завершенной этой станцией или найденной завершенной в базе.
+
+        Args:
+            route_card_number: Номер завершенной карты
+            was_current: Был ли кэш согласован с базой перед записью или чтением
+        """
+        with self._lock:
+            self.add(route_card_number)
+            if was_current:
+                self._version = self._current_version()
+
+    def _revalidate(self, version: int) -> None:
+        """Перепроверка всех номеров кэша одним запросом после изменения базы."""
+        self.revalidations += 1
+        numbers = list(self._numbers)
+        if not numbers:
+            self._version = version
+            return
+        try:
+            conn, cursor = self.db_manager.connect()
+        except Exception:
+            self._numbers.clear()
+            return
+
+        try:
+            cursor.execute(
+                f"""SELECT DISTINCT Номер_бланка FROM маршрутные_карты
+                    WHERE Номер_бланка IN ({', '.join('?' * len(numbers))})
+                      AND Статус = 'Завершена'""",
+                numbers
+            )
+            completed = {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"Ошибка при проверке кэша завершенных карт: {e}")
+            self._numbers.clear()
+            return
+        finally:
+            conn.close()
+
+        for number in numbers:
+            if number not in completed:
+                del self._numbers[number]
+        self._version = version
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики использования кэша.
+
+        Returns:
+            Словарь с количеством попаданий, промахов, перепроверок и вытеснений
+        """
+        with self._lock:
+            return {
+                "size": len(self._numbers),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        """Закрытие соединения наблюдателя."""
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
@@ -1,9 +1,12 @@
-import re
+import os
 import sqlite3
+import threading
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple, Union, Dict
+from typing import Callable, List, Optional, Tuple
 
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.graphics import Color, Rectangle
 from kivy.metrics import dp, sp
@@ -16,446 +19,39 @@ from kivy.uix.scrollview import ScrollView
 from kivy.uix.spinner import Spinner
 from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 from kivy.uix.textinput import TextInput
+from kivy.uix.togglebutton import ToggleButton
 
+from batch_writer import BatchWriter
+from blank_index import BlankBitmap
+from card_export import ExportError, default_export_name, export_cards
+from card_records import display_cells
+from instrumentation import metrics, timed
+from metrics_server import METRICS_HOST, MetricsServer, render_metrics
+from query_control import STATS_QUERY_TIMEOUT, QueryCancelled, QueryControl
+from route_card_db import (
+    ACCOUNT_NUMBER_PATTERN,
+    CLUSTER_NUMBER_PATTERN,
+    ROUTE_CARD_PATTERN,
+    DatabaseManager,
+    DatabaseUnavailableError,
+    find_archives,
+    validate_route_card_number,
+)
+from scan_journal import JOURNAL_RETRY_INTERVAL, ScanJournal
 
-class DatabaseManager:
-    """Класс для работы с базой данных маршрутных карт."""
-    
-    def __init__(self, db_name: str = "маршрутные_карты.db") -> None:
-        """Инициализация менеджера базы данных.
-        
-        Args:
-            db_name: Имя файла базы данных
-        """
-        self.db_name = db_name
-        
-    def connect(self) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
-        """Создание подключения к базе данных.
-        
-        Returns:
-            Кортеж из соединения и курсора
-        """
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            return conn, cursor
-        except sqlite3.Error as e:
-            raise Exception(f"Ошибка подключения к базе данных: {e}")
-        
-    def check_blank_number(self, blank_number: str) -> dict:
-        """Проверка наличия номера бланка в базе данных.
-        
-        Args:
-            blank_number: Номер бланка для проверки
-            
-        Returns:
-            Словарь с информацией о карте или None
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                "SELECT * FROM маршрутные_карты WHERE Номер_бланка = ?", 
-                (blank_number,)
-            )
-            record = cursor.fetchone()
-            
-            if record:
-                result = {
-                    "exists": True,
-                    "id": record[0],
-                    "account_number": record[2],  # Учетный_номер
-                    "cluster_number": record[3],  # Номер_кластера
-                    "status": record[4]  # Статус
-                }
-            else:
-                result = {"exists": False}
-                
-            return result
-        except sqlite3.Error as e:
-            raise Exception(f"Ошибка при проверке номера бланка: {e}")
-        finally:
-            conn.close()
-            
-    def check_account_number(self, account_number: str) -> bool:
-        """Проверка наличия учетного номера в базе данных.
-        
-        Args:
-            account_number: Учетный номер для проверки
-            
-        Returns:
-            True если номер существует, иначе False
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM маршрутные_карты WHERE Учетный_номер = ? AND Статус = 'Завершена'", 
-                (account_number,)
-            )
-            count = cursor.fetchone()[0]
-            return count > 0
-        except sqlite3.Error as e:
-            print(f"Ошибка при проверке учетного номера: {e}")
-            return False
-        finally:
-            conn.close()
-    
-    def check_cluster_number(self, cluster_number: str) -> bool:
-        """Проверка наличия номера кластера в базе данных.
-        
-        Args:
-            cluster_number: Номер кластера для проверки
-            
-        Returns:
-            True если номер существует, иначе False
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM маршрутные_карты WHERE Номер_кластера = ? AND Статус = 'Завершена'", 
-                (cluster_number,)
-            )
-            count = cursor.fetchone()[0]
-            return count > 0
-        except sqlite3.Error as e:
-            print(f"Ошибка при проверке номера кластера: {e}")
-            return False
-        finally:
-            conn.close()
-    
-    def check_route_card_completed(self, route_card_number: str) -> bool:
-        """Проверка, завершена ли маршрутная карта с указанным номером.
-        
-        Args:
-            route_card_number: Номер маршрутной карты для проверки
-            
-        Returns:
-            True если карта завершена, иначе False
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM маршрутные_карты WHERE Номер_бланка = ? AND Статус = 'Завершена'", 
-                (route_card_number,)
-            )
-            count = cursor.fetchone()[0]
-            return count > 0
-        except sqlite3.Error as e:
-            print(f"Ошибка при проверке статуса маршрутной карты: {e}")
-            return False
-        finally:
-            conn.close()
-    
-    def complete_route_card(self, route_card_number: str) -> Tuple[bool, str]:
-        """Установка статуса 'Завершена' для маршрутной карты.
-        
-        Args:
-            route_card_number: Номер маршрутной карты
-            
-        Returns:
-            Кортеж (успех, сообщение об ошибке или None)
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM маршрутные_карты WHERE Номер_бланка = ?",
-                (route_card_number,)
-            )
-            exists = cursor.fetchone()[0] > 0
-            
-            if not exists:
-                return False, f"Маршрутная карта №{route_card_number} не найдена в базе данных"
-            
-            current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            cursor.execute(
-                """UPDATE маршрутные_карты 
-                   SET Статус = ?, Дата_создания = ?
-                   WHERE Номер_бланка = ?""",
-                ("Завершена", current_date, route_card_number)
-            )
-            
-            conn.commit()
-            return cursor.rowcount > 0, None
-        except sqlite3.Error as e:
-            return False, f"Ошибка при завершении маршрутной карты: {e}"
-        finally:
-            conn.close()
-    
-    def update_card_info(
-        self, 
-        blank_number: str, 
-        account_number: str, 
-        cluster_number: str
-    ) -> bool:
-        """Обновление информации о маршрутной карте.
-        
-        Args:
-            blank_number: Номер бланка
-            account_number: Учетный номер
-            cluster_number: Номер кластера
-            
-        Returns:
-            True если обновление успешно, иначе False
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            cursor.execute(
-                """UPDATE маршрутные_карты 
-                   SET Учетный_номер = ?, 
-                       Номер_кластера = ?, 
-                       Статус = ?,
-                       Дата_создания = ?
-                   WHERE Номер_бланка = ?""",
-                (account_number, cluster_number, "Завершена", current_date, blank_number)
-            )
-            
-            conn.commit()
-            return cursor.rowcount > 0
-        except sqlite3.Error as e:
-            print(f"Ошибка при обновлении записи: {e}")
-            return False
-        finally:
-            conn.close()
-            
-    def get_all_records(self, limit: int = 100, offset: int = 0) -> List[tuple]:
-        """Получение списка записей из базы данных.
-        
-        Args:
-            limit: Ограничение количества записей
-            offset: Смещение
-            
-        Returns:
-            Список записей
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                """SELECT id, Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания 
-                   FROM маршрутные_карты
-                   ORDER BY id DESC
-                   LIMIT ? OFFSET ?""",
-                (limit, offset)
-            )
-            return cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении записей: {e}")
-            return []
-        finally:
-            conn.close()
-            
-    def search_records(self, search_term: str) -> List[tuple]:
-        """Поиск записей в базе данных.
-        
-        Args:
-            search_term: Поисковый запрос
-            
-        Returns:
-            Список найденных записей
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                """SELECT id, Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания 
-                   FROM маршрутные_карты
-                   WHERE Номер_бланка LIKE ? 
-                      OR Учетный_номер LIKE ? 
-                      OR Номер_кластера LIKE ?
-                   ORDER BY id DESC
-                   LIMIT 100""",
-                (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%")
-            )
-            return cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при поиске записей: {e}")
-            return []
-        finally:
-            conn.close()
-    
-    def get_total_cards_count(self) -> int:
-        """Получение общего количества маршрутных карт в базе данных.
-        
-        Returns:
-            Общее количество карт
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute("SELECT COUNT(*) FROM маршрутные_карты")
-            return cursor.fetchone()[0]
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении общего количества карт: {e}")
-            return 0
-        finally:
-            conn.close()
-    
-    def get_completed_cards_count(self) -> int:
-        """Получение количества заполненных маршрутных карт.
-        
-        Returns:
-            Количество заполненных карт
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM маршрутные_карты WHERE Статус = 'Завершена'"
-            )
-            return cursor.fetchone()[0]
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении количества заполненных карт: {e}")
-            return 0
-        finally:
-            conn.close()
-    
-    def get_incomplete_cards_count(self) -> int:
-        """Получение количества незаполненных маршрутных карт.
-        
-        Returns:
-            Количество незаполненных карт
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                """SELECT COUNT(*) FROM маршрутные_карты 
-                   WHERE Учетный_номер IS NULL OR Учетный_номер = '' 
-                   OR Номер_кластера IS NULL OR Номер_кластера = ''"""
-            )
-            return cursor.fetchone()[0]
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении количества незаполненных карт: {e}")
-            return 0
-        finally:
-            conn.close()
-    
-    def get_cards_by_period(self, period_start: str, period_end: str) -> List[tuple]:
-        """Получение списка маршрутных карт за указанный период.
-        
-        Args:
-            period_start: Начало периода в формате 'YYYY-MM-DD'
-            period_end: Конец периода в формате 'YYYY-MM-DD'
-            
-        Returns:
-            Список маршрутных карт за период
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                """SELECT id, Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания 
-                   FROM маршрутные_карты
-                   WHERE date(Дата_создания) BETWEEN date(?) AND date(?)
-                   ORDER BY Дата_создания DESC""",
-                (period_start, period_end)
-            )
-            return cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении карт за период: {e}")
-            return []
-        finally:
-            conn.close()
-    
-    def get_cards_count_by_period(self, period_start: str, period_end: str) -> int:
-        """Получение количества маршрутных карт за указанный период.
-        
-        Args:
-            period_start: Начало периода в формате 'YYYY-MM-DD'
-            period_end: Конец периода в формате 'YYYY-MM-DD'
-            
-        Returns:
-            Количество маршрутных карт за период
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                """SELECT COUNT(*) FROM маршрутные_карты
-                   WHERE date(Дата_создания) BETWEEN date(?) AND date(?)""",
-                (period_start, period_end)
-            )
-            return cursor.fetchone()[0]
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении количества карт за период: {e}")
-            return 0
-        finally:
-            conn.close()
-    
-    def get_completed_cards_by_period(self, period_start: str, period_end: str) -> int:
-        """Получение количества заполненных маршрутных карт за период.
-        
-        Args:
-            period_start: Начало периода в формате 'YYYY-MM-DD'
-            period_end: Конец периода в формате 'YYYY-MM-DD'
-            
-        Returns:
-            Количество заполненных маршрутных карт за период
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            cursor.execute(
-                """SELECT COUNT(*) FROM маршрутные_карты
-                   WHERE Статус = 'Завершена'
-                   AND date(Дата_создания) BETWEEN date(?) AND date(?)""",
-                (period_start, period_end)
-            )
-            return cursor.fetchone()[0]
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении количества заполненных карт за период: {e}")
-            return 0
-        finally:
-            conn.close()
-    
-    def get_monthly_stats(self, year: int = None) -> List[tuple]:
-        """Получение статистики по месяцам.
-        
-        Args:
-            year: Год для фильтрации, если None - за все время
-            
-        Returns:
-            Список кортежей (месяц, год, количество заполненных карт)
-        """
-        conn, cursor = self.connect()
-        
-        try:
-            if year:
-                cursor.execute(
-                    """SELECT strftime('%m', Дата_создания) as Месяц, 
-                             strftime('%Y', Дата_создания) as Год,
-                             COUNT(*) as Количество
-                       FROM маршрутные_карты
-                       WHERE Статус = 'Завершена'
-                       AND strftime('%Y', Дата_создания) = ?
-                       GROUP BY Месяц, Год
-                       ORDER BY Год, Месяц""",
-                    (str(year),)
-                )
-            else:
-                cursor.execute(
-                    """SELECT strftime('%m', Дата_создания) as Месяц, 
-                             strftime('%Y', Дата_создания) as Год,
-                             COUNT(*) as Количество
-                       FROM маршрутные_карты
-                       WHERE Статус = 'Завершена'
-                       GROUP BY Месяц, Год
-                       ORDER BY Год, Месяц"""
-                )
-            return cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении месячной статистики: {e}")
-            return []
-        finally:
-            conn.close()
+
+# Количество строк журнала последних сканов в режиме непрерывного сканирования
+SCAN_LOG_SIZE = 8
+
+# Количество последних отклоненных сканов, показываемых на панели сверки
+RECONCILIATION_LOG_SIZE = 5
+
+# Цвета результатов сканирования
+SCAN_OUTCOME_COLORS = {
+    "success": (0.3, 0.9, 0.4, 1),  # Зеленый - карта завершена
+    "warning": (1, 0.8, 0.2, 1),    # Желтый - карта уже завершена
+    "error": (1, 0.35, 0.35, 1),    # Красный - ошибка
+}
 
 
 class DataTable(GridLayout):
@@ -490,10 +86,9 @@ class DataTable(GridLayout):
             header_label.bind(size=self.update_rect, pos=self.update_rect)
             self.add_widget(header_label)
         
-        # Добавляем данные
+        # Добавляем данные (текст ячеек форматируется один раз и кэшируется)
         for i, row in enumerate(row_data):
-            for cell in row:
-                cell_text = str(cell) if cell is not None else ""
+            for cell_text in display_cells(row):
                 cell_label = Label(
                     text=cell_text,
                     size_hint_y=None,
@@ -528,6 +123,89 @@ class DataTable(GridLayout):
             Rectangle(pos=instance.pos, size=instance.size)
 
 
+class ScanStatusPanel(BoxLayout):
+    """Баннер результата и журнал последних сканов для непрерывного сканирования.
+    
+    Все метки создаются один раз, при каждом скане меняются только их текст и цвет.
+    """
+    
+    def __init__(self, log_size: int = SCAN_LOG_SIZE, **kwargs) -> None:
+        """Инициализация панели.
+        
+        Args:
+            log_size: Количество строк журнала
+        """
+        super().__init__(orientation="vertical", spacing=2, **kwargs)
+        self.banner = Label(text="", font_size=sp(20), bold=True, size_hint=(1, 2))
+        self.add_widget(self.banner)
+        
+        self.entries = deque(maxlen=log_size)
+        self.log_labels = []
+        for _ in range(log_size):
+            label = Label(text="", font_size=sp(14), halign="left", valign="middle")
+            label.bind(size=label.setter("text_size"))
+            self.log_labels.append(label)
+            self.add_widget(label)
+    
+    def show(self, outcome: str, message: str) -> None:
+        """Отображение результата скана.
+        
+        Args:
+            outcome: Результат ("success", "warning" или "error")
+            message: Текст сообщения
+        """
+        color = SCAN_OUTCOME_COLORS[outcome]
+        self.banner.text = message
+        self.banner.color = color
+        
+        self.entries.appendleft((f"{datetime.now():%H:%M:%S}  {message}", color))
+        for label, (text, entry_color) in zip(self.log_labels, self.entries):
+            label.text = text
+            label.color = entry_color
+
+
+class ReconciliationPanel(BoxLayout):
+    """Панель сверки сканов, подтвержденных сразу, но отклоненных базой данных."""
+    
+    def __init__(self, on_clear, **kwargs) -> None:
+        """Инициализация панели.
+        
+        Args:
+            on_clear: Обработчик кнопки очистки списка
+        """
+        super().__init__(orientation="horizontal", spacing=10, **kwargs)
+        self.summary = Label(
+            text="",
+            font_size=sp(14),
+            color=SCAN_OUTCOME_COLORS["error"],
+            halign="left",
+            valign="middle",
+            size_hint=(0.8, 1)
+        )
+        self.summary.bind(size=self.summary.setter("text_size"))
+        self.add_widget(self.summary)
+        
+        clear_button = Button(text="Очистить", size_hint=(0.2, 1), font_size=sp(14))
+        clear_button.bind(on_press=lambda button: on_clear())
+        self.add_widget(clear_button)
+        self.show([])
+    
+    def show(self, rejected_scans: List[Tuple[str, str, str]]) -> None:
+        """Отображение отклоненных сканов.
+        
+        Args:
+            rejected_scans: Список (время, номер, сообщение)
+        """
+        self.opacity = 1 if rejected_scans else 0
+        self.disabled = not rejected_scans
+        lines = [f"Не записаны в базу: {len(rejected_scans)}"]
+        lines.extend(
+            f"{scan_time}  {message}"
+            for scan_time, _, message in rejected_scans[-RECONCILIATION_LOG_SIZE:]
+        )
+        self.summary.text = "\n".join(lines)
+
+
 class NavigableTextInput(TextInput):
     """Текстовое поле с навигацией с помощью стрелок."""
     
@@ -560,9 +238,26 @@ class NavigableTextInput(TextInput):
 class CustomTabbedPanelItem(TabbedPanelItem):
     """Настраиваемый элемент вкладки."""
     
-    def __init__(self, **kwargs):
+    def __init__(self, content_builder: Optional[Callable[[], BoxLayout]] = None, **kwargs):
+        """Инициализация вкладки.
+        
+        Args:
+            content_builder: Функция построения содержимого при первом выборе вкладки
+        """
         super().__init__(**kwargs)
         self.font_size = sp(16)  # Увеличиваем размер шрифта
+        self.content_builder = content_builder
+        
+
+class LazyTabbedPanel(TabbedPanel):
+    """Панель вкладок, строящая содержимое вкладки при первом выборе."""
+    
+    def switch_to(self, header, do_scroll=False):
+        builder = getattr(header, "content_builder", None)
+        if builder is not None and header.content is None:
+            header.content_builder = None
+            header.content = builder()
+        super().switch_to(header, do_scroll)
         
 
 class RouteCardApp(App):
@@ -572,12 +267,51 @@ class RouteCardApp(App):
         """Инициализация приложения."""
         super().__init__(**kwargs)
         self.db_manager = DatabaseManager()
+        self.continuous_mode = False
+        self.scan_panel = None
+        
+        # Оптимистичное завершение: подтверждение скана до записи в базу
+        self.optimistic_mode = False
+        self.batch_writer: Optional[BatchWriter] = None
+        self.pending_scans = set()
+        self.rejected_scans: List[Tuple[str, str, str]] = []
+        self.reconciliation_panel = None
+        
+        # Локальный журнал сканов на время недоступности базы данных
+        self.journal: Optional[ScanJournal] = None
+        self.offline = False
+        self._journal_retry_event = None
+        self._journal_replay_thread: Optional[threading.Thread] = None
+        
+        # Создание индексов и построение битовой карты при запуске в фоне
+        self._prepare_thread: Optional[threading.Thread] = None
+        
+        # Обновление статистики в фоне с отменой устаревших запросов
+        self.stats_tab = None
+        self.stats_control: Optional[QueryControl] = None
+        self.stats_progress_label = None
+        # Значения общей статистики (всего, заполненных, незаполненных карт)
+        self.summary_value_labels: List[Label] = []
+        self._stats_thread: Optional[threading.Thread] = None
+        self._stats_period_name: Optional[str] = None
+        self._stats_reload_period: Optional[str] = None
+        
+        # Выгрузка карт за период в фоне
+        self.export_control: Optional[QueryControl] = None
+        self.export_status_label = None
+        self._export_thread: Optional[threading.Thread] = None
+        
+        # Локальная точка сбора метрик (порт None - выключена)
+        self.metrics_host = METRICS_HOST
+        self.metrics_port: Optional[int] = None
+        self.metrics_server: Optional[MetricsServer] = None
         
         # Регулярные выражения для валидации
-        self.account_number_pattern = re.compile(r"^\d{2}-\d{3}/\d{2}$")  # ММ-ННН/ГГ
-        self.cluster_number_pattern = re.compile(r"^К\d{2}/\d{2}-\d{3}$")  # КГГ/ММ-ННН
-        self.route_card_pattern = re.compile(r"^\d{6}$")  # 6-значный номер
+        self.account_number_pattern = ACCOUNT_NUMBER_PATTERN
+        self.cluster_number_pattern = CLUSTER_NUMBER_PATTERN
+        self.route_card_pattern = ROUTE_CARD_PATTERN
     
+    @timed("ui.build")
     def build(self) -> TabbedPanel:
         """Построение интерфейса приложения.
         
@@ -588,7 +322,7 @@ class RouteCardApp(App):
         self.title = "Система учета маршрутных карт"
         
         # Создаем панель с вкладками с улучшенным оформлением
-        tab_panel = TabbedPanel(
+        tab_panel = LazyTabbedPanel(
             do_default_tab=False,
             background_color=(0.15, 0.15, 0.15, 1),  # Более темный фон
             tab_width=200,  # Увеличиваем ширину вкладок
@@ -604,23 +338,21 @@ class RouteCardApp(App):
         edit_layout = self.build_edit_tab()
         edit_tab.add_widget(edit_layout)
         
-        # Вкладка просмотра с улучшенным оформлением
+        # Вкладки просмотра и статистики строятся при первом выборе,
+        # чтобы поле ввода номера было доступно сразу после запуска
         view_tab = CustomTabbedPanelItem(
+            content_builder=self.build_view_tab,
             text="Просмотр данных",
             background_color=(0.3, 0.3, 0.3, 1),  # Серый цвет для неактивной вкладки
             color=(0.9, 0.9, 0.9, 1)  # Светло-серый цвет текста
         )
-        view_layout = self.build_view_tab()
-        view_tab.add_widget(view_layout)
         
-        # Вкладка статистики с улучшенным оформлением
         stats_tab = CustomTabbedPanelItem(
+            content_builder=self.build_stats_tab,
             text="Статистика",
             background_color=(0.3, 0.4, 0.3, 1),  # Зеленоватый цвет для вкладки статистики
             color=(0.9, 0.9, 0.9, 1)  # Светло-серый цвет текста
         )
-        stats_layout = self.build_stats_tab()
-        stats_tab.add_widget(stats_layout)
         
         # Добавляем вкладки на панель
         tab_panel.add_widget(edit_tab)
@@ -628,8 +360,221 @@ class RouteCardApp(App):
         tab_panel.add_widget(stats_tab)
         tab_panel.default_tab = edit_tab
         
+        # При уходе со вкладки статистики ее запросы отменяются
+        self.stats_tab = stats_tab
+        tab_panel.bind(current_tab=self.on_tab_changed)
+        
         return tab_panel
     
+    def on_tab_changed(self, tab_panel: TabbedPanel, tab: TabbedPanelItem) -> None:
+        """Отмена запросов статистики при уходе со вкладки и повтор при возврате.
+        
+        Args:
+            tab_panel: Панель вкладок
+            tab: Выбранная вкладка
+        """
+        if tab is self.stats_tab:
+            if self._stats_reload_period is not None:
+                period_name, self._stats_reload_period = self._stats_reload_period, None
+                self.update_period_stats(period_name)
+        elif self.stats_control is not None:
+            self._stats_reload_period = self._stats_period_name
+            self.cancel_stats_queries()
+
+    def on_start(self) -> None:
+        """Фокус на поле ввода номера и подготовка базы данных после первого кадра."""
+        Clock.schedule_once(self.focus_route_card_input, 0)
+        Clock.schedule_once(self.prepare_database, 0.5)
+        if self.metrics_port is not None:
+            self.start_metrics_server()
+    
+    def start_metrics_server(self) -> None:
+        """Запуск локальной точки сбора метрик в фоновом потоке."""
+        if self.metrics_server is not None:
+            return
+        try:
+            self.metrics_server = MetricsServer(
+                self.collect_metrics, self.metrics_host, self.metrics_port
+            ).start()
+        except OSError as e:
+            print(f"Не удалось запустить сервер метрик: {e}")
+            self.metrics_server = None
+    
+    def collect_metrics(self) -> str:
+        """Текст метрик приложения (вызывается из потока сервера метрик, без запросов к базе).
+        
+        Returns:
+            Метрики в текстовом формате Prometheus
+        """
+        return render_metrics(
+            self.db_manager,
+            self.batch_writer,
+            {
+                "pending_scans": len(self.pending_scans),
+                "journal": len(self.journal) if self.journal is not None else 0,
+                "rejected_scans": len(self.rejected_scans),
+            },
+            self.offline
+        )
+    
+    def focus_route_card_input(self, dt: float = 0) -> None:
+        """Установка фокуса на поле ввода номера маршрутной карты."""
+        self.route_card_input.focus = True
+    
+    def prepare_database(self, dt: float = 0) -> None:
+        """Запуск подготовки базы данных в фоновом потоке."""
+        if self._prepare_thread is not None and self._prepare_thread.is_alive():
+            return
+        self._prepare_thread = threading.Thread(
+            target=self._prepare_database, name="PrepareDatabase", daemon=True
+        )
+        self._prepare_thread.start()
+    
+    def _prepare_database(self) -> None:
+        """Создание индексов, построение битовой карты бланков и чтение журнала
+        (выполняется в фоновом потоке)."""
+        blank_index = None
+        db_name = self.db_manager.db_name
+        try:
+            for column, value, count, blank_numbers in self.db_manager.ensure_indexes():
+                print(
+                    f"Конфликт уникальности: {column} = {value} "
+                    f"у {count} карт ({', '.join(blank_numbers)})"
+                )
+            blank_index = BlankBitmap.open(
+                db_name,
+                archive_paths=[path for _, path in sorted(find_archives(db_name).items())]
+            )
+        except Exception as e:
+            print(f"Не удалось построить битовую карту бланков: {e}")
+        journal = ScanJournal() if self.journal is None else None
+        Clock.schedule_once(lambda dt: self.finish_prepare_database(blank_index, journal))
+    
+    def finish_prepare_database(
+        self,
+        blank_index: Optional[BlankBitmap],
+        journal: Optional[ScanJournal]
+    ) -> None:
+        """Включение битовой карты, фоновой записи и журнала после подготовки базы.
+        
+        Args:
+            blank_index: Построенная битовая карта (None - не удалось построить)
+            journal: Прочитанный журнал сканов (None - журнал уже открыт)
+        """
+        if blank_index is not None:
+            self.db_manager.blank_index = blank_index
+        
+        if self.optimistic_mode:
+            self.start_background_writer()
+        
+        # Сканы, оставшиеся в журнале с прошлого запуска, применяются до новых
+        self.journal = self.journal or journal
+        if len(self.journal):
+            self.go_offline()
+            self.start_journal_replay()
+    
+    def go_offline(self) -> None:
+        """Переход к записи сканов в локальный журнал до восстановления базы."""
+        if self.journal is None:
+            self.journal = ScanJournal()
+        if not self.offline:
+            self.offline = True
+            self._journal_retry_event = Clock.schedule_interval(
+                self.start_journal_replay, JOURNAL_RETRY_INTERVAL
+            )
+    
+    def start_journal_replay(self, dt: float = 0) -> None:
+        """Запуск применения журнала в фоновом потоке."""
+        if self._journal_replay_thread is not None and self._journal_replay_thread.is_alive():
+            return
+        self._journal_replay_thread = threading.Thread(
+            target=self._replay_journal, name="ScanJournalReplay", daemon=True
+        )
+        self._journal_replay_thread.start()
+    
+    def _replay_journal(self) -> None:
+        """Применение журнала (выполняется в фоновом потоке)."""
+        applied, conflicts, complete = self.journal.replay(self.db_manager)
+        Clock.schedule_once(lambda dt: self.finish_journal_replay(applied, conflicts, complete))
+    
+    def finish_journal_replay(
+        self,
+        applied: int,
+        conflicts: List[Tuple[str, str, str]],
+        complete: bool
+    ) -> None:
+        """Возврат к работе с базой после применения журнала.
+        
+        Args:
+            applied: Количество примененных записей
+            conflicts: Конфликты (время, номер, сообщение)
+            complete: Журнал применен полностью
+        """
+        if conflicts:
+            self.rejected_scans.extend(conflicts)
+            if self.reconciliation_panel is not None:
+                self.reconciliation_panel.show(self.rejected_scans)
+        if applied or conflicts:
+            print(f"Журнал сканов применен: записей {applied}, конфликтов {len(conflicts)}")
+        
+        if complete and len(self.journal) == 0:
+            self.offline = False
+            if self._journal_retry_event is not None:
+                self._journal_retry_event.cancel()
+                self._journal_retry_event = None
+    
+    @timed("ui.complete_offline")
+    def complete_offline(self, route_card_number: str) -> None:
+        """Запись скана в локальный журнал, пока база данных недоступна.
+        
+        Args:
+            route_card_number: Нормализованный номер маршрутной карты
+        """
+        blank_index = self.db_manager.blank_index
+        if route_card_number in self.journal or (
+            blank_index is not None and blank_index.completed(route_card_number)
+        ):
+            self.report_scan(
+                "warning",
+                "Ошибка",
+                f"Маршрутная карта №{route_card_number} уже завершена"
+            )
+            return
+        
+        try:
+            self.journal.append(route_card_number)
+        except OSError as e:
+            self.report_scan("error", "Ошибка", f"Не удалось сохранить скан в локальный журнал: {e}")
+            return
+        
+        self.report_scan(
+            "success",
+            "Успех",
+            f"Маршрутная карта №{route_card_number} сохранена в локальный журнал (база недоступна)"
+        )
+        self.reset_form()
+    
+    def start_background_writer(self) -> None:
+        """Запуск фоновой записи для оптимистичного завершения карт."""
+        if self.batch_writer is None:
+            self.batch_writer = BatchWriter(self.db_manager).start()
+
+    def on_stop(self) -> None:
+        """Сохранение битовой карты бланков при завершении приложения."""
+        self.cancel_stats_queries()
+        self.cancel_export()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        if self.batch_writer is not None:
+            self.batch_writer.close()
+            self.batch_writer = None
+        if self.db_manager.blank_index is not None:
+            self.db_manager.blank_index.save()
+            self.db_manager.blank_index.close()
+        self.db_manager.recent_completions.close()
+
+    @timed("ui.build_edit_tab")
     def build_edit_tab(self) -> BoxLayout:
         """Создание интерфейса вкладки редактирования.
         
@@ -682,11 +627,155 @@ class RouteCardApp(App):
         complete_button.bind(on_press=self.on_complete_button_press)
         layout.add_widget(complete_button)
         
-        # Добавляем пробел внизу
-        layout.add_widget(Label(size_hint=(1, 0.5)))
+        # Переключатель режима непрерывного сканирования
+        mode_button = ToggleButton(
+            text="Непрерывное сканирование",
+            size_hint=(1, 0.25),
+            font_size=sp(14),
+            state="down" if self.continuous_mode else "normal"
+        )
+        mode_button.bind(state=lambda button, state: self.set_continuous_mode(state == "down"))
+        layout.add_widget(mode_button)
+        
+        # Баннер и журнал сканов (в обычном режиме скрыты и служат отступом снизу)
+        self.scan_panel = ScanStatusPanel(size_hint=(1, 0.5))
+        layout.add_widget(self.scan_panel)
+        
+        # Сканы, подтвержденные оптимистично, но не записанные в базу
+        self.reconciliation_panel = ReconciliationPanel(
+            on_clear=self.clear_rejected_scans,
+            size_hint=(1, 0.25)
+        )
+        self.reconciliation_panel.show(self.rejected_scans)
+        layout.add_widget(self.reconciliation_panel)
+        self.set_continuous_mode(self.continuous_mode)
         
         return layout
     
+    def set_continuous_mode(self, enabled: bool) -> None:
+        """Включение режима непрерывного сканирования.
+        
+        В этом режиме результаты показываются в баннере без всплывающих окон,
+        а фокус остается в поле ввода номера.
+        
+        Args:
+            enabled: Включить режим
+        """
+        self.continuous_mode = enabled
+        if self.scan_panel is not None:
+            self.scan_panel.opacity = 1 if enabled else 0
+        self.route_card_input.text_validate_unfocus = not enabled
+        self.route_card_input.focus = True
+    
+    @timed("ui.complete_optimistically")
+    def complete_optimistically(self, route_card_number: str) -> bool:
+        """Подтверждение скана по битовой карте с фоновой записью в базу.
+        
+        Карта подтверждается сразу, если бланк известен битовой карте и не
+        завершен. Запись выполняется в фоне, а отклоненные базой сканы
+        (карта удалена, завершена другой станцией) попадают на панель сверки.
+        
+        Args:
+            route_card_number: Нормализованный номер маршрутной карты
+            
+        Returns:
+            True если скан обработан, False если нужна обычная проверка в базе
+        """
+        blank_index = self.db_manager.blank_index
+        if self.batch_writer is None or blank_index is None:
+            return False
+        
+        if route_card_number in self.pending_scans or blank_index.completed(route_card_number):
+            self.report_scan(
+                "warning",
+                "Ошибка",
+                f"Маршрутная карта №{route_card_number} уже завершена"
+            )
+            return True
+        
+        if not blank_index.exists(route_card_number):
+            return False
+        
+        self.pending_scans.add(route_card_number)
+        self.batch_writer.submit(route_card_number, self.on_background_result)
+        self.report_scan(
+            "success",
+            "Успех",
+            f"Маршрутная карта №{route_card_number} успешно завершена"
+        )
+        self.reset_form()
+        return True
+    
+    def on_background_result(
+        self,
+        route_card_number: str,
+        success: Optional[bool],
+        message: Optional[str]
+    ) -> None:
+        """Результат фоновой записи (вызывается из потока записи).
+        
+        Args:
+            route_card_number: Номер карты
+            success: Записана ли карта (None - база данных недоступна)
+            message: Сообщение об ошибке
+        """
+        Clock.schedule_once(lambda dt: self.reconcile_scan(route_card_number, success, message))
+    
+    def reconcile_scan(self, route_card_number: str, success: Optional[bool], message: Optional[str]) -> None:
+        """Сверка оптимистично подтвержденного скана с результатом записи.
+        
+        Скан, не записанный из-за недоступности базы, уже подтвержден
+        оператору, поэтому он сохраняется в локальный журнал, а следующие
+        сканы записываются в журнал до восстановления базы.
+        
+        Args:
+            route_card_number: Номер карты
+            success: Записана ли карта (None - база данных недоступна)
+            message: Сообщение об ошибке
+        """
+        self.pending_scans.discard(route_card_number)
+        if success:
+            return
+        
+        if success is None:
+            self.go_offline()
+            try:
+                self.journal.append(route_card_number)
+                return
+            except OSError as e:
+                message = f"Не удалось сохранить скан в локальный журнал: {e}"
+        
+        self.rejected_scans.append((
+            datetime.now().strftime("%H:%M:%S"),
+            route_card_number,
+            message or f"Маршрутная карта №{route_card_number} не записана в базу данных"
+        ))
+        if self.reconciliation_panel is not None:
+            self.reconciliation_panel.show(self.rejected_scans)
+    
+    def clear_rejected_scans(self) -> None:
+        """Очистка списка отклоненных сканов после проверки оператором."""
+        self.rejected_scans.clear()
+        if self.reconciliation_panel is not None:
+            self.reconciliation_panel.show(self.rejected_scans)
+    
+    @timed("ui.report_scan")
+    def report_scan(self, outcome: str, title: str, message: str) -> None:
+        """Сообщение о результате обработки номера.
+        
+        Args:
+            outcome: Результат ("success", "warning" или "error")
+            title: Заголовок всплывающего окна
+            message: Текст сообщения
+        """
+        metrics.increment(f"scans.{outcome}")
+        if self.continuous_mode and self.scan_panel is not None:
+            self.scan_panel.show(outcome, message)
+            self.reset_form()
+        else:
+            self.show_popup(title, message)
+    
+    @timed("ui.build_view_tab")
     def build_view_tab(self) -> BoxLayout:
         """Создание интерфейса вкладки просмотра данных.
         
@@ -701,7 +790,7 @@ class RouteCardApp(App):
         self.search_input = TextInput(
             multiline=False, 
             hint_text="Введите текст для поиска",
-            size_hint=(0.8, 1),
+            size_hint=(0.6, 1),
             font_size=sp(16)
         )
         search_button = Button(
@@ -712,8 +801,18 @@ class RouteCardApp(App):
         )
         search_button.bind(on_press=self.on_search_button_press)
         
+        # Карты, документы которых не найдены при последней проверке файлов
+        files_button = Button(
+            text="Проблемные файлы",
+            size_hint=(0.2, 1),
+            background_color=(0.8, 0.5, 0.2, 1),  # Оранжевый цвет
+            font_size=sp(16)
+        )
+        files_button.bind(on_press=lambda x: self.show_file_problems())
+        
         search_layout.add_widget(self.search_input)
         search_layout.add_widget(search_button)
+        search_layout.add_widget(files_button)
         
         layout.add_widget(search_layout)
         
@@ -771,6 +870,7 @@ class RouteCardApp(App):
             Color(*color)
             Rectangle(pos=instance.pos, size=instance.size)
     
+    @timed("ui.build_stats_tab")
     def build_stats_tab(self) -> BoxLayout:
         """Создание интерфейса вкладки статистики.
         
@@ -789,10 +889,8 @@ class RouteCardApp(App):
         )
         layout.add_widget(stats_header)
         
-        # Получаем данные для статистики
-        total_cards = self.db_manager.get_total_cards_count()
-        completed_cards = self.db_manager.get_completed_cards_count()
-        incomplete_cards = self.db_manager.get_incomplete_cards_count()
+        # Значения заполняются фоновыми запросами вместе со статистикой по периоду
+        loading_text = "..."
         
         # Создаем информационные блоки
         summary_grid = GridLayout(cols=3, spacing=10, size_hint=(1, 0.2))
@@ -812,7 +910,7 @@ class RouteCardApp(App):
             bold=True
         )
         total_value = Label(
-            text=str(total_cards),
+            text=loading_text,
             font_size=sp(24),
             bold=True
         )
@@ -834,7 +932,7 @@ class RouteCardApp(App):
             bold=True
         )
         completed_value = Label(
-            text=str(completed_cards),
+            text=loading_text,
             font_size=sp(24),
             bold=True
         )
@@ -856,13 +954,14 @@ class RouteCardApp(App):
             bold=True
         )
         incomplete_value = Label(
-            text=str(incomplete_cards),
+            text=loading_text,
             font_size=sp(24),
             bold=True
         )
         incomplete_block.add_widget(incomplete_label)
         incomplete_block.add_widget(incomplete_value)
         
+        self.summary_value_labels = [total_value, completed_value, incomplete_value]
         summary_grid.add_widget(total_block)
         summary_grid.add_widget(completed_block)
         summary_grid.add_widget(incomplete_block)
@@ -905,7 +1004,7 @@ class RouteCardApp(App):
         period_spinner = Spinner(
             text=periods[0],
             values=periods,
-            size_hint=(0.4, 1),
+            size_hint=(0.3, 1),
             font_size=sp(16),
             background_color=(0.2, 0.4, 0.6, 1)  # Голубой цвет
         )
@@ -913,18 +1012,39 @@ class RouteCardApp(App):
         # Кнопка обновления статистики
         refresh_stats_button = Button(
             text="Обновить статистику",
-            size_hint=(0.4, 1),
+            size_hint=(0.3, 1),
             font_size=sp(16),
             background_color=(0.2, 0.6, 0.3, 1)  # Зеленый цвет
         )
         refresh_stats_button.bind(on_press=lambda x: self.on_refresh_stats_button_press(period_spinner.text))
+        # Выбор другого периода отменяет незавершенные запросы предыдущего
+        period_spinner.bind(text=lambda spinner, text: self.update_period_stats(text))
+        
+        # Кнопка выгрузки карт за период в файл
+        export_button = Button(
+            text="Экспорт",
+            size_hint=(0.2, 1),
+            font_size=sp(16),
+            background_color=(0.6, 0.4, 0.2, 1)  # Коричневый цвет
+        )
+        export_button.bind(on_press=lambda x: self.on_export_button_press(period_spinner.text))
         
         filter_layout.add_widget(period_label)
         filter_layout.add_widget(period_spinner)
         filter_layout.add_widget(refresh_stats_button)
+        filter_layout.add_widget(export_button)
         
         layout.add_widget(filter_layout)
         
+        # Ход выполнения выгрузки
+        self.export_status_label = Label(
+            text="",
+            size_hint=(1, 0.05),
+            font_size=sp(14),
+            color=(1, 1, 1, 1)
+        )
+        layout.add_widget(self.export_status_label)
+        
         # Создаем область для отображения статистики по периодам
         self.period_stats_container = BoxLayout(orientation="vertical", size_hint=(1, 0.45))
         
@@ -935,6 +1055,7 @@ class RouteCardApp(App):
         
         return layout
     
+    @timed("ui.refresh_table")
     def refresh_table(self, search_term: str = None) -> None:
         """Обновление содержимого таблицы.
         
@@ -965,6 +1086,26 @@ class RouteCardApp(App):
         except Exception as e:
             self.show_popup("Ошибка", f"Не удалось обновить таблицу: {e}")
     
+    @timed("ui.show_file_problems")
+    def show_file_problems(self) -> None:
+        """Отображение карт, документы которых не прошли последнюю проверку файлов."""
+        problems = self.db_manager.get_file_problems()
+        self.scroll_view.clear_widgets()
+        if not problems:
+            self.scroll_view.add_widget(Label(
+                text="Проблемных файлов нет (проверка: python run.py --verify-files)",
+                font_size=sp(16),
+                color=(1, 1, 1, 1)
+            ))
+            return
+        
+        self.data_table = DataTable(
+            headers=["ID", "Номер бланка", "Путь к файлу", "Состояние", "Проверено"],
+            row_data=problems,
+            size_hint_y=None
+        )
+        self.scroll_view.add_widget(self.data_table)
+    
     def on_refresh_button_press(self, instance: Button) -> None:
         """Обработчик нажатия на кнопку обновления данных.
         
@@ -986,6 +1127,7 @@ class RouteCardApp(App):
         else:
             self.refresh_table()
     
+    @timed("ui.reset_form")
     def reset_form(self) -> None:
         """Сброс формы в начальное состояние."""
         self.route_card_input.text = ""
@@ -1000,24 +1142,9 @@ class RouteCardApp(App):
         Returns:
             Кортеж (валидный, нормализованный_номер)
         """
-        number = number.strip()
-        
-        if not number:
-            return False, ""
-        
-        if not number.isdigit():
-            return False, number
-        
-        if len(number) > 6:
-            return False, number
-        
-        number_int = int(number)
-        if number_int < 1 or number_int > 999999:
-            return False, number
-        
-        normalized = str(number_int).zfill(6)
-        return True, normalized
+        return validate_route_card_number(number)
     
+    @timed("ui.on_complete_button_press")
     def on_complete_button_press(self, instance) -> None:
         """Обработчик нажатия на кнопку завершения.
         
@@ -1027,21 +1154,30 @@ class RouteCardApp(App):
         route_card_number = self.route_card_input.text.strip()
         
         if not route_card_number:
-            self.show_popup("Ошибка", "Введите номер маршрутной карты")
+            self.report_scan("error", "Ошибка", "Введите номер маршрутной карты")
             return
         
         is_valid, normalized_number = self.validate_route_card_number(route_card_number)
         
         if not is_valid:
-            self.show_popup(
+            self.report_scan(
+                "error",
                 "Ошибка", 
                 "Номер должен быть шестизначным числом (от 000001 до 999999)"
             )
             return
         
+        if self.offline:
+            self.complete_offline(normalized_number)
+            return
+        
+        if self.optimistic_mode and self.complete_optimistically(normalized_number):
+            return
+        
         try:
             if self.db_manager.check_route_card_completed(normalized_number):
-                self.show_popup(
+                self.report_scan(
+                    "warning",
                     "Ошибка", 
                     f"Маршрутная карта №{normalized_number} уже завершена"
                 )
@@ -1050,15 +1186,23 @@ class RouteCardApp(App):
             success, error_message = self.db_manager.complete_route_card(normalized_number)
             
             if success:
-                self.show_popup(
+                self.report_scan(
+                    "success",
                     "Успех", 
                     f"Маршрутная карта №{normalized_number} успешно завершена"
                 )
                 self.reset_form()
             else:
-                self.show_popup("Ошибка", error_message or "Не удалось завершить маршрутную карту")
+                self.report_scan(
+                    "error", "Ошибка", error_message or "Не удалось завершить маршрутную карту"
+                )
+        except DatabaseUnavailableError:
+            self.go_offline()
+            self.complete_offline(normalized_number)
         except Exception as e:
-            self.show_popup("Ошибка", f"Произошла ошибка при завершении маршрутной карты: {e}")
+            self.report_scan(
+                "error", "Ошибка", f"Произошла ошибка при завершении маршрутной карты: {e}"
+            )
     
     def on_check_button_press(self, instance: Button) -> None:
         """Обработчик нажатия на кнопку проверки (старый обработчик для совместимости).
@@ -1146,6 +1290,7 @@ class RouteCardApp(App):
         
         return start_date, end_date
 
+    @timed("ui.show_popup")
     def show_popup(self, title: str, message: str) -> None:
         """Отображение всплывающего окна с сообщением.
         
@@ -1187,40 +1332,277 @@ class RouteCardApp(App):
         """
         self.update_period_stats(period_name)
     
+    def on_export_button_press(self, period_name: str) -> None:
+        """Обработчик нажатия на кнопку экспорта.
+        
+        Args:
+            period_name: Выбранный период из выпадающего списка
+        """
+        if period_name == "Все время":
+            start_date, end_date = None, None
+        else:
+            start_date, end_date = self.get_period_dates(period_name)
+        self.start_export(default_export_name(start_date, end_date), start_date, end_date)
+    
+    def start_export(self, path: str, start_date: Optional[str], end_date: Optional[str]) -> None:
+        """Запуск выгрузки карт за период в фоновом потоке.
+        
+        Незавершенная выгрузка отменяется.
+        
+        Args:
+            path: Путь к файлу отчета (.csv или .xlsx)
+            start_date: Дата начала периода или None для всех карт
+            end_date: Дата конца периода
+        """
+        self.cancel_export()
+        control = QueryControl()
+        self.export_control = control
+        self.export_status_label.text = "Экспорт: подготовка..."
+        
+        self._export_thread = threading.Thread(
+            target=self._run_export,
+            args=(control, path, start_date, end_date),
+            name="Export",
+            daemon=True
+        )
+        self._export_thread.start()
+    
+    def _run_export(
+        self,
+        control: QueryControl,
+        path: str,
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ) -> None:
+        """Выгрузка карт в файл (выполняется в фоновом потоке)."""
+        def on_progress(written: int, total: int) -> None:
+            Clock.schedule_once(lambda dt: self.show_export_progress(control, written, total))
+        
+        try:
+            written = export_cards(self.db_manager, path, start_date, end_date, control, on_progress)
+        except QueryCancelled as e:
+            message = str(e)
+            Clock.schedule_once(lambda dt: self.finish_export(control, "Экспорт", f"Экспорт прерван: {message}"))
+            return
+        except (ExportError, OSError, sqlite3.Error) as e:
+            message = str(e)
+            Clock.schedule_once(lambda dt: self.finish_export(
+                control, "Ошибка", f"Не удалось выполнить экспорт: {message}"
+            ))
+            return
+        Clock.schedule_once(lambda dt: self.finish_export(
+            control, "Экспорт", f"Выгружено карт: {written}\nФайл: {os.path.abspath(path)}"
+        ))
+    
+    def cancel_export(self) -> None:
+        """Отмена выполняющейся выгрузки."""
+        if self.export_control is not None:
+            self.export_control.cancel()
+    
+    def show_export_progress(self, control: QueryControl, written: int, total: int) -> None:
+        """Отображение хода выполнения выгрузки.
+        
+        Args:
+            control: Задача, сообщившая о ходе выполнения
+            written: Количество выгруженных карт
+            total: Количество карт за период
+        """
+        if control is self.export_control and self.export_status_label is not None:
+            self.export_status_label.text = f"Экспорт: {written} из {total}"
+    
+    def finish_export(self, control: QueryControl, title: str, message: str) -> None:
+        """Сообщение о завершении выгрузки.
+        
+        Args:
+            control: Завершенная задача
+            title: Заголовок сообщения
+            message: Текст сообщения
+        """
+        if control is not self.export_control:
+            return
+        self.export_control = None
+        if self.export_status_label is not None:
+            self.export_status_label.text = ""
+        self.show_popup(title, message)
+    
+    @timed("ui.update_period_stats")
     def update_period_stats(self, period_name: str) -> None:
-        """Обновление статистики по периоду.
+        """Запуск обновления статистики по периоду в фоновом потоке.
+        
+        Незавершенное обновление предыдущего периода отменяется.
         
         Args:
             period_name: Название периода
         """
         # Получаем даты начала и конца периода
         start_date, end_date = self.get_period_dates(period_name)
+        year = None
+        if period_name == "Текущий год" or period_name == "Прошлый год":
+            year = int(start_date.split("-")[0])
+        
+        self.cancel_stats_queries()
+        control = QueryControl(
+            STATS_QUERY_TIMEOUT,
+            on_progress=lambda elapsed, steps: Clock.schedule_once(
+                lambda dt: self.show_stats_progress(control, elapsed)
+            )
+        )
+        self.stats_control = control
+        self._stats_period_name = period_name
+        
+        # Пока запросы выполняются, показываем ход выполнения и кнопку отмены
+        self.period_stats_container.clear_widgets()
+        progress_layout = BoxLayout(orientation="vertical", spacing=10, size_hint=(1, 0.4))
+        self.stats_progress_label = Label(
+            text="Загрузка статистики...",
+            font_size=sp(16),
+            color=(1, 1, 1, 1)
+        )
+        cancel_button = Button(
+            text="Отменить",
+            size_hint=(0.4, None),
+            height=dp(40),
+            pos_hint={"center_x": 0.5},
+            font_size=sp(16),
+            background_color=(0.8, 0.3, 0.3, 1)  # Красный цвет
+        )
+        cancel_button.bind(on_press=lambda x: self.cancel_stats_queries())
+        progress_layout.add_widget(self.stats_progress_label)
+        progress_layout.add_widget(cancel_button)
+        self.period_stats_container.add_widget(progress_layout)
+        
+        self._stats_thread = threading.Thread(
+            target=self._load_period_stats,
+            args=(control, period_name, start_date, end_date, year),
+            name="StatsQuery",
+            daemon=True
+        )
+        self._stats_thread.start()
+    
+    def _load_period_stats(
+        self,
+        control: QueryControl,
+        period_name: str,
+        start_date: str,
+        end_date: str,
+        year: Optional[int]
+    ) -> None:
+        """Запросы общей статистики и статистики по периоду (выполняется в фоновом потоке)."""
+        try:
+            summary_counts = (
+                self.db_manager.get_total_cards_count(control=control),
+                self.db_manager.get_completed_cards_count(control=control),
+                self.db_manager.get_incomplete_cards_count(control=control),
+            )
+            total_cards = self.db_manager.get_cards_count_by_period(start_date, end_date, control=control)
+            completed_cards = self.db_manager.get_completed_cards_by_period(
+                start_date, end_date, control=control
+            )
+            monthly_stats = self.db_manager.get_monthly_stats(year, control=control)
+        except QueryCancelled as e:
+            message = str(e)
+            Clock.schedule_once(lambda dt: self.show_stats_cancelled(control, message))
+            return
+        Clock.schedule_once(lambda dt: self.show_period_stats(
+            control, period_name, start_date, end_date, year, total_cards, completed_cards, monthly_stats,
+            summary_counts
+        ))
+    
+    def cancel_stats_queries(self) -> None:
+        """Отмена выполняющегося обновления статистики."""
+        if self.stats_control is not None:
+            self.stats_control.cancel()
+    
+    def show_stats_progress(self, control: QueryControl, elapsed: float) -> None:
+        """Отображение хода выполнения запросов статистики.
+        
+        Args:
+            control: Задача, сообщившая о ходе выполнения
+            elapsed: Время с начала обновления (секунды)
+        """
+        if control is self.stats_control and self.stats_progress_label is not None:
+            self.stats_progress_label.text = f"Загрузка статистики... {elapsed:.1f} с"
+    
+    def show_stats_cancelled(self, control: QueryControl, message: str) -> None:
+        """Сообщение об отмене или превышении времени обновления статистики.
+        
+        Args:
+            control: Остановленная задача
+            message: Причина остановки
+        """
+        if control is not self.stats_control:
+            return
+        self.stats_control = None
+        self.stats_progress_label = None
+        self.period_stats_container.clear_widgets()
+        self.period_stats_container.add_widget(Label(
+            text=f"{message}. Нажмите \"Обновить статистику\", чтобы повторить.",
+            size_hint=(1, 0.3),
+            font_size=sp(16),
+            color=(1, 0.5, 0.5, 1)  # Светло-красный цвет
+        ))
+    
+    def show_period_stats(
+        self,
+        control: QueryControl,
+        period_name: str,
+        start_date: str,
+        end_date: str,
+        year: Optional[int],
+        total_cards: int,
+        completed_cards: int,
+        monthly_stats: List[tuple],
+        summary_counts: Tuple[int, int, int] = None
+    ) -> None:
+        """Отображение результатов обновления статистики, если они не устарели.
+        
+        Args:
+            control: Задача, получившая результаты
+            period_name: Название периода
+            start_date: Дата начала периода
+            end_date: Дата конца периода
+            year: Год месячной статистики или None
+            total_cards: Количество карт за период
+            completed_cards: Количество заполненных карт за период
+            monthly_stats: Статистика по месяцам
+            summary_counts: Всего, заполненных и незаполненных карт за все время
+        """
+        if control is not self.stats_control:
+            return
+        self.stats_control = None
+        self.stats_progress_label = None
+        
+        if summary_counts is not None:
+            for value_label, count in zip(self.summary_value_labels, summary_counts):
+                value_label.text = str(count)
         
         # Очищаем контейнер статистики
         self.period_stats_container.clear_widgets()
         
         # Отображаем сводку по периоду
-        self.display_period_summary(start_date, end_date, period_name)
+        self.display_period_summary(start_date, end_date, period_name, total_cards, completed_cards)
         
         # Отображаем статистику по месяцам
-        if period_name == "Текущий год" or period_name == "Прошлый год":
-            year = int(start_date.split("-")[0])
-            self.display_monthly_stats(year)
-        else:
-            self.display_monthly_stats()
+        self.display_monthly_stats(monthly_stats, year)
     
-    def display_period_summary(self, start_date: str, end_date: str, period_name: str) -> None:
+    @timed("ui.display_period_summary")
+    def display_period_summary(
+        self,
+        start_date: str,
+        end_date: str,
+        period_name: str,
+        total_cards: int,
+        completed_cards: int
+    ) -> None:
         """Отображение сводки по выбранному периоду.
         
         Args:
             start_date: Дата начала периода
             end_date: Дата конца периода
             period_name: Название периода
+            total_cards: Количество карт за период
+            completed_cards: Количество заполненных карт за период
         """
-        # Получаем данные по периоду
-        total_cards = self.db_manager.get_cards_count_by_period(start_date, end_date)
-        completed_cards = self.db_manager.get_completed_cards_by_period(start_date, end_date)
-        
         # Создаем заголовок для периода
         if period_name == "Все время":
             header_text = "Сводка за все время"
@@ -1290,15 +1672,14 @@ class RouteCardApp(App):
         
         self.period_stats_container.add_widget(stats_grid)
     
-    def display_monthly_stats(self, year: int = None) -> None:
+    @timed("ui.display_monthly_stats")
+    def display_monthly_stats(self, monthly_stats: List[tuple], year: int = None) -> None:
         """Отображение статистики по месяцам.
         
         Args:
-            year: Год для фильтрации, если None - за все время
+            monthly_stats: Список кортежей (месяц, год, количество заполненных карт)
+            year: Год, за который получена статистика, если None - за все время
         """
-        # Получаем данные по месяцам
-        monthly_stats = self.db_manager.get_monthly_stats(year)
-        
         # Если нет данных, показываем сообщение
         if not monthly_stats:
             no_data_label = Label(
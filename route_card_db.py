@@ -0,0 +1,1551 @@
+"""
+Работа с базой данных маршрутных карт без зависимости от Kivy.
+
+Модуль используется графическим приложением, консольными отчетами run.py и
+фоновым приемом сканов (run.py --headless), поэтому импортирует только
+стандартную библиотеку и вспомогательные модули хранения.
+"""
+import heapq
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from blank_index import BlankBitmap, blank_to_int
+from card_mirror import CardMirror
+from card_records import CARD_COLUMNS, CARD_SELECT, CardRecord, card_record_factory
+from data_version import connect_existing, file_stamp
+from instrumentation import TimedCursor, metrics, stage, timed
+from query_control import QueryCancelled, QueryControl
+from recent_completions import RecentCompletions
+from slow_query_log import SLOW_QUERY_LOG_FILE, SLOW_QUERY_THRESHOLD, SlowQueryCursor, SlowQueryLog
+from write_retry import WriteRetryPolicy, is_busy_error
+
+
+# Регулярные выражения для валидации
+ACCOUNT_NUMBER_PATTERN = re.compile(r"^\d{2}-\d{3}/\d{2}$")  # ММ-ННН/ГГ
+CLUSTER_NUMBER_PATTERN = re.compile(r"^К\d{2}/\d{2}-\d{3}$")  # КГГ/ММ-ННН
+ROUTE_CARD_PATTERN = re.compile(r"^\d{6}$")  # 6-значный номер
+
+# Размер участка номеров бланков при поиске пропусков и дубликатов
+AUDIT_CHUNK_SIZE = 100000
+
+# Количество номеров в одном запросе IN при пакетном завершении карт
+BATCH_QUERY_SIZE = 500
+
+# Количество строк, читаемых за один раз при потоковой выгрузке карт
+EXPORT_CHUNK_SIZE = 5000
+
+# Условие периода (начало, конец в формате 'YYYY-MM-DD' включительно): диапазон
+# по Дата_создания вместо date(Дата_создания) BETWEEN, чтобы работал индекс по дате
+PERIOD_WHERE = "Дата_создания >= date(?) AND Дата_создания < date(?, '+1 day')"
+
+# Столбцы, уникальные среди завершенных карт, и суффиксы имен их индексов
+UNIQUE_CARD_COLUMNS = (
+    ("Учетный_номер", "учетный_номер"),
+    ("Номер_кластера", "номер_кластера"),
+)
+
+# Результаты проверки файлов карт (таблица проверка_файлов)
+FILE_FOUND = "найден"
+FILE_MISSING = "нет файла"
+FILE_EMPTY = "пустой файл"
+FILE_MISNAMED = "неверное имя"
+FILE_NO_PATH = "нет пути"
+FILE_PROBLEM_STATES = (FILE_MISSING, FILE_EMPTY, FILE_MISNAMED, FILE_NO_PATH)
+
+# Количество проблемных файлов, показываемых на вкладке просмотра
+FILE_PROBLEMS_LIMIT = 500
+
+# Служебные таблицы проверки файлов: результат по каждой карте и время
+# изменения каталогов при последней проверке (для повторных проверок)
+FILE_CHECK_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS проверка_файлов (
+           id_карты INTEGER PRIMARY KEY,
+           Путь_к_файлу TEXT,
+           Состояние TEXT NOT NULL,
+           Размер INTEGER,
+           Изменен REAL,
+           Проверено TEXT NOT NULL
+       )""",
+    """CREATE INDEX IF NOT EXISTS idx_проверка_файлов_состояние
+       ON проверка_файлов (Состояние)""",
+    """CREATE TABLE IF NOT EXISTS проверка_каталогов (
+           Каталог TEXT PRIMARY KEY,
+           Изменен REAL
+       )""",
+)
+
+# Архивы завершенных карт прошлых лет лежат рядом с базой:
+# <имя базы>_архив_ГГГГ.db, подключаются к запросам истории под именем архив_ГГГГ
+ARCHIVE_NAME_SUFFIX = "_архив_"
+ARCHIVE_SCHEMA_PREFIX = "архив_"
+
+# Фрагменты сообщений SQLite, означающие недоступность файла базы данных
+UNAVAILABLE_ERROR_MESSAGES = (
+    "unable to open database file",
+    "disk i/o error",
+)
+
+# Результат операции записи, выполняемой с повторами
+WriteResult = TypeVar("WriteResult")
+
+
+class DatabaseUnavailableError(Exception):
+    """База данных недоступна (например, пропал сетевой диск)."""
+
+
+def is_unavailable_error(error: sqlite3.Error) -> bool:
+    """Проверка, что ошибка SQLite вызвана недоступностью файла базы данных.
+    
+    Args:
+        error: Исключение SQLite
+        
+    Returns:
+        True если база данных недоступна
+    """
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        fragment in message for fragment in UNAVAILABLE_ERROR_MESSAGES
+    )
+
+
+def archive_path(db_name: str, year: int) -> str:
+    """Путь к архиву карт указанного года.
+    
+    Args:
+        db_name: Путь к файлу базы данных
+        year: Год Дата_создания карт архива
+        
+    Returns:
+        Путь к файлу архива рядом с базой данных
+    """
+    stem = os.path.splitext(db_name)[0]
+    return f"{stem}{ARCHIVE_NAME_SUFFIX}{year}.db"
+
+
+def find_archives(db_name: str) -> Dict[int, str]:
+    """Поиск архивов базы данных.
+    
+    Args:
+        db_name: Путь к файлу базы данных
+        
+    Returns:
+        Словарь {год: путь к архиву}
+    """
+    directory = os.path.dirname(os.path.abspath(db_name))
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    pattern = re.compile(re.escape(stem + ARCHIVE_NAME_SUFFIX) + r"(\d{4})\.db$")
+    archives = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                match = pattern.match(entry.name)
+                if match and entry.is_file():
+                    archives[int(match.group(1))] = os.path.join(directory, entry.name)
+    except OSError:
+        return {}
+    return archives
+
+
+def validate_route_card_number(number: str) -> Tuple[bool, str]:
+    """Валидация номера маршрутной карты.
+    
+    Args:
+        number: Номер для проверки
+        
+    Returns:
+        Кортеж (валидный, нормализованный_номер)
+    """
+    number = number.strip()
+    
+    if not number:
+        return False, ""
+    
+    if not number.isdigit():
+        return False, number
+    
+    if len(number) > 6:
+        return False, number
+    
+    number_int = int(number)
+    if number_int < 1 or number_int > 999999:
+        return False, number
+    
+    normalized = str(number_int).zfill(6)
+    return True, normalized
+
+
+class DatabaseManager:
+    """Класс для работы с базой данных маршрутных карт."""
+    
+    def __init__(self, db_name: str = "маршрутные_карты.db") -> None:
+        """Инициализация менеджера базы данных.
+        
+        Args:
+            db_name: Имя файла базы данных
+        """
+        self.db_name = db_name
+        self.blank_index: Optional[BlankBitmap] = None
+        self.mirror: Optional[CardMirror] = None
+        self.recent_completions = RecentCompletions(self)
+        self.write_retry = WriteRetryPolicy()
+        self.slow_query_log: Optional[SlowQueryLog] = None
+        # Путь архива -> (отпечаток файла, сводка _archive_summary)
+        self._archive_summaries: Dict[str, Tuple[tuple, tuple]] = {}
+        
+    @timed("db.enable_blank_index")
+    def enable_blank_index(self, use_sidecar: bool = True) -> BlankBitmap:
+        """Включение битовой карты номеров бланков для быстрых проверок.
+        
+        Args:
+            use_sidecar: Использовать файл битовой карты рядом с базой данных
+            
+        Returns:
+            Построенная или загруженная битовая карта
+        """
+        self.blank_index = BlankBitmap.open(
+            self.db_name,
+            use_sidecar=use_sidecar,
+            archive_paths=[path for _, path in self._archives()]
+        )
+        return self.blank_index
+    
+    @timed("db.enable_mirror")
+    def enable_mirror(self) -> CardMirror:
+        """Включение зеркала таблицы в памяти для чтения без обращения к диску.
+        
+        Зеркало загружается при первом чтении.
+        
+        Returns:
+            Зеркало таблицы маршрутных карт
+        """
+        self.mirror = CardMirror(self.db_name, reload_key=self._archive_key)
+        return self.mirror
+    
+    def enable_slow_query_log(
+        self,
+        threshold: float = SLOW_QUERY_THRESHOLD,
+        path: Optional[str] = SLOW_QUERY_LOG_FILE
+    ) -> SlowQueryLog:
+        """Включение журнала медленных запросов с планами выполнения.
+        
+        Args:
+            threshold: Порог медленного запроса (секунды)
+            path: Путь к ротируемому файлу журнала, None - только в памяти
+            
+        Returns:
+            Журнал медленных запросов
+        """
+        self.slow_query_log = SlowQueryLog(threshold, path)
+        return self.slow_query_log
+    
+    def _mirror_ready(self) -> bool:
+        """Проверка, что чтение можно обслужить из зеркала."""
+        return self.mirror is not None and self.mirror.ensure_current()
+    
+    def _mirror_ready_with_archives(self) -> bool:
+        """Проверка, что к данным зеркала можно добавить данные архивов.
+        
+        Зеркало другой станции узнает о переносе карт в архив при следующей
+        синхронизации; до этого оно еще содержит перенесенные строки, и
+        сложение с архивами посчитало бы их дважды.
+        """
+        return self._mirror_ready() and self.mirror.loaded_key == self._archive_key()
+    
+    def _archive_key(self) -> Tuple[Tuple[str, tuple], ...]:
+        """Отпечатки файлов архивов: меняются при каждом переносе карт в архив."""
+        return tuple((path, file_stamp(path)) for _, path in self._archives())
+    
+    def _archives(
+        self,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None
+    ) -> List[Tuple[int, str]]:
+        """Архивы, нужные запросу за период (все архивы, если период не задан).
+        
+        Args:
+            period_start: Начало периода, начинается с года ('YYYY-MM-DD' или 'YYYY')
+            period_end: Конец периода
+            
+        Returns:
+            Список (год, путь к архиву) по возрастанию года
+        """
+        archives = sorted(find_archives(self.db_name).items())
+        if period_start is None or not archives:
+            return archives
+        try:
+            first_year, last_year = int(str(period_start)[:4]), int(str(period_end)[:4])
+        except ValueError:
+            return archives
+        return [(year, path) for year, path in archives if first_year <= year <= last_year]
+    
+    def _attach_archives(self, cursor: sqlite3.Cursor, archives: List[Tuple[int, str]]) -> None:
+        """Подключение архивов к соединению запроса истории.
+        
+        Временное представление маршрутные_карты объединяет основную таблицу
+        с архивами и перекрывает ее для запросов без указания схемы, поэтому
+        тексты запросов чтения не меняются. Запись через представление
+        невозможна, так что случайно изменить архив нельзя.
+        
+        Args:
+            cursor: Курсор соединения, еще не выполнявшего запросов к таблице
+            archives: Список (год, путь к архиву) из _archives
+        """
+        if not archives:
+            return
+        columns = ", ".join(CARD_COLUMNS)
+        parts = [f"SELECT {columns} FROM main.маршрутные_карты"]
+        for year, path in archives:
+            schema = f"{ARCHIVE_SCHEMA_PREFIX}{year}"
+            cursor.execute(f'ATTACH DATABASE ? AS "{schema}"', (path,))
+            parts.append(f'SELECT {columns} FROM "{schema}".маршрутные_карты')
+        cursor.execute(f"CREATE TEMP VIEW маршрутные_карты AS {' UNION ALL '.join(parts)}")
+    
+    def _archive_summary(self, path: str) -> Optional[Tuple[Tuple[int, int, int], List[tuple]]]:
+        """Сводка архива для счетчиков и месячной статистики.
+        
+        Архив меняется только при архивировании, поэтому сводка хранится до
+        изменения отпечатка файла архива, и статистика не просматривает архивы.
+        
+        Args:
+            path: Путь к файлу архива
+            
+        Returns:
+            Кортеж ((всего, заполненных, незаполненных), [(месяц, год, заполненных)])
+            или None, если архив не удалось прочитать
+        """
+        stamp = file_stamp(path)
+        cached = self._archive_summaries.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            conn = connect_existing(path)
+            try:
+                counts = conn.execute(
+                    """SELECT COUNT(*),
+                              TOTAL(Статус = 'Завершена'),
+                              TOTAL(Учетный_номер IS NULL OR Учетный_номер = ''
+                                    OR Номер_кластера IS NULL OR Номер_кластера = '')
+                       FROM маршрутные_карты"""
+                ).fetchone()
+                monthly = conn.execute(
+                    """SELECT strftime('%m', Дата_создания) as Месяц,
+                              strftime('%Y', Дата_создания) as Год,
+                              COUNT(*) as Количество
+                       FROM маршрутные_карты
+                       WHERE Статус = 'Завершена'
+                       GROUP BY Месяц, Год"""
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Ошибка при чтении архива {path}: {e}")
+            return None
+        summary = (tuple(int(count) for count in counts), monthly)
+        self._archive_summaries[path] = (stamp, summary)
+        return summary
+    
+    def _archive_counts(self) -> Tuple[int, int, int]:
+        """Количество карт во всех архивах: (всего, заполненных, незаполненных)."""
+        totals = [0, 0, 0]
+        for _, path in self._archives():
+            summary = self._archive_summary(path)
+            if summary is not None:
+                for position, count in enumerate(summary[0]):
+                    totals[position] += count
+        return tuple(totals)
+    
+    def _with_archive_monthly_stats(self, stats: List[tuple], archives: List[Tuple[int, str]]) -> List[tuple]:
+        """Добавление к месячной статистике основной таблицы статистики архивов."""
+        if not archives:
+            return stats
+        counts: Dict[Tuple[str, str], int] = {(month, year): count for month, year, count in stats}
+        for _, path in archives:
+            summary = self._archive_summary(path)
+            if summary is not None:
+                for month, year, count in summary[1]:
+                    counts[(month, year)] = counts.get((month, year), 0) + count
+        return [
+            (month, year, count)
+            for (month, year), count in sorted(counts.items(), key=lambda item: (item[0][1], item[0][0]))
+        ]
+    
+    def _archived_year(self, route_card_number: str, archives: List[Tuple[int, str]]) -> Optional[int]:
+        """Год архива, в который перенесена карта, или None."""
+        for year, path in reversed(archives):
+            try:
+                conn = connect_existing(path)
+                try:
+                    found = conn.execute(
+                        "SELECT 1 FROM маршрутные_карты WHERE Номер_бланка = ? LIMIT 1",
+                        (route_card_number,)
+                    ).fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"Ошибка при поиске карты в архиве {path}: {e}")
+                continue
+            if found:
+                return year
+        return None
+    
+    def _not_found_message(
+        self,
+        route_card_number: str,
+        archives: Optional[List[Tuple[int, str]]] = None
+    ) -> str:
+        """Сообщение о карте, которой нет в основной таблице.
+        
+        Карта, перенесенная в архив, завершена в прошлые годы, поэтому
+        сообщается о повторном завершении, а не об отсутствии карты.
+        """
+        year = self._archived_year(route_card_number, self._archives() if archives is None else archives)
+        if year is not None:
+            return f"Маршрутная карта №{route_card_number} уже завершена (архив {year} года)"
+        return f"Маршрутная карта №{route_card_number} не найдена в базе данных"
+    
+    @timed("db.ensure_indexes")
+    def ensure_indexes(self) -> List[Tuple[str, str, int, List[str]]]:
+        """Создание индексов, необходимых для быстрых запросов, и служебных таблиц.
+        
+        Учетный номер и номер кластера завершенной карты должны быть
+        уникальными. Уникальный частичный индекс создается только если в базе
+        нет конфликтов, иначе создается обычный частичный индекс, а конфликты
+        возвращаются для отчета. После устранения конфликтов повторный вызов
+        заменит обычный индекс уникальным.
+        
+        Метод вызывается при каждом запуске приложения, поэтому если
+        уникальные индексы уже созданы, поиск конфликтов (просмотр обоих
+        столбцов) пропускается, а когда он нужен, выполняется до блокировки
+        записи, чтобы не задерживать другие станции.
+        
+        Returns:
+            Список конфликтов в формате find_duplicate_numbers
+        """
+        conn, cursor = self.connect()
+        
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'маршрутные_карты'")
+            existing_indexes = {name for name, in cursor.fetchall()}
+            unique_indexes = {f"uq_маршрутные_карты_{index_suffix}" for _, index_suffix in UNIQUE_CARD_COLUMNS}
+            if unique_indexes <= existing_indexes:
+                conflicts = []
+            else:
+                conflicts = self._find_duplicate_numbers(cursor)
+            conflicting_columns = {column for column, _, _, _ in conflicts}
+            
+            conn.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                """CREATE INDEX IF NOT EXISTS idx_маршрутные_карты_номер_бланка
+                   ON маршрутные_карты (Номер_бланка)"""
+            )
+            # Зеркало дочитывает изменения других станций по Дата_создания
+            cursor.execute(
+                """CREATE INDEX IF NOT EXISTS idx_маршрутные_карты_дата_создания
+                   ON маршрутные_карты (Дата_создания)"""
+            )
+            
+            for column, index_suffix in UNIQUE_CARD_COLUMNS:
+                index_where = f"WHERE Статус = 'Завершена' AND {column} > ''"
+                normal_index = f"""CREATE INDEX IF NOT EXISTS idx_маршрутные_карты_{index_suffix}
+                                   ON маршрутные_карты ({column}) {index_where}"""
+                if column in conflicting_columns:
+                    cursor.execute(normal_index)
+                    continue
+                try:
+                    cursor.execute(
+                        f"""CREATE UNIQUE INDEX IF NOT EXISTS uq_маршрутные_карты_{index_suffix}
+                            ON маршрутные_карты ({column}) {index_where}"""
+                    )
+                except sqlite3.IntegrityError:
+                    # Конфликт записан другой станцией после поиска; он будет
+                    # найден при следующем вызове
+                    cursor.execute(normal_index)
+                else:
+                    cursor.execute(f"DROP INDEX IF EXISTS idx_маршрутные_карты_{index_suffix}")
+            
+            for statement in FILE_CHECK_SCHEMA:
+                cursor.execute(statement)
+            
+            conn.commit()
+            return conflicts
+        except sqlite3.Error as e:
+            print(f"Ошибка при создании индексов: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    @timed("db.find_duplicate_numbers")
+    def find_duplicate_numbers(self) -> List[Tuple[str, str, int, List[str]]]:
+        """Поиск повторяющихся учетных номеров и номеров кластеров.
+        
+        Все конфликты среди завершенных карт, включая архивы, находятся одним
+        запросом с группировкой, без проверки каждой записи по отдельности.
+        
+        Returns:
+            Список кортежей (столбец, значение, количество, номера бланков)
+        """
+        conn, cursor = self.connect()
+        
+        try:
+            self._attach_archives(cursor, self._archives())
+            return self._find_duplicate_numbers(cursor)
+        except sqlite3.Error as e:
+            print(f"Ошибка при поиске повторяющихся номеров: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def _find_duplicate_numbers(self, cursor: sqlite3.Cursor) -> List[Tuple[str, str, int, List[str]]]:
+        """Поиск конфликтов уникальности через переданный курсор."""
+        queries = [
+            f"""SELECT '{column}', {column}, COUNT(*), group_concat(Номер_бланка, ',')
+                FROM маршрутные_карты
+                WHERE Статус = 'Завершена' AND {column} > ''
+                GROUP BY {column}
+                HAVING COUNT(*) > 1"""
+            for column, _ in UNIQUE_CARD_COLUMNS
+        ]
+        cursor.execute(" UNION ALL ".join(queries) + " ORDER BY 1, 2")
+        return [
+            (column, value, count, sorted(blank_numbers.split(",")))
+            for column, value, count, blank_numbers in cursor.fetchall()
+        ]
+    
+    def connect(
+        self,
+        timeout: float = 5.0,
+        control: Optional[QueryControl] = None
+    ) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
+        """Создание подключения к базе данных.
+        
+        Args:
+            timeout: Время ожидания блокировки базы другим соединением (секунды)
+            control: Отмена и ход выполнения запросов через это соединение
+            
+        Returns:
+            Кортеж из соединения и курсора
+            
+        Raises:
+            QueryCancelled: Если задача control уже отменена
+        """
+        if control is not None:
+            control.check()
+        try:
+            with stage("db.connect"):
+                conn = sqlite3.connect(self.db_name, timeout=timeout)
+            if control is not None:
+                control.attach(conn)
+            if self.slow_query_log is not None:
+                cursor = conn.cursor(SlowQueryCursor)
+                cursor.slow_query_log = self.slow_query_log
+            else:
+                cursor = conn.cursor(TimedCursor) if metrics.enabled else conn.cursor()
+            return conn, cursor
+        except sqlite3.Error as e:
+            raise DatabaseUnavailableError(f"Ошибка подключения к базе данных: {e}")
+        
+    @timed("db.check_blank_number")
+    def check_blank_number(self, blank_number: str) -> dict:
+        """Проверка наличия номера бланка в базе данных.
+        
+        Args:
+            blank_number: Номер бланка для проверки
+            
+        Returns:
+            Словарь с информацией о карте или None
+        """
+        if self._mirror_ready():
+            records = self.mirror.find_by_blank(blank_number)
+            if not records:
+                return {"exists": False}
+            record = records[0]
+            return {
+                "exists": True,
+                "id": record.id,
+                "account_number": record.account_number,
+                "cluster_number": record.cluster_number,
+                "status": record.status
+            }
+        
+        conn, cursor = self.connect()
+        
+        try:
+            cursor.row_factory = card_record_factory
+            cursor.execute(
+                f"{CARD_SELECT} WHERE Номер_бланка = ? ORDER BY id LIMIT 1", 
+                (blank_number,)
+            )
+            record = cursor.fetchone()
+            
+            if record:
+                result = {
+                    "exists": True,
+                    "id": record.id,
+                    "account_number": record.account_number,
+                    "cluster_number": record.cluster_number,
+                    "status": record.status
+                }
+            else:
+                result = {"exists": False}
+                
+            return result
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при проверке номера бланка: {e}")
+        finally:
+            conn.close()
+            
+    @timed("db.check_account_number")
+    def check_account_number(self, account_number: str) -> bool:
+        """Проверка наличия учетного номера в базе данных.
+        
+        Args:
+            account_number: Учетный номер для проверки
+            
+        Returns:
+            True если номер существует, иначе False
+        """
+        if self._mirror_ready():
+            return self.mirror.has_completed_account(account_number)
+        
+        conn, cursor = self.connect()
+        
+        try:
+            cursor.execute(
+                """SELECT EXISTS(
+                       SELECT 1 FROM маршрутные_карты
+                       WHERE Учетный_номер = ? AND Статус = 'Завершена' AND Учетный_номер > ''
+                   )""", 
+                (account_number,)
+            )
+            count = cursor.fetchone()[0]
+            return count > 0
+        except sqlite3.Error as e:
+            print(f"Ошибка при проверке учетного номера: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    @timed("db.check_cluster_number")
+    def check_cluster_number(self, cluster_number: str) -> bool:
+        """Проверка наличия номера кластера в базе данных.
+        
+        Args:
+            cluster_number: Номер кластера для проверки
+            
+        Returns:
+            True если номер существует, иначе False
+        """
+        if self._mirror_ready():
+            return self.mirror.has_completed_cluster(cluster_number)
+        
+        conn, cursor = self.connect()
+        
+        try:
+            cursor.execute(
+                """SELECT EXISTS(
+                       SELECT 1 FROM маршрутные_карты
+                       WHERE Номер_кластера = ? AND Статус = 'Завершена' AND Номер_кластера > ''
+                   )""", 
+                (cluster_number,)
+            )
+            count = cursor.fetchone()[0]
+            return count > 0
+        except sqlite3.Error as e:
+            print(f"Ошибка при проверке номера кластера: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    @timed("db.check_route_card_completed")
+    def check_route_card_completed(self, route_card_number: str) -> bool:
+        """Проверка, завершена ли маршрутная карта с указанным номером.
+        
+        Args:
+            route_card_number: Номер маршрутной карты для проверки
+            
+        Returns:
+            True если карта завершена, иначе False
+        """
+        if self.recent_completions.contains(route_card_number):
+            return True
+        recent_current = self.recent_completions.is_current()
+        
+        if self.blank_index is not None:
+            precheck = self.blank_index.precheck_completed(route_card_number)
+            if precheck is not None:
+                if precheck:
+                    self.recent_completions.note_completed(route_card_number, recent_current)
+                return precheck
+        
+        if self._mirror_ready():
+            completed = self.mirror.is_completed(route_card_number)
+            if completed:
+                self.recent_completions.note_completed(route_card_number, recent_current)
+            return completed
+        
+        conn, cursor = self.connect()
+        
+        try:
+            cursor.execute(
+                "SELECT COUNT(*) FROM маршрутные_карты WHERE Номер_бланка = ? AND Статус = 'Завершена'", 
+                (route_card_number,)
+            )
+            count = cursor.fetchone()[0]
+            if count > 0:
+                self.recent_completions.note_completed(route_card_number, recent_current)
+                if self.blank_index is not None:
+                    self.blank_index.mark_completed(route_card_number)
+            return count > 0
+        except sqlite3.Error as e:
+            if is_unavailable_error(e):
+                raise DatabaseUnavailableError(f"Ошибка подключения к базе данных: {e}")
+            print(f"Ошибка при проверке статуса маршрутной карты: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def _write(self, operation: Callable[[sqlite3.Cursor], WriteResult]) -> WriteResult:
+        """Выполнение записи в транзакции BEGIN IMMEDIATE с повторами при блокировке.
+        
+        Блокировка на запись берется в начале транзакции, поэтому конфликт со
+        станцией, пишущей в ту же базу, обнаруживается до чтения данных, и
+        операцию можно безопасно повторить целиком.
+        
+        Args:
+            operation: Функция, выполняющая запросы через курсор
+            
+        Returns:
+            Результат operation после фиксации транзакции
+            
+        Raises:
+            sqlite3.Error: Ошибка, не связанная с блокировкой, или исчерпаны попытки
+        """
+        policy = self.write_retry
+        conn, cursor = self.connect(timeout=policy.busy_timeout)
+        started = time.monotonic()
+        waited = 0.0
+        attempt = 0
+        
+        try:
+            while True:
+                attempt += 1
+                try:
+                    with stage("db.begin"):
+                        conn.execute("BEGIN IMMEDIATE")
+                    result = operation(cursor)
+                    with stage("db.commit"):
+                        conn.commit()
+                except sqlite3.Error as e:
+                    try:
+                        conn.rollback()
+                    except sqlite3.Error:
+                        pass
+                    if not is_busy_error(e) or attempt >= policy.max_attempts:
+                        policy.record_write(attempt, waited, False)
+                        raise
+                    policy.record_retry()
+                    time.sleep(policy.backoff(attempt - 1))
+                    waited = time.monotonic() - started
+                    continue
+                
+                policy.record_write(attempt, waited, True)
+                return result
+        finally:
+            conn.close()
+    
+    @timed("db.complete_route_card")
+    def complete_route_card(self, route_card_number: str) -> Tuple[bool, str]:
+        """Установка статуса 'Завершена' для маршрутной карты.
+        
+        Args:
+            route_card_number: Номер маршрутной карты
+            
+        Returns:
+            Кортеж (успех, сообщение об ошибке или None)
+        """
+        index_fresh = False
+        if self.blank_index is not None:
+            if self.blank_index.precheck_completed(route_card_number) is False:
+                return False, self._not_found_message(route_card_number)
+            index_fresh = self.blank_index.is_fresh()
+        mirror_current = self.mirror is not None and self.mirror.is_current()
+        recent_current = self.recent_completions.is_current()
+        
+        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        def complete(cursor: sqlite3.Cursor) -> Optional[int]:
+            cursor.execute(
+                "SELECT COUNT(*) FROM маршрутные_карты WHERE Номер_бланка = ?",
+                (route_card_number,)
+            )
+            if cursor.fetchone()[0] == 0:
+                return None
+            
+            cursor.execute(
+                """UPDATE маршрутные_карты 
+                   SET Статус = ?, Дата_создания = ?
+                   WHERE Номер_бланка = ?""",
+                ("Завершена", current_date, route_card_number)
+            )
+            return cursor.rowcount
+        
+        try:
+            updated = self._write(complete)
+        except sqlite3.Error as e:
+            if is_unavailable_error(e):
+                raise DatabaseUnavailableError(f"Ошибка подключения к базе данных: {e}")
+            return False, f"Ошибка при завершении маршрутной карты: {e}"
+        
+        if updated is None:
+            return False, self._not_found_message(route_card_number)
+        if updated > 0:
+            metrics.increment("db.completions")
+            self.recent_completions.note_completed(route_card_number, recent_current)
+            if self.blank_index is not None:
+                self.blank_index.note_write(route_card_number, index_fresh)
+            if self.mirror is not None:
+                self.mirror.apply_completion(
+                    route_card_number, current_date, was_current=mirror_current
+                )
+        return updated > 0, None
+    
+    @timed("db.complete_route_cards")
+    def complete_route_cards(self, route_card_numbers: List[str]) -> List[Tuple[str, bool, Optional[str]]]:
+        """Завершение нескольких маршрутных карт одной транзакцией.
+        
+        Правила те же, что при завершении одной карты: отсутствующая карта не
+        создается, уже завершенная не изменяется. Повтор номера в пакете
+        считается попыткой завершить уже завершенную карту.
+        
+        Args:
+            route_card_numbers: Нормализованные номера маршрутных карт
+            
+        Returns:
+            Список кортежей (номер, успех, сообщение об ошибке или None) в порядке номеров
+            
+        Raises:
+            DatabaseUnavailableError: Файл базы данных недоступен, пакет не записан
+        """
+        if not route_card_numbers:
+            return []
+        
+        index_fresh = self.blank_index is not None and self.blank_index.is_fresh()
+        mirror_current = self.mirror is not None and self.mirror.is_current()
+        recent_current = self.recent_completions.is_current()
+        unique_numbers = list(dict.fromkeys(route_card_numbers))
+        
+        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        def complete(cursor: sqlite3.Cursor) -> Tuple[Dict[str, int], List[str]]:
+            completed_states = {}
+            for start in range(0, len(unique_numbers), BATCH_QUERY_SIZE):
+                chunk = unique_numbers[start:start + BATCH_QUERY_SIZE]
+                cursor.execute(
+                    f"""SELECT Номер_бланка, MAX(Статус IS 'Завершена')
+                        FROM маршрутные_карты
+                        WHERE Номер_бланка IN ({', '.join('?' * len(chunk))})
+                        GROUP BY Номер_бланка""",
+                    chunk
+                )
+                completed_states.update(cursor.fetchall())
+            
+            to_complete = [number for number in unique_numbers if completed_states.get(number) == 0]
+            cursor.executemany(
+                """UPDATE маршрутные_карты 
+                   SET Статус = ?, Дата_создания = ?
+                   WHERE Номер_бланка = ?""",
+                [("Завершена", current_date, number) for number in to_complete]
+            )
+            return completed_states, to_complete
+        
+        try:
+            completed_states, to_complete = self._write(complete)
+        except sqlite3.Error as e:
+            if is_unavailable_error(e):
+                raise DatabaseUnavailableError(f"Ошибка подключения к базе данных: {e}")
+            message = f"Ошибка при завершении маршрутной карты: {e}"
+            return [(number, False, message) for number in route_card_numbers]
+        
+        metrics.increment("db.completions", len(to_complete))
+        for number in to_complete:
+            self.recent_completions.note_completed(number, recent_current)
+            if self.blank_index is not None:
+                self.blank_index.note_write(number, index_fresh)
+            if self.mirror is not None:
+                self.mirror.apply_completion(number, current_date, was_current=mirror_current)
+        
+        results = []
+        completed_now = set()
+        archives = self._archives() if len(completed_states) < len(unique_numbers) else []
+        for number in route_card_numbers:
+            state = completed_states.get(number)
+            if state is None:
+                results.append((number, False, self._not_found_message(number, archives)))
+            elif state or number in completed_now:
+                results.append((number, False, f"Маршрутная карта №{number} уже завершена"))
+            else:
+                completed_now.add(number)
+                results.append((number, True, None))
+        return results
+    
+    @timed("db.replay_completions")
+    def replay_completions(
+        self,
+        entries: List[Tuple[str, str]]
+    ) -> List[Tuple[str, str, bool, Optional[str]]]:
+        """Применение завершений из локального журнала одной транзакцией.
+        
+        Дата_создания устанавливается во время скана из журнала, поэтому
+        повторное применение того же журнала распознается: карта, завершенная
+        с той же датой, считается уже примененной записью, а не конфликтом.
+        
+        Args:
+            entries: Список (номер карты, время скана "%Y-%m-%d %H:%M:%S")
+            
+        Returns:
+            Список (номер, время скана, применено, сообщение о конфликте или None)
+            
+        Raises:
+            DatabaseUnavailableError: База данных по-прежнему недоступна
+            sqlite3.Error: Транзакция не выполнена, журнал нужно применить позже
+        """
+        if not entries:
+            return []
+        
+        index_fresh = self.blank_index is not None and self.blank_index.is_fresh()
+        mirror_current = self.mirror is not None and self.mirror.is_current()
+        recent_current = self.recent_completions.is_current()
+        unique_numbers = list(dict.fromkeys(number for number, _ in entries))
+        
+        def replay(cursor: sqlite3.Cursor) -> Tuple[list, list]:
+            found = set()
+            completed_dates: Dict[str, set] = {}
+            for start in range(0, len(unique_numbers), BATCH_QUERY_SIZE):
+                chunk = unique_numbers[start:start + BATCH_QUERY_SIZE]
+                cursor.execute(
+                    f"""SELECT Номер_бланка, Статус IS 'Завершена', Дата_создания
+                        FROM маршрутные_карты
+                        WHERE Номер_бланка IN ({', '.join('?' * len(chunk))})""",
+                    chunk
+                )
+                for number, completed, created_at in cursor.fetchall():
+                    found.add(number)
+                    if completed:
+                        completed_dates.setdefault(number, set()).add(created_at)
+            
+            results = []
+            updates = []
+            for number, completed_at in entries:
+                if number not in found:
+                    results.append((
+                        number, completed_at, False,
+                        f"Маршрутная карта №{number} не найдена в базе данных"
+                    ))
+                elif number not in completed_dates:
+                    completed_dates[number] = {completed_at}
+                    updates.append(("Завершена", completed_at, number))
+                    results.append((number, completed_at, True, None))
+                elif completed_at in completed_dates[number]:
+                    results.append((number, completed_at, True, None))
+                else:
+                    results.append((
+                        number, completed_at, False,
+                        f"Маршрутная карта №{number} уже завершена"
+                    ))
+            
+            cursor.executemany(
+                """UPDATE маршрутные_карты 
+                   SET Статус = ?, Дата_создания = ?
+                   WHERE Номер_бланка = ?""",
+                updates
+            )
+            return results, updates
+        
+        try:
+            results, updates = self._write(replay)
+        except sqlite3.Error as e:
+            if is_unavailable_error(e):
+                raise DatabaseUnavailableError(f"Ошибка подключения к базе данных: {e}")
+            raise
+        
+        metrics.increment("db.completions", len(updates))
+        for _, completed_at, number in updates:
+            self.recent_completions.note_completed(number, recent_current)
+            if self.blank_index is not None:
+                self.blank_index.note_write(number, index_fresh)
+            if self.mirror is not None:
+                self.mirror.apply_completion(number, completed_at, was_current=mirror_current)
+        
+        return results
+    
+    @timed("db.update_card_info")
+    def update_card_info(
+        self, 
+        blank_number: str, 
+        account_number: str, 
+        cluster_number: str
+    ) -> bool:
+        """Обновление информации о маршрутной карте.
+        
+        Args:
+            blank_number: Номер бланка
+            account_number: Учетный номер
+            cluster_number: Номер кластера
+            
+        Returns:
+            True если обновление успешно, иначе False
+        """
+        index_fresh = self.blank_index is not None and self.blank_index.is_fresh()
+        mirror_current = self.mirror is not None and self.mirror.is_current()
+        recent_current = self.recent_completions.is_current()
+        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        def update(cursor: sqlite3.Cursor) -> int:
+            cursor.execute(
+                """UPDATE маршрутные_карты 
+                   SET Учетный_номер = ?, 
+                       Номер_кластера = ?, 
+                       Статус = ?,
+                       Дата_создания = ?
+                   WHERE Номер_бланка = ?""",
+                (account_number, cluster_number, "Завершена", current_date, blank_number)
+            )
+            return cursor.rowcount
+        
+        try:
+            updated = self._write(update)
+        except sqlite3.IntegrityError as e:
+            print(f"Учетный номер или номер кластера уже используется завершенной картой: {e}")
+            return False
+        except sqlite3.Error as e:
+            print(f"Ошибка при обновлении записи: {e}")
+            return False
+        
+        if updated > 0:
+            metrics.increment("db.completions")
+            self.recent_completions.note_completed(blank_number, recent_current)
+            if self.blank_index is not None:
+                self.blank_index.note_write(blank_number, index_fresh)
+            if self.mirror is not None:
+                self.mirror.apply_completion(
+                    blank_number, current_date, account_number, cluster_number,
+                    was_current=mirror_current
+                )
+        return updated > 0
+            
+    @timed("db.get_all_records")
+    def get_all_records(self, limit: int = 100, offset: int = 0) -> List[CardRecord]:
+        """Получение списка записей из базы данных.
+        
+        Args:
+            limit: Ограничение количества записей
+            offset: Смещение
+            
+        Returns:
+            Список записей
+        """
+        if self._mirror_ready():
+            return self.mirror.latest(limit, offset)
+        
+        conn, cursor = self.connect()
+        
+        try:
+            cursor.row_factory = card_record_factory
+            cursor.execute(
+                f"""{CARD_SELECT}
+                    ORDER BY id DESC
+                    LIMIT ? OFFSET ?""",
+                (limit, offset)
+            )
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении записей: {e}")
+            return []
+        finally:
+            conn.close()
+            
+    @timed("db.get_file_problems")
+    def get_file_problems(self, limit: int = FILE_PROBLEMS_LIMIT) -> List[tuple]:
+        """Получение карт, файлы которых не прошли последнюю проверку.
+        
+        Args:
+            limit: Ограничение количества записей
+            
+        Returns:
+            Список кортежей (id, номер бланка, путь к файлу, состояние, время проверки)
+        """
+        conn, cursor = self.connect()
+        
+        try:
+            placeholders = ", ".join("?" * len(FILE_PROBLEM_STATES))
+            cursor.execute(
+                f"""SELECT m.id, m.Номер_бланка, m.Путь_к_файлу, p.Состояние, p.Проверено
+                    FROM проверка_файлов p
+                    JOIN маршрутные_карты m ON m.id = p.id_карты
+                    WHERE p.Состояние IN ({placeholders})
+                    ORDER BY p.id_карты
+                    LIMIT ?""",
+                (*FILE_PROBLEM_STATES, limit)
+            )
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            # До первой проверки файлов служебной таблицы может не быть
+            if "no such table" not in str(e):
+                print(f"Ошибка при получении результатов проверки файлов: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    @timed("db.search_records")
+    def search_records(self, search_term: str) -> List[CardRecord]:
+        """Поиск записей в базе данных и архивах.
+        
+        Args:
+            search_term: Поисковый запрос
+            
+        Returns:
+            Список найденных записей
+        """
+        archives = self._archives()
+        if not archives and self._mirror_ready():
+            return self.mirror.search(search_term)
+        
+        conn, cursor = self.connect()
+        
+        try:
+            self._attach_archives(cursor, archives)
+            cursor.row_factory = card_record_factory
+            cursor.execute(
+                f"""{CARD_SELECT}
+                    WHERE Номер_бланка LIKE ? 
+                       OR Учетный_номер LIKE ? 
+                       OR Номер_кластера LIKE ?
+                    ORDER BY id DESC
+                    LIMIT 100""",
+                (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%")
+            )
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка при поиске записей: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    @timed("db.get_total_cards_count")
+    def get_total_cards_count(self, control: Optional[QueryControl] = None) -> int:
+        """Получение общего количества маршрутных карт в базе данных.
+        
+        Args:
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Общее количество карт
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archived = self._archive_counts()[0]
+        if self._mirror_ready_with_archives():
+            return len(self.mirror.records) + archived
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            cursor.execute("SELECT COUNT(*) FROM маршрутные_карты")
+            return cursor.fetchone()[0] + archived
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении общего количества карт: {e}")
+            return 0
+        finally:
+            conn.close()
+    
+    @timed("db.get_completed_cards_count")
+    def get_completed_cards_count(self, control: Optional[QueryControl] = None) -> int:
+        """Получение количества заполненных маршрутных карт.
+        
+        Args:
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Количество заполненных карт
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archived = self._archive_counts()[1]
+        if self._mirror_ready_with_archives():
+            return self.mirror.completed_count + archived
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            cursor.execute(
+                "SELECT COUNT(*) FROM маршрутные_карты WHERE Статус = 'Завершена'"
+            )
+            return cursor.fetchone()[0] + archived
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении количества заполненных карт: {e}")
+            return 0
+        finally:
+            conn.close()
+    
+    @timed("db.get_incomplete_cards_count")
+    def get_incomplete_cards_count(self, control: Optional[QueryControl] = None) -> int:
+        """Получение количества незаполненных маршрутных карт.
+        
+        Args:
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Количество незаполненных карт
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archived = self._archive_counts()[2]
+        if self._mirror_ready_with_archives():
+            return self.mirror.incomplete_count + archived
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            cursor.execute(
+                """SELECT COUNT(*) FROM маршрутные_карты 
+                   WHERE Учетный_номер IS NULL OR Учетный_номер = '' 
+                   OR Номер_кластера IS NULL OR Номер_кластера = ''"""
+            )
+            return cursor.fetchone()[0] + archived
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении количества незаполненных карт: {e}")
+            return 0
+        finally:
+            conn.close()
+    
+    @timed("db.get_cards_by_period")
+    def get_cards_by_period(
+        self,
+        period_start: str,
+        period_end: str,
+        control: Optional[QueryControl] = None
+    ) -> List[CardRecord]:
+        """Получение списка маршрутных карт за указанный период, включая архивы.
+        
+        Args:
+            period_start: Начало периода в формате 'YYYY-MM-DD'
+            period_end: Конец периода в формате 'YYYY-MM-DD'
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Список маршрутных карт за период
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archives = self._archives(period_start, period_end)
+        if not archives and self._mirror_ready():
+            return self.mirror.by_period(period_start, period_end)
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            self._attach_archives(cursor, archives)
+            cursor.row_factory = card_record_factory
+            cursor.execute(
+                f"""{CARD_SELECT}
+                    WHERE {PERIOD_WHERE}
+                    ORDER BY Дата_создания DESC""",
+                (period_start, period_end)
+            )
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении карт за период: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    @timed("db.iter_cards")
+    def iter_cards(
+        self,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        control: Optional[QueryControl] = None
+    ) -> Iterator[CardRecord]:
+        """Потоковое чтение маршрутных карт в порядке id.
+        
+        Строки читаются участками через fetchmany, поэтому память не зависит
+        от количества карт за период.
+        
+        Args:
+            period_start: Начало периода в формате 'YYYY-MM-DD', None - все карты
+            period_end: Конец периода в формате 'YYYY-MM-DD'
+            chunk_size: Количество строк в одном участке
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Yields:
+            Записи маршрутных карт
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+            sqlite3.Error: При ошибке чтения (частичный результат нельзя выдать как полный)
+        """
+        archives = self._archives(period_start, period_end)
+        if not archives and self._mirror_ready():
+            yield from self.mirror.by_id(period_start, period_end)
+            return
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            self._attach_archives(cursor, archives)
+            cursor.row_factory = card_record_factory
+            if period_start is None:
+                cursor.execute(f"{CARD_SELECT} ORDER BY id")
+            else:
+                cursor.execute(
+                    f"""{CARD_SELECT}
+                        WHERE {PERIOD_WHERE}
+                        ORDER BY id""",
+                    (period_start, period_end)
+                )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        except sqlite3.Error:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            raise
+        finally:
+            conn.close()
+    
+    @timed("db.get_cards_count_by_period")
+    def get_cards_count_by_period(
+        self,
+        period_start: str,
+        period_end: str,
+        control: Optional[QueryControl] = None
+    ) -> int:
+        """Получение количества маршрутных карт за указанный период.
+        
+        Args:
+            period_start: Начало периода в формате 'YYYY-MM-DD'
+            period_end: Конец периода в формате 'YYYY-MM-DD'
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Количество маршрутных карт за период
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archives = self._archives(period_start, period_end)
+        if not archives and self._mirror_ready():
+            return self.mirror.count_by_period(period_start, period_end)
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            self._attach_archives(cursor, archives)
+            cursor.execute(
+                f"SELECT COUNT(*) FROM маршрутные_карты WHERE {PERIOD_WHERE}",
+                (period_start, period_end)
+            )
+            return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении количества карт за период: {e}")
+            return 0
+        finally:
+            conn.close()
+    
+    @timed("db.get_completed_cards_by_period")
+    def get_completed_cards_by_period(
+        self,
+        period_start: str,
+        period_end: str,
+        control: Optional[QueryControl] = None
+    ) -> int:
+        """Получение количества заполненных маршрутных карт за период.
+        
+        Args:
+            period_start: Начало периода в формате 'YYYY-MM-DD'
+            period_end: Конец периода в формате 'YYYY-MM-DD'
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Количество заполненных маршрутных карт за период
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archives = self._archives(period_start, period_end)
+        if not archives and self._mirror_ready():
+            return self.mirror.count_by_period(period_start, period_end, completed_only=True)
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            self._attach_archives(cursor, archives)
+            cursor.execute(
+                f"""SELECT COUNT(*) FROM маршрутные_карты
+                    WHERE Статус = 'Завершена'
+                    AND {PERIOD_WHERE}""",
+                (period_start, period_end)
+            )
+            return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении количества заполненных карт за период: {e}")
+            return 0
+        finally:
+            conn.close()
+    
+    @timed("db.get_monthly_stats")
+    def get_monthly_stats(self, year: int = None, control: Optional[QueryControl] = None) -> List[tuple]:
+        """Получение статистики по месяцам, включая архивы.
+        
+        Args:
+            year: Год для фильтрации, если None - за все время
+            control: Отмена, ограничение времени и ход выполнения запроса
+            
+        Returns:
+            Список кортежей (месяц, год, количество заполненных карт)
+            
+        Raises:
+            QueryCancelled: Если запрос отменен или превысил отведенное время
+        """
+        archives = self._archives(str(year), str(year)) if year else self._archives()
+        if self._mirror_ready_with_archives():
+            return self._with_archive_monthly_stats(self.mirror.monthly_stats(year), archives)
+        
+        conn, cursor = self.connect(control=control)
+        
+        try:
+            if year:
+                cursor.execute(
+                    """SELECT strftime('%m', Дата_создания) as Месяц, 
+                             strftime('%Y', Дата_создания) as Год,
+                             COUNT(*) as Количество
+                       FROM маршрутные_карты
+                       WHERE Статус = 'Завершена'
+                       AND Дата_создания >= ? AND Дата_создания < ?
+                       GROUP BY Месяц, Год
+                       ORDER BY Год, Месяц""",
+                    (str(year), str(int(year) + 1))
+                )
+            else:
+                cursor.execute(
+                    """SELECT strftime('%m', Дата_создания) as Месяц, 
+                             strftime('%Y', Дата_создания) as Год,
+                             COUNT(*) as Количество
+                       FROM маршрутные_карты
+                       WHERE Статус = 'Завершена'
+                       GROUP BY Месяц, Год
+                       ORDER BY Год, Месяц"""
+                )
+            return self._with_archive_monthly_stats(cursor.fetchall(), archives)
+        except sqlite3.Error as e:
+            if control is not None and control.stopped:
+                raise QueryCancelled(control.reason)
+            print(f"Ошибка при получении месячной статистики: {e}")
+            return []
+        finally:
+            conn.close()
+
+    
+    @timed("db.find_blank_sequence_issues")
+    def find_blank_sequence_issues(
+        self, 
+        range_start: str = "000001", 
+        range_end: str = "999999"
+    ) -> Iterator[Tuple[str, str, str, int]]:
+        """Поиск пропусков и дубликатов номеров бланков в диапазоне.
+        
+        Диапазон обрабатывается участками: номера участка читаются одним
+        запросом по индексу номера бланка в массив счетчиков, по которому
+        затем ищутся пустые места и повторы. Номера карт в архивах не
+        считаются пропущенными.
+        
+        Args:
+            range_start: Первый номер диапазона
+            range_end: Последний номер диапазона (включительно)
+            
+        Yields:
+            Кортежи (вид, первый номер, последний номер, количество), где вид -
+            "gap" (количество пропущенных номеров) или "duplicate"
+            (количество записей с этим номером), в порядке возрастания номеров
+        """
+        first = blank_to_int(range_start)
+        last = blank_to_int(range_end)
+        if first is None or last is None or last < first:
+            return
+        
+        conn, cursor = self.connect()
+        gap_start = None
+        
+        try:
+            self._attach_archives(cursor, self._archives())
+            for chunk_start in range(first, last + 1, AUDIT_CHUNK_SIZE):
+                chunk_end = min(chunk_start + AUDIT_CHUNK_SIZE - 1, last)
+                counts = bytearray(chunk_end - chunk_start + 1)
+                
+                cursor.execute(
+                    """SELECT group_concat(Номер_бланка, ',') FROM маршрутные_карты
+                       WHERE Номер_бланка BETWEEN ? AND ?""",
+                    (f"{chunk_start:06d}", f"{chunk_end:06d}")
+                )
+                numbers = cursor.fetchone()[0]
+                if numbers:
+                    for blank_number in numbers.split(","):
+                        if len(blank_number) == 6 and blank_number.isdigit():
+                            position = int(blank_number) - chunk_start
+                            if counts[position] < 255:
+                                counts[position] += 1
+                
+                # Пропуск, перенесенный из предыдущего участка, закончился на его границе
+                if gap_start is not None and counts[0]:
+                    yield "gap", f"{gap_start:06d}", f"{chunk_start - 1:06d}", chunk_start - gap_start
+                    gap_start = None
+                
+                # Пустые места и повторы ищутся по массиву регулярными выражениями
+                issues = heapq.merge(
+                    ((m.start(), m.end()) for m in re.finditer(rb"\x00+", counts)),
+                    ((m.start(), -counts[m.start()]) for m in re.finditer(rb"[\x02-\xff]", counts))
+                )
+                for position, value in issues:
+                    number = chunk_start + position
+                    if value < 0:
+                        yield "duplicate", f"{number:06d}", f"{number:06d}", -value
+                        continue
+                    
+                    start = gap_start if gap_start is not None else number
+                    gap_start = None
+                    if value == len(counts):
+                        # Пропуск доходит до конца участка и может продолжиться в следующем
+                        gap_start = start
+                    else:
+                        gap_end = chunk_start + value - 1
+                        yield "gap", f"{start:06d}", f"{gap_end:06d}", gap_end - start + 1
+            
+            if gap_start is not None:
+                yield "gap", f"{gap_start:06d}", f"{last:06d}", last - gap_start + 1
+        except sqlite3.Error as e:
+            print(f"Ошибка при поиске пропусков и дубликатов: {e}")
+        finally:
+            conn.close()
@@ -3,10 +3,255 @@
 Скрипт для запуска приложения управления маршрутными картами.
 """
 import argparse
+import csv
 import os
+import sqlite3
 import sys
+import time
+from typing import List, Optional
 
-from route_card_app import RouteCardApp
+import instrumentation
+from db_backup import BACKUP_KEEP, BackupScheduler
+from metrics_server import METRICS_HOST, METRICS_PORT
+from route_card_db import DatabaseManager
+from slow_query_log import SLOW_QUERY_LOG_FILE, SLOW_QUERY_THRESHOLD
+
+
+# Количество пропущенных при загрузке строк, выводимых в консоль
+IMPORT_REPORT_LIMIT = 20
+
+
+def audit_blanks(db_manager: DatabaseManager, range_start: str, range_end: str) -> int:
+    """Вывод отчета о пропусках и дубликатах номеров бланков.
+    
+    Args:
+        db_manager: Менеджер базы данных
+        range_start: Первый номер диапазона
+        range_end: Последний номер диапазона
+        
+    Returns:
+        Код завершения: 0 - нарушений нет, 2 - найдены пропуски или дубликаты
+    """
+    if not (range_start.isdigit() and range_end.isdigit()):
+        print("Ошибка: границы диапазона должны быть числами от 000001 до 999999")
+        return 1
+    range_start, range_end = range_start.zfill(6), range_end.zfill(6)
+    
+    gaps = duplicates = 0
+    for kind, first, last, count in db_manager.find_blank_sequence_issues(range_start, range_end):
+        if kind == "gap":
+            gaps += count
+            if first == last:
+                print(f"Пропуск: {first}")
+            else:
+                print(f"Пропуск: {first}-{last} ({count})")
+        else:
+            duplicates += 1
+            print(f"Дубликат: {first} ({count} записей)")
+    
+    print(f"Диапазон {range_start}-{range_end}: пропущено номеров {gaps}, дубликатов {duplicates}")
+    return 2 if gaps or duplicates else 0
+
+
+def audit_duplicates(db_manager: DatabaseManager) -> int:
+    """Вывод отчета о повторяющихся учетных номерах и номерах кластеров.
+    
+    Args:
+        db_manager: Менеджер базы данных
+        
+    Returns:
+        Код завершения: 0 - конфликтов нет, 2 - конфликты найдены
+    """
+    conflicts = db_manager.find_duplicate_numbers()
+    for column, value, count, blank_numbers in conflicts:
+        print(f"{column} {value}: {count} карт ({', '.join(blank_numbers)})")
+    
+    print(f"Найдено конфликтов: {len(conflicts)}")
+    return 2 if conflicts else 0
+
+
+def export_report(
+    db_manager: DatabaseManager,
+    path: str,
+    period: Optional[List[str]] = None
+) -> int:
+    """Выгрузка карт (всех или за период) и сводки в CSV или XLSX с выводом хода выполнения.
+    
+    Args:
+        db_manager: Менеджер базы данных
+        path: Путь к файлу отчета (.csv или .xlsx)
+        period: Даты начала и конца периода в формате 'YYYY-MM-DD' или None
+        
+    Returns:
+        Код завершения: 0 - отчет записан, 1 - ошибка или прерывание
+    """
+    from card_export import ExportError, export_cards
+    from query_control import QueryCancelled
+    
+    period_start, period_end = period if period else (None, None)
+    
+    def on_progress(written: int, total: int) -> None:
+        print(f"\rВыгружено {written} из {total}", end="", flush=True)
+    
+    try:
+        written = export_cards(db_manager, path, period_start, period_end, on_progress=on_progress)
+    except KeyboardInterrupt:
+        print("\nЭкспорт прерван")
+        return 1
+    except (ExportError, QueryCancelled, OSError, sqlite3.Error) as e:
+        print(f"\nОшибка экспорта: {e}")
+        return 1
+    
+    print(f"\nВыгружено карт: {written} в {path}")
+    return 0
+
+
+def import_cards_from(
+    db_manager: DatabaseManager,
+    source: str,
+    defer_indexes: bool = False,
+    rejects_path: Optional[str] = None
+) -> int:
+    """Загрузка карт из CSV-файла или каталога документов с выводом итога.
+    
+    Args:
+        db_manager: Менеджер базы данных
+        source: Путь к CSV-файлу или каталогу с документами карт
+        defer_indexes: Перестроить индексы после загрузки
+        rejects_path: CSV-файл для всех пропущенных строк (в консоль выводятся первые IMPORT_REPORT_LIMIT)
+        
+    Returns:
+        Код завершения: 0 - все строки загружены, 2 - часть строк пропущена, 1 - ошибка
+    """
+    from card_import import CardImportError, import_cards, read_source
+    
+    rejects_file = open(rejects_path, "w", newline="", encoding="utf-8-sig") if rejects_path else None
+    rejects_writer = csv.writer(rejects_file, delimiter=";") if rejects_file else None
+    reported = 0
+    
+    def on_rejected(location, blank_number: str, reason: str) -> None:
+        nonlocal reported
+        if rejects_writer is not None:
+            rejects_writer.writerow((location, blank_number, reason))
+        if reported < IMPORT_REPORT_LIMIT:
+            reported += 1
+            place = f"строка {location}" if isinstance(location, int) else location
+            print(f"\rПропущено ({place}): {reason}")
+    
+    def on_progress(result) -> None:
+        print(
+            f"\rЗагружено {result.inserted}, повторов {result.duplicates}, с ошибками {result.invalid}",
+            end="", flush=True
+        )
+    
+    started = time.perf_counter()
+    try:
+        result = import_cards(
+            db_manager, read_source(source), defer_indexes=defer_indexes,
+            on_rejected=on_rejected, on_progress=on_progress
+        )
+    except (CardImportError, OSError, sqlite3.Error) as e:
+        print(f"\nОшибка загрузки: {e}")
+        return 1
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+    
+    elapsed = time.perf_counter() - started
+    print(f"\nЗагружено карт: {result.inserted} за {elapsed:.1f} с ({result.inserted / max(elapsed, 1e-9):.0f} строк/с)")
+    skipped = result.duplicates + result.invalid
+    if skipped > reported and rejects_path is None:
+        print(f"Показаны первые {reported} из {skipped} пропущенных строк, полный список: --rejects ФАЙЛ")
+    for column, value, count, blank_numbers in result.conflicts:
+        print(f"Повтор {column} {value}: {count} карт ({', '.join(blank_numbers)})")
+    return 2 if skipped or result.conflicts else 0
+
+
+def verify_files(db_manager: DatabaseManager, root: Optional[str], full: bool = False) -> int:
+    """Проверка документов карт с выводом количества карт по состояниям.
+    
+    Args:
+        db_manager: Менеджер базы данных
+        root: Каталог с документами или None (каталог файла базы данных)
+        full: Проверить все карты, а не только измененные с прошлой проверки
+        
+    Returns:
+        Код завершения: 0 - все файлы найдены, 2 - есть проблемные файлы, 1 - ошибка
+    """
+    from file_verifier import verify_card_files
+    from route_card_db import FILE_PROBLEM_STATES
+    
+    def on_progress(seen: int, checked: int) -> None:
+        print(f"\rПросмотрено карт {seen}, проверено файлов {checked}", end="", flush=True)
+    
+    try:
+        summary = verify_card_files(db_manager, root or None, full=full, on_progress=on_progress)
+    except sqlite3.Error as e:
+        print(f"\nОшибка проверки файлов: {e}")
+        return 1
+    
+    checked = summary.pop("проверено")
+    print(f"\nПроверено файлов: {checked}")
+    for state, count in sorted(summary.items()):
+        print(f"{state}: {count}")
+    return 2 if any(summary.get(state) for state in FILE_PROBLEM_STATES) else 0
+
+
+def backup_database(db_name: str, backup_dir: Optional[str], keep: int) -> int:
+    """Создание проверенной копии базы данных с выводом хода копирования.
+    
+    Args:
+        db_name: Путь к файлу базы данных
+        backup_dir: Каталог копий или None (каталог резервные_копии рядом с базой)
+        keep: Количество хранимых копий
+        
+    Returns:
+        Код завершения: 0 - копия создана, 1 - ошибка
+    """
+    from db_backup import BackupError, create_backup
+    
+    def on_progress(copied: int, total: int) -> None:
+        print(f"\rСкопировано страниц {copied} из {total}", end="", flush=True)
+    
+    started = time.perf_counter()
+    try:
+        path = create_backup(db_name, backup_dir or None, keep, on_progress=on_progress)
+    except BackupError as e:
+        print(f"\n{e}")
+        return 1
+    
+    print(f"\nКопия проверена и сохранена: {path} ({time.perf_counter() - started:.1f} с)")
+    return 0
+
+
+def archive_cards(db_manager: DatabaseManager, before_year: int) -> int:
+    """Перенос завершенных карт прошлых лет в архивы с выводом хода переноса.
+    
+    Args:
+        db_manager: Менеджер базы данных
+        before_year: Переносятся карты, завершенные раньше этого года
+        
+    Returns:
+        Код завершения: 0 - перенос выполнен, 1 - ошибка
+    """
+    from card_archive import archive_completed_cards
+    
+    def on_progress(moved: int, total: int) -> None:
+        print(f"\rПеренесено карт {moved} из {total}", end="", flush=True)
+    
+    try:
+        results = archive_completed_cards(db_manager, before_year, on_progress=on_progress)
+    except sqlite3.Error as e:
+        print(f"\nОшибка переноса карт в архив: {e}")
+        return 1
+    
+    if not results:
+        print(f"Нет завершенных карт до {before_year} года")
+        return 0
+    print()
+    for year, count, path in results:
+        print(f"{year}: {count} карт -> {path}")
+    return 0
 
 
 def main():
@@ -17,20 +262,205 @@ def main():
         default="маршрутные_карты.db", 
         help="Путь к файлу базы данных SQLite"
     )
+    parser.add_argument(
+        "--audit-blanks",
+        nargs=2,
+        metavar=("НАЧАЛО", "КОНЕЦ"),
+        help="Отчет о пропусках и дубликатах номеров бланков в диапазоне"
+    )
+    parser.add_argument(
+        "--audit-duplicates",
+        action="store_true",
+        help="Отчет о повторяющихся учетных номерах и номерах кластеров"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="ФАЙЛ",
+        help="Выгрузка карт и сводки в CSV или XLSX (формат по расширению файла)"
+    )
+    parser.add_argument(
+        "--period",
+        nargs=2,
+        metavar=("НАЧАЛО", "КОНЕЦ"),
+        help="Период выгрузки --export в формате ГГГГ-ММ-ДД (по умолчанию все карты)"
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_source",
+        metavar="ИСТОЧНИК",
+        help="Загрузка бланков из CSV-файла или каталога с документами карт (*.pptx)"
+    )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="При --import удалить индексы на время загрузки и создать их заново в конце"
+    )
+    parser.add_argument(
+        "--rejects",
+        metavar="ФАЙЛ",
+        help="При --import записать все пропущенные строки и причины в CSV-файл"
+    )
+    parser.add_argument(
+        "--verify-files",
+        nargs="?",
+        const="",
+        metavar="КОРЕНЬ",
+        help="Проверка документов карт (Путь_к_файлу) относительно каталога КОРЕНЬ "
+             "(по умолчанию каталог базы данных); повторно проверяются только изменения"
+    )
+    parser.add_argument(
+        "--verify-full",
+        action="store_true",
+        help="При --verify-files проверить все карты заново"
+    )
+    parser.add_argument(
+        "--backup",
+        nargs="?",
+        const="",
+        metavar="КАТАЛОГ",
+        help="Создать проверенную копию базы без остановки станций "
+             "(по умолчанию в каталоге резервные_копии рядом с базой)"
+    )
+    parser.add_argument(
+        "--backup-every",
+        type=float,
+        metavar="МИНУТЫ",
+        help="Создавать копии по расписанию в фоне, пока работает приложение или прием сканов"
+    )
+    parser.add_argument(
+        "--backup-dir",
+        metavar="КАТАЛОГ",
+        help="Каталог копий для --backup-every"
+    )
+    parser.add_argument(
+        "--backup-keep",
+        type=int,
+        default=BACKUP_KEEP,
+        metavar="N",
+        help=f"Количество хранимых копий (по умолчанию {BACKUP_KEEP})"
+    )
+    parser.add_argument(
+        "--archive-before",
+        type=int,
+        metavar="ГОД",
+        help="Перенести завершенные карты до указанного года в архивы по годам рядом с базой"
+    )
+    parser.add_argument(
+        "--mirror",
+        action="store_true",
+        help="Обслуживать чтения из зеркала таблицы в памяти"
+    )
+    parser.add_argument(
+        "--scan-mode",
+        action="store_true",
+        help="Запуск в режиме непрерывного сканирования без всплывающих окон"
+    )
+    parser.add_argument(
+        "--optimistic",
+        action="store_true",
+        help="Подтверждать сканы сразу и записывать их в базу в фоне"
+    )
+    parser.add_argument(
+        "--headless",
+        nargs="?",
+        const="-",
+        metavar="ИСТОЧНИК",
+        help="Прием сканов без интерфейса: '-' (stdin), путь к файлу/FIFO, tcp:ПОРТ или unix:ПУТЬ"
+    )
+    parser.add_argument(
+        "--metrics",
+        nargs="?",
+        const=instrumentation.METRICS_FILE,
+        metavar="ПУТЬ",
+        help="Замерять время методов базы данных и обработчиков интерфейса, отчет при выходе"
+    )
+    parser.add_argument(
+        "--slow-query-log",
+        nargs="?",
+        type=float,
+        const=SLOW_QUERY_THRESHOLD * 1000,
+        metavar="МС",
+        help=f"Записывать запросы дольше порога (по умолчанию {SLOW_QUERY_THRESHOLD * 1000:.0f} мс) "
+             f"с планом выполнения в {SLOW_QUERY_LOG_FILE}"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        nargs="?",
+        type=int,
+        const=METRICS_PORT,
+        metavar="ПОРТ",
+        help=f"Отдавать метрики в формате Prometheus по HTTP (по умолчанию порт {METRICS_PORT})"
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default=METRICS_HOST,
+        help="Адрес точки сбора метрик (по умолчанию только локальные подключения)"
+    )
     
     args = parser.parse_args()
     
+    if args.metrics:
+        instrumentation.enable(args.metrics)
+    elif not instrumentation.enable_from_environment() and args.metrics_port is not None:
+        # Для точки сбора метрик замеры нужны без записи отчета при выходе
+        instrumentation.enable(dump_at_exit=False)
+    
     # Проверяем наличие файла базы данных
     if not os.path.exists(args.db):
         print(f"Ошибка: файл базы данных '{args.db}' не найден.")
         return 1
-        
-    # Запускаем приложение
-    app = RouteCardApp()
-    app.db_manager.db_name = args.db
-    app.run()
     
-    return 0
+    db_manager = DatabaseManager(args.db)
+    if args.slow_query_log is not None:
+        db_manager.enable_slow_query_log(args.slow_query_log / 1000)
+    
+    if args.audit_blanks:
+        return audit_blanks(db_manager, *args.audit_blanks)
+    
+    if args.audit_duplicates:
+        return audit_duplicates(db_manager)
+    
+    if args.backup is not None:
+        return backup_database(args.db, args.backup, args.backup_keep)
+    
+    if args.archive_before:
+        return archive_cards(db_manager, args.archive_before)
+    
+    if args.verify_files is not None:
+        return verify_files(db_manager, args.verify_files, args.verify_full)
+    
+    if args.import_source:
+        return import_cards_from(db_manager, args.import_source, args.defer_indexes, args.rejects)
+    
+    if args.export:
+        return export_report(db_manager, args.export, args.period)
+    
+    scheduler = None
+    if args.backup_every:
+        scheduler = BackupScheduler(args.db, args.backup_every * 60, args.backup_dir, args.backup_keep).start()
+    
+    try:
+        if args.headless:
+            from headless import run_headless
+            return run_headless(db_manager, args.headless, args.metrics_port, args.metrics_host)
+            
+        # Запускаем приложение (Kivy загружается только для графического интерфейса)
+        from route_card_app import RouteCardApp
+        
+        app = RouteCardApp()
+        app.db_manager = db_manager
+        app.continuous_mode = args.scan_mode
+        app.optimistic_mode = args.optimistic
+        app.metrics_host = args.metrics_host
+        app.metrics_port = args.metrics_port
+        if args.mirror:
+            app.db_manager.enable_mirror()
+        app.run()
+        
+        return 0
+    finally:
+        if scheduler is not None:
+            scheduler.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+Локальный журнал завершений маршрутных карт на время недоступности базы.
+
+Пока файл базы данных на сетевом диске недоступен, сканы дописываются в
+локальный текстовый файл (номер и время скана через табуляцию). Когда база
+снова доступна, журнал применяется пакетами через
+DatabaseManager.replay_completions. Применение идемпотентно: карта,
+завершенная с тем же временем скана, считается уже примененной записью.
+Конфликты (карта не найдена или завершена другой станцией) возвращаются
+вызывающему коду и дописываются в файл конфликтов рядом с журналом.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from route_card_db import DatabaseManager, DatabaseUnavailableError
+
+
+# Файл журнала по умолчанию (на локальном диске станции)
+JOURNAL_FILE = "журнал_сканов.txt"
+
+# Количество записей журнала в одной транзакции при применении
+JOURNAL_REPLAY_BATCH_SIZE = 500
+
+# Интервал проверки доступности базы для применения журнала (секунды)
+JOURNAL_RETRY_INTERVAL = 5.0
+
+
+class ScanJournal:
+    """Журнал завершений, дописываемый в конец файла."""
+
+    def __init__(self, path: str = JOURNAL_FILE) -> None:
+        """Инициализация журнала и чтение непримененных записей.
+
+        Args:
+            path: Путь к файлу журнала
+        """
+        self.path = path
+        self.conflicts_path = path + ".conflicts"
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[str, str]] = []
+        self._numbers = set()
+        try:
+            with open(path, encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    parts = line.rstrip("\n").split("\t")
+                    # Неполная последняя строка (сбой при записи) пропускается
+                    if line.endswith("\n") and len(parts) == 2 and parts[0] and parts[1]:
+                        self._entries.append((parts[0], parts[1]))
+                        self._numbers.add(parts[0])
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, route_card_number: str) -> bool:
+        with self._lock:
+            return route_card_number in self._numbers
+
+    def append(self, route_card_number: str, completed_at: Optional[str] = None) -> str:
+        """Запись завершения карты в журнал с принудительным сбросом на диск.
+
+        Args:
+            route_card_number: Нормализованный номер карты
+            completed_at: Время скана (по умолчанию текущее)
+
+        Returns:
+            Записанное время скана
+        """
+        completed_at = completed_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as journal_file:
+                journal_file.write(f"{route_card_number}\t{completed_at}\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self._entries.append((route_card_number, completed_at))
+            self._numbers.add(route_card_number)
+        return completed_at
+
+    def replay(
+        self,
+        db_manager: DatabaseManager,
+        batch_size: int = JOURNAL_REPLAY_BATCH_SIZE
+    ) -> Tuple[int, List[Tuple[str, str, str]], bool]:
+        """Применение журнала к базе данных пакетами.
+
+        После каждой зафиксированной транзакции примененные записи удаляются
+        из файла журнала. Записи, добавленные во время применения, остаются.
+
+        Args:
+            db_manager: Менеджер базы данных
+            batch_size: Количество записей в одной транзакции
+
+        Returns:
+            Кортеж (применено записей, конфликты (время, номер, сообщение), журнал применен полностью)
+        """
+        applied = 0
+        conflicts = []
+        while True:
+            with self._lock:
+                batch = self._entries[:batch_size]
+            if not batch:
+                return applied, conflicts, True
+
+            try:
+                results = db_manager.replay_completions(batch)
+            except (DatabaseUnavailableError, sqlite3.Error) as e:
+                print(f"Журнал сканов не применен, повтор позже: {e}")
+                return applied, conflicts, False
+
+            batch_conflicts = [
+                (completed_at, number, message)
+                for number, completed_at, success, message in results
+                if not success
+            ]
+            applied += len(results) - len(batch_conflicts)
+            conflicts.extend(batch_conflicts)
+            self._log_conflicts(batch_conflicts)
+            self._drop_applied(len(batch))
+
+    def _drop_applied(self, count: int) -> None:
+        """Удаление первых записей журнала после их применения."""
+        with self._lock:
+            del self._entries[:count]
+            self._numbers = {number for number, _ in self._entries}
+            if not self._entries:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                return
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as journal_file:
+                journal_file.writelines(f"{number}\t{completed_at}\n" for number, completed_at in self._entries)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            os.replace(temp_path, self.path)
+
+    def _log_conflicts(self, conflicts: List[Tuple[str, str, str]]) -> None:
+        """Дописывание конфликтов в файл конфликтов."""
+        if not conflicts:
+            return
+        try:
+            with open(self.conflicts_path, "a", encoding="utf-8") as conflicts_file:
+                for completed_at, number, message in conflicts:
+                    conflicts_file.write(f"{completed_at}\t{number}\t{message}\n")
+        except OSError as e:
+            print(f"Не удалось записать конфликты журнала сканов: {e}")
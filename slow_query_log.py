@@ -0,0 +1,231 @@
+"""
+Журнал медленных запросов DatabaseManager.
+
+Запрос считается медленным, если от выполнения до получения всех строк
+прошло больше порога. Для такого запроса в ротируемый файл записываются
+текст SQL, параметры, длительность и план выполнения (EXPLAIN QUERY PLAN),
+полученный на том же соединении сразу после запроса. Последние медленные
+запросы также хранятся в памяти (SlowQueryLog.recent).
+
+Включение: DatabaseManager.enable_slow_query_log() или флаг
+run.py --slow-query-log [МС].
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence
+
+from instrumentation import TimedCursor
+
+
+# Порог медленного запроса по умолчанию (секунды)
+SLOW_QUERY_THRESHOLD = 0.1
+
+# Файл журнала и параметры ротации
+SLOW_QUERY_LOG_FILE = "медленные_запросы.log"
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+# Количество последних медленных запросов, хранимых в памяти
+SLOW_QUERY_HISTORY = 100
+
+
+class SlowQuery(NamedTuple):
+    """Медленный запрос с планом выполнения."""
+
+    logged_at: str
+    sql: str
+    parameters: tuple
+    seconds: float
+    plan: List[str]
+
+
+# Обработчики файлов журнала по абсолютному пути: несколько менеджеров одной
+# базы пишут в один файл без конфликтов ротации
+_handlers: Dict[str, RotatingFileHandler] = {}
+_handlers_lock = threading.Lock()
+
+
+def _file_handler(path: str, max_bytes: int, backup_count: int) -> RotatingFileHandler:
+    """Общий для процесса обработчик ротируемого файла журнала."""
+    path = os.path.abspath(path)
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _handlers[path] = handler
+        return handler
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, parameters: Sequence = ()) -> List[str]:
+    """План выполнения запроса.
+
+    Args:
+        conn: Соединение, на котором выполнялся запрос
+        sql: Текст запроса
+        parameters: Параметры запроса
+
+    Returns:
+        Строки плана с отступом по вложенности (например, "SCAN маршрутные_карты")
+    """
+    depth = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters):
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def full_table_scans(plan: List[str], table: str = "маршрутные_карты") -> List[str]:
+    """Строки плана с полным просмотром таблицы (без индекса).
+
+    Args:
+        plan: Строки плана (explain_query_plan)
+        table: Имя таблицы
+
+    Returns:
+        Строки вида "SCAN таблица" без "USING ... INDEX"
+    """
+    return [
+        line.strip() for line in plan
+        if line.strip() in (f"SCAN {table}", f"SCAN TABLE {table}")
+    ]
+
+
+class SlowQueryLog:
+    """Запись медленных запросов в ротируемый файл и в память."""
+
+    def __init__(
+        self,
+        threshold: float = SLOW_QUERY_THRESHOLD,
+        path: Optional[str] = SLOW_QUERY_LOG_FILE,
+        max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+        backup_count: int = SLOW_QUERY_LOG_BACKUPS,
+        history: int = SLOW_QUERY_HISTORY
+    ) -> None:
+        """Инициализация журнала.
+
+        Args:
+            threshold: Порог медленного запроса (секунды), 0 - записывать все запросы
+            path: Путь к файлу журнала, None - только в памяти
+            max_bytes: Размер файла, после которого он ротируется
+            backup_count: Количество сохраняемых старых файлов
+            history: Количество последних медленных запросов в памяти
+        """
+        self.threshold = threshold
+        self.path = path
+        self.recent: Deque[SlowQuery] = deque(maxlen=history)
+        self._handler = _file_handler(path, max_bytes, backup_count) if path else None
+        self._lock = threading.Lock()
+
+    def observe(self, conn: sqlite3.Connection, sql: str, parameters: Sequence, seconds: float) -> None:
+        """Учет выполненного запроса: медленный запрос записывается с планом.
+
+        Args:
+            conn: Соединение, на котором выполнялся запрос
+            sql: Текст запроса
+            parameters: Параметры запроса
+            seconds: Длительность от выполнения до получения строк
+        """
+        if seconds < self.threshold:
+            return
+        parameters = tuple(parameters) if not isinstance(parameters, dict) else parameters
+        try:
+            plan = explain_query_plan(conn, sql, parameters)
+        except sqlite3.Error as e:
+            plan = [f"план недоступен: {e}"]
+        entry = SlowQuery(
+            datetime.now().isoformat(sep=" ", timespec="milliseconds"), sql, parameters, seconds, plan
+        )
+        with self._lock:
+            self.recent.append(entry)
+        if self._handler is not None:
+            self._handler.handle(logging.makeLogRecord({"msg": format_entry(entry), "levelno": logging.WARNING}))
+
+
+def format_entry(entry: SlowQuery) -> str:
+    """Текст записи журнала медленных запросов."""
+    sql = " ".join(entry.sql.split())
+    lines = [
+        f"{entry.logged_at} медленный запрос {entry.seconds * 1000:.1f} мс",
+        f"  SQL: {sql}",
+        f"  Параметры: {entry.parameters!r}",
+        "  План:",
+    ]
+    lines.extend(f"    {line}" for line in entry.plan)
+    return "\n".join(lines)
+
+
+class SlowQueryCursor(TimedCursor):
+    """Курсор, замеряющий запросы от выполнения до получения строк.
+
+    Используется DatabaseManager.connect(), когда включен журнал медленных
+    запросов; замеры instrumentation при этом работают как у TimedCursor.
+    """
+
+    slow_query_log: Optional[SlowQueryLog] = None
+
+    def _finish(self) -> None:
+        """Завершение замера предыдущего запроса курсора."""
+        pending = self.__dict__.pop("_pending", None)
+        if pending is not None and self.slow_query_log is not None:
+            sql, parameters, seconds = pending
+            self.slow_query_log.observe(self.connection, sql, parameters, seconds)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if "_pending" in self.__dict__:
+            sql, parameters, seconds = self._pending
+            self._pending = (sql, parameters, seconds + time.perf_counter() - start)
+        return result
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._pending = (sql, parameters, time.perf_counter() - start)
+        if self.description is None:
+            self._finish()
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        if seq_of_parameters:
+            self._pending = (sql, seq_of_parameters[0], time.perf_counter() - start)
+            self._finish()
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        self._finish()
+        return row
+
+    def fetchmany(self, size=None) -> List:
+        if size is None:
+            size = self.arraysize
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            # Строки закончились: замер включает все участки
+            self._finish()
+        return rows
+
+    def fetchall(self) -> List:
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Тесты бенчмарка задержки скана через интерфейс без окна."""
+
+import os
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from bench_scan_latency import run_benchmark, scan_numbers
+from generate_test_db import generate_database
+from route_card_db import DatabaseManager
+
+
+class TestScanLatencyBenchmark(unittest.TestCase):
+    """Тесты прогона сканов нажатиями клавиш."""
+
+    def setUp(self) -> None:
+        """Подготовка сгенерированной базы."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "scan.db")
+        generate_database(self.db_path, 300, {"Завершена": 0.5, None: 0.5})
+
+    def test_keystrokes_complete_cards(self) -> None:
+        """Тест завершения карт сканами и замера всех этапов."""
+        manager = DatabaseManager(self.db_path)
+        completed_before = manager.get_completed_cards_count()
+
+        summary = run_benchmark(self.db_path, "continuous", 20, repeat_ratio=0, invalid_ratio=0)
+
+        self.assertEqual(manager.get_completed_cards_count(), completed_before + 20)
+        for stage in ("keys", "enter", "check", "complete", "banner", "frame", "total"):
+            self.assertIn(stage, summary)
+        self.assertEqual(summary["total"]["count"], 20)
+        self.assertLessEqual(summary["total"]["p50"], summary["total"]["max"])
+
+    def test_optimistic_mode_skips_synchronous_write(self) -> None:
+        """Тест оптимистичного режима без синхронной записи в обработчике."""
+        summary = run_benchmark(self.db_path, "optimistic", 10, repeat_ratio=0, invalid_ratio=0)
+
+        self.assertEqual(summary["optimistic"]["count"], 10)
+        self.assertNotIn("complete", summary)
+
+    def test_scan_mix(self) -> None:
+        """Тест доли повторов и ошибочных номеров в последовательности сканов."""
+        numbers = scan_numbers(self.db_path, 100, repeat_ratio=0.2, invalid_ratio=0.1, seed=1)
+
+        self.assertEqual(len(numbers), 100)
+        self.assertTrue(0 < numbers.count("9999999") < 30)
+        self.assertLess(len(set(numbers)), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""Тесты битовой карты номеров бланков."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from blank_index import BlankBitmap, blank_to_int
+from route_card_db import DatabaseManager
+
+
+def create_test_database(path: str, rows: list) -> None:
+    """Создание тестовой базы данных с указанными строками.
+
+    Args:
+        path: Путь к файлу базы данных
+        rows: Список кортежей (Номер_бланка, Статус)
+    """
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS маршрутные_карты (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            Номер_бланка TEXT,
+            Учетный_номер TEXT,
+            Номер_кластера TEXT,
+            Статус TEXT,
+            Дата_создания TEXT,
+            Путь_к_файлу TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO маршрутные_карты (Номер_бланка, Статус) VALUES (?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestBlankBitmap(unittest.TestCase):
+    """Тесты построения и использования битовой карты."""
+
+    def setUp(self) -> None:
+        """Подготовка временной базы данных."""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        temp_db.close()
+        self.db_path = temp_db.name
+        create_test_database(self.db_path, [
+            ("000001", "Завершена"),
+            ("000002", None),
+            ("000010", "Завершена"),
+            ("999999", None),
+            ("abc", None),
+        ])
+
+    def tearDown(self) -> None:
+        """Удаление временных файлов."""
+        for path in (self.db_path, self.db_path + ".bitmap"):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def test_blank_to_int(self) -> None:
+        """Тест преобразования номера бланка в позицию."""
+        self.assertEqual(blank_to_int("000042"), 42)
+        self.assertIsNone(blank_to_int("42"))
+        self.assertIsNone(blank_to_int("000000"))
+        self.assertIsNone(blank_to_int("12345a"))
+
+    def test_build_exists_and_completed(self) -> None:
+        """Тест построения битовой карты по базе данных."""
+        bitmap = BlankBitmap.open(self.db_path, use_sidecar=False)
+        self.addCleanup(bitmap.close)
+
+        self.assertTrue(bitmap.exists("000001"))
+        self.assertTrue(bitmap.exists("999999"))
+        self.assertFalse(bitmap.exists("000003"))
+        self.assertTrue(bitmap.completed("000010"))
+        self.assertFalse(bitmap.completed("000002"))
+
+    def test_count_range(self) -> None:
+        """Тест подсчета бланков в диапазоне."""
+        bitmap = BlankBitmap.open(self.db_path, use_sidecar=False)
+        self.addCleanup(bitmap.close)
+
+        self.assertEqual(bitmap.count_range("000001", "999999"), 4)
+        self.assertEqual(bitmap.count_range("000001", "000010"), 3)
+        self.assertEqual(bitmap.count_range("000002", "000009"), 1)
+        self.assertEqual(bitmap.count_range("000001", "999999", completed=True), 2)
+
+    def test_sidecar_warm_start(self) -> None:
+        """Тест загрузки сохраненной битовой карты."""
+        bitmap = BlankBitmap.open(self.db_path)
+        bitmap.close()
+        self.assertTrue(os.path.exists(self.db_path + ".bitmap"))
+
+        loaded = BlankBitmap(self.db_path)
+        self.addCleanup(loaded.close)
+        self.assertTrue(loaded.load())
+        self.assertTrue(loaded.exists("000002"))
+        self.assertTrue(loaded.completed("000001"))
+
+    def test_sidecar_rejected_after_database_change(self) -> None:
+        """Тест отказа от устаревшего файла битовой карты."""
+        BlankBitmap.open(self.db_path).close()
+        create_test_database(self.db_path, [("000500", None)])
+
+        loaded = BlankBitmap(self.db_path)
+        self.addCleanup(loaded.close)
+        self.assertFalse(loaded.load())
+
+    def test_refresh_picks_up_new_rows(self) -> None:
+        """Тест дочитывания бланков, добавленных другим соединением."""
+        bitmap = BlankBitmap.open(self.db_path, use_sidecar=False)
+        self.addCleanup(bitmap.close)
+        self.assertFalse(bitmap.exists("000777"))
+
+        create_test_database(self.db_path, [("000777", None)])
+
+        self.assertIsNone(bitmap.precheck_completed("000777"))
+        self.assertTrue(bitmap.exists("000777"))
+
+    def test_precheck(self) -> None:
+        """Тест быстрой предварительной проверки."""
+        bitmap = BlankBitmap.open(self.db_path, use_sidecar=False)
+        self.addCleanup(bitmap.close)
+
+        self.assertTrue(bitmap.precheck_completed("000001"))
+        self.assertFalse(bitmap.precheck_completed("000003"))
+        self.assertIsNone(bitmap.precheck_completed("000002"))
+
+
+class TestDatabaseManagerWithBlankIndex(unittest.TestCase):
+    """Тесты DatabaseManager с включенной битовой картой."""
+
+    def setUp(self) -> None:
+        """Подготовка временной базы данных."""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        temp_db.close()
+        self.db_path = temp_db.name
+        create_test_database(self.db_path, [("000001", None), ("000002", "Завершена")])
+        self.db_manager = DatabaseManager(self.db_path)
+        self.db_manager.enable_blank_index(use_sidecar=False)
+        self.addCleanup(self.db_manager.blank_index.close)
+
+    def tearDown(self) -> None:
+        """Удаление временной базы данных."""
+        try:
+            os.unlink(self.db_path)
+        except OSError:
+            pass
+
+    def test_not_found_without_query(self) -> None:
+        """Тест отказа для отсутствующего бланка по битовой карте."""
+        success, message = self.db_manager.complete_route_card("000123")
+        self.assertFalse(success)
+        self.assertIn("не найдена", message)
+
+    def test_completion_updates_index(self) -> None:
+        """Тест обновления битовой карты при завершении карты."""
+        success, _ = self.db_manager.complete_route_card("000001")
+        self.assertTrue(success)
+        self.assertTrue(self.db_manager.blank_index.completed("000001"))
+        self.assertTrue(self.db_manager.blank_index.is_fresh())
+        self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+
+    def test_rows_added_before_own_write_read(self) -> None:
+        """Тест бланков другой станции, добавленных между проверкой актуальности и записью."""
+        bitmap = self.db_manager.blank_index
+        self.assertTrue(bitmap.is_fresh())
+        create_test_database(self.db_path, [("000777", None)])
+
+        bitmap.note_write("000001", was_fresh=True)
+
+        self.assertTrue(bitmap.is_fresh())
+        self.assertTrue(bitmap.exists("000777"))
+        self.assertIsNone(bitmap.precheck_completed("000777"))
+
+    def test_completed_card_detected(self) -> None:
+        """Тест обнаружения завершенной карты."""
+        self.assertTrue(self.db_manager.check_route_card_completed("000002"))
+        self.assertFalse(self.db_manager.check_route_card_completed("000001"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""Тесты переноса завершенных карт прошлых лет в архивы по годам."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from card_archive import archive_completed_cards
+from card_import import import_cards, read_source
+from route_card_db import DatabaseManager, archive_path, find_archives
+from test_database_reports import DatabaseTestCase
+
+
+class TestCardArchive(DatabaseTestCase):
+    """Тесты архивирования и запросов истории с подключенными архивами."""
+
+    def setUp(self) -> None:
+        """Подготовка карт за три года: завершенных и незавершенных."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.addCleanup(self.remove_archives)
+        conn, cursor = self.db_manager.connect()
+        cursor.executemany(
+            """INSERT INTO маршрутные_карты
+               (Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания)
+               VALUES (?, ?, ?, ?, ?)""",
+            [
+                ("000001", "03-001/23", "К23/03-001", "Завершена", "2023-03-10 10:00:00"),
+                ("000002", "11-002/23", "К23/11-002", "Завершена", "2023-11-20 10:00:00"),
+                ("000003", "05-003/24", "К24/05-003", "Завершена", "2024-05-05 10:00:00"),
+                ("000004", None, None, None, "2024-06-01 10:00:00"),
+                ("000005", "02-005/25", "К25/02-005", "Завершена", "2025-02-01 10:00:00"),
+                ("000006", None, None, None, None),
+            ]
+        )
+        conn.commit()
+        conn.close()
+
+    def remove_archives(self) -> None:
+        """Удаление архивов временной базы."""
+        for path in find_archives(self.db_path).values():
+            os.unlink(path)
+
+    def history(self) -> tuple:
+        """Результаты запросов истории."""
+        db = self.db_manager
+        return (
+            [record.blank_number for record in db.search_records("0000")],
+            [record.blank_number for record in db.get_cards_by_period("2023-01-01", "2024-12-31")],
+            [record.blank_number for record in db.iter_cards("2023-01-01", "2025-12-31")],
+            db.get_cards_count_by_period("2023-01-01", "2023-12-31"),
+            db.get_completed_cards_by_period("2024-01-01", "2025-12-31"),
+            db.get_monthly_stats(),
+            db.get_monthly_stats(2023),
+            db.get_total_cards_count(),
+            db.get_completed_cards_count(),
+            db.get_incomplete_cards_count(),
+        )
+
+    def main_blanks(self) -> list:
+        """Номера бланков в основной таблице."""
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("SELECT Номер_бланка FROM маршрутные_карты ORDER BY id")
+        blanks = [blank for blank, in cursor.fetchall()]
+        conn.close()
+        return blanks
+
+    def test_archive_by_year(self) -> None:
+        """Тест переноса только завершенных карт до года отсечки."""
+        progress = []
+
+        results = archive_completed_cards(self.db_manager, 2025, on_progress=lambda *args: progress.append(args))
+
+        self.assertEqual([(year, count) for year, count, _ in results], [(2023, 2), (2024, 1)])
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+        self.assertEqual(find_archives(self.db_path), {
+            2023: archive_path(self.db_path, 2023), 2024: archive_path(self.db_path, 2024),
+        })
+        self.assertEqual(self.main_blanks(), ["000004", "000005", "000006"])
+        conn = sqlite3.connect(archive_path(self.db_path, 2023))
+        self.assertEqual(conn.execute("SELECT id, Номер_бланка FROM маршрутные_карты").fetchall(),
+                         [(1, "000001"), (2, "000002")])
+        conn.close()
+        self.assertEqual(archive_completed_cards(self.db_manager, 2025), [])
+
+    def test_history_sees_archives(self) -> None:
+        """Тест одинаковых результатов запросов истории до и после переноса."""
+        expected = self.history()
+
+        archive_completed_cards(self.db_manager, 2025)
+
+        self.assertEqual(self.history(), expected)
+        self.db_manager.enable_mirror()
+        self.addCleanup(self.db_manager.mirror.close)
+        self.assertEqual(self.history(), expected)
+        self.assertEqual(len(self.db_manager.mirror.records), 3)
+
+    def test_mirror_of_other_station_reloaded(self) -> None:
+        """Тест зеркала станции, в базе которой карты перенес в архив другой процесс."""
+        station = DatabaseManager(self.db_path)
+        self.addCleanup(station.recent_completions.close)
+        station.enable_mirror()
+        self.addCleanup(station.mirror.close)
+        self.assertEqual(station.get_total_cards_count(), 6)
+        self.assertEqual(station.check_blank_number("000001")["exists"], True)
+
+        archive_completed_cards(self.db_manager, 2025)
+
+        self.assertEqual(station.get_total_cards_count(), 6)
+        self.assertEqual(station.get_completed_cards_count(), 4)
+        self.assertEqual(station.get_monthly_stats(2023), [("03", "2023", 1), ("11", "2023", 1)])
+        self.assertEqual(station.check_blank_number("000001")["exists"], False)
+        self.assertEqual(len(station.mirror.records), 3)
+
+    def test_period_attaches_overlapping_years(self) -> None:
+        """Тест подключения к запросу за период только архивов его лет."""
+        archive_completed_cards(self.db_manager, 2025)
+
+        self.assertEqual(self.db_manager._archives("2024-01-01", "2025-12-31"),
+                         [(2024, archive_path(self.db_path, 2024))])
+        self.assertEqual(self.db_manager._archives("2025-01-01", "2025-12-31"), [])
+        self.assertEqual(self.db_manager.get_monthly_stats(2025), [("02", "2025", 1)])
+
+    def test_audit_and_import_see_archives(self) -> None:
+        """Тест отчетов о номерах и загрузки бланков с учетом архивов."""
+        self.insert_cards([("000007", "03-001/23", None, "Завершена")])
+        archive_completed_cards(self.db_manager, 2025)
+
+        self.assertEqual(list(self.db_manager.find_blank_sequence_issues("000001", "000007")), [])
+        self.assertEqual(self.db_manager.find_duplicate_numbers(),
+                         [("Учетный_номер", "03-001/23", 2, ["000001", "000007"])])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "серия.csv")
+            with open(path, "w", encoding="utf-8") as source:
+                source.write("Номер_бланка\n000002\n000008\n")
+            result = import_cards(self.db_manager, read_source(path))
+        self.assertEqual((result.inserted, result.duplicates), (1, 1))
+
+        bitmap = self.db_manager.enable_blank_index(use_sidecar=False)
+        self.assertTrue(bitmap.completed("000003"))
+        self.assertEqual(bitmap.max_id, 8)
+
+    def test_complete_archived_card(self) -> None:
+        """Тест сообщения о повторном завершении карты, перенесенной в архив."""
+        archive_completed_cards(self.db_manager, 2025)
+
+        self.assertEqual(self.db_manager.complete_route_card("000002"),
+                         (False, "Маршрутная карта №000002 уже завершена (архив 2023 года)"))
+        self.assertEqual(self.db_manager.complete_route_card("000099"),
+                         (False, "Маршрутная карта №000099 не найдена в базе данных"))
+        self.db_manager.enable_blank_index(use_sidecar=False)
+        self.assertEqual(self.db_manager.complete_route_cards(["000003", "000004"]), [
+            ("000003", False, "Маршрутная карта №000003 уже завершена (архив 2024 года)"),
+            ("000004", True, None),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
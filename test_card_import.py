@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""Тесты потоковой загрузки бланков маршрутных карт."""
+
+import os
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from card_export import export_cards
+from card_import import CardImportError, import_cards, read_source
+from test_database_reports import DatabaseTestCase
+
+
+class TestCardImport(DatabaseTestCase):
+    """Тесты загрузки из CSV и каталога документов."""
+
+    def setUp(self) -> None:
+        """Подготовка базы с одной картой и каталога для источников."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.insert_cards([("000005", None, None, None)])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write_source(self, name: str, text: str) -> str:
+        """Запись CSV-источника во временный каталог."""
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as source:
+            source.write(text)
+        return path
+
+    def blank_rows(self) -> list:
+        """Номера бланков, номера кластеров и пути к файлам в порядке id."""
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("SELECT Номер_бланка, Номер_кластера, Путь_к_файлу FROM маршрутные_карты ORDER BY id")
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def index_names(self) -> list:
+        """Имена индексов таблицы."""
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL ORDER BY name")
+        names = [name for name, in cursor.fetchall()]
+        conn.close()
+        return names
+
+    def test_csv_validation_and_duplicates(self) -> None:
+        """Тест проверки форматов и пропуска повторов в базе и внутри файла."""
+        path = self.write_source("серия.csv", "\n".join([
+            "Номер_кластера,Номер_бланка,Комментарий",
+            "К25/01-001,1,без ведущих нулей",
+            ",000002,",
+            ",000005,уже в базе",
+            ",000002,повтор в файле",
+            ",12345678,",
+            "K25/01-002,000003,латинская K",
+            ",000004",
+        ]))
+        rejected = []
+
+        result = import_cards(self.db_manager, read_source(path), batch_size=2,
+                              on_rejected=lambda *args: rejected.append(args))
+
+        self.assertEqual((result.inserted, result.duplicates, result.invalid), (3, 2, 2))
+        self.assertEqual(self.blank_rows()[1:], [
+            ("000001", "К25/01-001", None), ("000002", None, None), ("000004", None, None),
+        ])
+        self.assertEqual([location for location, _, _ in rejected], [4, 5, 6, 7])
+        self.assertIn("номер кластера", rejected[-1][2])
+
+    def test_extra_values_ignored(self) -> None:
+        """Тест строк с лишними значениями в конце: отсутствующие столбцы остаются пустыми."""
+        path = self.write_source("лишние.csv", "Номер_бланка;Статус\n000007;;К25/01-007;лишнее\n")
+
+        result = import_cards(self.db_manager, read_source(path))
+
+        self.assertEqual((result.inserted, result.invalid), (1, 0))
+        self.assertEqual(self.blank_rows()[-1], ("000007", None, None))
+
+    def test_export_round_trip(self) -> None:
+        """Тест загрузки выгрузки card_export в пустую базу."""
+        self.insert_cards([("000006", "01-001/25", "К25/01-001", "Завершена")])
+        path = os.path.join(self.temp_dir.name, "выгрузка.csv")
+        export_cards(self.db_manager, path)
+        expected = self.blank_rows()
+
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("DELETE FROM маршрутные_карты")
+        conn.commit()
+        conn.close()
+        result = import_cards(self.db_manager, read_source(path))
+
+        self.assertEqual(result.inserted, 2)
+        self.assertEqual(self.blank_rows(), expected)
+
+    def test_document_directory(self) -> None:
+        """Тест загрузки каталога документов с подкаталогами."""
+        series = os.path.join(self.temp_dir.name, "серия", "январь")
+        os.makedirs(series)
+        for name in ("маршрутная_карта_000010.pptx", "маршрутная_карта_000011.PPTX", "описание.txt"):
+            open(os.path.join(series, name), "w").close()
+        open(os.path.join(self.temp_dir.name, "серия", "маршрутная_карта_000005.pptx"), "w").close()
+
+        result = import_cards(self.db_manager, read_source(os.path.join(self.temp_dir.name, "серия")))
+
+        self.assertEqual((result.inserted, result.duplicates, result.invalid), (2, 1, 0))
+        imported = sorted(self.blank_rows()[1:])
+        self.assertEqual([blank for blank, _, _ in imported], ["000010", "000011"])
+        self.assertEqual(imported[0][2], os.path.join(series, "маршрутная_карта_000010.pptx"))
+
+    def test_deferred_indexes_restored(self) -> None:
+        """Тест восстановления индексов после загрузки и отчета о повторах учетных номеров."""
+        self.insert_cards([("000006", "01-001/25", "К25/01-001", "Завершена")])
+        self.db_manager.ensure_indexes()
+        indexes = self.index_names()
+        path = self.write_source("серия.csv", "Номер бланка;Учетный номер;Статус\n000007;01-001/25;Завершена\n")
+
+        result = import_cards(self.db_manager, read_source(path), defer_indexes=True)
+
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual([(column, value) for column, value, _, _ in result.conflicts],
+                         [("Учетный_номер", "01-001/25")])
+        self.assertEqual(self.index_names(), sorted(
+            name.replace("uq_", "idx_") if "учетный" in name else name for name in indexes
+        ))
+
+    def test_unique_numbers_of_completed_cards_rejected(self) -> None:
+        """Тест пропуска занятых учетных номеров и номеров кластеров без отмены пакета."""
+        self.insert_cards([("000006", "01-001/25", "К25/01-001", "Завершена")])
+        self.db_manager.ensure_indexes()
+        path = self.write_source("серия.csv", "\n".join([
+            "Номер бланка;Учетный номер;Номер кластера;Статус",
+            "000007;03-311/25;К25/03-296;Завершена",
+            "000008;03-311/25;К25/03-297;Завершена",
+            "000009;01-002/25;К25/01-001;Завершена",
+            "000010;01-001/25;;",
+            "000011;03-312/25;К25/03-298;Завершена",
+        ]))
+        rejected = []
+
+        result = import_cards(self.db_manager, read_source(path), batch_size=10,
+                              on_rejected=lambda *args: rejected.append(args))
+
+        self.assertEqual((result.inserted, result.duplicates, result.invalid), (3, 2, 0))
+        self.assertEqual([row[0] for row in self.blank_rows()], ["000005", "000006", "000007", "000010", "000011"])
+        self.assertEqual([(location, reason) for location, _, reason in rejected], [
+            (3, "учетный номер '03-311/25' уже есть у завершенной карты"),
+            (4, "номер кластера 'К25/01-001' уже есть у завершенной карты"),
+        ])
+
+    def test_source_errors(self) -> None:
+        """Тест отказа без столбца номера бланка и без источника."""
+        path = self.write_source("без_номера.csv", "Статус;Дата создания\n")
+        with self.assertRaises(CardImportError):
+            import_cards(self.db_manager, read_source(path))
+        with self.assertRaises(CardImportError):
+            read_source(os.path.join(self.temp_dir.name, "нет.csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""Тесты зеркала таблицы маршрутных карт в памяти."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from card_mirror import CardMirror, CardRecord, mirror_memory_per_row
+from route_card_db import DatabaseManager
+
+
+SAMPLE_ROWS = [
+    ("000001", "03-311/25", "К25/03-296", "Завершена", "2025-03-25 13:09:02"),
+    ("000002", "03-312/25", "К25/03-297", "Завершена", "2025-04-02 10:00:00"),
+    ("000003", None, None, None, None),
+    ("000004", "", "К25/04-001", "Завершена", "2025-04-15 09:30:00"),
+    ("000004", None, None, None, None),
+    ("000005", None, None, None, "2024-12-31 23:59:59"),
+]
+
+
+class TestCardMirror(unittest.TestCase):
+    """Тесты соответствия зеркала запросам к базе данных."""
+
+    def setUp(self) -> None:
+        """Подготовка временной базы данных."""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        temp_db.close()
+        self.db_path = temp_db.name
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS маршрутные_карты (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Номер_бланка TEXT,
+                Учетный_номер TEXT,
+                Номер_кластера TEXT,
+                Статус TEXT,
+                Дата_создания TEXT,
+                Путь_к_файлу TEXT
+            )
+        """)
+        conn.executemany(
+            """INSERT INTO маршрутные_карты
+               (Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания)
+               VALUES (?, ?, ?, ?, ?)""",
+            SAMPLE_ROWS
+        )
+        conn.commit()
+        conn.close()
+
+        self.sql_manager = DatabaseManager(self.db_path)
+        self.mirror_manager = DatabaseManager(self.db_path)
+        self.mirror_manager.enable_mirror()
+        self.addCleanup(self.mirror_manager.mirror.close)
+
+    def tearDown(self) -> None:
+        """Удаление временной базы данных."""
+        try:
+            os.unlink(self.db_path)
+        except OSError:
+            pass
+
+    def assert_same_answers(self) -> None:
+        """Проверка совпадения ответов зеркала и SQL-запросов."""
+        calls = [
+            ("get_all_records", (100, 0)),
+            ("get_all_records", (2, 1)),
+            ("search_records", ("К25/03",)),
+            ("search_records", ("00000",)),
+            ("get_total_cards_count", ()),
+            ("get_completed_cards_count", ()),
+            ("get_incomplete_cards_count", ()),
+            ("get_cards_count_by_period", ("2025-04-01", "2025-04-30")),
+            ("get_cards_count_by_period", ("2024-12-31", "2025-03-25")),
+            ("get_completed_cards_by_period", ("2000-01-01", "2030-12-31")),
+            ("get_cards_by_period", ("2025-03-25", "2025-04-15")),
+            ("get_monthly_stats", (None,)),
+            ("get_monthly_stats", (2025,)),
+            ("check_blank_number", ("000004",)),
+            ("check_blank_number", ("999999",)),
+            ("check_account_number", ("03-311/25",)),
+            ("check_account_number", ("",)),
+            ("check_cluster_number", ("К25/04-001",)),
+            ("check_route_card_completed", ("000004",)),
+            ("check_route_card_completed", ("000003",)),
+        ]
+        for name, args in calls:
+            with self.subTest(method=name, args=args):
+                expected = getattr(self.sql_manager, name)(*args)
+                actual = getattr(self.mirror_manager, name)(*args)
+                self.assertEqual(actual, expected)
+
+    def test_mirror_matches_sql(self) -> None:
+        """Тест совпадения ответов зеркала с базой данных."""
+        self.assert_same_answers()
+        self.assertTrue(self.mirror_manager.mirror.loaded)
+
+    def test_lazy_loading(self) -> None:
+        """Тест загрузки зеркала только при первом чтении."""
+        self.assertFalse(self.mirror_manager.mirror.loaded)
+        self.mirror_manager.get_total_cards_count()
+        self.assertTrue(self.mirror_manager.mirror.loaded)
+
+    def test_records_are_compact(self) -> None:
+        """Тест типа записей зеркала."""
+        records = self.mirror_manager.get_all_records()
+        self.assertIsInstance(records[0], CardRecord)
+        self.assertFalse(hasattr(records[0], "__dict__"))
+        self.assertEqual(records[0].blank_number, "000005")
+        self.assertGreater(mirror_memory_per_row(self.mirror_manager.mirror), 0)
+
+    def test_write_through_completion(self) -> None:
+        """Тест применения собственной записи к зеркалу."""
+        self.mirror_manager.get_total_cards_count()
+
+        success, _ = self.mirror_manager.complete_route_card("000003")
+
+        self.assertTrue(success)
+        self.assertTrue(self.mirror_manager.mirror.is_current())
+        self.assertTrue(self.mirror_manager.check_route_card_completed("000003"))
+        self.assert_same_answers()
+
+    def test_write_through_update_card_info(self) -> None:
+        """Тест применения обновления учетного номера к зеркалу."""
+        self.mirror_manager.get_total_cards_count()
+
+        self.assertTrue(self.mirror_manager.update_card_info("000003", "05-002/25", "К25/05-099"))
+
+        self.assertTrue(self.mirror_manager.check_account_number("05-002/25"))
+        self.assert_same_answers()
+
+    def test_changes_from_other_connection(self) -> None:
+        """Тест обнаружения изменений других станций через data_version."""
+        self.mirror_manager.get_total_cards_count()
+
+        self.sql_manager.complete_route_card("000005")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO маршрутные_карты (Номер_бланка, Дата_создания) VALUES (?, ?)",
+            ("000006", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(self.mirror_manager.get_total_cards_count(), 7)
+        self.assertTrue(self.mirror_manager.check_route_card_completed("000005"))
+        self.assert_same_answers()
+
+    def test_mirror_unavailable_falls_back(self) -> None:
+        """Тест отказа зеркала при недоступной базе данных."""
+        mirror = CardMirror(self.db_path + ".missing")
+        self.addCleanup(mirror.close)
+        self.assertFalse(mirror.ensure_current())
+        self.assertFalse(os.path.exists(self.db_path + ".missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
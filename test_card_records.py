@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Тесты типизированных записей маршрутных карт."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from card_records import CardRecord, display_cells
+from route_card_db import DatabaseManager
+
+
+class TestCardRecords(unittest.TestCase):
+    """Тесты записей, возвращаемых DatabaseManager."""
+
+    def setUp(self) -> None:
+        """Подготовка временной базы данных с дополнительным столбцом."""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        temp_db.close()
+        self.db_path = temp_db.name
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE маршрутные_карты (
+                Комментарий TEXT,
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Номер_бланка TEXT,
+                Учетный_номер TEXT,
+                Номер_кластера TEXT,
+                Статус TEXT,
+                Дата_создания TEXT,
+                Путь_к_файлу TEXT
+            )
+        """)
+        conn.executemany(
+            """INSERT INTO маршрутные_карты
+               (Комментарий, Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                ("первая", "000001", "03-311/25", "К25/03-296", "Завершена", "2025-03-25 13:09:02"),
+                ("вторая", "000002", None, None, None, "2025-03-26 10:00:00"),
+            ]
+        )
+        conn.commit()
+        conn.close()
+
+        self.db_manager = DatabaseManager(self.db_path)
+
+    def tearDown(self) -> None:
+        """Удаление временной базы данных."""
+        try:
+            os.unlink(self.db_path)
+        except OSError:
+            pass
+
+    def test_records_have_named_fields(self) -> None:
+        """Тест именованных полей записей при измененной схеме таблицы."""
+        records = self.db_manager.get_all_records()
+
+        self.assertEqual(len(records), 2)
+        self.assertIsInstance(records[0], CardRecord)
+        self.assertEqual(records[0].blank_number, "000002")
+        self.assertEqual(records[1].account_number, "03-311/25")
+        self.assertEqual(records[1].created_at, "2025-03-25 13:09:02")
+        self.assertFalse(hasattr(records[0], "__dict__"))
+
+    def test_check_blank_number_with_extra_columns(self) -> None:
+        """Тест проверки бланка независимо от порядка столбцов таблицы."""
+        result = self.db_manager.check_blank_number("000001")
+
+        self.assertEqual(result, {
+            "exists": True,
+            "id": 1,
+            "account_number": "03-311/25",
+            "cluster_number": "К25/03-296",
+            "status": "Завершена",
+        })
+
+    def test_search_and_period_return_records(self) -> None:
+        """Тест типа записей поиска и выборки за период."""
+        for records in (
+            self.db_manager.search_records("К25"),
+            self.db_manager.get_cards_by_period("2025-03-01", "2025-03-31"),
+        ):
+            with self.subTest(records=records):
+                self.assertTrue(records)
+                self.assertTrue(all(isinstance(record, CardRecord) for record in records))
+
+    def test_display_cells_cached(self) -> None:
+        """Тест форматирования строк для отображения."""
+        record = CardRecord(1, "000001", None, "К25/03-296", "Завершена", None)
+
+        cells = display_cells(record)
+
+        self.assertEqual(cells, ("1", "000001", "", "К25/03-296", "Завершена", ""))
+        self.assertIs(display_cells(CardRecord(*record)), cells)
+        self.assertEqual(display_cells([1, None]), ("1", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""Тесты отчетов DatabaseManager по целостности данных."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from route_card_db import DatabaseManager
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Базовый класс тестов с временной базой данных."""
+
+    def setUp(self) -> None:
+        """Подготовка временной базы данных."""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        temp_db.close()
+        self.db_path = temp_db.name
+        self.db_manager = DatabaseManager(self.db_path)
+
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS маршрутные_карты (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Номер_бланка TEXT,
+                Учетный_номер TEXT,
+                Номер_кластера TEXT,
+                Статус TEXT,
+                Дата_создания TEXT,
+                Путь_к_файлу TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self) -> None:
+        """Удаление временной базы данных."""
+        try:
+            os.unlink(self.db_path)
+        except OSError:
+            pass
+
+    def insert_cards(self, rows: list) -> None:
+        """Добавление карт (Номер_бланка, Учетный_номер, Номер_кластера, Статус)."""
+        conn, cursor = self.db_manager.connect()
+        cursor.executemany(
+            """INSERT INTO маршрутные_карты
+               (Номер_бланка, Учетный_номер, Номер_кластера, Статус)
+               VALUES (?, ?, ?, ?)""",
+            rows
+        )
+        conn.commit()
+        conn.close()
+
+    def insert_blanks(self, numbers: list) -> None:
+        """Добавление пустых бланков с указанными номерами."""
+        self.insert_cards([(number, None, None, None) for number in numbers])
+
+
+class TestBlankSequenceIssues(DatabaseTestCase):
+    """Тесты поиска пропусков и дубликатов номеров бланков."""
+
+    def test_no_issues_in_complete_range(self) -> None:
+        """Тест диапазона без пропусков и дубликатов."""
+        self.insert_blanks([f"{n:06d}" for n in range(1, 11)])
+
+        issues = list(self.db_manager.find_blank_sequence_issues("000001", "000010"))
+
+        self.assertEqual(issues, [])
+
+    def test_gaps_and_duplicates(self) -> None:
+        """Тест обнаружения пропусков и дубликатов."""
+        self.insert_blanks(["000001", "000002", "000002", "000005", "000006", "000006", "000006"])
+
+        issues = list(self.db_manager.find_blank_sequence_issues("000001", "000008"))
+
+        self.assertEqual(issues, [
+            ("duplicate", "000002", "000002", 2),
+            ("gap", "000003", "000004", 2),
+            ("duplicate", "000006", "000006", 3),
+            ("gap", "000007", "000008", 2),
+        ])
+
+    def test_empty_range_is_one_gap(self) -> None:
+        """Тест диапазона без бланков."""
+        issues = list(self.db_manager.find_blank_sequence_issues("000100", "000199"))
+
+        self.assertEqual(issues, [("gap", "000100", "000199", 100)])
+
+    def test_gap_across_chunk_boundary(self) -> None:
+        """Тест пропуска, пересекающего границу участков."""
+        self.insert_blanks(["000001", "000002", "000009", "000010"])
+
+        with patch("route_card_db.AUDIT_CHUNK_SIZE", 4):
+            issues = list(self.db_manager.find_blank_sequence_issues("000001", "000010"))
+
+        self.assertEqual(issues, [("gap", "000003", "000008", 6)])
+
+    def test_gap_ending_at_chunk_boundary(self) -> None:
+        """Тест пропуска, заканчивающегося на границе участка."""
+        self.insert_blanks(["000001", "000005", "000006", "000007", "000008"])
+
+        with patch("route_card_db.AUDIT_CHUNK_SIZE", 4):
+            issues = list(self.db_manager.find_blank_sequence_issues("000001", "000008"))
+
+        self.assertEqual(issues, [("gap", "000002", "000004", 3)])
+
+    def test_non_canonical_numbers_ignored(self) -> None:
+        """Тест игнорирования номеров в нестандартном формате."""
+        self.insert_blanks(["000001", "2", "00000x", "000003"])
+
+        issues = list(self.db_manager.find_blank_sequence_issues("000001", "000003"))
+
+        self.assertEqual(issues, [("gap", "000002", "000002", 1)])
+
+    def test_invalid_range(self) -> None:
+        """Тест некорректного диапазона."""
+        self.assertEqual(list(self.db_manager.find_blank_sequence_issues("000010", "000001")), [])
+        self.assertEqual(list(self.db_manager.find_blank_sequence_issues("abc", "000001")), [])
+
+
+class TestDuplicateNumbers(DatabaseTestCase):
+    """Тесты поиска конфликтов и уникальных индексов."""
+
+    def index_names(self) -> set:
+        """Получение имен индексов временной базы данных."""
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        names = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return names
+
+    def test_find_duplicate_numbers(self) -> None:
+        """Тест группировки конфликтов за один запрос."""
+        self.insert_cards([
+            ("000001", "05-001/25", "К25/05-001", "Завершена"),
+            ("000002", "05-001/25", "К25/05-002", "Завершена"),
+            ("000003", "05-003/25", "К25/05-002", "Завершена"),
+            ("000004", "05-001/25", "К25/05-004", None),
+        ])
+
+        conflicts = self.db_manager.find_duplicate_numbers()
+
+        self.assertEqual(conflicts, [
+            ("Номер_кластера", "К25/05-002", 2, ["000002", "000003"]),
+            ("Учетный_номер", "05-001/25", 2, ["000001", "000002"]),
+        ])
+
+    def test_empty_values_are_not_conflicts(self) -> None:
+        """Тест игнорирования пустых номеров."""
+        self.insert_cards([
+            ("000001", "", None, "Завершена"),
+            ("000002", "", None, "Завершена"),
+        ])
+
+        self.assertEqual(self.db_manager.find_duplicate_numbers(), [])
+
+    def test_unique_indexes_created_without_conflicts(self) -> None:
+        """Тест создания уникальных индексов для чистой базы."""
+        self.insert_cards([("000001", "05-001/25", "К25/05-001", "Завершена")])
+
+        self.assertEqual(self.db_manager.ensure_indexes(), [])
+
+        names = self.index_names()
+        self.assertIn("uq_маршрутные_карты_учетный_номер", names)
+        self.assertIn("uq_маршрутные_карты_номер_кластера", names)
+        self.assertIn("idx_маршрутные_карты_номер_бланка", names)
+
+    def test_conflicts_reported_and_plain_index_created(self) -> None:
+        """Тест отчета о конфликтах при миграции."""
+        self.insert_cards([
+            ("000001", "05-001/25", "К25/05-001", "Завершена"),
+            ("000002", "05-001/25", "К25/05-002", "Завершена"),
+        ])
+
+        conflicts = self.db_manager.ensure_indexes()
+
+        self.assertEqual(conflicts, [("Учетный_номер", "05-001/25", 2, ["000001", "000002"])])
+        names = self.index_names()
+        self.assertIn("idx_маршрутные_карты_учетный_номер", names)
+        self.assertNotIn("uq_маршрутные_карты_учетный_номер", names)
+        self.assertIn("uq_маршрутные_карты_номер_кластера", names)
+
+    def test_existing_unique_indexes_skip_conflict_scan(self) -> None:
+        """Тест повторного запуска без поиска конфликтов при готовых индексах."""
+        self.insert_cards([("000001", "05-001/25", "К25/05-001", "Завершена")])
+        self.db_manager.ensure_indexes()
+
+        with patch.object(self.db_manager, "_find_duplicate_numbers") as find_duplicates:
+            self.assertEqual(self.db_manager.ensure_indexes(), [])
+
+        find_duplicates.assert_not_called()
+
+    def test_unique_index_rejects_duplicate_on_write(self) -> None:
+        """Тест отказа в записи повторяющегося учетного номера."""
+        self.insert_cards([
+            ("000001", "05-001/25", "К25/05-001", "Завершена"),
+            ("000002", None, None, None),
+        ])
+        self.db_manager.ensure_indexes()
+
+        self.assertFalse(self.db_manager.update_card_info("000002", "05-001/25", "К25/05-002"))
+        self.assertTrue(self.db_manager.update_card_info("000002", "05-002/25", "К25/05-002"))
+
+    def test_checks_use_partial_indexes(self) -> None:
+        """Тест проверки номеров по индексам."""
+        self.insert_cards([("000001", "05-001/25", "К25/05-001", "Завершена")])
+        self.db_manager.ensure_indexes()
+
+        self.assertTrue(self.db_manager.check_account_number("05-001/25"))
+        self.assertFalse(self.db_manager.check_account_number("05-002/25"))
+        self.assertTrue(self.db_manager.check_cluster_number("К25/05-001"))
+        self.assertFalse(self.db_manager.check_cluster_number(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Тесты резервного копирования базы данных через sqlite3 backup."""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+import db_backup
+from db_backup import BackupError, BackupScheduler, create_backup, list_backups, rotate_backups
+from test_database_reports import DatabaseTestCase
+
+
+class TestDatabaseBackup(DatabaseTestCase):
+    """Тесты создания, проверки и ротации копий."""
+
+    def setUp(self) -> None:
+        """Подготовка базы с картами и каталога копий."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.insert_cards([(f"{n:06d}", None, None, None) for n in range(1, 2001)])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.backup_dir = self.temp_dir.name
+
+    def count_cards(self, path: str) -> int:
+        """Количество карт в файле базы данных."""
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM маршрутные_карты").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_backup_in_steps(self) -> None:
+        """Тест копирования по шагам с записью другой станции между шагами."""
+        progress = []
+
+        def on_progress(copied: int, total: int) -> None:
+            progress.append((copied, total))
+            if len(progress) == 1:
+                self.insert_cards([("002001", None, None, None)])
+
+        path = create_backup(self.db_path, self.backup_dir, pages=2, pause=0, on_progress=on_progress)
+
+        self.assertEqual(list_backups(self.db_path, self.backup_dir), [path])
+        self.assertEqual(self.count_cards(path), 2001)
+        self.assertGreater(len(progress), 2)
+        self.assertEqual(progress[-1][0], progress[-1][1])
+        self.assertEqual(os.listdir(self.backup_dir), [os.path.basename(path)])
+
+    def test_backup_finishes_under_constant_writes(self) -> None:
+        """Тест копирования за один шаг, если запись другой станции перезапускает копирование."""
+        stop = threading.Event()
+        written = []
+
+        def writer() -> None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            try:
+                while not stop.is_set():
+                    conn.execute("INSERT INTO маршрутные_карты (Номер_бланка) VALUES ('100000')")
+                    conn.commit()
+                    written.append(1)
+                    time.sleep(0.0005)
+            finally:
+                conn.close()
+
+        progress = []
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            while not written:
+                time.sleep(0.001)
+            path = create_backup(self.db_path, self.backup_dir, pages=1, pause=0.002,
+                                 on_progress=lambda copied, total: progress.append(copied), max_restarts=2)
+        finally:
+            stop.set()
+            thread.join()
+
+        restarts = sum(1 for previous, copied in zip(progress, progress[1:]) if copied <= previous)
+        self.assertGreater(restarts, 2)
+        self.assertEqual(db_backup.integrity_check(path), [])
+        self.assertGreaterEqual(self.count_cards(path), 2000)
+
+    def test_failed_check_leaves_no_copy(self) -> None:
+        """Тест отказа сохранять копию, не прошедшую проверку целостности."""
+        with patch.object(db_backup, "integrity_check", return_value=["*** in database main ***"]):
+            with self.assertRaises(BackupError):
+                create_backup(self.db_path, self.backup_dir)
+
+        self.assertEqual(os.listdir(self.backup_dir), [])
+
+    def test_rotation_keeps_newest(self) -> None:
+        """Тест удаления старых копий сверх заданного количества."""
+        prefix = os.path.splitext(os.path.basename(self.db_path))[0]
+        for stamp in ("20250101_000000", "20250102_000000", "20250103_000000"):
+            open(os.path.join(self.backup_dir, f"{prefix}_{stamp}.db"), "w").close()
+        open(os.path.join(self.backup_dir, "другая_база_20250101_000000.db"), "w").close()
+
+        path = create_backup(self.db_path, self.backup_dir, keep=2)
+        removed = rotate_backups(self.db_path, self.backup_dir, keep=2)
+
+        self.assertEqual(removed, [])
+        self.assertEqual(
+            [os.path.basename(backup) for backup in list_backups(self.db_path, self.backup_dir)],
+            [f"{prefix}_20250103_000000.db", os.path.basename(path)]
+        )
+        self.assertIn("другая_база_20250101_000000.db", os.listdir(self.backup_dir))
+
+    def test_scheduler(self) -> None:
+        """Тест копирования по расписанию в фоновом потоке."""
+        scheduler = BackupScheduler(self.db_path, interval=60, backup_dir=self.backup_dir).start()
+        self.addCleanup(scheduler.close)
+        deadline = time.monotonic() + 5
+        while scheduler.last_backup is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scheduler.close()
+
+        self.assertIsNotNone(scheduler.last_backup)
+        self.assertEqual(self.count_cards(scheduler.last_backup), 2000)
+        self.assertGreater(BackupScheduler(self.db_path, 60, self.backup_dir).next_delay(), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
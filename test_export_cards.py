@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""Тесты потоковой выгрузки маршрутных карт в CSV и XLSX."""
+
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from kivy.clock import Clock
+
+import card_export
+from card_export import CSV_DELIMITER, EXPORT_HEADERS, ExportError, export_cards
+from query_control import QueryCancelled, QueryControl
+from route_card_app import RouteCardApp
+from test_database_reports import DatabaseTestCase
+
+
+def read_csv(path: str) -> list:
+    """Чтение CSV-файла отчета."""
+    with open(path, newline="", encoding="utf-8-sig") as source:
+        return list(csv.reader(source, delimiter=CSV_DELIMITER))
+
+
+class TestExportCards(DatabaseTestCase):
+    """Тесты выгрузки карт и сводки за период."""
+
+    def setUp(self) -> None:
+        """Подготовка карт за 2024 и 2025 годы и каталога для отчетов."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        conn, cursor = self.db_manager.connect()
+        cursor.executemany(
+            """INSERT INTO маршрутные_карты (Номер_бланка, Статус, Дата_создания)
+               VALUES (?, ?, ?)""",
+            [
+                (f"{n:06d}", "Завершена" if n % 2 else "Не заполнена", f"{2024 + n % 2}-{n % 3 + 1:02d}-10 12:00:00")
+                for n in range(1, 31)
+            ]
+        )
+        conn.commit()
+        conn.close()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_csv_period_export(self) -> None:
+        """Тест выгрузки карт за период в порядке id со сводкой в соседнем файле."""
+        path = os.path.join(self.temp_dir.name, "отчет.csv")
+        progress = []
+
+        with patch.object(card_export, "EXPORT_CHUNK_SIZE", 4):
+            written = export_cards(self.db_manager, path, "2025-01-01", "2025-12-31",
+                                   on_progress=lambda done, total: progress.append((done, total)))
+
+        rows = read_csv(path)
+        self.assertEqual(written, 15)
+        self.assertEqual(tuple(rows[0]), EXPORT_HEADERS)
+        self.assertEqual([int(row[0]) for row in rows[1:]], list(range(1, 31, 2)))
+        self.assertEqual(progress[0], (0, 15))
+        self.assertEqual(progress[-1], (15, 15))
+        self.assertIn((4, 15), progress)
+
+        summary = read_csv(os.path.join(self.temp_dir.name, "отчет_сводка.csv"))
+        self.assertIn(["Всего карт", "15"], summary)
+        self.assertIn(["Заполненные карты", "15"], summary)
+        self.assertIn(["2025", "02", "5"], summary)
+
+    def test_export_all_cards(self) -> None:
+        """Тест выгрузки всех карт без периода."""
+        path = os.path.join(self.temp_dir.name, "все.csv")
+
+        self.assertEqual(export_cards(self.db_manager, path), 30)
+        self.assertEqual(len(read_csv(path)), 31)
+        self.assertIn(["Период", "Все время"], read_csv(os.path.join(self.temp_dir.name, "все_сводка.csv")))
+
+    def test_cancelled_export_leaves_no_file(self) -> None:
+        """Тест отсутствия неполного отчета после отмены."""
+        path = os.path.join(self.temp_dir.name, "отмена.csv")
+        control = QueryControl()
+
+        def cancel_after_first_chunk(done: int, total: int) -> None:
+            if done:
+                control.cancel()
+
+        with patch.object(card_export, "EXPORT_CHUNK_SIZE", 4):
+            with self.assertRaises(QueryCancelled):
+                export_cards(self.db_manager, path, control=control, on_progress=cancel_after_first_chunk)
+
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_failed_export_leaves_no_summary(self) -> None:
+        """Тест отсутствия файла сводки, если файл карт не сохранен."""
+        path = os.path.join(self.temp_dir.name, "ошибка.csv")
+
+        with patch.object(card_export.os, "replace", side_effect=OSError("нет места")):
+            with self.assertRaises(OSError):
+                export_cards(self.db_manager, path)
+
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_unsupported_format(self) -> None:
+        """Тест отказа при неизвестном расширении и без openpyxl для XLSX."""
+        with self.assertRaises(ExportError):
+            export_cards(self.db_manager, os.path.join(self.temp_dir.name, "отчет.txt"))
+        with patch.object(card_export, "openpyxl", None):
+            with self.assertRaises(ExportError):
+                export_cards(self.db_manager, os.path.join(self.temp_dir.name, "отчет.xlsx"))
+
+    @unittest.skipUnless(card_export.xlsx_available(), "openpyxl не установлен")
+    def test_xlsx_export(self) -> None:
+        """Тест выгрузки карт и сводки на листы XLSX."""
+        import openpyxl
+
+        path = os.path.join(self.temp_dir.name, "отчет.xlsx")
+        export_cards(self.db_manager, path, "2024-01-01", "2024-12-31")
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        self.assertEqual(workbook.sheetnames, ["Карты", "Сводка"])
+        self.assertEqual(len(list(workbook["Карты"].rows)), 16)
+        workbook.close()
+
+    def test_stats_tab_export(self) -> None:
+        """Тест выгрузки из вкладки статистики в фоновом потоке."""
+        app = RouteCardApp()
+        app.db_manager = self.db_manager
+        app.build_stats_tab()
+        app.show_popup = MagicMock()
+        path = os.path.join(self.temp_dir.name, "вкладка.csv")
+
+        app.start_export(path, None, None)
+        app._export_thread.join(5)
+        Clock.tick()
+
+        self.assertIsNone(app.export_control)
+        self.assertEqual(app.export_status_label.text, "")
+        self.assertEqual(len(read_csv(path)), 31)
+        title, message = app.show_popup.call_args[0]
+        self.assertIn("Выгружено карт: 30", message)
+
+
+if __name__ == "__main__":
+    unittest.main()
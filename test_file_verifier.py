@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Тесты проверки документов маршрутных карт по Путь_к_файлу."""
+
+import os
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from file_verifier import normalize_card_path, verify_card_files
+from route_card_app import RouteCardApp
+from route_card_db import FILE_EMPTY, FILE_FOUND, FILE_MISNAMED, FILE_MISSING, FILE_NO_PATH
+from test_database_reports import DatabaseTestCase
+
+
+class TestNormalizeCardPath(unittest.TestCase):
+    """Тесты приведения путей в стиле Windows."""
+
+    @unittest.skipIf(os.sep == "\\", "пути POSIX")
+    def test_windows_paths(self) -> None:
+        """Тест относительных путей, путей с буквой диска и UNC-путей."""
+        self.assertEqual(normalize_card_path("Карты\\маршрутная_карта_000001.pptx", "/mnt/share"),
+                         "/mnt/share/Карты/маршрутная_карта_000001.pptx")
+        self.assertEqual(normalize_card_path("D:\\Карты\\a.pptx", "/mnt/share"), "/mnt/share/Карты/a.pptx")
+        self.assertEqual(normalize_card_path("\\\\server\\docs\\a.pptx", "/mnt/share"), "/mnt/share/a.pptx")
+        self.assertIsNone(normalize_card_path("  ", "/mnt/share"))
+
+
+class TestVerifyCardFiles(DatabaseTestCase):
+    """Тесты проверки файлов с записью в служебную таблицу."""
+
+    def setUp(self) -> None:
+        """Подготовка каталога документов и карт с разными состояниями файлов."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = self.temp_dir.name
+        self.documents = os.path.join(self.root, "Маршрутные_карты")
+        os.makedirs(self.documents)
+        for name, content in (("маршрутная_карта_000001.pptx", "x"),
+                              ("маршрутная_карта_000003.pptx", ""),
+                              ("маршрутная_карта_000099.pptx", "x")):
+            with open(os.path.join(self.documents, name), "w") as document:
+                document.write(content)
+
+        conn, cursor = self.db_manager.connect()
+        cursor.executemany(
+            "INSERT INTO маршрутные_карты (Номер_бланка, Путь_к_файлу) VALUES (?, ?)",
+            [
+                ("000001", "Маршрутные_карты\\маршрутная_карта_000001.pptx"),
+                ("000002", "Маршрутные_карты\\маршрутная_карта_000002.pptx"),
+                ("000003", "Маршрутные_карты\\маршрутная_карта_000003.pptx"),
+                ("000004", "Маршрутные_карты\\маршрутная_карта_000099.pptx"),
+                ("000005", None),
+            ]
+        )
+        conn.commit()
+        conn.close()
+        self.db_manager.ensure_indexes()
+
+    def set_directory_mtime(self, mtime: float) -> None:
+        """Установка времени изменения каталога документов."""
+        os.utime(self.documents, (mtime, mtime))
+
+    def test_states_and_problems(self) -> None:
+        """Тест состояний файлов и списка проблемных карт."""
+        summary = verify_card_files(self.db_manager, self.root, workers=2, chunk_size=2)
+
+        self.assertEqual(summary, {
+            FILE_FOUND: 1, FILE_MISSING: 1, FILE_EMPTY: 1, FILE_MISNAMED: 1, FILE_NO_PATH: 1, "проверено": 5,
+        })
+        problems = self.db_manager.get_file_problems()
+        self.assertEqual([(blank, state) for _, blank, _, state, _ in problems], [
+            ("000002", FILE_MISSING), ("000003", FILE_EMPTY), ("000004", FILE_MISNAMED), ("000005", FILE_NO_PATH),
+        ])
+
+    def test_incremental_recheck(self) -> None:
+        """Тест повторной проверки только измененных карт и каталогов."""
+        self.set_directory_mtime(1000000000)
+        verify_card_files(self.db_manager, self.root)
+        self.assertEqual(verify_card_files(self.db_manager, self.root)["проверено"], 0)
+
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("UPDATE маршрутные_карты SET Путь_к_файлу = ? WHERE Номер_бланка = '000004'",
+                       ("Маршрутные_карты\\маршрутная_карта_000004.pptx",))
+        conn.commit()
+        conn.close()
+        summary = verify_card_files(self.db_manager, self.root)
+        self.assertEqual(summary["проверено"], 1)
+        self.assertEqual(summary[FILE_MISSING], 2)
+
+        os.unlink(os.path.join(self.documents, "маршрутная_карта_000001.pptx"))
+        self.set_directory_mtime(1000000100)
+        summary = verify_card_files(self.db_manager, self.root)
+        self.assertEqual(summary["проверено"], 4)
+        self.assertEqual(summary[FILE_MISSING], 3)
+        self.assertEqual(verify_card_files(self.db_manager, self.root, full=True)["проверено"], 5)
+
+    def test_deleted_cards_removed(self) -> None:
+        """Тест удаления результатов для удаленных карт."""
+        verify_card_files(self.db_manager, self.root)
+        conn, cursor = self.db_manager.connect()
+        cursor.execute("DELETE FROM маршрутные_карты WHERE Номер_бланка = '000002'")
+        conn.commit()
+        conn.close()
+
+        summary = verify_card_files(self.db_manager, self.root)
+
+        self.assertNotIn(FILE_MISSING, summary)
+
+    def test_view_tab_shows_problems(self) -> None:
+        """Тест отображения проблемных файлов на вкладке просмотра."""
+        app = RouteCardApp()
+        app.db_manager = self.db_manager
+        app.build_view_tab()
+        app.show_file_problems()
+        self.assertEqual(len(app.scroll_view.children), 1)
+        self.assertFalse(hasattr(app.scroll_view.children[0], "cols"))
+
+        verify_card_files(self.db_manager, self.root)
+        app.show_file_problems()
+        texts = [child.text for child in app.data_table.children]
+        self.assertIn(FILE_MISNAMED, texts)
+        self.assertNotIn("000001", texts)
+
+
+if __name__ == "__main__":
+    unittest.main()
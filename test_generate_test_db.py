@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Тесты генератора баз данных и бенчмарка методов DatabaseManager."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from bench_database import find_regressions, missing_benchmarks, run_size
+from generate_test_db import generate_database, parse_status_mix
+from route_card_db import (
+    ACCOUNT_NUMBER_PATTERN,
+    CLUSTER_NUMBER_PATTERN,
+    DatabaseManager,
+    validate_route_card_number,
+)
+
+
+class TestGenerateDatabase(unittest.TestCase):
+    """Тесты генератора баз данных."""
+
+    def setUp(self) -> None:
+        """Подготовка временного каталога."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "test.db")
+
+    def test_rows_formats_and_status_mix(self) -> None:
+        """Тест количества строк, форматов номеров и долей статусов."""
+        summary = generate_database(
+            self.db_path, 2000, {"Завершена": 0.5, None: 0.5},
+            start_date="2025-01-01", end_date="2025-06-30"
+        )
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            """SELECT Номер_бланка, Учетный_номер, Номер_кластера, Статус, Дата_создания
+               FROM маршрутные_карты"""
+        ).fetchall()
+        conn.close()
+
+        self.assertEqual(len(rows), 2000)
+        completed = [row for row in rows if row[3] == "Завершена"]
+        self.assertEqual(summary["completed"], len(completed))
+        self.assertTrue(800 < len(completed) < 1200)
+        for blank, account, cluster, status, created_at in rows:
+            self.assertTrue(validate_route_card_number(blank)[0])
+            self.assertTrue("2025-01-01" <= created_at < "2025-07-01")
+            if status == "Завершена":
+                self.assertRegex(account, ACCOUNT_NUMBER_PATTERN)
+                self.assertRegex(cluster, CLUSTER_NUMBER_PATTERN)
+                self.assertEqual(account[:2], created_at[5:7])
+            else:
+                self.assertIsNone(account)
+        self.assertEqual(summary["repeated_account_numbers"], 0)
+
+    def test_unique_indexes_created(self) -> None:
+        """Тест создания уникальных индексов без конфликтов."""
+        generate_database(self.db_path, 1000)
+
+        self.assertEqual(DatabaseManager(self.db_path).find_duplicate_numbers(), [])
+        conn = sqlite3.connect(self.db_path)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        conn.close()
+        self.assertIn("uq_маршрутные_карты_учетный_номер", indexes)
+
+    def test_existing_file_not_overwritten(self) -> None:
+        """Тест отказа перезаписать существующий файл."""
+        open(self.db_path, "w").close()
+
+        with self.assertRaises(FileExistsError):
+            generate_database(self.db_path, 10)
+        self.assertEqual(os.path.getsize(self.db_path), 0)
+
+    def test_parse_status_mix(self) -> None:
+        """Тест разбора долей статусов."""
+        self.assertEqual(parse_status_mix("Завершена=3,NULL=1"), {"Завершена": 0.75, None: 0.25})
+        with self.assertRaises(ValueError):
+            parse_status_mix("Завершена")
+
+
+class TestBenchDatabase(unittest.TestCase):
+    """Тесты бенчмарка методов DatabaseManager."""
+
+    def test_all_public_methods_benchmarked(self) -> None:
+        """Тест наличия замера для каждого публичного метода."""
+        self.assertEqual(missing_benchmarks(), [])
+
+    def test_run_on_small_database(self) -> None:
+        """Тест выполнения всех замеров на маленькой базе."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "bench.db")
+            generate_database(db_path, 500)
+            results = run_size(db_path, 500, calls=2, slow_calls=1, seed=1)
+
+        self.assertEqual(results["check_blank_number"]["calls"], 2)
+        self.assertEqual(results["get_monthly_stats"]["calls"], 1)
+
+    def test_find_regressions(self) -> None:
+        """Тест определения регрессий по порогам и предыдущему результату."""
+        results = {"1000": {"search_records": {"p50_ms": 10.0}, "get_all_records": {"p50_ms": 1.0}}}
+
+        regressions = find_regressions(
+            results,
+            thresholds={"1000": {"search_records": 5.0, "get_all_records": 5.0}},
+            baseline={"1000": {"get_all_records": {"p50_ms": 0.5}}},
+            tolerance=0.5
+        )
+
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("search_records", regressions[0])
+        self.assertIn("get_all_records", regressions[1])
+        self.assertEqual(find_regressions(results, baseline={"1000": {"get_all_records": {"p50_ms": 0.99}}}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
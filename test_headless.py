@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""Тесты приема сканов без графического интерфейса."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from batch_writer import BatchWriter
+from headless import format_result, ingest_lines, start_journal_replay
+from route_card_db import DatabaseUnavailableError, validate_route_card_number
+from scan_journal import ScanJournal
+from test_database_reports import DatabaseTestCase
+
+
+class TestCompleteRouteCards(DatabaseTestCase):
+    """Тесты пакетного завершения маршрутных карт."""
+
+    def setUp(self) -> None:
+        """Подготовка карт для завершения."""
+        super().setUp()
+        self.insert_cards([
+            ("000001", None, None, None),
+            ("000002", "03-311/25", "К25/03-296", "Завершена"),
+            ("000003", None, None, None),
+            ("000003", None, None, None),
+        ])
+
+    def test_batch_applies_completion_rules(self) -> None:
+        """Тест правил завершения для каждой карты пакета."""
+        results = self.db_manager.complete_route_cards(
+            ["000001", "000002", "999999", "000001", "000003"]
+        )
+
+        self.assertEqual([(number, success) for number, success, _ in results], [
+            ("000001", True),
+            ("000002", False),
+            ("999999", False),
+            ("000001", False),
+            ("000003", True),
+        ])
+        self.assertIn("уже завершена", results[1][2])
+        self.assertIn("не найдена", results[2][2])
+        self.assertIn("уже завершена", results[3][2])
+        for number in ("000001", "000003"):
+            self.assertTrue(self.db_manager.check_route_card_completed(number))
+        self.assertEqual(self.db_manager.get_completed_cards_count(), 4)
+
+    def test_empty_batch(self) -> None:
+        """Тест пустого пакета."""
+        self.assertEqual(self.db_manager.complete_route_cards([]), [])
+
+    def test_batch_updates_blank_index(self) -> None:
+        """Тест учета пакетной записи в битовой карте бланков."""
+        self.db_manager.enable_blank_index(use_sidecar=False)
+        self.addCleanup(self.db_manager.blank_index.close)
+
+        self.db_manager.complete_route_cards(["000001"])
+
+        self.assertTrue(self.db_manager.blank_index.completed("000001"))
+        self.assertTrue(self.db_manager.blank_index.is_fresh())
+
+
+class TestHeadlessIngestion(DatabaseTestCase):
+    """Тесты приема строк со сканами через пакетную запись."""
+
+    def setUp(self) -> None:
+        """Подготовка карт и пакетной записи."""
+        super().setUp()
+        self.insert_cards([(f"{number:06d}", None, None, None) for number in range(1, 201)])
+        self.writer = BatchWriter(self.db_manager, max_batch_size=50).start()
+        self.addCleanup(self.writer.close)
+        self.replies = []
+
+    def test_ingest_lines(self) -> None:
+        """Тест ответов на корректные, повторные и ошибочные строки."""
+        submitted = ingest_lines(["1\n", "\n", "abc\n", "000001\n", "1000000\n"], self.writer, self.replies.append)
+        self.writer.flush()
+
+        self.assertEqual(submitted, 2)
+        self.assertEqual(sorted(self.replies), sorted([
+            format_result("000001", True, None),
+            format_result("000001", False, "Маршрутная карта №000001 уже завершена"),
+            format_result("abc", False, "Номер должен быть шестизначным числом (от 000001 до 999999)"),
+            format_result("1000000", False, "Номер должен быть шестизначным числом (от 000001 до 999999)"),
+        ]))
+
+    def test_writes_in_batches(self) -> None:
+        """Тест записи большого потока сканов пакетами."""
+        ingest_lines((f"{number:06d}" for number in range(1, 201)), self.writer, self.replies.append)
+        self.writer.flush()
+
+        self.assertEqual(self.writer.written, 200)
+        self.assertLessEqual(self.writer.batches, 200)
+        self.assertGreaterEqual(self.writer.batches, 4)
+        self.assertTrue(all(reply.endswith("\tOK") for reply in self.replies))
+        self.assertEqual(self.db_manager.get_completed_cards_count(), 200)
+
+    def test_unavailable_database_scans_journaled(self) -> None:
+        """Тест сохранения сканов в журнал при недоступной базе и его применения."""
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir, True)
+        journal = ScanJournal(os.path.join(journal_dir, "журнал.txt"))
+
+        with patch.object(self.db_manager, "complete_route_cards",
+                          side_effect=DatabaseUnavailableError("сетевой диск недоступен")):
+            ingest_lines(["000001"], self.writer, self.replies.append, journal)
+            self.writer.flush()
+        ingest_lines(["000002", "000002"], self.writer, self.replies.append, journal)
+        self.writer.flush()
+
+        journaled = format_result("000001", True, "сохранена в локальный журнал (база недоступна)")
+        self.assertEqual(self.replies, [
+            journaled,
+            journaled.replace("000001", "000002"),
+            format_result("000002", False, "Маршрутная карта №000002 уже завершена"),
+        ])
+        self.assertEqual(len(journal), 2)
+        self.assertEqual(self.writer.written, 0)
+
+        stop = threading.Event()
+        stop.set()
+        start_journal_replay(journal, self.db_manager, stop).join(5)
+
+        self.assertEqual(len(journal), 0)
+        self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+        self.assertTrue(self.db_manager.check_route_card_completed("000002"))
+
+
+class TestKivyFreeModules(unittest.TestCase):
+    """Тесты независимости консольных режимов от Kivy."""
+
+    def test_modules_do_not_import_kivy(self) -> None:
+        """Тест импорта run.py и модуля базы данных без Kivy."""
+        code = "import sys, run, headless, route_card_db; print('kivy' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+
+    def test_validator(self) -> None:
+        """Тест валидатора номера маршрутной карты без приложения."""
+        self.assertEqual(validate_route_card_number(" 42 "), (True, "000042"))
+        self.assertEqual(validate_route_card_number("0"), (False, "0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Тесты замеров времени методов базы данных и обработчиков интерфейса."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+import instrumentation
+from instrumentation import METRICS_ENV_VAR, metrics, stage, timed
+from test_database_reports import DatabaseTestCase
+
+
+class InstrumentationTestCase(DatabaseTestCase):
+    """Базовый класс с включенными замерами."""
+
+    def setUp(self) -> None:
+        """Включение замеров с отчетом во временный файл."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.report_path = self.db_path + ".metrics.json"
+        self.addCleanup(lambda: os.path.exists(self.report_path) and os.unlink(self.report_path))
+        metrics.reset()
+        metrics.enable(self.report_path)
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.disable)
+
+
+class TestDatabaseMetrics(InstrumentationTestCase):
+    """Тесты замеров DatabaseManager."""
+
+    def test_methods_and_stages_recorded(self) -> None:
+        """Тест замера методов, подключения, запросов и фиксации."""
+        self.insert_blanks(["000001", "000002", "000004"])
+
+        self.db_manager.complete_route_card("000001")
+        self.assertEqual(len(self.db_manager.get_all_records()), 3)
+        self.assertEqual(len(list(self.db_manager.find_blank_sequence_issues("000001", "000004"))), 1)
+
+        snapshot = metrics.snapshot()
+        for name in ("db.connect", "db.query", "db.begin", "db.commit", "db.complete_route_card"):
+            self.assertIn(name, snapshot)
+        self.assertEqual(snapshot["db.get_all_records"]["rows"], 3)
+        self.assertEqual(snapshot["db.find_blank_sequence_issues"]["count"], 1)
+        self.assertEqual(snapshot["db.find_blank_sequence_issues"]["rows"], 1)
+        self.assertEqual(snapshot["db.complete_route_card"]["errors"], 0)
+
+    def test_disabled_records_nothing(self) -> None:
+        """Тест отсутствия замеров, когда они выключены."""
+        metrics.disable()
+
+        self.db_manager.get_total_cards_count()
+
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_dump_report(self) -> None:
+        """Тест записи отчета в JSON-файл."""
+        self.db_manager.get_total_cards_count()
+
+        path = instrumentation.dump()
+
+        self.assertEqual(path, self.report_path)
+        with open(path, encoding="utf-8") as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report["metrics"]["db.get_total_cards_count"]["count"], 1)
+        self.assertIn("db.get_total_cards_count", metrics.format_report())
+
+
+class TestTimers(InstrumentationTestCase):
+    """Тесты декоратора, контекстного менеджера и гистограммы."""
+
+    def test_errors_counted(self) -> None:
+        """Тест учета вызовов, завершившихся исключением."""
+        @timed("test.fail")
+        def fail() -> None:
+            raise ValueError("ошибка")
+
+        with self.assertRaises(ValueError):
+            fail()
+        with self.assertRaises(KeyError):
+            with stage("test.stage"):
+                raise KeyError("ошибка")
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["test.fail"]["errors"], 1)
+        self.assertEqual(snapshot["test.stage"]["errors"], 1)
+
+    def test_histogram_percentiles(self) -> None:
+        """Тест оценки перцентилей по гистограмме."""
+        for _ in range(90):
+            metrics.record("test.latency", 0.0004)
+        for _ in range(10):
+            metrics.record("test.latency", 0.04)
+
+        values = metrics.snapshot()["test.latency"]
+        self.assertEqual(values["p50_ms"], 0.5)
+        self.assertEqual(values["p95_ms"], 40.0)
+        self.assertEqual(sum(count for _, count in values["buckets_ms"]), 100)
+
+    def test_enable_from_environment(self) -> None:
+        """Тест включения замеров переменной окружения."""
+        metrics.disable()
+        with patch.dict(os.environ, {METRICS_ENV_VAR: "0"}):
+            self.assertFalse(instrumentation.enable_from_environment())
+
+        other_path = os.path.join(tempfile.gettempdir(), "другой_отчет.json")
+        with patch.dict(os.environ, {METRICS_ENV_VAR: other_path}):
+            self.assertTrue(instrumentation.enable_from_environment())
+        self.assertEqual(metrics.dump_path, other_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
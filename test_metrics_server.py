@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Тесты локальной точки сбора метрик в формате Prometheus."""
+
+import os
+import unittest
+import urllib.error
+import urllib.request
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from batch_writer import BatchWriter
+from headless import ingest_lines
+from instrumentation import metrics
+from metrics_server import CONTENT_TYPE, MetricsServer, render_metrics
+from test_database_reports import DatabaseTestCase
+
+
+def parse_samples(text: str) -> dict:
+    """Разбор строк значений текстового формата в словарь имя{метки} -> значение."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+class TestMetricsServer(DatabaseTestCase):
+    """Тесты сбора метрик приема сканов."""
+
+    def setUp(self) -> None:
+        """Подготовка карт и включение замеров без отчета при выходе."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.insert_blanks(["000001", "000002"])
+        metrics.reset()
+        metrics.enable(dump_at_exit=False)
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.disable)
+
+    def test_scan_counters_and_histograms(self) -> None:
+        """Тест счетчиков сканов, завершений и гистограмм длительности."""
+        writer = BatchWriter(self.db_manager).start()
+        self.addCleanup(writer.close)
+        ingest_lines(["000001", "000001", "12345a"], writer, lambda line: None)
+        writer.flush()
+        self.db_manager.check_route_card_completed("000001")
+
+        samples = parse_samples(render_metrics(self.db_manager, writer, {"journal": 3}, offline=False))
+
+        self.assertEqual(samples['route_card_scans_total{outcome="success"}'], 1)
+        self.assertEqual(samples['route_card_scans_total{outcome="error"}'], 2)
+        self.assertEqual(samples["route_card_completions_total"], 1)
+        self.assertEqual(
+            samples['route_card_operation_duration_seconds_count{operation="db.complete_route_cards"}'],
+            samples['route_card_operation_duration_seconds_bucket{operation="db.complete_route_cards",le="+Inf"}']
+        )
+        self.assertEqual(samples['route_card_queue_depth{queue="batch_writer"}'], 0)
+        self.assertEqual(samples['route_card_queue_depth{queue="journal"}'], 3)
+        self.assertEqual(samples["route_card_batch_cards_total"], 1)
+        self.assertEqual(samples["route_card_offline"], 0)
+        self.assertIn('route_card_recent_completions_cache_total{event="hits"}', samples)
+
+    def test_histogram_buckets_cumulative(self) -> None:
+        """Тест накопительных интервалов гистограммы в секундах."""
+        metrics.record("test.latency", 0.0004)
+        metrics.record("test.latency", 0.04)
+
+        samples = parse_samples(render_metrics())
+
+        bucket = 'route_card_operation_duration_seconds_bucket{operation="test.latency",le="%s"}'
+        self.assertEqual(samples[bucket % "0.0005"], 1)
+        self.assertEqual(samples[bucket % "0.05"], 2)
+        self.assertEqual(samples[bucket % "+Inf"], 2)
+        self.assertAlmostEqual(
+            samples['route_card_operation_duration_seconds_sum{operation="test.latency"}'], 0.0404
+        )
+
+    def test_http_endpoint(self) -> None:
+        """Тест ответа сервера по HTTP на свободном порту."""
+        server = MetricsServer(lambda: render_metrics(self.db_manager), port=0).start()
+        self.addCleanup(server.close)
+        host, port = server.address
+
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            self.assertEqual(response.headers["Content-Type"], CONTENT_TYPE)
+            body = response.read().decode("utf-8")
+        self.assertIn("# TYPE route_card_completions_total counter", body)
+
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+        context.exception.close()
+        self.assertEqual(context.exception.code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""Тесты оптимистичного завершения маршрутных карт."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from kivy.clock import Clock
+
+from route_card_app import RouteCardApp
+from route_card_db import DatabaseUnavailableError
+from scan_journal import ScanJournal
+from test_database_reports import DatabaseTestCase
+
+
+class TestOptimisticCompletion(DatabaseTestCase):
+    """Тесты подтверждения сканов до записи и панели сверки."""
+
+    def setUp(self) -> None:
+        """Подготовка приложения с битовой картой и фоновой записью."""
+        super().setUp()
+        self.insert_cards([
+            ("000001", None, None, None),
+            ("000002", "03-311/25", "К25/03-296", "Завершена"),
+            ("000003", None, None, None),
+        ])
+        self.db_manager.enable_blank_index(use_sidecar=False)
+        self.addCleanup(self.db_manager.blank_index.close)
+
+        self.app = RouteCardApp()
+        self.app.db_manager = self.db_manager
+        self.app.show_popup = MagicMock()
+        self.app.build_edit_tab()
+        self.app.optimistic_mode = True
+        self.app.start_background_writer()
+        self.addCleanup(self.app.batch_writer.close)
+
+    def wait_for_writes(self) -> None:
+        """Ожидание фоновой записи и применение ее результатов в главном потоке."""
+        self.app.batch_writer.flush()
+        Clock.tick()
+        Clock.tick()
+
+    def scan(self, text: str) -> None:
+        """Имитация скана с нажатием Enter."""
+        self.app.route_card_input.text = text
+        self.app.on_complete_button_press(self.app.route_card_input)
+
+    def test_acknowledged_without_database_queries(self) -> None:
+        """Тест подтверждения скана без обращения к базе в потоке интерфейса."""
+        with patch.object(self.db_manager, "check_route_card_completed") as check:
+            self.scan("1")
+            check.assert_not_called()
+
+        self.app.show_popup.assert_called_once_with(
+            "Успех", "Маршрутная карта №000001 успешно завершена"
+        )
+        self.wait_for_writes()
+        self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+        self.assertEqual(self.app.pending_scans, set())
+        self.assertEqual(self.app.rejected_scans, [])
+
+    def test_duplicate_scans_rejected_immediately(self) -> None:
+        """Тест повторного скана карты, ожидающей записи или уже завершенной."""
+        self.app.batch_writer.close()
+        self.app.batch_writer = MagicMock()
+
+        self.scan("000003")
+        self.scan("000003")
+        self.scan("000002")
+
+        self.assertEqual(self.app.batch_writer.submit.call_count, 1)
+        self.app.show_popup.assert_called_with("Ошибка", "Маршрутная карта №000002 уже завершена")
+        self.assertEqual(self.app.show_popup.call_args_list[1][0][1], "Маршрутная карта №000003 уже завершена")
+
+    def test_rejected_write_shown_on_reconciliation_panel(self) -> None:
+        """Тест сверки скана, отклоненного базой после подтверждения."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE маршрутные_карты SET Статус = 'Завершена' WHERE Номер_бланка = '000003'")
+        conn.commit()
+        conn.close()
+
+        self.scan("000003")
+        self.wait_for_writes()
+
+        self.assertEqual(len(self.app.rejected_scans), 1)
+        self.assertEqual(self.app.rejected_scans[0][1], "000003")
+        panel = self.app.reconciliation_panel
+        self.assertEqual(panel.opacity, 1)
+        self.assertIn("Не записаны в базу: 1", panel.summary.text)
+        self.assertIn("уже завершена", panel.summary.text)
+
+        self.app.clear_rejected_scans()
+        self.assertEqual(panel.opacity, 0)
+
+    def test_unavailable_database_moves_scans_to_journal(self) -> None:
+        """Тест сохранения подтвержденного скана в журнал при недоступной базе."""
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir, True)
+        self.app.journal = ScanJournal(os.path.join(journal_dir, "журнал.txt"))
+        self.addCleanup(self.cancel_journal_retry)
+
+        with patch.object(self.db_manager, "complete_route_cards",
+                          side_effect=DatabaseUnavailableError("сетевой диск недоступен")):
+            self.scan("000001")
+            self.wait_for_writes()
+        self.scan("000003")
+
+        self.assertTrue(self.app.offline)
+        self.assertIn("000001", self.app.journal)
+        self.assertIn("000003", self.app.journal)
+        self.assertEqual(self.app.pending_scans, set())
+        self.assertEqual(self.app.rejected_scans, [])
+        self.assertFalse(self.db_manager.check_route_card_completed("000001"))
+
+    def cancel_journal_retry(self) -> None:
+        """Отмена периодической попытки применения журнала."""
+        if self.app._journal_retry_event is not None:
+            self.app._journal_retry_event.cancel()
+
+    def test_unknown_blank_falls_back_to_database(self) -> None:
+        """Тест обычной проверки для бланка, неизвестного битовой карте."""
+        self.scan("999999")
+
+        self.app.show_popup.assert_called_once_with(
+            "Ошибка", "Маршрутная карта №999999 не найдена в базе данных"
+        )
+        self.assertEqual(self.app.pending_scans, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""Тесты отмены, ограничения времени и хода выполнения запросов статистики."""
+
+import os
+import sqlite3
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from kivy.clock import Clock
+from kivy.uix.label import Label
+
+from query_control import QueryCancelled, QueryControl
+from route_card_app import RouteCardApp
+from test_database_reports import DatabaseTestCase
+
+
+# Запрос, выполняющийся несколько секунд без обращения к таблицам
+LONG_QUERY = """WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000)
+                SELECT COUNT(*) FROM n"""
+
+
+class TestQueryControl(unittest.TestCase):
+    """Тесты прерывания запроса на соединении."""
+
+    def test_cancel_interrupts_running_query(self) -> None:
+        """Тест прерывания выполняющегося запроса из другого потока."""
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.addCleanup(conn.close)
+        control = QueryControl()
+        control.attach(conn)
+        errors = []
+
+        def run() -> None:
+            try:
+                conn.execute(LONG_QUERY).fetchone()
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+        started = time.monotonic()
+        worker = threading.Thread(target=run)
+        worker.start()
+        time.sleep(0.05)
+        control.cancel()
+        worker.join(5)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertLess(time.monotonic() - started, 2)
+        with self.assertRaises(QueryCancelled):
+            control.check()
+
+    def test_timeout_and_progress(self) -> None:
+        """Тест остановки по времени и сообщений о ходе выполнения."""
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        reports = []
+        control = QueryControl(timeout=0.2, on_progress=lambda elapsed, steps: reports.append(elapsed),
+                               report_interval=0)
+        control.attach(conn)
+
+        with self.assertRaises(sqlite3.OperationalError):
+            conn.execute(LONG_QUERY).fetchone()
+
+        self.assertTrue(control.timed_out)
+        self.assertFalse(control.cancelled)
+        self.assertIn("время", control.reason)
+        self.assertTrue(reports)
+        self.assertLess(reports[-1], 1)
+
+
+class TestCancellableStatistics(DatabaseTestCase):
+    """Тесты отмены запросов статистики DatabaseManager и вкладки статистики."""
+
+    def setUp(self) -> None:
+        """Подготовка карт за несколько месяцев."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        conn, cursor = self.db_manager.connect()
+        cursor.executemany(
+            """INSERT INTO маршрутные_карты (Номер_бланка, Статус, Дата_создания)
+               VALUES (?, 'Завершена', ?)""",
+            [(f"{n:06d}", f"2025-{n % 12 + 1:02d}-15 10:00:00") for n in range(1, 5001)]
+        )
+        conn.commit()
+        conn.close()
+
+    def test_cancelled_control_raises(self) -> None:
+        """Тест отказа выполнять запросы отмененной задачи."""
+        control = QueryControl()
+        control.cancel()
+
+        for method, args in (
+            (self.db_manager.get_monthly_stats, (2025,)),
+            (self.db_manager.get_cards_by_period, ("2025-01-01", "2025-12-31")),
+            (self.db_manager.get_completed_cards_count, ()),
+        ):
+            with self.subTest(method=method.__name__):
+                with self.assertRaises(QueryCancelled):
+                    method(*args, control=control)
+
+    def test_cancel_during_query(self) -> None:
+        """Тест прерывания запроса из обработчика хода выполнения."""
+        control = QueryControl(on_progress=lambda elapsed, steps: control.cancel(), report_interval=0)
+
+        with self.assertRaises(QueryCancelled):
+            self.db_manager.get_cards_by_period("2025-01-01", "2025-12-31", control=control)
+        self.assertLess(control.steps, 5)
+        self.assertEqual(len(self.db_manager.get_cards_by_period("2025-01-01", "2025-12-31")), 5000)
+
+    def test_stale_period_results_ignored(self) -> None:
+        """Тест отображения только последнего выбранного периода."""
+        app = RouteCardApp()
+        app.db_manager = self.db_manager
+        app.build_stats_tab()
+        first_control = app.stats_control
+
+        app.update_period_stats("Прошлый месяц")
+        latest_control = app.stats_control
+        app._stats_thread.join(5)
+        Clock.tick()
+
+        self.assertTrue(first_control.cancelled)
+        self.assertIsNot(first_control, latest_control)
+        self.assertIsNone(app.stats_control)
+        texts = [widget.text for widget in app.period_stats_container.walk() if isinstance(widget, Label)]
+        self.assertTrue(any(text.startswith("Сводка за период") for text in texts))
+        self.assertFalse(any("отменен" in text for text in texts))
+
+    def test_summary_counts_loaded_in_background(self) -> None:
+        """Тест загрузки общей статистики в фоновом потоке вместе со статистикой по периоду."""
+        app = RouteCardApp()
+        app.db_manager = self.db_manager
+        with patch.object(self.db_manager, "get_total_cards_count",
+                          wraps=self.db_manager.get_total_cards_count) as total_count:
+            app.build_stats_tab()
+            self.assertEqual([label.text for label in app.summary_value_labels], ["...", "...", "..."])
+            app._stats_thread.join(5)
+        Clock.tick()
+
+        self.assertIsNotNone(total_count.call_args.kwargs["control"])
+        self.assertEqual([label.text for label in app.summary_value_labels], ["5000", "5000", "5000"])
+
+    def test_leaving_tab_cancels_and_returning_reloads(self) -> None:
+        """Тест отмены при уходе со вкладки статистики и повтора при возврате."""
+        app = RouteCardApp()
+        app.db_manager = self.db_manager
+        app.stats_tab = object()
+        app.build_stats_tab()
+        control = app.stats_control
+
+        app.on_tab_changed(None, None)
+        self.assertTrue(control.cancelled)
+        app._stats_thread.join(5)
+
+        app.on_tab_changed(None, app.stats_tab)
+        self.assertIsNot(app.stats_control, control)
+        app._stats_thread.join(5)
+        Clock.tick()
+        self.assertIsNone(app.stats_control)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""Тесты планов выполнения запросов DatabaseManager на схеме и индексах рабочей базы."""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from typing import Dict, List
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from bench_database import BENCHMARKS, NOISE_FLOOR_MS, call_method, measure
+from card_mirror import REFRESH_CHANGED_WHERE
+from card_records import CARD_SELECT
+from data_version import connect_existing
+from generate_test_db import generate_database
+from route_card_db import DatabaseManager
+from slow_query_log import SlowQueryLog, full_table_scans
+
+
+# Количество строк базы для проверки планов
+PLAN_ROWS = 5000
+
+# Размеры баз для проверки роста задержки поиска по индексу
+SMOKE_ROWS = (1000, 20000)
+
+# Во сколько раз может вырасти медиана поиска по индексу при росте базы в 20 раз
+SMOKE_MAX_GROWTH = 5.0
+
+# Фрагменты плана, обязательные для запросов метода (пустой список - индекс
+# не нужен, полный просмотр разрешен в FULL_SCAN_ALLOWED)
+EXPECTED_PLANS: Dict[str, List[str]] = {
+    "check_blank_number": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_номер_бланка"],
+    "check_account_number": ["SEARCH маршрутные_карты USING INDEX uq_маршрутные_карты_учетный_номер"],
+    "check_cluster_number": ["SEARCH маршрутные_карты USING INDEX uq_маршрутные_карты_номер_кластера"],
+    "check_route_card_completed": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_номер_бланка"],
+    "get_all_records": ["SCAN маршрутные_карты"],
+    "search_records": ["SCAN маршрутные_карты"],
+    "get_file_problems": [
+        "SEARCH p USING INDEX idx_проверка_файлов_состояние",
+        "SEARCH m USING INTEGER PRIMARY KEY",
+    ],
+    "get_total_cards_count": ["SCAN маршрутные_карты USING COVERING INDEX idx_маршрутные_карты_"],
+    "get_completed_cards_count": [],
+    "get_incomplete_cards_count": [],
+    "get_cards_by_period": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_дата_создания"],
+    "get_cards_count_by_period": [
+        "SEARCH маршрутные_карты USING COVERING INDEX idx_маршрутные_карты_дата_создания",
+    ],
+    "get_completed_cards_by_period": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_дата_создания"],
+    "iter_cards": [],
+    # Статистика за год (вкладка статистики) выбирает год по индексу даты
+    "get_monthly_stats": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_дата_создания"],
+    "find_blank_sequence_issues": [
+        "SEARCH маршрутные_карты USING COVERING INDEX idx_маршрутные_карты_номер_бланка",
+    ],
+    "find_duplicate_numbers": [
+        "SEARCH маршрутные_карты USING INDEX uq_маршрутные_карты_учетный_номер",
+        "SEARCH маршрутные_карты USING INDEX uq_маршрутные_карты_номер_кластера",
+    ],
+    "complete_route_card": [
+        "SEARCH маршрутные_карты USING COVERING INDEX idx_маршрутные_карты_номер_бланка",
+        "SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_номер_бланка",
+    ],
+    "complete_route_cards": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_номер_бланка"],
+    "replay_completions": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_номер_бланка"],
+    "update_card_info": ["SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_номер_бланка"],
+    # При готовых уникальных индексах поиск конфликтов не выполняется
+    "ensure_indexes": ["SCAN sqlite_master"],
+}
+
+# Методы, которым полный просмотр таблицы разрешен, и причина
+FULL_SCAN_ALLOWED: Dict[str, str] = {
+    "get_all_records": "обход по убыванию id останавливается на LIMIT",
+    "search_records": "LIKE с % в начале шаблона не использует индекс",
+    "get_completed_cards_count": "подсчет по всей таблице",
+    "get_incomplete_cards_count": "подсчет по всей таблице",
+    "iter_cards": "выгрузка всех карт читает таблицу в порядке id",
+    "get_monthly_stats": "группировка по всей таблице за все время",
+}
+
+# Методы, не выполняющие запросов через DatabaseManager.connect()
+NO_QUERY_METHODS = {"enable_blank_index", "enable_mirror"}
+
+# Поиск по индексу для проверки роста задержки
+INDEXED_LOOKUPS = ("check_blank_number", "check_account_number", "check_cluster_number")
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Проверка использования индексов каждым запросом DatabaseManager."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Генерация базы со схемой и индексами рабочей базы и сбор планов всех методов."""
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.db_path = db_path = os.path.join(cls.temp_dir, "plans.db")
+        generate_database(db_path, PLAN_ROWS)
+
+        db_manager = DatabaseManager(db_path)
+        cls.plans: Dict[str, List[List[str]]] = {}
+        for name, _, args_factory in BENCHMARKS:
+            db_manager.slow_query_log = SlowQueryLog(threshold=0, path=None, history=10000)
+            for args in args_factory(random.Random(name), PLAN_ROWS, 2):
+                call_method(db_manager, name, args)
+            cls.plans[name] = [entry.plan for entry in db_manager.slow_query_log.recent]
+        db_manager.recent_completions.close()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Удаление временной базы."""
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def test_every_method_has_expected_plan(self) -> None:
+        """Тест наличия ожидаемого плана для каждого метода с запросами."""
+        for name in self.plans:
+            if name in NO_QUERY_METHODS:
+                self.assertEqual(self.plans[name], [], name)
+            else:
+                self.assertIn(name, EXPECTED_PLANS)
+        self.assertLessEqual(set(FULL_SCAN_ALLOWED), set(EXPECTED_PLANS))
+
+    def test_expected_indexes_used(self) -> None:
+        """Тест использования ожидаемых индексов."""
+        for name, fragments in EXPECTED_PLANS.items():
+            plan_lines = [line.strip() for plan in self.plans[name] for line in plan]
+            for fragment in fragments:
+                with self.subTest(method=name, fragment=fragment):
+                    self.assertTrue(
+                        any(line.startswith(fragment) for line in plan_lines),
+                        f"{name}: нет '{fragment}' в плане:\n" + "\n".join(plan_lines)
+                    )
+
+    def test_no_unexpected_full_scans(self) -> None:
+        """Тест отсутствия полного просмотра таблицы там, где он не разрешен."""
+        for name, plans in self.plans.items():
+            if name in FULL_SCAN_ALLOWED:
+                continue
+            with self.subTest(method=name):
+                scans = [scan for plan in plans for scan in full_table_scans(plan)]
+                self.assertEqual(scans, [], f"{name}: полный просмотр таблицы")
+
+    def test_latest_records_not_sorted(self) -> None:
+        """Тест чтения последних записей по id без сортировки всей таблицы."""
+        for plan in self.plans["get_all_records"]:
+            self.assertFalse(any("TEMP B-TREE" in line for line in plan), plan)
+
+    def test_mirror_refresh_uses_date_index(self) -> None:
+        """Тест дочитывания зеркалом измененных строк по индексу даты, без просмотра таблицы."""
+        conn = connect_existing(self.db_path)
+        try:
+            plan = [
+                detail for _, _, _, detail in conn.execute(
+                    f"EXPLAIN QUERY PLAN {CARD_SELECT} {REFRESH_CHANGED_WHERE}", ("2025-01-01 00:00:00",)
+                )
+            ]
+        finally:
+            conn.close()
+        self.assertTrue(
+            any(line.startswith("SEARCH маршрутные_карты USING INDEX idx_маршрутные_карты_дата_создания")
+                for line in plan),
+            "\n".join(plan)
+        )
+
+
+class TestLookupScaling(unittest.TestCase):
+    """Проверка, что задержка поиска по индексу почти не растет с размером базы."""
+
+    def test_indexed_lookups_scale(self) -> None:
+        """Тест роста медианы поиска при увеличении базы в 20 раз."""
+        medians: Dict[str, List[float]] = {name: [] for name in INDEXED_LOOKUPS}
+        factories = {name: args_factory for name, _, args_factory in BENCHMARKS}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for rows in SMOKE_ROWS:
+                db_path = os.path.join(temp_dir, f"{rows}.db")
+                generate_database(db_path, rows)
+                db_manager = DatabaseManager(db_path)
+                for name in INDEXED_LOOKUPS:
+                    args_list = factories[name](random.Random(name), rows, 50)
+                    medians[name].append(max(measure(db_manager, name, args_list)["p50_ms"], NOISE_FLOOR_MS))
+                db_manager.recent_completions.close()
+
+        for name, (small, large) in medians.items():
+            with self.subTest(method=name):
+                self.assertLess(
+                    large / small, SMOKE_MAX_GROWTH,
+                    f"{name}: медиана {small:.3f} мс на {SMOKE_ROWS[0]} строк, "
+                    f"{large:.3f} мс на {SMOKE_ROWS[1]} строк"
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
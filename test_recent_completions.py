@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Тесты кэша недавно завершенных маршрутных карт."""
+
+import os
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from recent_completions import RecentCompletions
+from test_database_reports import DatabaseTestCase
+
+
+class TestRecentCompletions(DatabaseTestCase):
+    """Тесты кэша на пути завершения карт."""
+
+    def setUp(self) -> None:
+        """Подготовка карт."""
+        super().setUp()
+        self.insert_cards([
+            ("000001", None, None, None),
+            ("000002", "03-311/25", "К25/03-296", "Завершена"),
+            ("000003", None, None, None),
+        ])
+        self.recent = self.db_manager.recent_completions
+        self.addCleanup(self.recent.close)
+
+    def test_repeat_scan_served_from_cache(self) -> None:
+        """Тест ответа на повторный скан без запросов к базе."""
+        success, _ = self.db_manager.complete_route_card("000001")
+        self.assertTrue(success)
+
+        with patch.object(self.db_manager, "connect", side_effect=AssertionError("запрос к базе")):
+            self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+        self.assertEqual(self.recent.stats()["hits"], 1)
+
+    def test_completed_check_result_cached(self) -> None:
+        """Тест кэширования карты, найденной завершенной при проверке."""
+        self.assertTrue(self.db_manager.check_route_card_completed("000002"))
+        self.assertFalse(self.db_manager.check_route_card_completed("000003"))
+
+        self.assertTrue(self.db_manager.check_route_card_completed("000002"))
+        stats = self.recent.stats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_revalidated_after_change_by_other_station(self) -> None:
+        """Тест перепроверки кэша после изменения базы другой станцией."""
+        self.db_manager.complete_route_card("000001")
+        self.db_manager.complete_route_card("000003")
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE маршрутные_карты SET Статус = NULL WHERE Номер_бланка = '000001'")
+        conn.commit()
+        conn.close()
+
+        self.assertFalse(self.db_manager.check_route_card_completed("000001"))
+        self.assertTrue(self.db_manager.check_route_card_completed("000003"))
+        self.assertEqual(self.recent.stats()["revalidations"], 1)
+
+    def test_bounded_size(self) -> None:
+        """Тест вытеснения самых старых номеров."""
+        recent = RecentCompletions(self.db_manager, max_size=2)
+        self.addCleanup(recent.close)
+
+        for number in ("000001", "000002", "000003"):
+            recent.add(number)
+
+        self.assertEqual(recent.stats()["evictions"], 1)
+        self.assertEqual(recent.stats()["size"], 2)
+        self.assertFalse(recent.contains("000001"))
+
+    def test_batch_completion_cached(self) -> None:
+        """Тест кэширования номеров, завершенных пакетом."""
+        self.db_manager.complete_route_cards(["000001", "000003"])
+
+        with patch.object(self.db_manager, "connect", side_effect=AssertionError("запрос к базе")):
+            self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+            self.assertTrue(self.db_manager.check_route_card_completed("000003"))
+
+
+if __name__ == "__main__":
+    unittest.main()
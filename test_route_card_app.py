@@ -1,8 +1,8 @@
-import re
 import unittest
 from unittest.mock import MagicMock, patch
 import sqlite3
 
+from card_records import CardRecord
 from route_card_app import DatabaseManager, RouteCardApp, DataTable
 
 
@@ -21,7 +21,7 @@ class TestDatabaseManager(unittest.TestCase):
     def test_check_blank_number_exists(self) -> None:
         """Тест проверки наличия номера бланка, когда он существует."""
         # Настраиваем мок для возврата данных
-        self.mock_cursor.fetchone.return_value = (1, "000001", "3-311/25", "К25/03-296", "Завершена", "2025-03-25", "path")
+        self.mock_cursor.fetchone.return_value = CardRecord(1, "000001", "3-311/25", "К25/03-296", "Завершена", "2025-03-25")
         
         result = self.db_manager.check_blank_number("000001")
         
@@ -190,6 +190,32 @@ class TestRouteCardApp(unittest.TestCase):
         # Тестируем обновление таблицы с поисковым запросом
         app.refresh_table("000001")
         mock_instance.search_records.assert_called_once_with("000001")
+    
+    def test_view_and_stats_tabs_built_lazily(self) -> None:
+        """Тест построения вкладок просмотра и статистики при первом выборе."""
+        self.app.db_manager = MagicMock()
+        self.app.db_manager.get_all_records.return_value = []
+        self.app.db_manager.get_monthly_stats.return_value = []
+        
+        tab_panel = self.app.build()
+        edit_tab, view_tab, stats_tab = reversed(tab_panel.tab_list)
+        
+        self.assertIsNotNone(edit_tab.content)
+        self.assertIsNone(view_tab.content)
+        self.assertIsNone(stats_tab.content)
+        self.app.db_manager.get_all_records.assert_not_called()
+        self.app.db_manager.get_total_cards_count.assert_not_called()
+        
+        tab_panel.switch_to(view_tab)
+        self.assertIsNotNone(view_tab.content)
+        self.assertIs(tab_panel.current_tab, view_tab)
+        self.assertIn(view_tab.content, tab_panel.content.children)
+        self.app.db_manager.get_all_records.assert_called_once()
+        self.assertIsNone(stats_tab.content)
+        
+        tab_panel.switch_to(edit_tab)
+        tab_panel.switch_to(view_tab)
+        self.app.db_manager.get_all_records.assert_called_once()
 
 
 if __name__ == "__main__":
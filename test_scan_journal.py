@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""Тесты локального журнала сканов на время недоступности базы данных."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from kivy.clock import Clock
+
+from route_card_app import RouteCardApp
+from route_card_db import DatabaseManager
+from scan_journal import ScanJournal
+from test_database_reports import DatabaseTestCase
+
+
+class JournalTestCase(DatabaseTestCase):
+    """Базовый класс с картами и временным файлом журнала."""
+
+    def setUp(self) -> None:
+        """Подготовка карт и каталога журнала."""
+        super().setUp()
+        self.insert_cards([
+            ("000001", None, None, None),
+            ("000002", None, None, None),
+            ("000003", "03-311/25", "К25/03-296", "Завершена"),
+        ])
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir, True)
+        self.journal_path = os.path.join(self.journal_dir, "журнал.txt")
+
+
+class TestScanJournal(JournalTestCase):
+    """Тесты записи и применения журнала."""
+
+    def test_entries_survive_restart(self) -> None:
+        """Тест чтения записей журнала после перезапуска."""
+        journal = ScanJournal(self.journal_path)
+        journal.append("000001", "2025-05-01 10:00:00")
+        with open(self.journal_path, "a", encoding="utf-8") as journal_file:
+            journal_file.write("000002\t2025-05")
+
+        reopened = ScanJournal(self.journal_path)
+
+        self.assertEqual(len(reopened), 1)
+        self.assertIn("000001", reopened)
+        self.assertNotIn("000002", reopened)
+
+    def test_replay_applies_and_reports_conflicts(self) -> None:
+        """Тест применения журнала с конфликтами."""
+        journal = ScanJournal(self.journal_path)
+        journal.append("000001", "2025-05-01 10:00:00")
+        journal.append("000003", "2025-05-01 10:00:01")
+        journal.append("999999", "2025-05-01 10:00:02")
+
+        applied, conflicts, complete = journal.replay(self.db_manager, batch_size=2)
+
+        self.assertTrue(complete)
+        self.assertEqual(applied, 1)
+        self.assertEqual([number for _, number, _ in conflicts], ["000003", "999999"])
+        self.assertIn("уже завершена", conflicts[0][2])
+        self.assertIn("не найдена", conflicts[1][2])
+        self.assertEqual(len(journal), 0)
+        self.assertFalse(os.path.exists(self.journal_path))
+        self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+        with open(journal.conflicts_path, encoding="utf-8") as conflicts_file:
+            self.assertEqual(len(conflicts_file.readlines()), 2)
+
+    def test_replay_is_idempotent(self) -> None:
+        """Тест повторного применения журнала после сбоя до его очистки."""
+        entries = [("000001", "2025-05-01 10:00:00"), ("000002", "2025-05-01 10:00:05")]
+        for _ in range(2):
+            journal = ScanJournal(self.journal_path)
+            for number, completed_at in entries:
+                journal.append(number, completed_at)
+
+            applied, conflicts, complete = journal.replay(self.db_manager)
+
+            self.assertEqual((applied, conflicts, complete), (2, [], True))
+
+    def test_replay_waits_for_database(self) -> None:
+        """Тест сохранения журнала, пока база данных недоступна."""
+        journal = ScanJournal(self.journal_path)
+        journal.append("000001")
+        unavailable = DatabaseManager(os.path.join(self.journal_dir, "нет", "база.db"))
+
+        applied, conflicts, complete = journal.replay(unavailable)
+
+        self.assertEqual((applied, conflicts, complete), (0, [], False))
+        self.assertEqual(len(ScanJournal(self.journal_path)), 1)
+
+
+class TestOfflineScanning(JournalTestCase):
+    """Тесты сканирования во время недоступности базы данных."""
+
+    def setUp(self) -> None:
+        """Подготовка приложения с недоступной базой данных."""
+        super().setUp()
+        self.app = RouteCardApp()
+        self.app.db_manager = DatabaseManager(os.path.join(self.journal_dir, "нет", "база.db"))
+        self.app.journal = ScanJournal(self.journal_path)
+        self.app.show_popup = MagicMock()
+        self.app.build_edit_tab()
+        self.addCleanup(self.cancel_retry)
+
+    def cancel_retry(self) -> None:
+        """Отмена периодической попытки применения журнала."""
+        if self.app._journal_retry_event is not None:
+            self.app._journal_retry_event.cancel()
+
+    def scan(self, text: str) -> None:
+        """Имитация скана с нажатием Enter."""
+        self.app.route_card_input.text = text
+        self.app.on_complete_button_press(self.app.route_card_input)
+
+    def test_scans_journaled_and_replayed(self) -> None:
+        """Тест записи сканов в журнал и их применения после восстановления базы."""
+        self.scan("1")
+        self.scan("000001")
+        self.scan("000002")
+
+        self.assertTrue(self.app.offline)
+        self.assertEqual(len(self.app.journal), 2)
+        self.assertIn("локальный журнал", self.app.show_popup.call_args_list[0][0][1])
+        self.assertIn("уже завершена", self.app.show_popup.call_args_list[1][0][1])
+
+        self.app.db_manager.db_name = self.db_path
+        self.app.start_journal_replay()
+        self.app._journal_replay_thread.join()
+        Clock.tick()
+
+        self.assertFalse(self.app.offline)
+        self.assertEqual(self.app.rejected_scans, [])
+        self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+        self.assertTrue(self.db_manager.check_route_card_completed("000002"))
+
+
+class TestPrepareDatabase(JournalTestCase):
+    """Тесты подготовки базы данных при запуске приложения."""
+
+    def test_prepared_in_background_and_handed_to_ui(self) -> None:
+        """Тест построения индексов и битовой карты в фоне с передачей в основной поток."""
+        journal = ScanJournal(self.journal_path)
+        journal.append("000001")
+        app = RouteCardApp()
+        app.db_manager = self.db_manager
+        app.journal = ScanJournal(self.journal_path)
+        self.addCleanup(self.remove_sidecar)
+
+        app.prepare_database()
+        app._prepare_thread.join(5)
+
+        self.assertIsNone(self.db_manager.blank_index)
+        self.assertFalse(app.offline)
+        Clock.tick()
+
+        self.addCleanup(self.db_manager.blank_index.close)
+        self.assertTrue(self.db_manager.blank_index.exists("000002"))
+        self.assertTrue(app.offline)
+        app._journal_replay_thread.join(5)
+        Clock.tick()
+        self.assertFalse(app.offline)
+        self.assertTrue(self.db_manager.check_route_card_completed("000001"))
+
+    def remove_sidecar(self) -> None:
+        """Удаление файла битовой карты временной базы."""
+        try:
+            os.unlink(self.db_path + ".bitmap")
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""Тесты режима непрерывного сканирования."""
+
+import os
+import unittest
+from unittest.mock import MagicMock
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from route_card_app import SCAN_LOG_SIZE, SCAN_OUTCOME_COLORS, RouteCardApp
+from test_database_reports import DatabaseTestCase
+
+
+class TestContinuousScanMode(DatabaseTestCase):
+    """Тесты баннера и журнала сканов вместо всплывающих окон."""
+
+    def setUp(self) -> None:
+        """Подготовка приложения с временной базой данных."""
+        super().setUp()
+        self.insert_cards([(f"{number:06d}", None, None, None) for number in range(1, 21)])
+        self.app = RouteCardApp()
+        self.app.db_manager = self.db_manager
+        self.app.show_popup = MagicMock()
+        self.app.build_edit_tab()
+        self.app.set_continuous_mode(True)
+
+    def scan(self, text: str) -> None:
+        """Имитация скана с нажатием Enter."""
+        self.app.route_card_input.text = text
+        self.app.on_complete_button_press(self.app.route_card_input)
+
+    def test_results_shown_without_popups(self) -> None:
+        """Тест показа результатов в баннере с цветом по исходу."""
+        panel = self.app.scan_panel
+
+        self.scan("1")
+        self.assertIn("успешно завершена", panel.banner.text)
+        self.assertEqual(panel.banner.color, list(SCAN_OUTCOME_COLORS["success"]))
+
+        self.scan("000001")
+        self.assertIn("уже завершена", panel.banner.text)
+        self.assertEqual(panel.banner.color, list(SCAN_OUTCOME_COLORS["warning"]))
+
+        self.scan("abc")
+        self.assertEqual(panel.banner.color, list(SCAN_OUTCOME_COLORS["error"]))
+
+        self.app.show_popup.assert_not_called()
+        self.assertEqual(self.app.route_card_input.text, "")
+        self.assertFalse(self.app.route_card_input.text_validate_unfocus)
+        self.assertIn("шестизначным", panel.log_labels[0].text)
+        self.assertIn("000001", panel.log_labels[2].text)
+
+    def test_rolling_log_reuses_widgets(self) -> None:
+        """Тест журнала последних сканов без создания виджетов."""
+        panel = self.app.scan_panel
+        labels = list(panel.children)
+
+        for number in range(1, 21):
+            self.scan(str(number))
+
+        self.assertEqual(list(panel.children), labels)
+        self.assertEqual(len(panel.entries), SCAN_LOG_SIZE)
+        self.assertIn("000020", panel.log_labels[0].text)
+        self.assertIn(f"{21 - SCAN_LOG_SIZE:06d}", panel.log_labels[-1].text)
+        self.assertEqual(self.db_manager.get_completed_cards_count(), 20)
+
+    def test_default_mode_keeps_popups(self) -> None:
+        """Тест всплывающих окон в обычном режиме."""
+        self.app.set_continuous_mode(False)
+
+        self.scan("000002")
+
+        self.app.show_popup.assert_called_once_with(
+            "Успех", "Маршрутная карта №000002 успешно завершена"
+        )
+        self.assertEqual(self.app.scan_panel.banner.text, "")
+        self.assertTrue(self.app.route_card_input.text_validate_unfocus)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Тесты журнала медленных запросов и проверки планов выполнения."""
+
+import os
+import unittest
+from contextlib import contextmanager
+from typing import Iterator
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from slow_query_log import SlowQueryLog, full_table_scans
+from test_database_reports import DatabaseTestCase
+
+
+class QueryPlanTestCase(DatabaseTestCase):
+    """Базовый класс тестов с индексами рабочей базы и проверкой планов запросов."""
+
+    def setUp(self) -> None:
+        """Создание индексов, как при запуске приложения."""
+        super().setUp()
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.db_manager.ensure_indexes()
+
+    @contextmanager
+    def capture_queries(self) -> Iterator[SlowQueryLog]:
+        """Запись всех запросов DatabaseManager с планами в памяти."""
+        previous = self.db_manager.slow_query_log
+        log = self.db_manager.slow_query_log = SlowQueryLog(threshold=0, path=None, history=10000)
+        try:
+            yield log
+        finally:
+            self.db_manager.slow_query_log = previous
+
+    @contextmanager
+    def assertNoFullTableScan(self, table: str = "маршрутные_карты") -> Iterator[SlowQueryLog]:
+        """Проверка, что запросы внутри блока не просматривают таблицу целиком."""
+        with self.capture_queries() as log:
+            yield log
+        scans = [
+            f"{' '.join(entry.sql.split())}: {'; '.join(entry.plan)}"
+            for entry in log.recent if full_table_scans(entry.plan, table)
+        ]
+        if scans:
+            self.fail("Полный просмотр таблицы:\n" + "\n".join(scans))
+
+
+class TestSlowQueryLog(QueryPlanTestCase):
+    """Тесты записи медленных запросов."""
+
+    def test_slow_query_written_with_plan(self) -> None:
+        """Тест записи SQL, параметров, длительности и плана в файл."""
+        self.insert_blanks(["000001", "000002"])
+        log_path = self.db_path + ".slow.log"
+        self.addCleanup(lambda: os.path.exists(log_path) and os.unlink(log_path))
+        log = self.db_manager.enable_slow_query_log(threshold=0, path=log_path)
+
+        self.db_manager.search_records("0001")
+
+        entry = log.recent[-1]
+        self.assertIn("LIKE", entry.sql)
+        self.assertEqual(entry.parameters, ("%0001%", "%0001%", "%0001%"))
+        self.assertGreater(entry.seconds, 0)
+        self.assertEqual(full_table_scans(entry.plan), ["SCAN маршрутные_карты"])
+        with open(log_path, encoding="utf-8") as log_file:
+            text = log_file.read()
+        self.assertIn("медленный запрос", text)
+        self.assertIn("('%0001%', '%0001%', '%0001%')", text)
+        self.assertIn("SCAN маршрутные_карты", text)
+
+    def test_fast_queries_not_logged(self) -> None:
+        """Тест пропуска запросов быстрее порога."""
+        log = self.db_manager.enable_slow_query_log(threshold=60, path=None)
+
+        self.db_manager.get_total_cards_count()
+        self.db_manager.complete_route_card("000001")
+
+        self.assertEqual(len(log.recent), 0)
+
+    def test_write_statements_explained(self) -> None:
+        """Тест плана для записи через executemany в транзакции с повторами."""
+        self.insert_blanks(["000001", "000002"])
+
+        with self.capture_queries() as log:
+            results = self.db_manager.complete_route_cards(["000001", "000002"])
+
+        self.assertTrue(all(success for _, success, _ in results))
+        update = next(entry for entry in log.recent if entry.sql.lstrip().startswith("UPDATE"))
+        self.assertEqual(update.parameters[2], "000001")
+        self.assertTrue(any("USING INDEX" in line for line in update.plan))
+
+
+class TestFullScanHelper(QueryPlanTestCase):
+    """Тесты проверки отсутствия полного просмотра таблицы."""
+
+    def test_scan_path_uses_indexes(self) -> None:
+        """Тест проверок и завершения карты по индексам."""
+        self.insert_cards([
+            ("000001", None, None, None),
+            ("000002", "03-311/25", "К25/03-296", "Завершена"),
+        ])
+
+        with self.assertNoFullTableScan() as log:
+            self.db_manager.check_blank_number("000001")
+            self.db_manager.check_account_number("03-311/25")
+            self.db_manager.check_cluster_number("К25/03-296")
+            self.db_manager.check_route_card_completed("000001")
+            self.db_manager.complete_route_card("000001")
+
+        self.assertGreaterEqual(len(log.recent), 5)
+
+    def test_full_scan_reported(self) -> None:
+        """Тест отказа при полном просмотре таблицы."""
+        with self.assertRaises(AssertionError) as context:
+            with self.assertNoFullTableScan():
+                self.db_manager.get_completed_cards_count()
+
+        self.assertIn("SCAN маршрутные_карты", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Тесты повторов записи при блокировке базы другой станцией."""
+
+import os
+import sqlite3
+import threading
+import unittest
+from unittest.mock import patch
+
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_FILELOG'] = '1'
+os.environ['KIVY_GL_BACKEND'] = 'mock'
+
+from test_database_reports import DatabaseTestCase
+from write_retry import WriteRetryPolicy, is_busy_error
+
+
+class TestWriteRetryPolicy(unittest.TestCase):
+    """Тесты политики повторов."""
+
+    def test_backoff_bounded_with_jitter(self) -> None:
+        """Тест экспоненциальной задержки с верхней границей."""
+        policy = WriteRetryPolicy(base_delay=0.01, max_delay=0.05)
+
+        for _ in range(50):
+            self.assertTrue(0.005 <= policy.backoff(0) <= 0.01)
+            self.assertTrue(0.01 <= policy.backoff(1) <= 0.02)
+            self.assertTrue(0.025 <= policy.backoff(10) <= 0.05)
+
+    def test_busy_error_detection(self) -> None:
+        """Тест распознавания ошибки блокировки."""
+        self.assertTrue(is_busy_error(sqlite3.OperationalError("database is locked")))
+        self.assertFalse(is_busy_error(sqlite3.OperationalError("no such table: x")))
+        self.assertFalse(is_busy_error(sqlite3.IntegrityError("database is locked")))
+
+
+class TestContendedWrites(DatabaseTestCase):
+    """Тесты записи при удержании блокировки другим соединением."""
+
+    def setUp(self) -> None:
+        """Подготовка карт и короткого ожидания блокировки."""
+        super().setUp()
+        self.insert_cards([
+            ("000001", None, None, None),
+            ("000002", None, None, None),
+        ])
+        self.addCleanup(self.db_manager.recent_completions.close)
+        self.db_manager.write_retry = WriteRetryPolicy(
+            max_attempts=20, base_delay=0.01, max_delay=0.05, busy_timeout=0.01
+        )
+
+    def hold_write_lock(self, seconds: float) -> threading.Thread:
+        """Удержание блокировки на запись другим соединением."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("BEGIN IMMEDIATE")
+
+        def release() -> None:
+            threading.Event().wait(seconds)
+            conn.rollback()
+            conn.close()
+
+        thread = threading.Thread(target=release)
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread
+
+    def test_write_succeeds_after_lock_released(self) -> None:
+        """Тест успешной записи после освобождения блокировки."""
+        self.hold_write_lock(0.2)
+
+        success, error_message = self.db_manager.complete_route_card("000001")
+
+        self.assertTrue(success)
+        self.assertIsNone(error_message)
+        stats = self.db_manager.write_retry.stats()
+        self.assertEqual(stats["writes"], 1)
+        self.assertEqual(stats["retried_writes"], 1)
+        self.assertGreater(stats["retries"], 0)
+        self.assertGreater(stats["wait_seconds"], 0)
+        self.assertEqual(stats["failures"], 0)
+
+    def test_update_card_info_retried(self) -> None:
+        """Тест повтора обновления информации о карте."""
+        self.hold_write_lock(0.2)
+
+        self.assertTrue(self.db_manager.update_card_info("000002", "05-002/25", "К25/05-099"))
+        self.assertGreater(self.db_manager.write_retry.stats()["retries"], 0)
+
+    def test_attempts_exhausted(self) -> None:
+        """Тест отказа после исчерпания попыток."""
+        self.db_manager.write_retry = WriteRetryPolicy(
+            max_attempts=3, base_delay=0.001, max_delay=0.002, busy_timeout=0.001
+        )
+        thread = self.hold_write_lock(1.0)
+
+        success, error_message = self.db_manager.complete_route_card("000001")
+        thread.join()
+
+        self.assertFalse(success)
+        self.assertIn("locked", error_message)
+        stats = self.db_manager.write_retry.stats()
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["failures"], 1)
+        self.assertFalse(self.db_manager.check_route_card_completed("000001"))
+
+    def test_other_errors_not_retried(self) -> None:
+        """Тест немедленного отказа при ошибке, не связанной с блокировкой."""
+        with patch("route_card_db.time.sleep") as sleep:
+            self.assertFalse(self.db_manager.update_card_info("000003", "05-002/25", "К25/05-099"))
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("DROP TABLE маршрутные_карты")
+            conn.close()
+            success, _ = self.db_manager.complete_route_card("000001")
+
+        self.assertFalse(success)
+        sleep.assert_not_called()
+        self.assertEqual(self.db_manager.write_retry.stats()["retries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
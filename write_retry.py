@@ -0,0 +1,126 @@
+"""
+Повторы записи в базу данных при блокировке другой станцией.
+
+Несколько станций пишут в один файл маршрутные_карты.db. Запись, не
+получившая блокировку за короткое время ожидания SQLite (busy timeout),
+повторяется с ограниченной экспоненциальной задержкой со случайной
+составляющей, чтобы станции не повторяли попытки одновременно.
+"""
+import random
+import sqlite3
+import threading
+from typing import Dict
+
+
+# Максимальное количество попыток записи
+WRITE_RETRY_ATTEMPTS = 8
+
+# Задержка перед первым повтором и верхняя граница задержки (секунды)
+WRITE_RETRY_BASE_DELAY = 0.01
+WRITE_RETRY_MAX_DELAY = 0.5
+
+# Время ожидания блокировки внутри SQLite на одну попытку (секунды)
+WRITE_BUSY_TIMEOUT = 0.5
+
+# Фрагменты сообщений SQLite о занятой базе данных
+BUSY_ERROR_MESSAGES = (
+    "database is locked",
+    "database is busy",
+    "database table is locked",
+)
+
+
+def is_busy_error(error: sqlite3.Error) -> bool:
+    """Проверка, что ошибка SQLite вызвана блокировкой базы другим соединением.
+
+    Args:
+        error: Исключение SQLite
+
+    Returns:
+        True если запись можно повторить позже
+    """
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        fragment in message for fragment in BUSY_ERROR_MESSAGES
+    )
+
+
+class WriteRetryPolicy:
+    """Политика повторов записи и счетчики ожидания блокировок."""
+
+    def __init__(
+        self,
+        max_attempts: int = WRITE_RETRY_ATTEMPTS,
+        base_delay: float = WRITE_RETRY_BASE_DELAY,
+        max_delay: float = WRITE_RETRY_MAX_DELAY,
+        busy_timeout: float = WRITE_BUSY_TIMEOUT
+    ) -> None:
+        """Инициализация политики.
+
+        Args:
+            max_attempts: Максимальное количество попыток записи
+            base_delay: Задержка перед первым повтором
+            max_delay: Верхняя граница задержки
+            busy_timeout: Время ожидания блокировки внутри SQLite на попытку
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.busy_timeout = busy_timeout
+        self.writes = 0
+        self.retried_writes = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед повтором со случайной составляющей.
+
+        Args:
+            attempt: Номер неудачной попытки, начиная с 0
+
+        Returns:
+            Задержка в секундах от половины до полной экспоненциальной задержки
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def record_retry(self) -> None:
+        """Учет повтора записи."""
+        with self._lock:
+            self.retries += 1
+
+    def record_write(self, attempts: int, waited: float, success: bool) -> None:
+        """Учет завершенной записи.
+
+        Args:
+            attempts: Количество выполненных попыток
+            waited: Время ожидания блокировок до последней попытки (секунды)
+            success: Запись выполнена
+        """
+        with self._lock:
+            self.writes += 1
+            if attempts > 1:
+                self.retried_writes += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            if not success:
+                self.failures += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики повторов записи.
+
+        Returns:
+            Словарь с количеством записей, повторов, отказов и временем ожидания
+        """
+        with self._lock:
+            return {
+                "writes": self.writes,
+                "retried_writes": self.retried_writes,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }